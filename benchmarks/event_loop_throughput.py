@@ -0,0 +1,117 @@
+"""Stream downloads and uploads over loopback on each event loop implementation, see
+`waterbutler.core.event_loop`::
+
+    python -m benchmarks.event_loop_throughput [--size 512] [--rounds 3] [--loops asyncio,uvloop]
+
+Downloads are written with the server's ``write_stream`` in ``CHUNK_SIZE`` chunks and read with
+aiohttp, uploads are sent with aiohttp and read by a handler streaming the request body, as
+WaterButler does for both.  ``SERVER_CONFIG.SOCKET_SEND_BUFFER`` and ``SOCKET_RECEIVE_BUFFER``
+apply to the benchmark's listening socket, so buffer sizes can be compared too.
+"""
+import time
+import logging
+import argparse
+
+import aiohttp
+import tornado.web
+import tornado.netutil
+import tornado.httpserver
+
+from waterbutler.core import event_loop
+from waterbutler.server import utils
+from waterbutler.server import settings
+
+MB = 1024 * 1024
+
+
+class ZeroStream:
+
+    def __init__(self, size):
+        self.remaining = size
+
+    async def read(self, size=-1):
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        self.remaining -= size
+        return bytes(size)
+
+
+class DownloadHandler(utils.UtilMixin, tornado.web.RequestHandler):
+
+    async def get(self):
+        size = int(self.get_argument('size'))
+        self.set_header('Content-Length', str(size))
+        await self.write_stream(ZeroStream(size))
+
+
+@tornado.web.stream_request_body
+class UploadHandler(utils.UtilMixin, tornado.web.RequestHandler):
+
+    def prepare(self):
+        self.received = 0
+
+    def data_received(self, chunk):
+        self.received += len(chunk)
+
+    def put(self):
+        self.write({'received': self.received})
+
+
+async def upload_body(size, chunk_size):
+    chunk = bytes(chunk_size)
+    while size > 0:
+        yield chunk[:size]
+        size -= chunk_size
+
+
+async def measure(size, rounds):
+    sockets = tornado.netutil.bind_sockets(0, address='127.0.0.1')
+    for sock in sockets:
+        event_loop.set_buffer_sizes(sock, send=settings.SOCKET_SEND_BUFFER,
+                                    receive=settings.SOCKET_RECEIVE_BUFFER)
+    port = sockets[0].getsockname()[1]
+    server = tornado.httpserver.HTTPServer(
+        tornado.web.Application([(r'/download', DownloadHandler), (r'/upload', UploadHandler)]),
+        max_body_size=size + 1,
+    )
+    server.add_sockets(sockets)
+
+    base = f'http://127.0.0.1:{port}'
+    download = upload = 0.0
+    async with aiohttp.ClientSession() as session:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            async with session.get(f'{base}/download', params={'size': size}) as resp:
+                async for _chunk in resp.content.iter_chunked(settings.CHUNK_SIZE):
+                    pass
+            download += time.perf_counter() - start
+
+            start = time.perf_counter()
+            async with session.put(f'{base}/upload',
+                                   data=upload_body(size, settings.CHUNK_SIZE)) as resp:
+                assert (await resp.json())['received'] == size
+            upload += time.perf_counter() - start
+
+    server.stop()
+    await server.close_all_connections()
+    return size * rounds / download, size * rounds / upload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=512, help='MB per transfer')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--loops', default='asyncio,uvloop')
+    args = parser.parse_args()
+
+    print(f'{args.rounds} x {args.size} MB each way, {settings.CHUNK_SIZE // 1024} KB chunks')
+    logging.getLogger('tornado.access').setLevel(logging.WARNING)
+    for name in args.loops.split(','):
+        if name == 'uvloop' and event_loop.uvloop is None:
+            print(f'  {name:8} not installed')
+            continue
+        download, upload = event_loop.run(measure(args.size * MB, args.rounds), name=name)
+        print(f'  {name:8} download {download / MB:>8.0f} MB/s   upload {upload / MB:>8.0f} MB/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Count the requests and response bytes the Google Drive provider needs for a typical sequence
+of operations, with and without ``fields`` masks and request batching.
+
+The upstream is simulated from the recorded fixtures in ``tests/providers/googledrive/fixtures``,
+so the numbers are deterministic and no credentials are needed::
+
+    python -m benchmarks.googledrive_requests [--files 50] [--depth 3]
+"""
+import os
+import json
+import copy
+import asyncio
+import argparse
+from urllib import parse
+
+from waterbutler.providers.googledrive import settings as pd_settings
+from waterbutler.providers.googledrive import GoogleDriveProvider
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir,
+                        'tests', 'providers', 'googledrive', 'fixtures', 'root_provider.json')
+
+
+def parse_fields(fields):
+    """Parse a Drive ``fields`` mask such as ``nextLink,items(id,title)`` into a nested dict."""
+    mask, stack, name = {}, [], ''
+    current = mask
+    for char in fields + ',':
+        if char in ',()':
+            if name.strip():
+                current[name.strip()] = {}
+            if char == '(':
+                stack.append(current)
+                current = current[name.strip()]
+            elif char == ')':
+                current = stack.pop()
+            name = ''
+        else:
+            name += char
+    return mask
+
+
+def apply_fields(data, mask):
+    if not mask:
+        return data
+    if isinstance(data, list):
+        return [apply_fields(item, mask) for item in data]
+    return {key: apply_fields(data[key], sub) for key, sub in mask.items() if key in data}
+
+
+class FakeDrive:
+    """Serve Drive v2 requests for a folder tree ``depth`` levels deep whose innermost folder
+    holds ``files`` files, all cloned from the recorded fixtures."""
+
+    def __init__(self, files, depth, honor_fields):
+        with open(FIXTURES) as fp:
+            fixtures = json.load(fp)
+        self.honor_fields = honor_fields
+        self.requests = 0
+        self.bytes = 0
+
+        template = fixtures['list_file']['items'][0]
+        self.items = {}
+        for i in range(files):
+            item = copy.deepcopy(template)
+            item.update(id=f'file{i}', title=f'file{i}.txt', mimeType='text/plain')
+            self.items[item['id']] = item
+        self.folders = []
+        for i in range(depth):
+            folder = copy.deepcopy(fixtures['folder_metadata'])
+            folder.update(id=f'folder{i}', title=f'folder{i}',
+                          mimeType=GoogleDriveProvider.FOLDER_MIME_TYPE)
+            self.items[folder['id']] = folder
+            self.folders.append(folder)
+
+    def respond(self, method, url):
+        url = parse.urlsplit(url)
+        query = dict(parse.parse_qsl(url.query))
+        segments = url.path.split('/')
+        if method == 'PUT':
+            data = self.items[segments[-1]]
+        elif segments[-1] == 'revisions':
+            data = {'items': [{'id': '1'}]}
+        elif segments[-1] == 'files' and 'title = ' in query.get('q', ''):
+            title = query['q'].split("title = '")[1].split("'")[0]
+            data = {'items': [item for item in self.items.values() if item['title'] == title]}
+        elif segments[-1] == 'files':
+            data = {'items': [item for item in self.items.values()
+                              if item['mimeType'] != GoogleDriveProvider.FOLDER_MIME_TYPE]}
+        else:
+            data = self.items[segments[-1]]
+        if self.honor_fields and 'fields' in query:
+            data = apply_fields(data, parse_fields(query['fields']))
+        return json.dumps(data)
+
+    async def make_request(self, method, url, **kwargs):
+        self.requests += 1
+        if url == pd_settings.BATCH_URL:
+            body = self._respond_to_batch(kwargs)
+            headers = {'Content-Type': 'multipart/mixed; boundary=batch_response'}
+        else:
+            body = self.respond(method, url).encode('utf-8')
+            headers = {'Content-Type': 'application/json'}
+        self.bytes += len(body)
+        return FakeResponse(body, headers)
+
+    def _respond_to_batch(self, kwargs):
+        boundary = kwargs['headers']['Content-Type'].partition('boundary=')[2]
+        parts = []
+        for part in kwargs['data'].decode('utf-8').split(f'--{boundary}')[1:-1]:
+            headers, _, http = part.strip('\r\n').partition('\r\n\r\n')
+            content_id = headers.rpartition('<')[2].rstrip('>')
+            method, path, _ = http.split('\r\n')[0].split(' ')
+            payload = self.respond(method, 'https://www.googleapis.com' + path)
+            parts.append(
+                f'--batch_response\r\nContent-Type: application/http\r\n'
+                f'Content-ID: <response-{content_id}>\r\n\r\n'
+                f'HTTP/1.1 200 OK\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n'
+                f'{payload}\r\n'
+            )
+        return (''.join(parts) + '--batch_response--\r\n').encode('utf-8')
+
+
+class FakeResponse:
+
+    def __init__(self, body, headers):
+        self.status = 200
+        self.body = body
+        self.headers = headers
+
+    async def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+    async def read(self):
+        return self.body
+
+    async def release(self):
+        pass
+
+
+async def run(files, depth, masked, batched, max_requests):
+    drive = FakeDrive(files, depth, honor_fields=masked)
+    provider = GoogleDriveProvider({}, {'token': 'token'}, {'folder': {'id': 'root', 'name': '/'}})
+    provider.make_request = drive.make_request
+    pd_settings.BATCH_MAX_REQUESTS = max_requests if batched else 1
+
+    folder = '/' + '/'.join(f['title'] for f in drive.folders) + '/'
+    path = await provider.validate_v1_path(folder)
+    listing = await provider.metadata(path)
+    children = [provider.path_from_metadata(path, child) for child in listing]
+    await asyncio.gather(*[provider.metadata(child) for child in children])
+    await asyncio.gather(*[provider.delete(child) for child in children[:files // 2]])
+    return drive.requests, drive.bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--depth', type=int, default=3)
+    args = parser.parse_args()
+
+    max_requests = pd_settings.BATCH_MAX_REQUESTS
+    loop = asyncio.get_event_loop()
+    print(f'{"fields":>8} {"batching":>9} {"requests":>9} {"bytes":>10}')
+    for masked in (False, True):
+        for batched in (False, True):
+            requests, size = loop.run_until_complete(run(args.files, args.depth, masked, batched,
+                                                                 max_requests))
+            print(f'{masked!s:>8} {batched!s:>9} {requests:>9} {size:>10}')
+
+
+if __name__ == '__main__':
+    main()
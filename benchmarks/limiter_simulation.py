@@ -0,0 +1,144 @@
+"""Simulate a burst of requests against a local fake upstream that slows down as it gets busy and
+starts answering 429 (with ``Retry-After``) past its capacity.  Compare a static concurrency limit
+against the adaptive limiter in `waterbutler.core.limiter`, both going through
+`BaseProvider.make_request`::
+
+    python -m benchmarks.limiter_simulation [--requests 2000] [--capacity 20] [--latency 0.01]
+
+A second, well-behaved upstream is exercised at the same time to show that throttling on one
+host doesn't slow down requests to another.
+"""
+import time
+import asyncio
+import argparse
+import statistics
+
+from aiohttp import web
+
+from waterbutler.core import limiter
+from waterbutler.core.provider import BaseProvider
+
+
+class BenchProvider(BaseProvider):
+    NAME = 'bench'
+
+    def can_duplicate_names(self):
+        return False
+
+    async def validate_v1_path(self, path, **kwargs):
+        raise NotImplementedError
+
+    async def validate_path(self, path, **kwargs):
+        raise NotImplementedError
+
+    async def download(self, *args, **kwargs):
+        raise NotImplementedError
+
+    async def upload(self, *args, **kwargs):
+        raise NotImplementedError
+
+    async def delete(self, *args, **kwargs):
+        raise NotImplementedError
+
+    async def metadata(self, *args, **kwargs):
+        raise NotImplementedError
+
+
+def fake_upstream(capacity, latency, retry_after):
+    """An upstream whose latency grows with load and which throttles beyond ``capacity``."""
+    state = {'in_flight': 0, 'throttled': 0}
+
+    async def handle(request):
+        state['in_flight'] += 1
+        try:
+            if state['in_flight'] > capacity:
+                state['throttled'] += 1
+                return web.Response(status=429, headers={'Retry-After': str(retry_after)})
+            await asyncio.sleep(latency * (1 + state['in_flight'] / capacity))
+            return web.Response(text='ok')
+        finally:
+            state['in_flight'] -= 1
+
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', handle)
+    return app, state
+
+
+async def serve(app):
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}'
+
+
+async def fetch(provider, url, latencies):
+    start = time.monotonic()
+    resp = await provider.make_request('GET', url, expects=(200, 429), retry=0)
+    await resp.release()
+    if resp.status == 429:
+        # a client that keeps knocking until it gets through
+        return await fetch(provider, url, latencies)
+    latencies.append(time.monotonic() - start)
+
+
+async def run(args, adaptive):
+    limiter._LIMITERS.clear()
+    config = {'initial': args.initial, 'floor': 1, 'ceiling': 200}
+    if not adaptive:
+        config.update(floor=args.initial, ceiling=args.initial)
+
+    busy_app, busy = fake_upstream(args.capacity, args.latency, args.retry_after)
+    quiet_app, _ = fake_upstream(10 ** 6, args.latency, args.retry_after)
+    busy_runner, busy_url = await serve(busy_app)
+    quiet_runner, quiet_url = await serve(quiet_app)
+
+    for url in (busy_url, quiet_url):
+        key = ('bench', url.split('//')[1])
+        limiter._LIMITERS.setdefault(asyncio.get_event_loop(), {})[key] = \
+            limiter.AdaptiveLimiter(key, **config)
+
+    provider = BenchProvider({}, {}, {})
+    busy_latencies, quiet_latencies = [], []
+    start = time.monotonic()
+    await asyncio.gather(
+        *[fetch(provider, f'{busy_url}/{i}', busy_latencies) for i in range(args.requests)],
+        *[fetch(provider, f'{quiet_url}/{i}', quiet_latencies) for i in range(args.requests // 10)],
+    )
+    elapsed = time.monotonic() - start
+    stats = {stat['host']: stat for stat in limiter.stats()}[busy_url.split('//')[1]]
+
+    for session in provider.session_list:
+        await session.close()
+    await busy_runner.cleanup()
+    await quiet_runner.cleanup()
+    return elapsed, busy['throttled'], busy_latencies, quiet_latencies, stats
+
+
+def p(values, pct):
+    return statistics.quantiles(values, n=100)[pct - 1] if len(values) > 1 else values[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--capacity', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--retry-after', type=float, default=0.1)
+    parser.add_argument('--initial', type=int, default=100,
+                        help='starting (and, for the static run, fixed) concurrency')
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    print(f'{"limiter":>9} {"seconds":>8} {"429s":>6} {"busy p50":>9} {"busy p99":>9} '
+          f'{"quiet p99":>10} {"final limit":>12}')
+    for adaptive in (False, True):
+        elapsed, throttled, busy, quiet, stats = loop.run_until_complete(run(args, adaptive))
+        final = stats['limit']
+        print(f'{"adaptive" if adaptive else "static":>9} {elapsed:>8.2f} {throttled:>6} '
+              f'{p(busy, 50):>9.3f} {p(busy, 99):>9.3f} {p(quiet, 99):>10.3f} {final:>12}')
+
+
+if __name__ == '__main__':
+    main()
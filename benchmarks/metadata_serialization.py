@@ -0,0 +1,85 @@
+"""Serialize a large synthetic S3 folder listing for the v1 API, the way it was serialized before
+the entity urls were built from a cached prefix and ISO 8601 dates were parsed by the stdlib,
+and the way it is now::
+
+    python -m benchmarks.metadata_serialization [--items 100000]
+
+Each run serializes every item with ``json_api_serialized`` and encodes the result, with the
+stdlib encoder before and with `waterbutler.core.utils.json_encode` (``orjson`` if it is
+installed) now.
+"""
+import json
+import time
+import argparse
+from unittest import mock
+
+import furl
+import pytz
+import dateutil.parser
+
+from waterbutler.core import utils
+from waterbutler.core import metadata
+from waterbutler.server import settings
+from waterbutler.providers.s3.metadata import S3FileMetadata
+
+
+def legacy_entity_url(self, resource):
+    url = furl.furl(settings.DOMAIN)
+    segments = ['v1', 'resources', resource, 'providers', self.provider]
+    segments += self.path.split('/')[1:]
+    url.path.segments.extend(segments)
+    return url.url
+
+
+def legacy_normalize_datetime(date_string):
+    if date_string is None:
+        return None
+    parsed_datetime = dateutil.parser.parse(date_string)
+    if not parsed_datetime.tzinfo:
+        parsed_datetime = parsed_datetime.replace(tzinfo=pytz.UTC)
+    parsed_datetime = parsed_datetime.astimezone(tz=pytz.UTC)
+    parsed_datetime = parsed_datetime.replace(microsecond=0)
+    return parsed_datetime.isoformat()
+
+
+def listing(count):
+    items = []
+    for number in range(count):
+        items.append(S3FileMetadata({
+            'Key': f'projects/raw data/run {number // 1000}/sample_{number:06d}.csv',
+            'LastModified': f'2024-03-{number % 28 + 1:02d}T12:{number % 60:02d}:07.000Z',
+            'ETag': f'"{number:032x}"',
+            'Size': str(number * 17),
+            'StorageClass': 'STANDARD',
+            'base_folder': '',
+        }))
+    return items
+
+
+def serialize(items, encode):
+    start = time.perf_counter()
+    for item in items:
+        encode(item.json_api_serialized('abc12'))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=100000)
+    args = parser.parse_args()
+
+    items = listing(args.items)
+
+    with mock.patch.object(metadata.BaseMetadata, '_entity_url', legacy_entity_url), \
+            mock.patch.object(utils, 'normalize_datetime', legacy_normalize_datetime):
+        before = serialize(items, json.dumps)
+    after = serialize(items, utils.json_encode)
+
+    encoder = 'orjson' if utils.orjson is not None else 'json'
+    print(f'{args.items} items')
+    print(f'  before:          {args.items / before:>10.0f} items/s')
+    print(f'  after ({encoder}): {args.items / after:>10.0f} items/s  ({before / after:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Make a million child paths of one folder, as a large listing or a tree walk does, the way
+`WaterButlerPath.child` made them before, by joining and parsing their full path again with
+`WaterButlerPath.from_parts`, and the way it makes them now, sharing the parent's parts::
+
+    python -m benchmarks.path_children [--children 1000000] [--depth 6]
+
+Reports the time taken to make the children and read their ``path`` and ``materialized_path``
+twice, and the memory the children hold on to.
+"""
+import gc
+import time
+import argparse
+import tracemalloc
+
+from waterbutler.core.path import WaterButlerPath
+
+
+def legacy_child(parent, name):
+    return parent.from_parts(parent.parts + [parent.PART_CLASS(name)], prepend=parent._prepend)
+
+
+def new_child(parent, name):
+    return parent.child(name)
+
+
+def run(parent, count, child):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    children = [child(parent, f'sample_{number:07d}.csv') for number in range(count)]
+    for _ in range(2):
+        for path in children:
+            path.path
+            path.materialized_path
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del children
+    return elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--children', type=int, default=1000000)
+    parser.add_argument('--depth', type=int, default=6)
+    args = parser.parse_args()
+
+    parent = WaterButlerPath('/' + ''.join(f'folder {n}/' for n in range(args.depth)),
+                             prepend='storage/root')
+
+    before, before_size = run(parent, args.children, legacy_child)
+    after, after_size = run(parent, args.children, new_child)
+
+    print(f'{args.children} children of a folder {args.depth} deep')
+    print(f'  before: {before:>7.2f}s  {before_size / 2 ** 20:>8.1f} MiB')
+    print(f'  after:  {after:>7.2f}s  {after_size / 2 ** 20:>8.1f} MiB  '
+          f'({before / after:.1f}x faster, {before_size / after_size:.1f}x smaller)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Copy one large file between two filesystem providers that pretend to be remote, as a single
+stream and as concurrent byte ranges fed into a multipart upload (`waterbutler.core.ranged`)::
+
+    python -m benchmarks.ranged_transfer [--size 256] [--bandwidth 50] [--concurrency 2 4 8]
+
+Every connection, download or upload, is throttled to ``--bandwidth`` MB/s and every request
+takes ``--latency`` seconds, so a single stream is limited by one connection the way a copy
+between two real providers is.
+"""
+import os
+import time
+import shutil
+import asyncio
+import hashlib
+import argparse
+import tempfile
+
+from waterbutler import settings as wb_settings
+from waterbutler.core import ranged
+from waterbutler.core import streams
+from waterbutler.core.path import WaterButlerPath
+from waterbutler.providers.filesystem import FileSystemProvider
+from waterbutler.providers.filesystem import settings as fs_settings
+
+
+class ThrottledStream(streams.BaseStream):
+    """Read ``inner`` no faster than ``bandwidth`` bytes a second."""
+
+    def __init__(self, inner, bandwidth):
+        super().__init__()
+        self.inner = inner
+        self.bandwidth = bandwidth
+        self.partial = getattr(inner, 'partial', False)
+        self.started = time.monotonic()
+        self.bytes_read = 0
+
+    @property
+    def size(self):
+        return self.inner.size
+
+    async def _read(self, n=-1):
+        chunk = await self.inner.read(n)
+        if chunk:
+            self.bytes_read += len(chunk)
+            await asyncio.sleep(self.started + self.bytes_read / self.bandwidth - time.monotonic())
+        else:
+            self.feed_eof()
+        return chunk
+
+
+class FilePartUpload(ranged.PartUpload):
+
+    def __init__(self, provider, path, part_size):
+        self.provider = provider
+        self.path = path
+        self.part_size = part_size
+        self.fd = os.open(path.full_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+    async def upload_part(self, part):
+        await asyncio.sleep(self.provider.latency + part.size / self.provider.bandwidth)
+        await part.digest('md5')
+        os.pwrite(self.fd, part.data, part.offset)
+
+    async def complete(self):
+        os.close(self.fd)
+        return (await self.provider.metadata(self.path)), True
+
+    async def abort(self):
+        os.close(self.fd)
+        os.remove(self.path.full_path)
+        return True
+
+
+class RemoteFileSystemProvider(FileSystemProvider):
+
+    NAME = 'remotefs'
+    latency = 0.0
+    bandwidth = 50 * 1024 * 1024
+    part_size = 16 * 1024 * 1024
+    ranged = True
+
+    def can_intra_copy(self, dest_provider, path=None):
+        return False
+
+    def can_download_ranges(self):
+        return self.ranged
+
+    def can_upload_parts(self, size):
+        return self.ranged
+
+    async def start_part_upload(self, path, size):
+        await asyncio.sleep(self.latency)
+        return FilePartUpload(self, path, self.part_size)
+
+    async def download(self, path, **kwargs):
+        await asyncio.sleep(self.latency)
+        return ThrottledStream(await super().download(path, **kwargs), self.bandwidth)
+
+
+def md5sum(path):
+    with open(path, 'rb') as fp:
+        return hashlib.file_digest(fp, 'md5').hexdigest()
+
+
+async def copy(src_root, dest_root, ranged_copy):
+    shutil.rmtree(dest_root, ignore_errors=True)
+    os.makedirs(dest_root)
+    RemoteFileSystemProvider.ranged = ranged_copy
+    src = RemoteFileSystemProvider({}, {}, {'folder': src_root})
+    dest = RemoteFileSystemProvider({}, {}, {'folder': dest_root})
+    start = time.monotonic()
+    await src.copy(dest, WaterButlerPath('/large.bin', prepend=src_root),
+                   WaterButlerPath('/large.bin', prepend=dest_root), handle_naming=False)
+    return time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=256, help='file size, in MB')
+    parser.add_argument('--part-size', type=int, default=16, help='part size, in MB')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='simulated seconds per request')
+    parser.add_argument('--bandwidth', type=float, default=50,
+                        help='simulated bandwidth of one connection, in MB/s')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[2, 4, 8])
+    args = parser.parse_args()
+
+    RemoteFileSystemProvider.latency = args.latency
+    RemoteFileSystemProvider.bandwidth = args.bandwidth * 1024 * 1024
+    RemoteFileSystemProvider.part_size = args.part_size * 1024 * 1024
+    wb_settings.RANGED_TRANSFER_THRESHOLD = 0
+    # read in the same chunks as the filesystem provider's upload does
+    wb_settings.RANGED_TRANSFER_READ_SIZE = fs_settings.CHUNK_SIZE
+    wb_settings.RANGED_TRANSFER_MAX_BUFFER = max(args.concurrency) * args.part_size * 1024 * 1024
+
+    loop = asyncio.get_event_loop()
+    with tempfile.TemporaryDirectory() as workdir:
+        src_root, dest_root = os.path.join(workdir, 'src'), os.path.join(workdir, 'dest')
+        os.makedirs(src_root)
+        with open(os.path.join(src_root, 'large.bin'), 'wb') as fp:
+            for _ in range(args.size):
+                fp.write(os.urandom(1024 * 1024))
+        expected = md5sum(os.path.join(src_root, 'large.bin'))
+
+        single = loop.run_until_complete(copy(src_root, dest_root, False))
+        assert md5sum(os.path.join(dest_root, 'large.bin')) == expected
+        print(f'{"mode":>12} {"seconds":>8} {"MB/s":>7} {"speedup":>8}')
+        print(f'{"one stream":>12} {single:>8.2f} {args.size / single:>7.1f} {1:>7.1f}x')
+
+        for concurrency in args.concurrency:
+            wb_settings.RANGED_TRANSFER_CONCURRENCY = concurrency
+            elapsed = loop.run_until_complete(copy(src_root, dest_root, True))
+            assert md5sum(os.path.join(dest_root, 'large.bin')) == expected
+            print(f'{f"{concurrency} ranges":>12} {elapsed:>8.2f} {args.size / elapsed:>7.1f} '
+                  f'{single / elapsed:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
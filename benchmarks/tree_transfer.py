@@ -0,0 +1,176 @@
+"""Copy synthetic folder trees between two filesystem providers, with a simulated per-request
+latency, using the old per-folder batches and the tree-wide `waterbutler.core.transfer`
+scheduler::
+
+    python -m benchmarks.tree_transfer [--latency 0.02] [--concurrency 5]
+
+Intra copies are disabled so that every file goes through download and upload, as it would
+between two different providers.  Two trees are copied: a deep one (a chain of folders with a
+few small files each) and a wide one (many small subfolders, plus a handful of large files).
+"""
+import os
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+
+from waterbutler import settings as wb_settings
+from waterbutler.core import exceptions
+from waterbutler.core.path import WaterButlerPath
+from waterbutler.providers.filesystem import FileSystemProvider
+from waterbutler.providers.filesystem.metadata import FileSystemFolderMetadata
+
+
+class SlowFileSystemProvider(FileSystemProvider):
+    """A filesystem provider that pretends to be remote: every call takes ``latency`` seconds,
+    and uploads also take time proportional to their size."""
+
+    NAME = 'slowfs'
+    latency = 0.0
+    bandwidth = 100 * 1024 * 1024
+
+    def can_intra_copy(self, dest_provider, path=None):
+        return False
+
+    def can_intra_move(self, dest_provider, path=None):
+        return False
+
+    async def revalidate_path(self, base, name, folder=False):
+        return base.child(name, folder=folder)
+
+    async def metadata(self, path, **kwargs):
+        await asyncio.sleep(self.latency)
+        return await super().metadata(path, **kwargs)
+
+    async def download(self, path, **kwargs):
+        await asyncio.sleep(self.latency)
+        return await super().download(path, **kwargs)
+
+    async def upload(self, stream, path, **kwargs):
+        await asyncio.sleep(self.latency + stream.size / self.bandwidth)
+        return await super().upload(stream, path, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        await asyncio.sleep(self.latency)
+        if not os.path.exists(path.full_path):
+            raise exceptions.NotFoundError(str(path))
+        return await super().delete(path, **kwargs)
+
+    async def create_folder(self, path, **kwargs):
+        await asyncio.sleep(self.latency)
+        os.makedirs(path.full_path, exist_ok=True)
+        return FileSystemFolderMetadata({'path': path.path}, self.folder)
+
+
+class BatchedFileSystemProvider(SlowFileSystemProvider):
+    """The folder walk as it was before the tree-wide scheduler: children in batches of
+    ``OP_CONCURRENCY``, each subfolder awaited inline."""
+
+    async def _folder_file_op(self, func, dest_provider, src_path, dest_path, **kwargs):
+        try:
+            await dest_provider.delete(dest_path)
+            created = False
+        except exceptions.ProviderError as e:
+            if e.code != 404:
+                raise
+            created = True
+
+        folder = await dest_provider.create_folder(dest_path, folder_precheck=False)
+        dest_path = await dest_provider.revalidate_path(dest_path.parent, dest_path.name,
+                                                        folder=dest_path.is_dir)
+        folder.children = []
+        items = await self.metadata(src_path)
+
+        for i in range(0, len(items), wb_settings.OP_CONCURRENCY):
+            futures = []
+            for item in items[i:i + wb_settings.OP_CONCURRENCY]:
+                futures.append(asyncio.ensure_future(func(
+                    dest_provider,
+                    (await self.revalidate_path(src_path, item.name, folder=item.is_folder)),
+                    (await dest_provider.revalidate_path(dest_path, item.name,
+                                                         folder=item.is_folder)),
+                    handle_naming=False,
+                )))
+                if item.is_folder:
+                    await futures[-1]
+            if not futures:
+                continue
+            done, _ = await asyncio.wait(futures, return_when=asyncio.FIRST_EXCEPTION)
+            for fut in done:
+                folder.children.append(fut.result()[0])
+
+        return folder, created
+
+
+def write_file(path, size):
+    with open(path, 'wb') as fp:
+        fp.write(os.urandom(size))
+
+
+def deep_tree(root, depth=30, files=3):
+    path = root
+    for level in range(depth):
+        path = os.path.join(path, f'level-{level}')
+        os.makedirs(path)
+        for i in range(files):
+            write_file(os.path.join(path, f'file-{i}.txt'), 1024)
+
+
+def wide_tree(root, folders=60, files=4, large=4, large_size=16 * 1024 * 1024):
+    for i in range(large):
+        write_file(os.path.join(root, f'large-{i}.bin'), large_size)
+    for folder in range(folders):
+        path = os.path.join(root, f'folder-{folder}')
+        os.makedirs(path)
+        for i in range(files):
+            write_file(os.path.join(path, f'file-{i}.txt'), 1024)
+
+
+async def copy_tree(provider_class, src_root, dest_root):
+    shutil.rmtree(dest_root, ignore_errors=True)
+    src = provider_class({}, {}, {'folder': src_root})
+    dest = provider_class({}, {}, {'folder': dest_root})
+    start = time.monotonic()
+    await src.copy(dest, WaterButlerPath('/', prepend=src_root),
+                   WaterButlerPath('/copy/', prepend=dest_root), handle_naming=False)
+    return time.monotonic() - start
+
+
+def count_files(root):
+    return sum(len(files) for _, _, files in os.walk(root))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='simulated seconds per provider call')
+    parser.add_argument('--concurrency', type=int, default=wb_settings.OP_CONCURRENCY)
+    parser.add_argument('--bandwidth', type=float, default=100,
+                        help='simulated upload bandwidth, in MB/s')
+    args = parser.parse_args()
+
+    wb_settings.OP_CONCURRENCY = args.concurrency
+    SlowFileSystemProvider.latency = args.latency
+    SlowFileSystemProvider.bandwidth = args.bandwidth * 1024 * 1024
+
+    loop = asyncio.get_event_loop()
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f'{"tree":>5} {"files":>6} {"batched":>9} {"scheduler":>10} {"speedup":>8}')
+        for name, build in (('deep', deep_tree), ('wide', wide_tree)):
+            src_root = os.path.join(workdir, name)
+            dest_root = os.path.join(workdir, f'{name}-dest')
+            os.makedirs(src_root)
+            build(src_root)
+
+            batched = loop.run_until_complete(
+                copy_tree(BatchedFileSystemProvider, src_root, dest_root))
+            scheduled = loop.run_until_complete(
+                copy_tree(SlowFileSystemProvider, src_root, dest_root))
+            assert count_files(dest_root) == count_files(src_root)
+            print(f'{name:>5} {count_files(src_root):>6} {batched:>9.2f} {scheduled:>10.2f} '
+                  f'{batched / scheduled:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
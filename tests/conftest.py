@@ -12,8 +12,14 @@ server_settings.ENABLE_RATE_LIMITING = False
 
 import aiohttpretty
 
+from waterbutler.core import retry
+from waterbutler.core import hedging
+
 
 def pytest_runtest_setup(item):
+    # retry budgets, circuit breakers and latency histories are shared across the process
+    retry._UPSTREAMS.clear()
+    hedging._TRACKERS.clear()
     if 'aiohttpretty' in item.keywords:
         aiohttpretty.clear()
         aiohttpretty.activate()
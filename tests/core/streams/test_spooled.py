@@ -0,0 +1,81 @@
+import hashlib
+
+import pytest
+
+from waterbutler.core import streams
+
+
+DATA = b'SLEEP IS FOR THE WEAK GO SERVE STREAMS'
+
+
+class TestSpooledPart:
+
+    @pytest.mark.asyncio
+    async def test_fill_digests(self):
+        with streams.SpooledPart(10, digests=('sha1', 'md5')) as part:
+            assert await part.fill(streams.StringStream(DATA)) == 10
+
+            assert part.digest('sha1') == hashlib.sha1(DATA[:10]).digest()
+            assert part.hexdigest('md5') == hashlib.md5(DATA[:10]).hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_fill_leaves_rest_of_stream(self):
+        stream = streams.StringStream(DATA)
+        with streams.SpooledPart(10, write_size=3) as part:
+            await part.fill(stream)
+
+            assert await part.stream().read() == DATA[:10]
+            assert await stream.read() == DATA[10:]
+
+    @pytest.mark.asyncio
+    async def test_fill_to_end(self):
+        with streams.SpooledPart(digests=()) as part:
+            assert await part.fill(streams.StringStream(DATA)) == len(DATA)
+            assert part.stream().size == len(DATA)
+
+    @pytest.mark.asyncio
+    async def test_short_stream(self):
+        with streams.SpooledPart(100) as part:
+            assert await part.fill(streams.StringStream(DATA)) == len(DATA)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('max_memory,on_disk', [(len(DATA), False), (10, True)])
+    async def test_spills_to_disk(self, max_memory, on_disk):
+        with streams.SpooledPart(max_memory=max_memory, write_size=4) as part:
+            await part.fill(streams.StringStream(DATA))
+
+            assert part.on_disk is on_disk
+            assert await part.stream().read() == DATA
+
+    @pytest.mark.asyncio
+    async def test_streams_are_rereadable(self):
+        with streams.SpooledPart(max_memory=10) as part:
+            await part.fill(streams.StringStream(DATA))
+
+            first = part.stream()
+            chunks = []
+            async for chunk in first:
+                chunks.append(chunk)
+            assert b''.join(chunks) == DATA
+            assert first.at_eof()
+
+            second = part.stream()
+            assert await second.read(5) == DATA[:5]
+            assert await second.read() == DATA[5:]
+            assert await second.read() == b''
+
+    @pytest.mark.asyncio
+    async def test_read(self):
+        with streams.SpooledPart(max_memory=10) as part:
+            await part.fill(streams.StringStream(DATA))
+
+            assert await part.read(6, 2) == DATA[6:8]
+
+    @pytest.mark.asyncio
+    async def test_empty(self):
+        with streams.SpooledPart() as part:
+            assert await part.fill(streams.StringStream(b'')) == 0
+
+            stream = part.stream()
+            assert await stream.read() == b''
+            assert stream.at_eof()
@@ -0,0 +1,136 @@
+import asyncio
+from http import HTTPStatus
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import batch
+from waterbutler.core import exceptions
+
+BASE_URL = 'https://api.example.com'
+
+
+class ListBatcher(batch.BaseBatcher):
+    """Sends a batch as the list of its sub-request urls and expects a list of sub-responses."""
+
+    base_url = BASE_URL
+    window = 0.05
+    default_retry_after = 0.0
+
+    def _build_batch(self, requests):
+        return f'{BASE_URL}/batch', {'data': [request.url for request in requests]}
+
+    async def _parse_batch(self, resp, requests):
+        return list(zip(requests, await resp.json()))
+
+
+class FakeUpstream:
+    """Answers plain requests with a 200 and batch calls with the next list of sub-response
+    statuses, repeating the last one."""
+
+    def __init__(self, *statuses, delay=0):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs.get('data')))
+        await asyncio.sleep(self.delay)
+        if method != 'POST':
+            return batch.BatchResponse(HTTPStatus.OK, body={'url': url})
+        statuses = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return batch.BatchResponse(HTTPStatus.OK, body=[
+            batch.BatchResponse(status, body={'url': url}) for url, status in
+            zip(kwargs['data'], statuses)
+        ])
+
+
+def make_batcher(upstream):
+    return ListBatcher(mock.Mock(make_request=upstream))
+
+
+def get(batcher, name):
+    return batcher.request('GET', f'{BASE_URL}/{name}', (HTTPStatus.OK, ), exceptions.MetadataError)
+
+
+class TestBaseBatcher:
+
+    @pytest.mark.asyncio
+    async def test_lone_request_doesnt_wait_for_the_window(self):
+        upstream = FakeUpstream()
+        batcher = make_batcher(upstream)
+        batcher.window = 10
+
+        resp = await asyncio.wait_for(get(batcher, 'a'), 1)
+
+        assert resp.status == HTTPStatus.OK
+        assert upstream.calls == [('GET', f'{BASE_URL}/a', None)]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_are_batched(self):
+        upstream = FakeUpstream([HTTPStatus.OK] * 3)
+        batcher = make_batcher(upstream)
+
+        results = await asyncio.gather(*[get(batcher, name) for name in 'abc'])
+
+        assert [resp.body for resp in results] == [{'url': f'/{name}'} for name in 'abc']
+        assert upstream.calls == [('POST', f'{BASE_URL}/batch', ['/a', '/b', '/c'])]
+
+    @pytest.mark.asyncio
+    async def test_requests_made_while_in_flight_are_collected(self):
+        upstream = FakeUpstream([HTTPStatus.OK] * 2, delay=0.02)
+        batcher = make_batcher(upstream)
+
+        first = asyncio.ensure_future(get(batcher, 'a'))
+        await asyncio.sleep(0.005)
+        second = asyncio.ensure_future(get(batcher, 'b'))
+        await asyncio.sleep(0.005)
+        third = asyncio.ensure_future(get(batcher, 'c'))
+        await asyncio.gather(first, second, third)
+
+        assert upstream.calls == [
+            ('GET', f'{BASE_URL}/a', None),
+            ('POST', f'{BASE_URL}/batch', ['/b', '/c']),
+        ]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('status', [
+        HTTPStatus.TOO_MANY_REQUESTS,
+        HTTPStatus.INTERNAL_SERVER_ERROR,
+        HTTPStatus.BAD_GATEWAY,
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        HTTPStatus.GATEWAY_TIMEOUT,
+    ])
+    async def test_throttled_and_failed_sub_requests_are_retried(self, status):
+        upstream = FakeUpstream([HTTPStatus.OK, status], [HTTPStatus.OK])
+        batcher = make_batcher(upstream)
+
+        results = await asyncio.gather(get(batcher, 'a'), get(batcher, 'b'))
+
+        assert [resp.status for resp in results] == [HTTPStatus.OK, HTTPStatus.OK]
+        assert upstream.calls[1] == ('POST', f'{BASE_URL}/batch', ['/b'])
+
+    @pytest.mark.asyncio
+    async def test_failed_sub_requests_give_up(self):
+        upstream = FakeUpstream([HTTPStatus.OK, HTTPStatus.BAD_GATEWAY], [HTTPStatus.BAD_GATEWAY])
+        batcher = make_batcher(upstream)
+
+        results = await asyncio.gather(get(batcher, 'a'), get(batcher, 'b'),
+                                       return_exceptions=True)
+
+        assert results[0].status == HTTPStatus.OK
+        assert isinstance(results[1], exceptions.MetadataError)
+        assert results[1].code == HTTPStatus.BAD_GATEWAY
+        assert len(upstream.calls) == 1 + batcher.max_retries
+
+    @pytest.mark.asyncio
+    async def test_other_errors_are_raised(self):
+        upstream = FakeUpstream([HTTPStatus.OK, HTTPStatus.NOT_FOUND])
+        batcher = make_batcher(upstream)
+
+        results = await asyncio.gather(get(batcher, 'a'), get(batcher, 'b'),
+                                       return_exceptions=True)
+
+        assert isinstance(results[1], exceptions.MetadataError)
+        assert results[1].code == HTTPStatus.NOT_FOUND
+        assert len(upstream.calls) == 1
@@ -0,0 +1,77 @@
+import socket
+import asyncio
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import event_loop
+
+
+class TestImplementation:
+
+    def test_asyncio(self):
+        with mock.patch.object(event_loop, 'uvloop', mock.Mock()):
+            assert event_loop.implementation('asyncio') == 'asyncio'
+
+    @pytest.mark.parametrize('name', ['auto', 'uvloop'])
+    def test_uvloop_installed(self, name):
+        with mock.patch.object(event_loop, 'uvloop', mock.Mock()):
+            assert event_loop.implementation(name) == 'uvloop'
+
+    @pytest.mark.parametrize('name', ['auto', 'uvloop'])
+    def test_uvloop_missing(self, name):
+        with mock.patch.object(event_loop, 'uvloop', None):
+            assert event_loop.implementation(name) == 'asyncio'
+
+    def test_setting(self):
+        with mock.patch.object(event_loop.settings, 'EVENT_LOOP', 'asyncio'), \
+                mock.patch.object(event_loop, 'uvloop', mock.Mock()):
+            assert event_loop.implementation() == 'asyncio'
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            event_loop.implementation('trio')
+
+
+class TestNewEventLoop:
+
+    def test_uvloop(self):
+        uvloop = mock.Mock()
+        with mock.patch.object(event_loop, 'uvloop', uvloop):
+            assert event_loop.new_event_loop('uvloop') is uvloop.new_event_loop.return_value
+
+    def test_executor_threads(self):
+        with mock.patch.object(event_loop.settings, 'EVENT_LOOP_EXECUTOR_THREADS', 3):
+            loop = event_loop.new_event_loop('asyncio')
+        try:
+            assert loop._default_executor._max_workers == 3
+        finally:
+            loop.close()
+
+    def test_default_executor(self):
+        with mock.patch.object(event_loop.settings, 'EVENT_LOOP_EXECUTOR_THREADS', 0):
+            loop = event_loop.new_event_loop('asyncio')
+        try:
+            assert loop._default_executor is None
+        finally:
+            loop.close()
+
+
+def test_run():
+    async def main():
+        return asyncio.get_running_loop()
+
+    loop = event_loop.run(main(), name='asyncio')
+
+    assert isinstance(loop, asyncio.AbstractEventLoop)
+    assert loop.is_closed()
+
+
+def test_set_buffer_sizes():
+    with socket.socket() as sock:
+        default = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+        event_loop.set_buffer_sizes(sock, send=1024 * 1024)
+
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF) >= 1024 * 1024
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF) == default
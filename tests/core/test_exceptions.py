@@ -31,6 +31,7 @@ class TestExceptionSerialization:
         exceptions.UploadChecksumMismatchError,
         exceptions.UploadFailedError,
         exceptions.NotFoundError,
+        exceptions.ServiceUnavailableError,
         exceptions.InvalidPathError,
         exceptions.OverwriteSelfError,
         exceptions.UnsupportedOperationError,
@@ -0,0 +1,189 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from tests import utils
+from waterbutler import settings
+from waterbutler.core import hedging
+
+
+class FakeResponse:
+
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+        self.status = 200
+        self.headers = {}
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(hedging, '_TRACKERS', {})
+    monkeypatch.setattr(hedging, '_BUDGET', None)
+    monkeypatch.setattr(hedging, '_STATS', {'eligible': 0, 'sent': 0, 'wins': 0})
+
+
+def sender(*latencies, fail=()):
+    """Return a send function whose n-th call takes ``latencies[n]`` seconds."""
+    calls = []
+
+    async def send():
+        n = len(calls)
+        calls.append(n)
+        try:
+            await asyncio.sleep(latencies[n])
+        except asyncio.CancelledError:
+            calls[n] = 'cancelled'
+            raise
+        if n in fail:
+            raise ValueError(n)
+        return FakeResponse(n)
+
+    send.calls = calls
+    return send
+
+
+class TestLatencyTracker:
+
+    def test_percentile(self):
+        tracker = hedging.LatencyTracker(100)
+        for latency in range(1, 101):
+            tracker.add(latency / 100)
+        assert tracker.percentile(50) == 0.51
+        assert tracker.percentile(95) == 0.96
+        assert tracker.percentile(100) == 1.0
+
+    def test_window(self):
+        tracker = hedging.LatencyTracker(10)
+        for latency in range(100):
+            tracker.add(latency)
+        assert tracker.percentile(0) == 90
+
+    def test_needs_samples_to_hedge(self, monkeypatch):
+        monkeypatch.setattr(settings, 'HEDGING_MIN_SAMPLES', 5)
+        tracker = hedging.LatencyTracker(10)
+        for _ in range(4):
+            tracker.add(1)
+        assert tracker.hedge_delay() is None
+        tracker.add(1)
+        assert tracker.hedge_delay() == 1
+
+    def test_min_delay(self, monkeypatch):
+        monkeypatch.setattr(settings, 'HEDGING_MIN_SAMPLES', 1)
+        monkeypatch.setattr(settings, 'HEDGING_MIN_DELAY', 0.5)
+        tracker = hedging.LatencyTracker(10)
+        tracker.add(0.001)
+        assert tracker.hedge_delay() == 0.5
+
+
+class TestRace:
+
+    @pytest.mark.asyncio
+    async def test_fast_response_is_not_hedged(self):
+        send = sender(0)
+        resp, hedged, won = await hedging.race(send, 0.05)
+        assert (resp.name, hedged, won) == (0, False, False)
+        assert send.calls == [0]
+
+    @pytest.mark.asyncio
+    async def test_never_hedges_without_delay(self):
+        send = sender(0.02)
+        resp, hedged, _ = await hedging.race(send, None)
+        assert not hedged
+        assert send.calls == [0]
+
+    @pytest.mark.asyncio
+    async def test_hedge_wins(self):
+        send = sender(1, 0)
+        resp, hedged, won = await hedging.race(send, 0.01)
+        assert (resp.name, hedged, won) == (1, True, True)
+        await asyncio.sleep(0)
+        assert send.calls == ['cancelled', 1]
+        assert hedging.stats() == {'eligible': 1, 'sent': 1, 'wins': 1}
+
+    @pytest.mark.asyncio
+    async def test_original_wins(self):
+        send = sender(0.03, 1)
+        resp, hedged, won = await hedging.race(send, 0.01)
+        assert (resp.name, hedged, won) == (0, True, False)
+        await asyncio.sleep(0)
+        assert send.calls == [0, 'cancelled']
+
+    @pytest.mark.asyncio
+    async def test_failed_attempt_falls_back_to_other(self):
+        send = sender(0.03, 0.05, fail=(0, ))
+        resp, hedged, won = await hedging.race(send, 0.01)
+        assert (resp.name, hedged, won) == (1, True, True)
+
+    @pytest.mark.asyncio
+    async def test_both_fail(self):
+        send = sender(0.03, 0.05, fail=(0, 1))
+        with pytest.raises(ValueError) as exc:
+            await hedging.race(send, 0.01)
+        assert exc.value.args == (0, )
+
+    @pytest.mark.asyncio
+    async def test_budget_limits_hedges(self, monkeypatch):
+        monkeypatch.setattr(settings, 'HEDGING_MAX_RATIO', 0.1)
+        monkeypatch.setattr(settings, 'HEDGING_BURST', 1)
+
+        results = [await hedging.race(sender(0.02, 0), 0.01) for _ in range(5)]
+
+        assert [hedged for _, hedged, _ in results] == [True, False, False, False, False]
+        assert hedging.stats()['sent'] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancellation_cancels_both(self):
+        send = sender(1, 1)
+        task = asyncio.ensure_future(hedging.race(send, 0.01))
+        await asyncio.sleep(0.03)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+        assert send.calls == ['cancelled', 'cancelled']
+
+
+class TestMakeRequest:
+
+    @pytest.mark.asyncio
+    async def test_hedges_slow_requests(self, monkeypatch):
+        monkeypatch.setattr(settings, 'HEDGING_MIN_SAMPLES', 1)
+        monkeypatch.setattr(settings, 'HEDGING_MIN_DELAY', 0.01)
+        provider = utils.MockProvider1({}, {}, {})
+        hedging.tracker(provider.NAME, 'https://example.com').add(0.01)
+        send = sender(1, 0)
+        with mock.patch.object(provider, '_send_request', new=lambda *a, **kw: send()):
+            resp = await provider.make_request('GET', 'https://example.com', hedge=True)
+
+        assert resp.name == 1
+        metrics = provider.provider_metrics.serialize()['hedge']
+        assert metrics == {'sent': 1, 'wins': 1}
+
+    @pytest.mark.asyncio
+    async def test_only_idempotent_methods(self, monkeypatch):
+        monkeypatch.setattr(settings, 'HEDGING_MIN_SAMPLES', 1)
+        provider = utils.MockProvider1({}, {}, {})
+        hedging.tracker(provider.NAME, 'https://example.com').add(0.01)
+        send = sender(0.05, 0)
+        with mock.patch.object(provider, '_send_request', new=lambda *a, **kw: send()):
+            resp = await provider.make_request('POST', 'https://example.com', hedge=True)
+
+        assert resp.name == 0
+        assert send.calls == [0]
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, 'HEDGING_ENABLED', False)
+        monkeypatch.setattr(settings, 'HEDGING_MIN_SAMPLES', 1)
+        provider = utils.MockProvider1({}, {}, {})
+        hedging.tracker(provider.NAME, 'https://example.com').add(0.01)
+        send = sender(0.05, 0)
+        with mock.patch.object(provider, '_send_request', new=lambda *a, **kw: send()):
+            await provider.make_request('GET', 'https://example.com', hedge=True)
+
+        assert send.calls == [0]
@@ -0,0 +1,280 @@
+import random
+import asyncio
+from unittest import mock
+
+import pytest
+
+from tests import utils
+from waterbutler import settings
+from waterbutler.core import limiter
+from waterbutler.core import streams
+
+
+@pytest.fixture
+def upstream():
+    return limiter.AdaptiveLimiter(('mock', 'example.com'), initial=2, floor=1, ceiling=4)
+
+
+class TestParseRetryAfter:
+
+    def test_seconds(self):
+        assert limiter.parse_retry_after('3') == 3.0
+
+    def test_http_date(self):
+        assert limiter.parse_retry_after('Thu, 01 Jan 1970 00:01:00 GMT', now=30) == 30.0
+
+    def test_garbage(self):
+        assert limiter.parse_retry_after('soon') is None
+        assert limiter.parse_retry_after(None) is None
+
+
+class TestAdaptiveLimiter:
+
+    @pytest.mark.asyncio
+    async def test_queues_beyond_limit(self, upstream):
+        await upstream.acquire()
+        await upstream.acquire()
+
+        waiter = asyncio.ensure_future(upstream.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        assert upstream.stats()['queued'] == 1
+
+        upstream.release(200, 0.1)
+        await waiter
+        assert upstream.in_flight == 2
+        assert upstream.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_additive_increase_when_saturated(self, upstream):
+        for _ in range(4):
+            await upstream.acquire()
+            await upstream.acquire()
+            upstream.release(200, 0.1)
+            upstream.release(200, 0.1)
+
+        assert 3 <= upstream.limit <= 4
+
+    @pytest.mark.asyncio
+    async def test_no_increase_when_idle(self, upstream):
+        for _ in range(10):
+            await upstream.acquire()
+            upstream.release(200, 0.1)
+
+        assert upstream.limit == 2
+
+    @pytest.mark.asyncio
+    async def test_ceiling(self, upstream):
+        upstream.limit = 4
+        for _ in range(20):
+            for _ in range(4):
+                await upstream.acquire()
+            for _ in range(4):
+                upstream.release(200, 0.1)
+
+        assert upstream.limit == 4
+
+    @pytest.mark.asyncio
+    async def test_multiplicative_decrease_on_throttle(self, upstream):
+        upstream.limit = 4
+        await upstream.acquire()
+        upstream.release(429, 0.1)
+
+        assert upstream.limit == 2
+        assert upstream.throttled == 1
+
+    @pytest.mark.asyncio
+    async def test_decrease_once_per_round_trip(self, upstream):
+        upstream.limit = 4
+        upstream.smoothed_latency = upstream.baseline_latency = 10
+        for _ in range(3):
+            await upstream.acquire()
+        for _ in range(3):
+            upstream.release(503, 0.1)
+
+        assert upstream.limit == 2
+
+    @pytest.mark.asyncio
+    async def test_floor(self, upstream):
+        for _ in range(5):
+            upstream._hold_until = 0
+            await upstream.acquire()
+            upstream.release(None, 0.1)
+
+        assert upstream.limit == 1
+
+    @pytest.mark.asyncio
+    async def test_decrease_on_sustained_latency_rise(self, upstream):
+        upstream.limit = 4
+        for _ in range(upstream.LATENCY_WARMUP):
+            await upstream.acquire()
+            upstream.release(200, 0.1)
+        for _ in range(upstream.LATENCY_SUSTAINED + 5):
+            await upstream.acquire()
+            upstream.release(200, 1.0)
+
+        assert upstream.limit < 4
+
+    @pytest.mark.asyncio
+    async def test_no_decrease_on_a_few_slow_responses(self, upstream):
+        upstream.limit = 4
+        for _ in range(upstream.LATENCY_WARMUP):
+            await upstream.acquire()
+            upstream.release(200, 0.1)
+        for _ in range(3):
+            await upstream.acquire()
+            upstream.release(200, 1.0)
+
+        assert upstream.limit == 4
+
+    @pytest.mark.asyncio
+    async def test_mixed_latency_traffic_doesnt_collapse_the_limit(self):
+        upstream = limiter.AdaptiveLimiter(('mock', 'example.com'), initial=10, floor=1,
+                                           ceiling=100)
+        choice = random.Random(0).choice
+        completed = 0
+
+        async def client():
+            nonlocal completed
+            for _ in range(25):
+                latency = choice([0.005, 0.08])
+                await upstream.acquire()
+                await asyncio.sleep(latency / 20)
+                upstream.release(200, latency)
+                completed += 1
+
+        await asyncio.gather(*[client() for _ in range(40)])
+
+        assert completed == 1000
+        assert upstream.limit >= 10
+
+    @pytest.mark.asyncio
+    async def test_cancelled_requests_dont_count(self, upstream):
+        await upstream.acquire()
+        upstream.release(None, None)
+
+        assert upstream.limit == 2
+        assert upstream.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_retry_after_holds_requests(self, upstream):
+        await upstream.acquire()
+        upstream.release(429, 0.01, {'Retry-After': '0.05'})
+        assert upstream.paused
+
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        await upstream.acquire()
+        assert loop.time() - start >= 0.04
+        assert not upstream.paused
+
+    @pytest.mark.asyncio
+    async def test_retry_after_is_capped(self, upstream):
+        upstream.max_retry_after = 0.01
+        await upstream.acquire()
+        upstream.release(503, 0.01, {'Retry-After': '3600'})
+
+        await asyncio.wait_for(upstream.acquire(), 1)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_is_removed(self, upstream):
+        await upstream.acquire()
+        await upstream.acquire()
+
+        waiter = asyncio.ensure_future(upstream.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert upstream.queued == 0
+        assert upstream.in_flight == 2
+
+
+class TestLargeBodies:
+
+    @pytest.mark.asyncio
+    async def test_admit_doesnt_hold_a_slot(self, upstream):
+        await upstream.admit()
+
+        assert upstream.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_admit_waits_for_a_slot(self, upstream):
+        await upstream.acquire()
+        await upstream.acquire()
+
+        waiter = asyncio.ensure_future(upstream.admit())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        upstream.release(200, 0.1)
+        await waiter
+        assert upstream.in_flight == 1
+
+    def test_record_without_latency(self, upstream):
+        upstream.record(200, None)
+
+        assert upstream.smoothed_latency is None
+        assert upstream.limit == 2
+
+    def test_record_throttled(self, upstream):
+        upstream.record(429, None)
+
+        assert upstream.limit == 1
+
+    @pytest.mark.parametrize('data,large', [
+        (None, False),
+        ({'name': 'value'}, False),
+        (b'small', False),
+        (b'x' * (settings.LIMITER_LARGE_BODY + 1), True),
+        (streams.StringStream(b'small'), True),
+    ])
+    def test_is_large_body(self, data, large):
+        assert limiter.is_large_body(data) is large
+
+    @pytest.mark.asyncio
+    async def test_uploads_dont_hold_slots_or_sample_latency(self, monkeypatch):
+        monkeypatch.setattr(limiter, '_LIMITERS', type(limiter._LIMITERS)())
+        provider = utils.MockProvider1({}, {}, {})
+        upstream = limiter.get_limiter(provider.NAME, 'https://example.com/upload')
+        in_flight = []
+
+        async def put(*args, **kwargs):
+            in_flight.append(upstream.in_flight)
+            return mock.Mock(status=201, headers={})
+
+        session = mock.Mock(put=put)
+        await provider._send_request(session, 'PUT', 'https://example.com/upload',
+                                     'https://example.com/upload',
+                                     data=streams.StringStream(b'body'))
+
+        assert in_flight == [0]
+        assert upstream.in_flight == 0
+        assert upstream.smoothed_latency is None
+
+
+class TestGetLimiter:
+
+    @pytest.mark.asyncio
+    async def test_one_limiter_per_provider_and_host(self, monkeypatch):
+        monkeypatch.setattr(limiter, '_LIMITERS', type(limiter._LIMITERS)())
+        first = limiter.get_limiter('box', 'https://api.box.com/2.0/files/1')
+        assert limiter.get_limiter('box', 'https://api.box.com/2.0/folders/2') is first
+        assert limiter.get_limiter('box', 'https://upload.box.com/api/2.0') is not first
+        assert limiter.get_limiter('s3', 'https://api.box.com/2.0') is not first
+        assert len(limiter.stats()) == 3
+
+    @pytest.mark.asyncio
+    async def test_provider_overrides(self, monkeypatch):
+        monkeypatch.setattr(limiter, '_LIMITERS', type(limiter._LIMITERS)())
+        monkeypatch.setattr(settings, 'LIMITER_PROVIDERS', {
+            'box': {'MIN_CONCURRENCY': 3, 'MAX_CONCURRENCY': 5},
+        })
+
+        box = limiter.get_limiter('box', 'https://api.box.com')
+        s3 = limiter.get_limiter('s3', 'https://s3.amazonaws.com')
+
+        assert (box.floor, box.ceiling, box.limit) == (3, 5, 5)
+        assert (s3.floor, s3.ceiling) == (settings.LIMITER_MIN_CONCURRENCY,
+                                          settings.LIMITER_MAX_CONCURRENCY)
@@ -0,0 +1,321 @@
+import os
+import json
+import time
+import asyncio
+from unittest import mock
+
+import pytest
+import aiohttp
+
+from waterbutler.core import utils
+from waterbutler.core import metrics
+from waterbutler.core import log_shipper
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    metrics.LOG_EVENTS.clear()
+    yield
+    metrics.LOG_EVENTS.clear()
+
+
+@pytest.fixture
+def spool(tmpdir):
+    return str(tmpdir.join('spool'))
+
+
+@pytest.fixture
+def shipper(spool):
+    return log_shipper.LogShipper(spool_path=spool, max_queue=10, batch_size=3,
+                                  flush_interval=0.05, retries=2, backoff=0, replay_interval=60)
+
+
+@pytest.fixture
+def send_signed_request(monkeypatch):
+    mock_send = mock.AsyncMock(return_value=(200, b'ok'))
+    monkeypatch.setattr(utils, 'send_signed_request', mock_send)
+    return mock_send
+
+
+@pytest.fixture
+def keen_projects(monkeypatch):
+    monkeypatch.setattr(log_shipper.settings, 'KEEN_PRIVATE_PROJECT_ID', 'private-project')
+    monkeypatch.setattr(log_shipper.settings, 'KEEN_PRIVATE_WRITE_KEY', 'private-key')
+    monkeypatch.setattr(log_shipper.settings, 'KEEN_PUBLIC_PROJECT_ID', 'public-project')
+    monkeypatch.setattr(log_shipper.settings, 'KEEN_PUBLIC_WRITE_KEY', 'public-key')
+
+
+def keen_session(status=200, results=None):
+    response = mock.Mock(status=status, read=mock.AsyncMock(return_value=b'nope'),
+                         json=mock.AsyncMock(return_value=results or {}))
+    session = mock.Mock(close=mock.AsyncMock())
+    session.post.return_value.__aenter__ = mock.AsyncMock(return_value=response)
+    session.post.return_value.__aexit__ = mock.AsyncMock(return_value=False)
+    return session
+
+
+def spooled(spool, with_counts=False):
+    events = []
+    for name in sorted(os.listdir(spool)):
+        if not name.endswith('.jsonl'):
+            continue
+        with open(os.path.join(spool, name)) as fp:
+            events.extend(json.loads(line) for line in fp)
+    if not with_counts:
+        for event in events:
+            del event['spooled'], event['first_spooled']
+    return events
+
+
+def callback(n):
+    return log_shipper.callback_event(f'http://osf/{n}', {'n': n}, 'upload')
+
+
+class TestCallbacks:
+
+    @pytest.mark.asyncio
+    async def test_delivered_with_shared_session(self, shipper, send_signed_request):
+        shipper.submit(callback(1))
+        shipper.submit(callback(2))
+        await shipper.flush()
+
+        assert send_signed_request.await_count == 2
+        sessions = {call.kwargs['session'] for call in send_signed_request.await_args_list}
+        assert len(sessions) == 1
+        assert metrics.LOG_EVENTS.value('callback', 'delivered') == 2
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_signed_at_send_time(self, shipper, send_signed_request):
+        with mock.patch.object(log_shipper.time, 'time', return_value=1000):
+            shipper.submit(callback(1))
+            await shipper.flush()
+
+        (method, url, payload), _ = send_signed_request.call_args
+        assert (method, url, payload) == ('PUT', 'http://osf/1', {'n': 1, 'time': 1060})
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_retried_then_spooled(self, shipper, spool, send_signed_request):
+        send_signed_request.return_value = (503, b'unavailable')
+
+        shipper.submit(callback(1))
+        await shipper.flush()
+
+        assert send_signed_request.await_count == 3
+        assert spooled(spool) == [callback(1)]
+        assert metrics.LOG_EVENTS.value('callback', 'spooled') == 1
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_connection_error_retried(self, shipper, send_signed_request):
+        send_signed_request.side_effect = [aiohttp.ClientConnectionError(), (200, b'ok')]
+
+        shipper.submit(callback(1))
+        await shipper.flush()
+
+        assert send_signed_request.await_count == 2
+        assert metrics.LOG_EVENTS.value('callback', 'delivered') == 1
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_rejected(self, shipper, spool, send_signed_request):
+        send_signed_request.return_value = (400, b'bad signature')
+
+        shipper.submit(callback(1))
+        await shipper.flush()
+
+        assert send_signed_request.await_count == 1
+        assert not os.path.exists(spool)
+        assert metrics.LOG_EVENTS.value('callback', 'rejected') == 1
+        await shipper.close()
+
+
+class TestKeen:
+
+    @pytest.mark.asyncio
+    async def test_batched_by_domain(self, shipper, keen_projects):
+        session = keen_session(results={'file_access': [{'success': True}] * 2})
+        shipper._session = session
+
+        shipper.submit(log_shipper.keen_event('private', 'file_access', {'n': 1}, 'upload'))
+        shipper.submit(log_shipper.keen_event('public', 'file_stats', {'n': 2}, 'download'))
+        shipper.submit(log_shipper.keen_event('private', 'file_access', {'n': 3}, 'upload'))
+        await shipper.flush()
+
+        assert session.post.call_count == 2
+        calls = {call.args[0]: call.kwargs for call in session.post.call_args_list}
+        private = calls['https://api.keen.io/3.0/projects/private-project/events']
+        assert private['headers']['Authorization'] == 'private-key'
+        assert json.loads(private['data']) == {'file_access': [{'n': 1}, {'n': 3}]}
+        public = calls['https://api.keen.io/3.0/projects/public-project/events']
+        assert json.loads(public['data']) == {'file_stats': [{'n': 2}]}
+        assert metrics.LOG_EVENTS.value('keen', 'delivered') == 3
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_gathered_until_batch_is_full(self, shipper, keen_projects):
+        shipper.flush_interval = 60
+        session = shipper._session = keen_session()
+
+        for n in range(3):
+            shipper.submit(log_shipper.keen_event('private', 'file_access', {'n': n}, 'upload'))
+        await asyncio.sleep(0.05)
+
+        assert session.post.call_count == 1
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_server_error_spooled(self, shipper, spool, keen_projects):
+        shipper._session = keen_session(status=500)
+        event = log_shipper.keen_event('private', 'file_access', {'n': 1}, 'upload')
+
+        shipper.submit(event)
+        await shipper.flush()
+
+        assert shipper._session.post.call_count == 3
+        assert spooled(spool) == [event]
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_unconfigured_project_rejected(self, shipper, keen_projects, monkeypatch):
+        monkeypatch.setattr(log_shipper.settings, 'KEEN_PUBLIC_PROJECT_ID', None)
+        shipper._session = keen_session()
+
+        shipper.submit(log_shipper.keen_event('public', 'file_stats', {'n': 1}, 'download'))
+        await shipper.flush()
+
+        assert not shipper._session.post.called
+        assert metrics.LOG_EVENTS.value('keen', 'rejected') == 1
+        await shipper.close()
+
+
+class TestSpool:
+
+    @pytest.mark.asyncio
+    async def test_full_queue_spooled(self, shipper, spool, send_signed_request):
+        shipper.max_queue = 1
+
+        shipper.submit(callback(1))
+        shipper.submit(callback(2))
+        await shipper.spooled()
+
+        assert spooled(spool) == [callback(2)]
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_replay(self, shipper, spool, send_signed_request):
+        await shipper._spool([callback(1), callback(2)])
+
+        assert await shipper.replay() == 2
+        await shipper.flush()
+
+        assert os.listdir(spool) == []
+        assert send_signed_request.await_count == 2
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_replay_stops_at_half_full_queue(self, shipper, spool, send_signed_request):
+        shipper.max_queue = 2
+        await shipper._spool([callback(1)])
+        await shipper._spool([callback(2)])
+
+        assert await shipper.replay() == 1
+        assert spooled(spool) == [callback(2)]
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_spool_counts(self, shipper, spool):
+        with mock.patch.object(log_shipper.time, 'time', return_value=1000):
+            await shipper._spool([callback(1)])
+        event, = spooled(spool, with_counts=True)
+        assert (event['spooled'], event['first_spooled']) == (1, 1000)
+
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_spooled_too_often_is_dead(self, shipper, spool):
+        shipper.max_spools = 2
+        event = dict(callback(1), spooled=2, first_spooled=time.time())
+
+        await shipper._spool([event])
+
+        assert spooled(spool) == []
+        dead = spooled(os.path.join(spool, log_shipper.DEAD_LETTERS), with_counts=True)
+        assert dead == [dict(event, spooled=3)]
+        assert metrics.LOG_EVENTS.value('callback', 'dead') == 1
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_spooled_too_long_ago_is_dead(self, shipper, spool):
+        shipper.max_age = 60
+        event = dict(callback(1), spooled=1, first_spooled=time.time() - 120)
+
+        await shipper._spool([event, callback(2)])
+
+        assert spooled(spool) == [callback(2)]
+        assert spooled(os.path.join(spool, log_shipper.DEAD_LETTERS)) == [callback(1)]
+        assert metrics.LOG_EVENTS.value('callback', 'dead') == 1
+        assert metrics.LOG_EVENTS.value('callback', 'spooled') == 1
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_dead_letters_are_not_replayed(self, shipper, spool, send_signed_request):
+        shipper.max_spools = 0
+        await shipper._spool([callback(1)])
+
+        assert await shipper.replay() == 0
+        assert not send_signed_request.called
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_spool_io_runs_in_executor(self, shipper, spool):
+        loop = asyncio.get_event_loop()
+        with mock.patch.object(loop, 'run_in_executor', wraps=loop.run_in_executor) as run:
+            await shipper._spool([callback(1)])
+            await shipper.replay()
+
+        functions = [call.args[1] for call in run.call_args_list]
+        assert functions == [shipper._write, shipper._spool_files, shipper._claim]
+        await shipper.close()
+
+    @pytest.mark.asyncio
+    async def test_no_spool_drops(self):
+        shipper = log_shipper.LogShipper(spool_path=None)
+
+        await shipper._spool([callback(1)])
+
+        assert metrics.LOG_EVENTS.value('callback', 'dropped') == 1
+
+
+@pytest.mark.asyncio
+async def test_close_spools_undelivered(shipper, spool, send_signed_request):
+    delivered = asyncio.Event()
+
+    async def hang(*args, **kwargs):
+        delivered.set()
+        await asyncio.sleep(60)
+
+    send_signed_request.side_effect = hang
+    shipper.submit(callback(1))
+    shipper.submit(callback(2))
+    await delivered.wait()
+
+    await shipper.close(timeout=0.05)
+    shipper.submit(callback(3))
+    await shipper.spooled()
+
+    assert sorted(event['url'] for event in spooled(spool)) == [
+        'http://osf/1', 'http://osf/2', 'http://osf/3',
+    ]
+    assert shipper._tasks == []
+
+
+@pytest.mark.asyncio
+async def test_get_shipper_per_loop():
+    shipper = log_shipper.get_shipper()
+
+    assert log_shipper.get_shipper() is shipper
+    await log_shipper.close()
+    assert log_shipper.get_shipper() is not shipper
+    await log_shipper.close()
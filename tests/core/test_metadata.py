@@ -1,6 +1,10 @@
 import hashlib
 
+import furl
+import pytest
+
 from tests import utils
+from waterbutler.core import metadata
 
 
 class TestBaseMetadata:
@@ -110,3 +114,31 @@ class TestBaseMetadata:
             'modified_utc': 'never',
             'versionIdentifier': 'versions',
         }
+
+
+class TestEntityUrl:
+
+    @pytest.mark.parametrize('path', [
+        '/',
+        '/Foo.name',
+        '/Bar/',
+        '/a folder/with spaces.txt',
+        '/percent%20and?query#fragment',
+        "/keep:@-._~!$&'()*+,;=",
+        '/résumé/日本.txt',
+        '/double//slash/',
+    ])
+    @pytest.mark.parametrize('domain', ['http://localhost:7777', 'https://files.example.com/wb'])
+    def test_matches_furl(self, monkeypatch, path, domain):
+        monkeypatch.setattr(metadata.settings, 'DOMAIN', domain)
+        file_metadata = utils.MockFileMetadata()
+        file_metadata.raw = {'path': path}
+        monkeypatch.setattr(utils.MockFileMetadata, 'path',
+                            property(lambda self: self.raw['path']))
+
+        expected = furl.furl(domain)
+        expected.path.segments.extend(
+            ['v1', 'resources', 'n0 d3z', 'providers', 'MockProvider'] + path.split('/')[1:]
+        )
+
+        assert file_metadata._entity_url('n0 d3z') == expected.url
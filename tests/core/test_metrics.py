@@ -0,0 +1,179 @@
+import urllib.error
+import urllib.request
+from unittest import mock
+
+import pytest
+
+from tests import utils
+from waterbutler import settings
+from waterbutler.core import metrics
+
+
+class FakeResponse:
+
+    def __init__(self, status):
+        self.status = status
+        self.headers = {}
+
+
+@pytest.fixture
+def registry():
+    return metrics.Registry()
+
+
+class TestRegistry:
+
+    def test_counter(self, registry):
+        counter = registry.counter('wb_things', 'Things', labels=('kind', ))
+        counter.inc('a')
+        counter.inc('a', amount=2)
+        counter.inc('b')
+
+        assert counter.value('a') == 3
+        assert registry.expose() == (
+            '# TYPE wb_things counter\n'
+            '# HELP wb_things Things\n'
+            'wb_things_total{kind="a"} 3\n'
+            'wb_things_total{kind="b"} 1\n'
+            '# EOF\n'
+        )
+
+    def test_gauge(self, registry):
+        gauge = registry.gauge('wb_level', 'Level')
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        assert 'wb_level 1\n' in registry.expose()
+
+    def test_histogram(self, registry):
+        histogram = registry.histogram('wb_seconds', 'Seconds', labels=('op', ),
+                                       buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, 'get')
+
+        assert histogram.count('get') == 4
+        assert registry.expose().splitlines()[2:] == [
+            'wb_seconds_bucket{op="get",le="0.1"} 2',
+            'wb_seconds_bucket{op="get",le="1.0"} 3',
+            'wb_seconds_bucket{op="get",le="+Inf"} 4',
+            'wb_seconds_count{op="get"} 4',
+            'wb_seconds_sum{op="get"} 3.65',
+            '# EOF',
+        ]
+
+    def test_label_values_are_escaped(self, registry):
+        registry.counter('wb_hosts', 'Hosts', labels=('host', )).inc('a"b\\c\nd')
+
+        assert r'wb_hosts_total{host="a\"b\\c\nd"} 1' in registry.expose()
+
+    def test_series_are_bounded(self, registry):
+        counter = registry.counter('wb_hosts', 'Hosts', labels=('host', 'method'), max_series=2)
+        for host in ('a', 'b', 'c', 'd'):
+            counter.inc(host, 'GET')
+
+        assert counter.value('a', 'GET') == 1
+        assert counter.value('c', 'GET') == 0
+        assert counter.value(metrics.OVERFLOW, metrics.OVERFLOW) == 2
+        assert len(counter._series) == 3
+
+    def test_wrong_labels(self, registry):
+        counter = registry.counter('wb_hosts', 'Hosts', labels=('host', ))
+
+        with pytest.raises(ValueError):
+            counter.inc('a', 'b')
+
+    def test_names_are_unique(self, registry):
+        registry.counter('wb_things', 'Things')
+
+        with pytest.raises(ValueError):
+            registry.gauge('wb_things', 'Things')
+
+
+@pytest.mark.parametrize('status,expected', [(204, '2xx'), (404, '4xx'), (None, 'error')])
+def test_status_class(status, expected):
+    assert metrics.status_class(status) == expected
+
+
+@pytest.mark.parametrize('authorization,token,expected', [
+    ('Bearer s3cret', 's3cret', True),
+    ('bearer s3cret', 's3cret', True),
+    ('Bearer wrong', 's3cret', False),
+    ('Basic s3cret', 's3cret', False),
+    (None, 's3cret', False),
+    ('Bearer ', None, False),
+    (None, None, False),
+])
+def test_authorized(authorization, token, expected, monkeypatch):
+    monkeypatch.setattr(settings, 'METRICS_TOKEN', token)
+
+    assert metrics.authorized(authorization) is expected
+
+
+class TestServe:
+
+    @pytest.fixture
+    def server(self, monkeypatch):
+        monkeypatch.setattr(settings, 'METRICS_TOKEN', 's3cret')
+        server = metrics.serve('127.0.0.1', 0)
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    def fetch(self, server, path='/metrics', token='s3cret'):
+        url = f'http://127.0.0.1:{server.server_address[1]}{path}'
+        request = urllib.request.Request(url, headers={'Authorization': f'Bearer {token}'})
+        return urllib.request.urlopen(request, timeout=5)
+
+    def test_exports_the_registry(self, server):
+        metrics.TASKS.inc('copy', 'box', 'osfstorage', 'succeeded')
+
+        with self.fetch(server) as resp:
+            body = resp.read().decode()
+
+        assert resp.headers['Content-Type'] == metrics.REGISTRY.CONTENT_TYPE
+        assert ('waterbutler_tasks_total{action="copy",src_provider="box",'
+                'dest_provider="osfstorage",outcome="succeeded"}') in body
+        assert body.endswith('# EOF\n')
+
+    @pytest.mark.parametrize('path,token', [('/metrics', 'wrong'), ('/other', 's3cret')])
+    def test_not_found(self, server, path, token):
+        with pytest.raises(urllib.error.HTTPError) as exc:
+            self.fetch(server, path, token)
+
+        assert exc.value.code == 404
+
+
+class TestUpstreamRequests:
+
+    @pytest.fixture(autouse=True)
+    def clear(self):
+        metrics.REGISTRY.clear()
+        yield
+        metrics.REGISTRY.clear()
+
+    @pytest.mark.asyncio
+    async def test_records_requests(self):
+        provider = utils.MockProvider1({}, {}, {})
+        session = mock.Mock(get=mock.AsyncMock(return_value=FakeResponse(503)))
+
+        await provider._send_request(session, 'GET', 'https://metrics.example.com/a',
+                                     'https://metrics.example.com/a')
+
+        labels = ('MockProvider1', 'metrics.example.com')
+        assert metrics.UPSTREAM_REQUESTS.value(*labels, 'GET', '5xx') == 1
+        assert metrics.UPSTREAM_LATENCY.count(*labels, 'GET') == 1
+        assert metrics.UPSTREAM_IN_FLIGHT.value(*labels) == 0
+
+    @pytest.mark.asyncio
+    async def test_records_failed_requests(self):
+        provider = utils.MockProvider1({}, {}, {})
+        session = mock.Mock(put=mock.AsyncMock(side_effect=ConnectionResetError))
+
+        with pytest.raises(ConnectionResetError):
+            await provider._send_request(session, 'PUT', 'https://metrics.example.com/a',
+                                         'https://metrics.example.com/a')
+
+        labels = ('MockProvider1', 'metrics.example.com')
+        assert metrics.UPSTREAM_REQUESTS.value(*labels, 'PUT', 'error') == 1
+        assert metrics.UPSTREAM_IN_FLIGHT.value(*labels) == 0
@@ -15,7 +15,23 @@ class EncodedPath:
     PART_CLASS = EncodedPathPart
 
 class TestPathPart:
-    pass
+
+    def test_increment_name(self):
+        part = WaterButlerPathPart('report.txt')
+
+        assert part.value == 'report.txt'
+
+        part.increment_name()
+        part.increment_name()
+
+        assert part.value == 'report (2).txt'
+        assert part.raw == 'report (2).txt'
+        assert part.original_value == 'report.txt'
+        assert part.ext == '.txt'
+
+    def test_has_no_dict(self):
+        with pytest.raises(AttributeError):
+            WaterButlerPathPart('report.txt').extra = True
 
 class TestPath:
 
@@ -57,6 +73,74 @@ class TestPath:
 
         assert path.name == 'journey'
 
+    def test_strings_follow_rename_and_increment(self):
+        path = WaterButlerPath('/this/is/a/file.txt', prepend='root')
+
+        assert path.path == 'this/is/a/file.txt'
+        assert path.full_path == 'root/this/is/a/file.txt'
+
+        path.increment_name()
+
+        assert path.path == 'this/is/a/file (1).txt'
+        assert path.raw_path == 'this/is/a/file (1).txt'
+        assert path.full_path == 'root/this/is/a/file (1).txt'
+        assert path.materialized_path == '/this/is/a/file (1).txt'
+
+        path.rename('other.txt')
+
+        assert path.path == 'this/is/a/other.txt'
+        assert path.materialized_path == '/this/is/a/other.txt'
+
+    def test_strings_follow_changed_parts(self):
+        path = WaterButlerPath('/this/is/a/')
+
+        assert path.path == 'this/is/a/'
+
+        del path._parts[1]
+        path._is_folder = False
+
+        assert path.path == 'is/a'
+
+    def test_children_share_parent_parts(self):
+        path = WaterButlerPath('/this/is/', prepend='root')
+        first, second = path.child('a.txt', _id='1'), path.child('b.txt')
+
+        assert first.parts[:-1] == path.parts
+        assert all(x is y for x, y in zip(first.parts, second.parts[:-1]))
+        assert first == WaterButlerPath.from_parts(path.parts + [WaterButlerPathPart('a.txt')])
+        assert first.identifier == '1'
+        assert first.full_path == 'root/this/is/a.txt'
+        assert repr(first.parent) == repr(path)
+
+    def test_children_are_incremented_independently(self):
+        path = WaterButlerPath('/this/is/')
+        first, second = path.child('a.txt'), path.child('a.txt')
+
+        first.increment_name()
+
+        assert first.name == 'a (1).txt'
+        assert second.name == 'a.txt'
+        assert first.parent.child('b.txt').path == 'this/is/b.txt'
+
+    def test_child_of_incremented_folder(self):
+        folder = WaterButlerPath('/this/is/', folder=True)
+        folder.increment_name()
+        child = folder.child('a.txt')
+
+        assert child.path == 'this/is (1)/a.txt'
+        assert child.parent.name == 'is (1)'
+        assert child.parts[-2].original_raw == 'is (1)'
+
+    def test_child_name_with_slash_is_parsed(self):
+        child = WaterButlerPath('/this/is/').child('a/b')
+
+        assert [x.value for x in child.parts] == ['', 'this', 'is', 'a', 'b']
+
+    @pytest.mark.parametrize('name', ['.', '..'])
+    def test_child_with_invalid_name(self, name):
+        with pytest.raises(exceptions.InvalidPathError):
+            WaterButlerPath('/this/is/').child(name)
+
 
 class TestValidation:
 
@@ -0,0 +1,187 @@
+import json
+import asyncio
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import progress
+from waterbutler.core import exceptions
+from waterbutler.core.streams import StringStream
+from waterbutler.core.path import WaterButlerPath
+from waterbutler import settings as wb_settings
+
+from tests.core.test_transfer import TreeProvider
+
+TASK_ID = '2a4f3b0c-9d8e-4f1a-8b7c-6d5e4f3a2b1c'
+
+
+@pytest.fixture
+def store(tmpdir, monkeypatch):
+    monkeypatch.setattr(wb_settings, 'PROGRESS_STORE', f'file://{tmpdir}')
+    return progress.get_store()
+
+
+class TestFileStore:
+
+    @pytest.mark.asyncio
+    async def test_save_and_load(self, store):
+        await store.save(TASK_ID, {'status': 'running'})
+
+        assert await store.load(TASK_ID) == {'status': 'running'}
+        assert await store.load('d3adb33f') is None
+
+    @pytest.mark.asyncio
+    async def test_create_doesnt_overwrite(self, store):
+        await store.save(TASK_ID, {'status': 'running'})
+        await store.create(TASK_ID, {'status': 'pending'})
+
+        assert await store.load(TASK_ID) == {'status': 'running'}
+
+    @pytest.mark.asyncio
+    async def test_cancel(self, store):
+        assert not await store.is_cancelled(TASK_ID)
+
+        await store.cancel(TASK_ID)
+
+        assert await store.is_cancelled(TASK_ID)
+
+    @pytest.mark.asyncio
+    async def test_rejects_paths(self, store):
+        with pytest.raises(ValueError):
+            await store.load('../../etc/passwd')
+
+    @pytest.mark.asyncio
+    async def test_io_runs_in_executor(self, store):
+        loop = asyncio.get_event_loop()
+        with mock.patch.object(loop, 'run_in_executor', wraps=loop.run_in_executor) as run:
+            await store.save(TASK_ID, {'status': 'running'})
+            await store.load(TASK_ID)
+            await store.cancel(TASK_ID)
+
+        assert run.call_count == 3
+
+
+class TestStoreUrl:
+
+    def test_configured(self, monkeypatch):
+        monkeypatch.setattr(wb_settings, 'PROGRESS_STORE', 'redis://progress:6379/2')
+        monkeypatch.setattr(progress.task_settings, 'result_backend', 'redis://celery:6379/0')
+
+        assert progress.store_url() == 'redis://progress:6379/2'
+
+    def test_defaults_to_redis_result_backend(self, monkeypatch):
+        monkeypatch.setattr(wb_settings, 'PROGRESS_STORE', None)
+        monkeypatch.setattr(progress.task_settings, 'result_backend', 'redis://celery:6379/0')
+
+        assert progress.store_url() == 'redis://celery:6379/0'
+
+    @pytest.mark.parametrize('backend', [None, 'rpc://'])
+    def test_defaults_to_file_store(self, monkeypatch, backend):
+        monkeypatch.setattr(wb_settings, 'PROGRESS_STORE', None)
+        monkeypatch.setattr(progress.task_settings, 'result_backend', backend)
+
+        assert progress.store_url() == progress.DEFAULT_FILE_STORE
+
+
+class TestTransferProgress:
+
+    @pytest.mark.asyncio
+    async def test_single_file(self, store):
+        path = WaterButlerPath('/folder/file.txt')
+
+        async with progress.TransferProgress(TASK_ID, 'copy', store=store) as reporter:
+            assert progress.current() is reporter
+            with reporter.transferring(path):
+                stream = StringStream(b'x' * 100)
+                reporter.track(stream)
+                snapshot = reporter.snapshot()
+                assert snapshot['progress']['current_file'] == '/folder/file.txt'
+                assert snapshot['progress']['bytes_total'] == 100
+                await stream.read(100)
+
+        assert progress.current() is None
+        record = await store.load(TASK_ID)
+        assert record['status'] == 'succeeded'
+        assert record['progress']['files_total'] == 1
+        assert record['progress']['files_done'] == 1
+        assert record['progress']['bytes_done'] == 100
+        assert record['progress']['current_file'] is None
+
+    @pytest.mark.asyncio
+    async def test_unstreamed_bytes_are_counted_when_the_file_is_done(self, store):
+        reporter = progress.TransferProgress(TASK_ID, 'copy', store=store)
+        reporter.announce([10, 20, None])
+
+        with reporter.transferring(WaterButlerPath('/a'), 10, announced=True):
+            pass
+
+        snapshot = reporter.snapshot()['progress']
+        assert snapshot['files_total'] == 3
+        assert snapshot['files_done'] == 1
+        assert snapshot['bytes_total'] == 30
+        assert snapshot['bytes_done'] == 10
+
+    @pytest.mark.asyncio
+    async def test_publishes_periodically(self, store):
+        async with progress.TransferProgress(TASK_ID, 'move', store=store,
+                                             publish_interval=0.01) as reporter:
+            reporter.announce([5])
+            await asyncio.sleep(0.05)
+            record = await store.load(TASK_ID)
+            assert record['status'] == 'running'
+            assert record['progress']['files_total'] == 1
+
+    @pytest.mark.asyncio
+    async def test_failure(self, store):
+        with pytest.raises(exceptions.UploadError):
+            async with progress.TransferProgress(TASK_ID, 'copy', store=store):
+                raise exceptions.UploadError('nope', code=502)
+
+        record = await store.load(TASK_ID)
+        assert record['status'] == 'failed'
+        assert record['error'] == {'code': 502, 'message': 'nope'}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_while_streaming(self, store):
+        with pytest.raises(exceptions.TransferCancelledError):
+            async with progress.TransferProgress(TASK_ID, 'copy', store=store,
+                                                 publish_interval=0.01) as reporter:
+                with reporter.transferring(WaterButlerPath('/file')):
+                    stream = StringStream(b'x' * 100)
+                    reporter.track(stream)
+                    await store.cancel(TASK_ID)
+                    await asyncio.sleep(0.05)
+                    await stream.read(10)
+
+        assert (await store.load(TASK_ID))['status'] == 'cancelled'
+
+    @pytest.mark.asyncio
+    async def test_cancelled_before_starting(self, store):
+        await store.cancel(TASK_ID)
+
+        with pytest.raises(exceptions.TransferCancelledError):
+            async with progress.TransferProgress(TASK_ID, 'copy', store=store):
+                pytest.fail('The transfer should not start')
+
+        assert (await store.load(TASK_ID))['status'] == 'cancelled'
+        assert progress.current() is None
+
+
+class TestFolderProgress:
+
+    @pytest.mark.asyncio
+    async def test_counts_the_tree(self, store):
+        tree = {'a': {'b': {'deep.txt': 1}, 'a.txt': 1}, 'top.txt': 1}
+        src = TreeProvider({}, {}, {}, tree=tree)
+        dest = TreeProvider({}, {}, {})
+
+        async with progress.TransferProgress(TASK_ID, 'copy', store=store) as reporter:
+            await src.copy(dest, WaterButlerPath('/'), WaterButlerPath('/copied/'),
+                           handle_naming=False)
+
+        snapshot = reporter.snapshot()['progress']
+        assert snapshot['files_total'] == 3
+        assert snapshot['files_done'] == 3
+        # MockFileMetadata reports 1337 bytes for every file
+        assert snapshot['bytes_total'] == snapshot['bytes_done'] == 3 * 1337
+        assert json.dumps(reporter.snapshot())
@@ -105,6 +105,42 @@ class TestBaseProvider:
         assert new_path.name == 'text_file.txt'
 
 
+class TestListFolder:
+
+    @pytest.fixture
+    def children(self, provider1):
+        children = [utils.MockFileMetadata() for _ in range(5)]
+        provider1.metadata = utils.MockCoroutine(return_value=children)
+        return children
+
+    @pytest.mark.asyncio
+    async def test_pages(self, provider1, children):
+        first, cursor = await provider1.list_folder('/folder/', page_size=2, revision='1')
+        assert first == children[:2]
+        assert cursor == '2'
+
+        last, cursor = await provider1.list_folder('/folder/', cursor='4', page_size=2)
+        assert last == children[4:]
+        assert cursor is None
+        provider1.metadata.assert_called_with('/folder/')
+
+    @pytest.mark.asyncio
+    async def test_unpaginated(self, provider1, children):
+        assert await provider1.list_folder('/folder/') == (children, None)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('cursor', ['next', '-1'])
+    async def test_invalid_cursor(self, provider1, children, cursor):
+        with pytest.raises(exceptions.InvalidParameters):
+            await provider1.list_folder('/folder/', cursor=cursor, page_size=2)
+
+    @pytest.mark.asyncio
+    async def test_iter_folder(self, provider1, children):
+        pages = [page async for page in provider1.iter_folder('/folder/', page_size=2)]
+
+        assert pages == [children[:2], children[2:4], children[4:]]
+
+
 class TestHandleNameConflict:
 
     @pytest.mark.asyncio
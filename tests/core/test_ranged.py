@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from waterbutler.core import ranged
+from waterbutler.core import streams
+from waterbutler.core import exceptions
+from waterbutler.core.path import WaterButlerPath
+from waterbutler import settings as wb_settings
+
+from tests import utils
+
+DATA = bytes(range(256)) * 40  # 10240 bytes
+
+
+class RangeStream(streams.StringStream):
+
+    def __init__(self, data, partial=True):
+        super().__init__(data)
+        self.partial = partial
+
+
+class RecordingPartUpload(ranged.PartUpload):
+
+    def __init__(self, part_size, fail_on=None):
+        self.part_size = part_size
+        self.fail_on = fail_on
+        self.parts = []
+        self.hashed = []
+        self.completed = False
+        self.aborted = False
+
+    async def hash_in_order(self, part):
+        self.hashed.append(part.number)
+
+    async def upload_part(self, part):
+        # later parts finish first
+        await asyncio.sleep(0.001 * (20 - part.number))
+        if part.number == self.fail_on:
+            raise exceptions.UploadError('nope')
+        self.parts.append((part.number, part.offset, part.data, await part.digest('md5')))
+
+    def data(self):
+        return b''.join(data for _, _, data, _ in sorted(self.parts))
+
+    async def complete(self):
+        self.completed = True
+        return utils.MockFileMetadata(), True
+
+    async def abort(self):
+        self.aborted = True
+        return True
+
+
+class RangedProvider(utils.MockProvider1):
+    """Serves ``data`` from memory, with or without support for ranges and part uploads."""
+
+    def __init__(self, *args, data=b'', ranges=True, parts=True, honor_ranges=True,
+                 part_size=1024, fail_on=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.data = data
+        self.ranges = ranges
+        self.parts = parts
+        self.honor_ranges = honor_ranges
+        self.part_size = part_size
+        self.fail_on = fail_on
+        self.in_flight = 0
+        self.peak = 0
+        self.requested = []
+        self.session = None
+        self.uploaded = None
+
+    def can_download_ranges(self):
+        return self.ranges
+
+    def can_upload_parts(self, size):
+        return self.parts
+
+    async def start_part_upload(self, path, size):
+        self.session = RecordingPartUpload(self.part_size, fail_on=self.fail_on)
+        return self.session
+
+    async def download(self, path, range=None, **kwargs):
+        self.requested.append(range)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.002)
+        finally:
+            self.in_flight -= 1
+        if range is None or not self.honor_ranges:
+            return RangeStream(self.data, partial=False)
+        return RangeStream(self.data[range[0]:range[1] + 1])
+
+    async def upload(self, stream, path, **kwargs):
+        self.uploaded = await stream.read(stream.size)
+        return utils.MockFileMetadata(), True
+
+
+@pytest.fixture
+def threshold(monkeypatch):
+    monkeypatch.setattr(wb_settings, 'RANGED_TRANSFER_THRESHOLD', 4096)
+
+
+class TestTransfer:
+
+    @pytest.mark.asyncio
+    async def test_parts_are_uploaded_in_order(self):
+        src = RangedProvider({}, {}, {}, data=DATA)
+        dest = RangedProvider({}, {}, {}, part_size=1000)
+
+        metadata, created = await ranged.transfer(src, dest, WaterButlerPath('/big.bin'),
+                                                  WaterButlerPath('/big.bin'), len(DATA),
+                                                  concurrency=4)
+
+        assert created is True
+        session = dest.session
+        assert session.completed and not session.aborted
+        assert session.hashed == list(range(1, 12))
+        assert sorted(offset for _, offset, *_ in session.parts) == list(range(0, 11000, 1000))
+        assert session.data() == DATA
+        assert all(hashlib.md5(data).digest() == md5 for _, _, data, md5 in session.parts)
+        assert sorted(session.parts)[-1][2] == DATA[10000:]
+        assert src.peak == 4
+
+    @pytest.mark.asyncio
+    async def test_buffer_limits_concurrency(self):
+        src = RangedProvider({}, {}, {}, data=DATA)
+        dest = RangedProvider({}, {}, {}, part_size=1024)
+
+        await ranged.transfer(src, dest, WaterButlerPath('/big.bin'),
+                              WaterButlerPath('/big.bin'), len(DATA),
+                              concurrency=8, max_buffer=2048)
+
+        assert src.peak == 2
+        assert dest.session.data() == DATA
+
+    @pytest.mark.asyncio
+    async def test_always_holds_one_part(self):
+        src = RangedProvider({}, {}, {}, data=DATA)
+        dest = RangedProvider({}, {}, {}, part_size=4096)
+
+        await ranged.transfer(src, dest, WaterButlerPath('/big.bin'),
+                              WaterButlerPath('/big.bin'), len(DATA),
+                              concurrency=4, max_buffer=1)
+
+        assert src.peak == 1
+        assert dest.session.data() == DATA
+
+    @pytest.mark.asyncio
+    async def test_failure_aborts_the_upload(self):
+        src = RangedProvider({}, {}, {}, data=DATA)
+        dest = RangedProvider({}, {}, {}, part_size=1000, fail_on=3)
+
+        with pytest.raises(exceptions.UploadError):
+            await ranged.transfer(src, dest, WaterButlerPath('/big.bin'),
+                                  WaterButlerPath('/big.bin'), len(DATA), concurrency=4)
+
+        assert dest.session.aborted
+        assert not dest.session.completed
+        assert src.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_ignored_range_is_an_error(self):
+        src = RangedProvider({}, {}, {}, data=DATA, honor_ranges=False)
+        dest = RangedProvider({}, {}, {}, part_size=1000)
+
+        with pytest.raises(exceptions.DownloadError):
+            await ranged.transfer(src, dest, WaterButlerPath('/big.bin'),
+                                  WaterButlerPath('/big.bin'), len(DATA))
+
+        assert dest.session.aborted
+
+
+class TestCopy:
+
+    @pytest.mark.asyncio
+    async def test_large_files_are_copied_in_parts(self, threshold):
+        src = RangedProvider({}, {}, {}, data=DATA)
+        dest = RangedProvider({}, {}, {}, part_size=1000)
+
+        await src.copy(dest, WaterButlerPath('/big.bin'), WaterButlerPath('/copy.bin'),
+                       handle_naming=False)
+
+        assert dest.uploaded is None
+        assert dest.session.data() == DATA
+        assert src.requested[0] is None
+        assert src.requested[1:] == [(offset, min(offset + 1000, len(DATA)) - 1)
+                                     for offset in range(0, len(DATA), 1000)]
+        assert src.provider_metrics.serialize()['copy']['ranged'] is True
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('data,ranges,parts', [
+        (DATA[:1024], True, True),
+        (DATA, False, True),
+        (DATA, True, False),
+    ])
+    async def test_falls_back_to_one_stream(self, threshold, data, ranges, parts):
+        src = RangedProvider({}, {}, {}, data=data, ranges=ranges)
+        dest = RangedProvider({}, {}, {}, parts=parts)
+
+        await src.copy(dest, WaterButlerPath('/big.bin'), WaterButlerPath('/copy.bin'),
+                       handle_naming=False)
+
+        assert dest.uploaded == data
+        assert dest.session is None
+        assert src.requested == [None]
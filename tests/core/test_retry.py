@@ -0,0 +1,216 @@
+from unittest import mock
+
+import pytest
+
+from tests import utils
+from waterbutler import settings
+from waterbutler.core import retry
+from waterbutler.core import exceptions
+
+
+class FakeResponse:
+
+    def __init__(self, status, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self.method = 'GET'
+
+    async def json(self):
+        return {'status': self.status}
+
+    async def release(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def empty_upstreams(monkeypatch):
+    monkeypatch.setattr(retry, '_UPSTREAMS', {})
+
+
+@pytest.fixture
+def sleep():
+    with mock.patch('waterbutler.core.provider.asyncio.sleep', new=mock.AsyncMock()) as sleep:
+        yield sleep
+
+
+@pytest.fixture
+def provider():
+    return utils.MockProvider1({}, {}, {})
+
+
+def respond_with(provider, *responses):
+    provider._send_request = mock.AsyncMock(side_effect=list(responses))
+
+
+class TestRetryBudget:
+
+    def test_starts_full(self):
+        budget = retry.RetryBudget(0.5, 2)
+        assert budget.withdraw()
+        assert budget.withdraw()
+        assert not budget.withdraw()
+
+    def test_refilled_by_traffic(self):
+        budget = retry.RetryBudget(0.5, 2)
+        budget.tokens = 0
+        budget.deposit()
+        assert not budget.withdraw()
+        budget.deposit()
+        assert budget.withdraw()
+
+    def test_capped(self):
+        budget = retry.RetryBudget(0.5, 2)
+        for _ in range(10):
+            budget.deposit()
+        assert budget.tokens == 2
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold(self):
+        breaker = retry.CircuitBreaker(2, 30)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == breaker.OPEN
+        assert not breaker.allow()
+
+    def test_success_resets_failures(self):
+        breaker = retry.CircuitBreaker(2, 30)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == breaker.CLOSED
+
+    def test_half_open_probe(self):
+        breaker = retry.CircuitBreaker(1, 30)
+        breaker.record_failure()
+        breaker.opened_at -= 31
+
+        assert breaker.allow()
+        assert breaker.state == breaker.HALF_OPEN
+        assert not breaker.allow()
+
+        breaker.record_success()
+        assert breaker.state == breaker.CLOSED
+        assert breaker.allow()
+
+    def test_failed_probe_reopens(self):
+        breaker = retry.CircuitBreaker(5, 30)
+        breaker.state = breaker.HALF_OPEN
+        breaker.record_failure()
+        assert breaker.state == breaker.OPEN
+
+
+class TestRetryPolicy:
+
+    def test_decorrelated_jitter(self):
+        policy = retry.RetryPolicy(base_delay=1, max_delay=20)
+        delay = None
+        for _ in range(50):
+            new_delay = policy.delay(delay)
+            assert 1 <= new_delay <= min(20, (delay or 1) * 3)
+            delay = new_delay
+
+    def test_retry_after(self):
+        policy = retry.RetryPolicy(max_retry_after=60)
+        assert policy.delay(None, '7') == 7
+        assert policy.delay(None, '600') is None
+
+    def test_throttling_is_not_a_breaker_failure(self):
+        policy = retry.RetryPolicy(retry_on={429, 503}, breaker_threshold=1)
+        upstream = policy.upstream('mock', 'https://example.com/foo')
+        policy.record(upstream, 429)
+        assert upstream.breaker.state == upstream.breaker.CLOSED
+        policy.record(upstream, 503)
+        assert upstream.breaker.state == upstream.breaker.OPEN
+
+    def test_upstreams_are_shared_per_provider_and_host(self):
+        first = retry.RetryPolicy().upstream('box', 'https://api.box.com/2.0/files')
+        assert retry.RetryPolicy().upstream('box', 'https://api.box.com/2.0/folders') is first
+        assert retry.RetryPolicy().upstream('s3', 'https://api.box.com') is not first
+        assert len(retry.stats()) == 2
+
+    def test_provider_overrides(self, monkeypatch):
+        monkeypatch.setattr(settings, 'RETRY_PROVIDERS', {'box': {'BREAKER_THRESHOLD': 2}})
+        assert retry.RetryPolicy.from_settings('box').breaker_threshold == 2
+        assert retry.RetryPolicy.from_settings('s3').breaker_threshold == \
+            settings.RETRY_BREAKER_THRESHOLD
+
+
+class TestMakeRequest:
+
+    @pytest.mark.asyncio
+    async def test_retries_with_jitter(self, provider, sleep):
+        respond_with(provider, FakeResponse(503), FakeResponse(502), FakeResponse(200))
+
+        resp = await provider.make_request('GET', 'https://example.com', expects=(200, ))
+
+        assert resp.status == 200
+        assert sleep.await_count == 2
+        first, second = [call.args[0] for call in sleep.await_args_list]
+        assert 1 <= first <= 3
+        assert 1 <= second <= first * 3
+        assert provider.provider_metrics.serialize()['retry']['count'] == 2
+
+    @pytest.mark.asyncio
+    async def test_honors_retry_after(self, provider, sleep):
+        respond_with(provider, FakeResponse(503, {'Retry-After': '5'}), FakeResponse(200))
+
+        await provider.make_request('GET', 'https://example.com', expects=(200, ))
+
+        sleep.assert_awaited_once_with(5.0)
+
+    @pytest.mark.asyncio
+    async def test_no_retry_when_retry_after_too_long(self, provider, sleep):
+        respond_with(provider, FakeResponse(503, {'Retry-After': '3600'}), FakeResponse(200))
+
+        with pytest.raises(exceptions.UnhandledProviderError) as exc:
+            await provider.make_request('GET', 'https://example.com', expects=(200, ))
+
+        assert exc.value.code == 503
+        sleep.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_budget_exhausted(self, provider, sleep):
+        upstream = provider.retry_policy.upstream(provider.NAME, 'https://example.com')
+        upstream.budget.tokens = 0
+        respond_with(provider, FakeResponse(503), FakeResponse(200))
+
+        with pytest.raises(exceptions.UnhandledProviderError):
+            await provider.make_request('GET', 'https://example.com', expects=(200, ))
+
+        sleep.assert_not_awaited()
+        assert provider.provider_metrics.serialize()['retry']['budget_exhausted'] == 1
+
+    @pytest.mark.asyncio
+    async def test_breaker_fails_fast(self, provider, sleep):
+        provider.retry_policy.breaker_threshold = 3
+        respond_with(provider, *[FakeResponse(503)] * 3)
+
+        with pytest.raises(exceptions.MetadataError):
+            await provider.make_request('GET', 'https://example.com', expects=(200, ),
+                                        throws=exceptions.MetadataError)
+        assert provider._send_request.await_count == 3
+
+        with pytest.raises(exceptions.ServiceUnavailableError) as exc:
+            await provider.make_request('GET', 'https://example.com/other', expects=(200, ),
+                                        throws=exceptions.MetadataError)
+
+        assert exc.value.code == 503
+        assert exc.value.message == ('example.com is currently unavailable, '
+                                     'please try again later')
+        assert provider._send_request.await_count == 3
+        metrics = provider.provider_metrics.serialize()['retry']
+        assert metrics['short_circuited'] == 1
+        assert metrics['upstream']['breaker'] == 'open'
+
+    @pytest.mark.asyncio
+    async def test_other_hosts_unaffected(self, provider, sleep):
+        provider.retry_policy.upstream(provider.NAME, 'https://down.com').breaker.state = 'open'
+        provider.retry_policy.upstream(provider.NAME, 'https://down.com').breaker.opened_at = 1e12
+        respond_with(provider, FakeResponse(200))
+
+        resp = await provider.make_request('GET', 'https://up.com', expects=(200, ))
+
+        assert resp.status == 200
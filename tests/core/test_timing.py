@@ -0,0 +1,59 @@
+import time
+import asyncio
+
+import pytest
+
+from waterbutler.core import timing
+
+
+class TestRequestTiming:
+
+    def test_phases_add_up(self):
+        request_timing = timing.RequestTiming()
+        request_timing.add('auth', 0.01)
+        request_timing.add('auth', 0.02)
+        with request_timing.phase('validate'):
+            time.sleep(0.01)
+
+        assert request_timing.phases['auth'] == pytest.approx(0.03)
+        assert request_timing.phases['validate'] >= 0.01
+
+    def test_begin_and_end(self):
+        request_timing = timing.RequestTiming()
+        request_timing.begin('operation')
+        request_timing.begin('stream')
+        request_timing.end('operation')
+
+        assert list(request_timing.phases) == ['operation']
+
+        request_timing.end()
+        assert list(request_timing.phases) == ['operation', 'stream']
+
+    def test_server_timing(self):
+        request_timing = timing.RequestTiming()
+        request_timing.add('auth', 0.0123)
+        request_timing.add_upstream(0.05)
+        request_timing.add_upstream(0.035)
+
+        header = request_timing.server_timing()
+
+        assert header.startswith('auth;dur=12.3, upstream;dur=85.0;desc="2 calls", total;dur=')
+        assert request_timing.serialize()['upstream_calls'] == 2
+
+    @pytest.mark.asyncio
+    async def test_upstream_requests_are_recorded_in_child_tasks(self):
+        request_timing = timing.RequestTiming()
+
+        async def request():
+            request_timing.activate()
+            await asyncio.ensure_future(upload())
+
+        async def upload():
+            timing.record_upstream(0.5)
+
+        await asyncio.ensure_future(request())
+        timing.record_upstream(1.0)  # not part of the request
+
+        assert request_timing.upstream_count == 1
+        assert request_timing.upstream_seconds == 0.5
+        assert timing.current() is None
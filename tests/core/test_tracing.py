@@ -0,0 +1,111 @@
+from unittest import mock
+
+import pytest
+
+from tests import utils
+from waterbutler import settings
+from waterbutler.core import timing
+from waterbutler.core import tracing
+
+
+class FakeResponse:
+
+    def __init__(self, status):
+        self.status = status
+        self.headers = {}
+
+
+class TestDisabled:
+
+    @pytest.fixture(autouse=True)
+    def disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, 'TRACING_ENABLED', False)
+
+    def test_span_is_none(self):
+        with tracing.span('waterbutler.test', attribute='value') as span:
+            assert span is None
+
+    def test_start_span_is_none(self):
+        span = tracing.start_span('waterbutler.test', current=True)
+
+        assert span is None
+        tracing.end_span(span, attribute='value')
+
+    def test_inject_leaves_carrier_alone(self):
+        assert tracing.inject({'task': 'copy'}) == {'task': 'copy'}
+
+    def test_request_timing(self):
+        request_timing = timing.RequestTiming()
+        request_timing.activate(**{'http.method': 'GET'})
+        with request_timing.phase('auth'):
+            pass
+        request_timing.begin('operation')
+        request_timing.finish(**{'http.status_code': 200})
+
+        assert set(request_timing.phases) == {'auth', 'operation'}
+
+
+class TestEnabled:
+
+    @pytest.fixture
+    def exporter(self, monkeypatch):
+        pytest.importorskip('opentelemetry.sdk')
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        monkeypatch.setattr(settings, 'TRACING_ENABLED', True)
+        monkeypatch.setattr(tracing, '_TRACER_PROVIDER', None)
+        tracing.configure(tracer_provider=provider)
+        return exporter
+
+    def test_nested_spans(self, exporter):
+        with tracing.span('waterbutler.outer', attribute='value', missing=None):
+            with tracing.span('waterbutler.inner'):
+                tracing.add_event('waterbutler.retry', attempt=1)
+
+        inner, outer = exporter.get_finished_spans()
+        assert inner.parent.span_id == outer.context.span_id
+        assert dict(outer.attributes) == {'attribute': 'value'}
+        assert inner.events[0].name == 'waterbutler.retry'
+
+    def test_context_is_propagated(self, exporter):
+        with tracing.span('waterbutler.request'):
+            headers = tracing.inject({})
+
+        assert 'traceparent' in headers
+        with tracing.span('waterbutler.task.copy', carrier=headers):
+            pass
+
+        request, task = exporter.get_finished_spans()
+        assert task.context.trace_id == request.context.trace_id
+        assert task.parent.span_id == request.context.span_id
+
+    def test_request_phases(self, exporter):
+        request_timing = timing.RequestTiming()
+        request_timing.activate(**{'http.method': 'GET'})
+        with request_timing.phase('auth'):
+            pass
+        request_timing.begin('operation')
+        request_timing.finish(**{'http.status_code': 200})
+
+        spans = {span.name: span for span in exporter.get_finished_spans()}
+        request = spans['waterbutler.request']
+        assert set(spans) == {'waterbutler.request', 'waterbutler.auth', 'waterbutler.operation'}
+        assert spans['waterbutler.auth'].parent.span_id == request.context.span_id
+        assert request.attributes['http.status_code'] == 200
+
+    @pytest.mark.asyncio
+    async def test_upstream_requests(self, exporter):
+        provider = utils.MockProvider1({}, {}, {})
+        session = mock.Mock(get=mock.AsyncMock(return_value=FakeResponse(404)))
+
+        await provider._send_request(session, 'GET', 'https://tracing.example.com/a',
+                                     'https://tracing.example.com/a')
+
+        span, = exporter.get_finished_spans()
+        assert span.name == 'GET tracing.example.com'
+        assert span.attributes['http.status_code'] == 404
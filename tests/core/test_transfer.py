@@ -0,0 +1,207 @@
+import asyncio
+
+import pytest
+
+from waterbutler.core import exceptions
+from waterbutler.core.path import WaterButlerPath
+from waterbutler.core.transfer import TreeTransfer
+
+from tests import utils
+
+
+class Tracker:
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.order = []
+
+    async def op(self, name, delay=0.001):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        self.order.append(name)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.in_flight -= 1
+        return name
+
+
+class TestTreeTransfer:
+
+    @pytest.mark.asyncio
+    async def test_limits_operations_across_the_tree(self):
+        tracker = Tracker()
+        transfer = TreeTransfer(concurrency=3, max_bytes=100)
+
+        async def folder(depth):
+            TreeTransfer.current().detach()
+            futures = [transfer.submit(tracker.op, f'{depth}-{i}', size=1) for i in range(5)]
+            if depth:
+                futures.append(transfer.submit(folder, depth - 1))
+            return await asyncio.gather(*futures)
+
+        await transfer.run(folder(6))
+
+        assert tracker.peak == 3
+        assert len(tracker.order) == 35
+        assert transfer.peak_in_flight == 3
+
+    @pytest.mark.asyncio
+    async def test_waiting_folders_dont_hold_slots(self):
+        transfer = TreeTransfer(concurrency=1, max_bytes=100)
+
+        async def folder(depth):
+            TreeTransfer.current().detach()
+            if depth:
+                return await transfer.submit(folder, depth - 1)
+            return 'leaf'
+
+        result = await asyncio.wait_for(transfer.run(folder(10)), 1)
+
+        assert result == 'leaf'
+
+    @pytest.mark.asyncio
+    async def test_folders_run_before_files(self):
+        tracker = Tracker()
+        transfer = TreeTransfer(concurrency=1, max_bytes=100)
+
+        async def root():
+            return await asyncio.gather(
+                transfer.submit(tracker.op, 'first', size=1),
+                transfer.submit(tracker.op, 'file', size=1),
+                transfer.submit(tracker.op, 'folder'),
+            )
+
+        await transfer.run(root())
+
+        assert tracker.order == ['first', 'folder', 'file']
+
+    @pytest.mark.asyncio
+    async def test_small_files_overtake_large_ones(self):
+        tracker = Tracker()
+        transfer = TreeTransfer(concurrency=4, max_bytes=100)
+
+        async def root():
+            return await asyncio.gather(
+                transfer.submit(tracker.op, 'large-1', 0.01, size=90),
+                transfer.submit(tracker.op, 'large-2', 0.01, size=90),
+                transfer.submit(tracker.op, 'small', 0.01, size=5),
+            )
+
+        await transfer.run(root())
+
+        assert tracker.order == ['large-1', 'small', 'large-2']
+        assert tracker.peak == 2
+
+    @pytest.mark.asyncio
+    async def test_large_files_arent_starved(self):
+        tracker = Tracker()
+        transfer = TreeTransfer(concurrency=2, max_bytes=100)
+
+        async def root():
+            futures = [transfer.submit(tracker.op, 'large-1', 0.01, size=90),
+                       transfer.submit(tracker.op, 'large-2', 0.01, size=90)]
+            futures += [transfer.submit(tracker.op, f'small-{i}', 0.01, size=5)
+                        for i in range(10)]
+            return await asyncio.gather(*futures)
+
+        await transfer.run(root())
+
+        assert tracker.order.index('large-2') <= 4
+
+    @pytest.mark.asyncio
+    async def test_file_larger_than_window_still_runs(self):
+        tracker = Tracker()
+        transfer = TreeTransfer(concurrency=2, max_bytes=10)
+
+        result = await transfer.run(transfer.submit(tracker.op, 'huge', size=1000))
+
+        assert result == 'huge'
+
+    @pytest.mark.asyncio
+    async def test_first_error_cancels_remaining_work(self):
+        transfer = TreeTransfer(concurrency=2, max_bytes=100)
+        started = []
+
+        async def fail():
+            await asyncio.sleep(0.001)
+            raise exceptions.UploadError('boom')
+
+        async def slow(name):
+            started.append(name)
+            await asyncio.sleep(10)
+
+        async def root():
+            futures = [transfer.submit(fail, size=1)]
+            futures += [transfer.submit(slow, i, size=1) for i in range(10)]
+            return await asyncio.gather(*futures)
+
+        with pytest.raises(exceptions.UploadError) as exc:
+            await asyncio.wait_for(transfer.run(root()), 1)
+
+        assert exc.value.message == 'boom'
+        assert started == [0]
+        assert transfer.in_flight == 0
+        assert TreeTransfer.current() is None
+
+
+class TreeProvider(utils.MockProvider1):
+    """A provider serving a fixed tree of folders and files from memory."""
+
+    def __init__(self, *args, tree=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tree = tree or {}
+        self.created = []
+        self.uploaded = []
+
+    async def metadata(self, path, **kwargs):
+        node = self.tree
+        for part in path.parts[1:]:
+            node = node[part.value]
+        children = []
+        for name, child in node.items():
+            if isinstance(child, dict):
+                children.append(utils.MockFolderMetadata())
+                children[-1].name = name
+            else:
+                children.append(utils.MockFileMetadata())
+                children[-1].name = name
+        return children
+
+    async def delete(self, path, **kwargs):
+        raise exceptions.NotFoundError(str(path))
+
+    async def create_folder(self, path, **kwargs):
+        self.created.append(path.path)
+        return utils.MockFolderMetadata()
+
+    async def revalidate_path(self, base, name, folder=False):
+        return base.child(name, folder=folder)
+
+    async def download(self, path, **kwargs):
+        return path.path
+
+    async def upload(self, stream, path, **kwargs):
+        await asyncio.sleep(0)
+        self.uploaded.append(stream)
+        return utils.MockFileMetadata(), True
+
+
+class TestFolderFileOp:
+
+    @pytest.mark.asyncio
+    async def test_copies_the_whole_tree(self):
+        tree = {'a': {'b': {'c': {'deep.txt': 1}}, 'a.txt': 1}, 'top.txt': 1, 'e': {}}
+        src = TreeProvider({}, {}, {}, tree=tree)
+        dest = TreeProvider({}, {}, {})
+
+        folder, created = await src.copy(dest, WaterButlerPath('/'),
+                                         WaterButlerPath('/copied/'), handle_naming=False)
+
+        assert created is True
+        assert sorted(dest.created) == ['copied/', 'copied/a/', 'copied/a/b/', 'copied/a/b/c/',
+                                        'copied/e/']
+        assert sorted(dest.uploaded) == ['a/a.txt', 'a/b/c/deep.txt', 'top.txt']
+        assert len(folder.children) == 3
+        assert src.provider_metrics.serialize()['_folder_file_ops']['transfer']['completed'] == 7
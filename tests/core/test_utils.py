@@ -1,3 +1,4 @@
+import json
 import asyncio
 from unittest import mock
 
@@ -128,6 +129,32 @@ class TestAsyncRetry:
         assert merk.call_count == 2
 
 
+class TestNormalizeDatetime:
+
+    @pytest.mark.parametrize('date_string,expected', [
+        (None, None),
+        ('2017-04-19T15:24:58Z', '2017-04-19T15:24:58+00:00'),
+        ('2017-04-19T15:24:58.123+02:00', '2017-04-19T13:24:58+00:00'),
+        ('2017-04-19T15:24:58.1234567Z', '2017-04-19T15:24:58+00:00'),
+        ('2017-04-19 15:24:58', '2017-04-19T15:24:58+00:00'),
+        ('Wed, 25 Sep 1991 18:20:30 GMT', '1991-09-25T18:20:30+00:00'),
+        ('9/25/1991 18:20:30 -0500', '1991-09-25T23:20:30+00:00'),
+    ])
+    def test_normalize_datetime(self, date_string, expected):
+        assert utils.normalize_datetime(date_string) == expected
+
+
+class TestJsonEncode:
+
+    def test_json_encode(self):
+        value = {'name': 'résumé.txt', 'size': None, 'extra': {'hashes': [1, 2.5, True]}}
+
+        assert json.loads(utils.json_encode(value)) == value
+
+    def test_json_encode_large_integers(self):
+        assert json.loads(utils.json_encode({'size': 2 ** 70})) == {'size': 2 ** 70}
+
+
 class TestContentDisposition:
 
     @pytest.mark.parametrize("filename,expected", [
@@ -1,10 +1,15 @@
 import io
 import json
+import asyncio
+import base64
+import hashlib
 from http import HTTPStatus
 
 import pytest
 import aiohttpretty
 
+from waterbutler.core import retry
+from waterbutler.core import ranged
 from waterbutler.core import streams
 from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
@@ -21,6 +26,11 @@ from tests.providers.box.fixtures import (intra_fixtures,
                                           root_provider_fixtures,)
 
 
+@pytest.fixture(autouse=True)
+def upstreams(monkeypatch):
+    monkeypatch.setattr(retry, '_UPSTREAMS', {})
+
+
 @pytest.fixture
 def auth():
     return {
@@ -393,6 +403,57 @@ class TestUpload:
                                                                      parts_manifest,
                                                                      file_sha_b64)
 
+    @pytest.mark.asyncio
+    async def test_part_upload(self, provider, file_content, root_provider_fixtures):
+        session_metadata = root_provider_fixtures['create_session_metadata']
+        entry = root_provider_fixtures['upload_commit_metadata']['entries'][0]
+        provider._open_chunked_upload_session = MockCoroutine(return_value=session_metadata)
+        provider._send_part = MockCoroutine(side_effect=lambda *args: {'offset': args[2]})
+        provider._complete_chunked_upload_session = MockCoroutine(return_value=entry)
+
+        path = WaterButlerPath('/foobah', _ids=('0', None))
+        session = await provider.start_part_upload(path, len(file_content))
+        assert session.part_size == 10
+        for number, offset in enumerate(range(0, len(file_content), 10), start=1):
+            part = ranged.Part(number, offset, file_content[offset:offset + 10])
+            await session.hash_in_order(part)
+            await session.upload_part(part)
+        metadata, created = await session.complete()
+
+        provider._open_chunked_upload_session.assert_called_once_with(path, len(file_content))
+        assert provider._send_part.call_count == 4
+        part_args = provider._send_part.call_args_list[-1][0]
+        assert part_args[1:5] == (8, 30, 38, base64.standard_b64encode(
+            hashlib.sha1(file_content[30:]).digest()).decode())
+        provider._complete_chunked_upload_session.assert_called_once_with(
+            session_metadata, [{'offset': 0}, {'offset': 10}, {'offset': 20}, {'offset': 30}],
+            base64.standard_b64encode(hashlib.sha1(file_content).digest()).decode())
+        assert created is True
+        assert metadata.path == f'/{entry["id"]}'
+
+    @pytest.mark.asyncio
+    async def test_part_upload_commit_never_finishes(self, provider, file_content,
+                                                     root_provider_fixtures):
+        session_metadata = root_provider_fixtures['create_session_metadata']
+        provider._open_chunked_upload_session = MockCoroutine(return_value=session_metadata)
+        provider._send_part = MockCoroutine(side_effect=lambda *args: {'offset': args[2]})
+        provider._complete_chunked_upload_session = MockCoroutine(
+            side_effect=exceptions.RetryChunkedUploadCommit('Failed to commit chunked upload'))
+
+        path = WaterButlerPath('/foobah', _ids=('0', None))
+        session = await provider.start_part_upload(path, len(file_content))
+        part = ranged.Part(1, 0, file_content)
+        await session.hash_in_order(part)
+        await session.upload_part(part)
+
+        with pytest.raises(exceptions.UploadError) as exc:
+            await session.complete()
+
+        assert exc.value.code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert (provider._complete_chunked_upload_session.call_count ==
+                provider.UPLOAD_COMMIT_RETRIES)
+        assert path.identifier is None
+
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
     async def test_create_upload_session_new_file(self, provider, file_stream):
@@ -573,6 +634,115 @@ class TestUpload:
             'Digest': 'sha={}'.format('pz4mZbOEOesBeUhR1THUF1Oq1bI=')
         }
 
+    @pytest.mark.asyncio
+    async def test_upload_parts_concurrently(self, provider, root_provider_fixtures):
+        session_metadata = root_provider_fixtures['create_session_metadata']
+        data = b'tenbytestr' + b'0123456789' + b'abcdefghij' + b'ABCDE'
+        in_flight, most_in_flight, sent = 0, 0, {}
+
+        async def send_part(part_stream, part_size, start_offset, *args, **kwargs):
+            nonlocal in_flight, most_in_flight
+            in_flight += 1
+            most_in_flight = max(most_in_flight, in_flight)
+            sent[start_offset] = (await part_stream.read(), args[1])
+            # the later parts finish first
+            await asyncio.sleep(0.01 * (4 - start_offset // 10))
+            in_flight -= 1
+            return {'offset': start_offset, 'size': part_size}
+
+        provider.UPLOAD_PART_CONCURRENCY = 2
+        provider._send_part = send_part
+        manifest = await provider._upload_parts(streams.StringStream(data), session_metadata)
+
+        assert manifest == [{'offset': 0, 'size': 10}, {'offset': 10, 'size': 10},
+                            {'offset': 20, 'size': 10}, {'offset': 30, 'size': 5}]
+        assert most_in_flight == 2
+        for offset, (part_data, part_sha_b64) in sent.items():
+            assert part_data == data[offset:offset + 10]
+            assert part_sha_b64 == base64.standard_b64encode(
+                hashlib.sha1(part_data).digest()).decode()
+
+    @pytest.mark.asyncio
+    async def test_upload_parts_failed_part(self, provider, root_provider_fixtures):
+        session_metadata = root_provider_fixtures['create_session_metadata']
+        provider._upload_part = MockCoroutine(side_effect=exceptions.UploadError('nope'))
+
+        with pytest.raises(exceptions.UploadError):
+            await provider._upload_parts(streams.StringStream(b'tenbytestr' * 2),
+                                         session_metadata)
+
+    @pytest.mark.asyncio
+    async def test_upload_part_retried_from_spool(self, provider):
+        sent = []
+
+        async def send_part(part_stream, *args, **kwargs):
+            sent.append(await part_stream.read())
+            if len(sent) == 1:
+                raise exceptions.UploadError('unavailable', code=503)
+            return {'offset': 0}
+
+        provider._send_part = send_part
+        provider.retry_policy.delay = lambda previous, retry_after=None: 0
+        part = streams.SpooledPart(10)
+        await part.fill(streams.StringStream(b'tenbytestr'))
+
+        assert await provider._upload_part(part, '0', 0, 10, 'fake_session_id') == {'offset': 0}
+        assert sent == [b'tenbytestr', b'tenbytestr']
+
+    @pytest.mark.asyncio
+    async def test_upload_part_honors_retry_after(self, provider, monkeypatch):
+        error = exceptions.UploadError('slow down', code=503)
+        error.retry_after = '3'
+        provider._send_part = MockCoroutine(side_effect=[error, {'offset': 0}])
+        sleep = MockCoroutine()
+        monkeypatch.setattr(asyncio, 'sleep', sleep)
+        part = streams.SpooledPart(10)
+        await part.fill(streams.StringStream(b'tenbytestr'))
+
+        assert await provider._upload_part(part, '0', 0, 10, 'fake_session_id') == {'offset': 0}
+        sleep.assert_called_once_with(3.0)
+
+    @pytest.mark.asyncio
+    async def test_upload_part_stops_when_budget_is_spent(self, provider):
+        provider._send_part = MockCoroutine(
+            side_effect=exceptions.UploadError('unavailable', code=503))
+        provider.retry_policy.delay = lambda previous, retry_after=None: 0
+        upload_url = provider._build_upload_url('files', 'upload_sessions', 'fake_session_id')
+        upstream = provider.retry_policy.upstream(provider.NAME, upload_url)
+        upstream.budget.tokens = 0
+        part = streams.SpooledPart(10)
+        await part.fill(streams.StringStream(b'tenbytestr'))
+
+        with pytest.raises(exceptions.UploadError):
+            await provider._upload_part(part, '0', 0, 10, 'fake_session_id')
+        assert provider._send_part.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_upload_part_stops_when_breaker_opens(self, provider):
+        provider._send_part = MockCoroutine(
+            side_effect=exceptions.UploadError('unavailable', code=503))
+        provider.retry_policy.delay = lambda previous, retry_after=None: 0
+        upload_url = provider._build_upload_url('files', 'upload_sessions', 'fake_session_id')
+        upstream = provider.retry_policy.upstream(provider.NAME, upload_url)
+        upstream.breaker.record_failure()
+        upstream.breaker.state = upstream.breaker.OPEN
+        part = streams.SpooledPart(10)
+        await part.fill(streams.StringStream(b'tenbytestr'))
+
+        with pytest.raises(exceptions.UploadError):
+            await provider._upload_part(part, '0', 0, 10, 'fake_session_id')
+        assert provider._send_part.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_upload_part_not_retried(self, provider):
+        provider._send_part = MockCoroutine(side_effect=exceptions.UploadError('bad', code=400))
+        part = streams.SpooledPart(10)
+        await part.fill(streams.StringStream(b'tenbytestr'))
+
+        with pytest.raises(exceptions.UploadError):
+            await provider._upload_part(part, '0', 0, 10, 'fake_session_id')
+        assert provider._send_part.call_count == 1
+
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
     async def test_complete_chunked_upload_session(self, provider, root_provider_fixtures):
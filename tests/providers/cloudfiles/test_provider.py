@@ -1,5 +1,6 @@
 import io
 import time
+import asyncio
 import hashlib
 from unittest import mock
 
@@ -11,6 +12,7 @@ import aiohttpretty
 from waterbutler.core import streams, exceptions
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.providers.cloudfiles import CloudFilesProvider
+from waterbutler.providers.cloudfiles import provider as cloud_provider
 from waterbutler.providers.cloudfiles import settings as cloud_settings
 
 
@@ -103,6 +105,17 @@ def auth_json():
     }
 
 
+@pytest.fixture
+def fresh_auth_json(auth_json):
+    auth_json['access']['token']['expires'] = '2999-12-17T09:12:26.069Z'
+    return auth_json
+
+
+@pytest.fixture
+def empty_connection_cache(monkeypatch):
+    monkeypatch.setattr(cloud_provider, '_CONNECTIONS', {})
+
+
 @pytest.fixture
 def token(auth_json):
     return auth_json['access']['token']['id']
@@ -721,6 +734,73 @@ class TestOperations:
         assert aiohttpretty.has_call(method='POST', uri=token_url)
         assert aiohttpretty.has_call(method='HEAD', uri=endpoint)
 
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_ensure_connection_is_shared(self, auth, credentials, settings,
+                                               fresh_auth_json, mock_temp_key,
+                                               empty_connection_cache):
+        token_url = cloud_settings.AUTH_URL
+        aiohttpretty.register_json_uri('POST', token_url, body=fresh_auth_json)
+
+        first = CloudFilesProvider(auth, credentials, settings)
+        second = CloudFilesProvider(auth, credentials, settings)
+        await first._ensure_connection()
+        await second._ensure_connection()
+
+        assert second.token == first.token
+        assert second.temp_url_key == first.temp_url_key
+        assert len([call for call in aiohttpretty.calls if call['method'] == 'POST']) == 1
+        assert len([call for call in aiohttpretty.calls if call['method'] == 'HEAD']) == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_ensure_connection_single_flight(self, auth, credentials, settings,
+                                                   fresh_auth_json, mock_temp_key,
+                                                   empty_connection_cache):
+        token_url = cloud_settings.AUTH_URL
+        aiohttpretty.register_json_uri('POST', token_url, body=fresh_auth_json)
+
+        providers = [CloudFilesProvider(auth, credentials, settings) for _ in range(5)]
+        await asyncio.gather(*[p._ensure_connection() for p in providers])
+
+        assert len([call for call in aiohttpretty.calls if call['method'] == 'POST']) == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_ensure_connection_expired_token(self, provider, auth_json, mock_temp_key,
+                                                   empty_connection_cache):
+        token_url = cloud_settings.AUTH_URL
+        aiohttpretty.register_json_uri('POST', token_url, body=auth_json)
+
+        await provider._ensure_connection()
+        provider.token = None
+        await provider._ensure_connection()
+
+        # auth_json's token expired in 2014, so it is never reused
+        assert len([call for call in aiohttpretty.calls if call['method'] == 'POST']) == 2
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_unauthorized_invalidates_connection(self, provider, fresh_auth_json,
+                                                       mock_temp_key, mock_time,
+                                                       empty_connection_cache):
+        token_url = cloud_settings.AUTH_URL
+        aiohttpretty.register_json_uri('POST', token_url, body=fresh_auth_json)
+        await provider._ensure_connection()
+
+        path = WaterButlerPath('/lets-go-crazy')
+        url = provider.sign_url(path)
+        aiohttpretty.register_uri('GET', url, responses=[
+            {'status': 401},
+            {'status': 200, 'body': b'squares'},
+        ])
+
+        result = await provider.download(path)
+        content = await result.read()
+
+        assert content == b'squares'
+        assert len([call for call in aiohttpretty.calls if call['method'] == 'POST']) == 2
+
     def test_can_duplicate_names(self, connected_provider):
         assert connected_provider.can_duplicate_names() is False
 
@@ -2,6 +2,7 @@ import pytest
 
 import io
 import json
+import time
 from http import client
 
 import aiohttpretty
@@ -11,6 +12,7 @@ from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.providers.dataverse import settings as dvs
 from waterbutler.providers.dataverse import DataverseProvider
+from waterbutler.providers.dataverse import provider as dataverse_provider
 from waterbutler.providers.dataverse.metadata import DataverseFileMetadata, DataverseRevision
 
 from tests.providers.dataverse.fixtures import (
@@ -24,6 +26,11 @@ from tests.providers.dataverse.fixtures import (
 )
 
 
+@pytest.fixture(autouse=True)
+def empty_listing_cache(monkeypatch):
+    monkeypatch.setattr(dataverse_provider, '_LISTINGS', {})
+
+
 @pytest.fixture
 def provider(auth, credentials, settings):
     return DataverseProvider(auth, credentials, settings)
@@ -468,3 +475,75 @@ class TestUtils:
 
     def test_utils(self, provider):
         assert not provider.can_duplicate_names()
+
+
+class TestListingCache:
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_listing_shared_across_instances(self, auth, credentials, settings,
+                                                   native_dataset_metadata):
+        provider = DataverseProvider(auth, credentials, settings)
+        url = f'{provider.BASE_URL}/' + dvs.JSON_BASE_URL.format(provider._id, '1')
+        aiohttpretty.register_json_uri('GET', url, status=200, body=native_dataset_metadata)
+
+        first = await provider.validate_path('/19', revision='1')
+        second = await DataverseProvider(auth, credentials, settings).validate_path(
+            '/19', revision='1'
+        )
+
+        assert first == second
+        assert second.identifier == '19'
+        assert len(aiohttpretty.calls) == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_listing_not_shared_between_tokens(self, auth, credentials, settings,
+                                                     native_dataset_metadata):
+        provider = DataverseProvider(auth, credentials, settings)
+        url = f'{provider.BASE_URL}/' + dvs.JSON_BASE_URL.format(provider._id, '1')
+        aiohttpretty.register_json_uri('GET', url, status=200, body=native_dataset_metadata)
+
+        await provider.validate_path('/19', revision='1')
+        other = DataverseProvider(auth, dict(credentials, token='other-token'), settings)
+        await other.validate_path('/19', revision='1')
+
+        assert len(aiohttpretty.calls) == 2
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_draft_listing_expires(self, auth, credentials, settings, monkeypatch,
+                                         native_dataset_metadata):
+        provider = DataverseProvider(auth, credentials, settings)
+        url = f'{provider.BASE_URL}/' + dvs.JSON_BASE_URL.format(provider._id, 'latest')
+        aiohttpretty.register_json_uri('GET', url, status=200, body=native_dataset_metadata)
+
+        await provider.validate_path('/19', revision='latest')
+        now = time.time()
+        monkeypatch.setattr(time, 'time', lambda: now + dvs.DRAFT_CACHE_TTL + 1)
+        await DataverseProvider(auth, credentials, settings).validate_path(
+            '/19', revision='latest'
+        )
+
+        assert len(aiohttpretty.calls) == 2
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_delete_invalidates_draft(self, auth, credentials, settings,
+                                            native_dataset_metadata):
+        provider = DataverseProvider(auth, credentials, settings)
+        draft_url = f'{provider.BASE_URL}/' + dvs.JSON_BASE_URL.format(provider._id, 'latest')
+        aiohttpretty.register_json_uri('GET', draft_url, status=200, body=native_dataset_metadata)
+        published_url = f'{provider.BASE_URL}/' + dvs.JSON_BASE_URL.format(provider._id, 'latest-published')
+        aiohttpretty.register_json_uri('GET', published_url, status=200, body=native_dataset_metadata)
+        delete_url = provider.build_url(dvs.EDIT_MEDIA_BASE_URL, 'file', '19')
+        aiohttpretty.register_json_uri('DELETE', delete_url, status=204)
+
+        path = await provider.validate_path('/19', revision='latest')
+        await provider.delete(path)
+        await DataverseProvider(auth, credentials, settings).validate_path(
+            '/19', revision='latest'
+        )
+
+        # draft and published listings for the delete, then the draft again once it was dropped
+        assert len([call for call in aiohttpretty.calls if call['method'] == 'GET']) == 3
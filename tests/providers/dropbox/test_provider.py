@@ -502,6 +502,35 @@ class TestMetadata:
         assert result[0].name == 'randomfolder'
         assert result[0].path == '/conflict folder/randomfolder/'
 
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_list_folder(self, provider, provider_fixtures):
+        path = await provider.validate_path('/')
+        url = provider.build_url('files', 'list_folder')
+        more = provider_fixtures['folder_with_more_metadata']
+        aiohttpretty.register_json_uri(
+            'POST',
+            url,
+            data={'path': path.full_path.rstrip('/'), 'limit': 2},
+            body=more
+        )
+        aiohttpretty.register_json_uri(
+            'POST',
+            url + '/continue',
+            data={'cursor': more['cursor']},
+            body=provider_fixtures['folder_with_subdirectory_metadata']
+        )
+
+        first, cursor = await provider.list_folder(path, page_size=2)
+        last, last_cursor = await provider.list_folder(path, cursor=cursor, page_size=2)
+
+        assert len(first) == 2
+        assert first[0].kind == 'folder'
+        assert first[0].name == 'randomfolder'
+        assert cursor == more['cursor']
+        assert len(last) == 2
+        assert last_cursor is None
+
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
     async def test_get_revisions(self, provider, revision_fixtures):
@@ -26,3 +26,20 @@ def sharing_fixtures():
 def error_fixtures():
     with open(os.path.join(os.path.dirname(__file__), 'fixtures/errors.json')) as fp:
         return json.load(fp)
+
+
+def multipart_response(boundary, *parts):
+    """Build a Drive batch response body from (content id, status, body) tuples."""
+    body = ''
+    for content_id, status, payload in parts:
+        body += (
+            f'--{boundary}\r\n'
+            'Content-Type: application/http\r\n'
+            f'Content-ID: <response-item{content_id}>\r\n'
+            '\r\n'
+            f'HTTP/1.1 {status} Whatever\r\n'
+            'Content-Type: application/json; charset=UTF-8\r\n'
+            '\r\n'
+            f'{payload}\r\n'
+        )
+    return (body + f'--{boundary}--\r\n').encode('utf-8')
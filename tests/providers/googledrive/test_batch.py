@@ -0,0 +1,79 @@
+import pytest
+
+from waterbutler.core import exceptions
+from waterbutler.core.batch import BatchRequest
+
+from waterbutler.providers.googledrive.batch import build_multipart, parse_multipart
+
+from tests.providers.googledrive.fixtures import multipart_response
+
+
+class TestBuildMultipart:
+
+    @pytest.mark.asyncio
+    async def test_build_multipart(self):
+        requests = [
+            BatchRequest('GET', '/drive/v2/files/abc?fields=id', (200, ), exceptions.MetadataError),
+            BatchRequest('PUT', '/drive/v2/files/def', (200, ), exceptions.DeleteError,
+                         body={'labels': {'trashed': 'true'}}),
+        ]
+
+        body = build_multipart(requests, 'batch_foo').decode('utf-8')
+
+        assert body == (
+            '--batch_foo\r\n'
+            'Content-Type: application/http\r\n'
+            'Content-ID: <item0>\r\n'
+            '\r\n'
+            'GET /drive/v2/files/abc?fields=id HTTP/1.1\r\n'
+            '\r\n'
+            '\r\n'
+            '--batch_foo\r\n'
+            'Content-Type: application/http\r\n'
+            'Content-ID: <item1>\r\n'
+            '\r\n'
+            'PUT /drive/v2/files/def HTTP/1.1\r\n'
+            'Content-Type: application/json\r\n'
+            '\r\n'
+            '{"labels": {"trashed": "true"}}\r\n'
+            '--batch_foo--'
+        )
+
+
+class TestParseMultipart:
+
+    def test_parse_multipart(self):
+        payload = multipart_response(
+            'batch_bar',
+            (1, 404, '{"error": {"code": 404}}'),
+            (0, 200, '{"id": "abc"}'),
+        )
+
+        responses = parse_multipart('multipart/mixed; boundary=batch_bar', payload)
+
+        assert sorted(responses) == [0, 1]
+        assert responses[0].status == 200
+        assert responses[0].body == {'id': 'abc'}
+        assert responses[1].status == 404
+        assert responses[1].body == {'error': {'code': 404}}
+
+    def test_parse_multipart_empty_body(self):
+        payload = (
+            '--batch_baz\r\n'
+            'Content-Type: application/http\r\n'
+            'Content-ID: <response-item0>\r\n'
+            '\r\n'
+            'HTTP/1.1 204 No Content\r\n'
+            '\r\n'
+            '\r\n'
+            '--batch_baz--\r\n'
+        ).encode('utf-8')
+
+        responses = parse_multipart('multipart/mixed; boundary="batch_baz"', payload)
+
+        assert responses[0].status == 204
+        assert responses[0].body is None
+
+    def test_parse_multipart_requires_boundary(self):
+        with pytest.raises(ValueError):
+            parse_multipart('multipart/mixed', b'')
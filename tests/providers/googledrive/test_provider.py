@@ -2,6 +2,7 @@ import io
 import os
 import copy
 import json
+import asyncio
 from http import client
 from urllib import parse
 
@@ -24,6 +25,7 @@ from waterbutler.providers.googledrive.metadata import (GoogleDriveRevision,
 from tests.providers.googledrive.fixtures import(error_fixtures,
                                                  sharing_fixtures,
                                                  revision_fixtures,
+                                                 multipart_response,
                                                  root_provider_fixtures)
 
 
@@ -83,9 +85,11 @@ def other_provider(auth, other_credentials, settings):
 @pytest.fixture
 def search_for_file_response():
     return {
-        'items': [
-            {'id': '1234ideclarethumbwar'}
-        ]
+        'items': [{
+            'id': '1234ideclarethumbwar',
+            'mimeType': 'text/plain',
+            'title': 'B.txt',
+        }]
     }
 
 
@@ -96,21 +100,14 @@ def no_file_response():
     }
 
 
-@pytest.fixture
-def actual_file_response():
-    return {
-        'id': '1234ideclarethumbwar',
-        'mimeType': 'text/plain',
-        'title': 'B.txt',
-    }
-
-
 @pytest.fixture
 def search_for_folder_response():
     return {
-        'items': [
-            {'id': 'whyis6afraidof7'}
-        ]
+        'items': [{
+            'id': 'whyis6afraidof7',
+            'mimeType': 'application/vnd.google-apps.folder',
+            'title': 'A',
+        }]
     }
 
 
@@ -121,15 +118,6 @@ def no_folder_response():
     }
 
 
-@pytest.fixture
-def actual_folder_response():
-    return {
-        'id': 'whyis6afraidof7',
-        'mimeType': 'application/vnd.google-apps.folder',
-        'title': 'A',
-    }
-
-
 def make_unauthorized_file_access_error(file_id):
     message = ('The authenticated user does not have the required access '
                'to the file {}'.format(file_id))
@@ -191,6 +179,11 @@ def _build_title_search_query(provider, entity_name, is_folder=True):
         )
 
 
+def _build_part_search_url(provider, parent_id, query):
+    return provider.build_url('files', q=f"'{parent_id}' in parents and {query}",
+                              fields=provider.PATH_PART_FIELDS)
+
+
 def generate_list(child_id, root_provider_fixtures, **kwargs):
     item = {}
     item.update(root_provider_fixtures['list_file']['items'][0])
@@ -204,25 +197,20 @@ class TestValidatePath:
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
     async def test_validate_v1_path_file(self, provider, search_for_file_response,
-                                         actual_file_response, no_folder_response):
+                                         no_folder_response):
         file_name = 'file.txt'
-        file_id = '1234ideclarethumbwar'
 
-        query_url = provider.build_url(
-            'files', provider.folder['id'], 'children',
-            q=_build_title_search_query(provider, file_name, False),
-            fields='items(id)'
+        query_url = _build_part_search_url(
+            provider, provider.folder['id'],
+            _build_title_search_query(provider, file_name, False),
         )
-        wrong_query_url = provider.build_url(
-            'files', provider.folder['id'], 'children',
-            q=_build_title_search_query(provider, file_name, True),
-            fields='items(id)'
+        wrong_query_url = _build_part_search_url(
+            provider, provider.folder['id'],
+            _build_title_search_query(provider, file_name, True),
         )
-        specific_url = provider.build_url('files', file_id, fields='id,title,mimeType')
 
         aiohttpretty.register_json_uri('GET', query_url, body=search_for_file_response)
         aiohttpretty.register_json_uri('GET', wrong_query_url, body=no_folder_response)
-        aiohttpretty.register_json_uri('GET', specific_url, body=actual_file_response)
 
         try:
             wb_path_v1 = await provider.validate_v1_path('/' + file_name)
@@ -241,25 +229,20 @@ class TestValidatePath:
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
     async def test_validate_v1_path_folder(self, provider, search_for_folder_response,
-                                           actual_folder_response, no_file_response):
+                                           no_file_response):
         folder_name = 'foofolder'
-        folder_id = 'whyis6afraidof7'
 
-        query_url = provider.build_url(
-            'files', provider.folder['id'], 'children',
-            q=_build_title_search_query(provider, folder_name, True),
-            fields='items(id)'
+        query_url = _build_part_search_url(
+            provider, provider.folder['id'],
+            _build_title_search_query(provider, folder_name, True),
         )
-        wrong_query_url = provider.build_url(
-            'files', provider.folder['id'], 'children',
-            q=_build_title_search_query(provider, folder_name, False),
-            fields='items(id)'
+        wrong_query_url = _build_part_search_url(
+            provider, provider.folder['id'],
+            _build_title_search_query(provider, folder_name, False),
         )
-        specific_url = provider.build_url('files', folder_id, fields='id,title,mimeType')
 
         aiohttpretty.register_json_uri('GET', query_url, body=search_for_folder_response)
         aiohttpretty.register_json_uri('GET', wrong_query_url, body=no_file_response)
-        aiohttpretty.register_json_uri('GET', specific_url, body=actual_folder_response)
 
         try:
             wb_path_v1 = await provider.validate_v1_path('/' + folder_name + '/')
@@ -301,12 +284,10 @@ class TestValidatePath:
         name, ext = os.path.splitext(part_name)
         query = _build_title_search_query(provider, file_name.strip('/'), False)
 
-        url = provider.build_url('files', file_id, 'children', q=query, fields='items(id)')
-        aiohttpretty.register_json_uri('GET', url, body=revalidate_path_metadata)
-
-        url = provider.build_url('files', file_id, fields='id,title,mimeType')
-        aiohttpretty.register_json_uri('GET', url,
-                                       body=root_provider_fixtures['revalidate_path_file_metadata_2'])
+        url = _build_part_search_url(provider, file_id, query)
+        aiohttpretty.register_json_uri('GET', url, body={
+            'items': [root_provider_fixtures['revalidate_path_file_metadata_2']]
+        })
 
         result = await provider.revalidate_path(path, file_name)
 
@@ -330,13 +311,10 @@ class TestValidatePath:
                 "and trashed = false " \
                 "and mimeType = '{}'".format(clean_query(name), gd_ext)
 
-        url = provider.build_url('files', file_id, 'children', q=query, fields='items(id)')
-        aiohttpretty.register_json_uri('GET', url,
-                                       body=root_provider_fixtures['revalidate_path_file_metadata_1'])
-
-        url = provider.build_url('files', file_id, fields='id,title,mimeType')
-        aiohttpretty.register_json_uri('GET', url,
-                                       body=root_provider_fixtures['revalidate_path_gdoc_file_metadata'])
+        url = _build_part_search_url(provider, file_id, query)
+        aiohttpretty.register_json_uri('GET', url, body={
+            'items': [root_provider_fixtures['revalidate_path_gdoc_file_metadata']]
+        })
 
         result = await provider.revalidate_path(path, file_name)
 
@@ -357,13 +335,10 @@ class TestValidatePath:
         name, ext = os.path.splitext(part_name)
         query = _build_title_search_query(provider, file_name.strip('/') + '/', True)
 
-        folder_one_url = provider.build_url('files', file_id, 'children', q=query, fields='items(id)')
-        aiohttpretty.register_json_uri('GET', folder_one_url,
-                                       body=root_provider_fixtures['revalidate_path_folder_metadata_1'])
-
-        folder_two_url = provider.build_url('files', file_id, fields='id,title,mimeType')
-        aiohttpretty.register_json_uri('GET', folder_two_url,
-                                       body=root_provider_fixtures['revalidate_path_folder_metadata_2'])
+        url = _build_part_search_url(provider, file_id, query)
+        aiohttpretty.register_json_uri('GET', url, body={
+            'items': [root_provider_fixtures['revalidate_path_folder_metadata_2']]
+        })
 
         result = await provider.revalidate_path(path, file_name, True)
         assert result.name in path.name
@@ -598,11 +573,12 @@ class TestDownload:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         revisions_body = sharing_fixtures['editable_gdoc']['revisions']
-        revisions_url = provider.build_url('files', metadata_body['id'], 'revisions')
+        revisions_url = provider.build_url('files', metadata_body['id'], 'revisions',
+                                          fields=provider.DOCS_REVISION_FIELDS)
         aiohttpretty.register_json_uri('GET', revisions_url, body=revisions_body)
 
         file_content = b'we love you conrad'
@@ -672,11 +648,12 @@ class TestDownload:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         revisions_body = sharing_fixtures['editable_gdoc']['revisions']
-        revisions_url = provider.build_url('files', metadata_body['id'], 'revisions')
+        revisions_url = provider.build_url('files', metadata_body['id'], 'revisions',
+                                          fields=provider.DOCS_REVISION_FIELDS)
         aiohttpretty.register_json_uri('GET', revisions_url, body=revisions_body)
 
         file_content = b'we love you conrad'
@@ -701,7 +678,7 @@ class TestDownload:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         file_content = b'we love you conrad'
@@ -744,7 +721,7 @@ class TestDownload:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         file_content = b'we love you conrad'
@@ -768,7 +745,7 @@ class TestDownload:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         file_content = b'we love you conrad'
@@ -835,7 +812,7 @@ class TestDownload:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         file_content = b'we love you conrad'
@@ -858,7 +835,7 @@ class TestDownload:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         file_content = b'we love you conrad'
@@ -900,7 +877,7 @@ class TestDownload:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         file_content = b'we love you conrad'
@@ -924,7 +901,7 @@ class TestDownload:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         file_content = b'we'
@@ -976,7 +953,7 @@ class TestMetadata:
         file_metadata = root_provider_fixtures['list_file']['items'][0]
         path = WaterButlerPath('/birdie.jpg', _ids=(provider.folder['id'], file_metadata['id']))
 
-        list_file_url = provider.build_url('files', path.identifier)
+        list_file_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', list_file_url, body=file_metadata)
 
         result = await provider.metadata(path)
@@ -991,7 +968,7 @@ class TestMetadata:
                                _ids=(provider.folder['id'],
                                      root_provider_fixtures['list_file']['items'][0]['id']))
 
-        list_file_url = provider.build_url('files', path.identifier)
+        list_file_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_uri('GET', list_file_url, headers={'Content-Type': 'text/html'},
             body='this is an error message string with a 404... or is it?', status=404)
 
@@ -1020,7 +997,7 @@ class TestMetadata:
         )
 
         item = generate_list(3, root_provider_fixtures)['items'][0]
-        url = provider.build_url('files', path.identifier)
+        url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
 
         aiohttpretty.register_json_uri('GET', url, body=item)
 
@@ -1035,7 +1012,8 @@ class TestMetadata:
     async def test_metadata_root_folder(self, provider, root_provider_fixtures):
         path = await provider.validate_path('/')
         query = provider._build_query(provider.folder['id'])
-        list_file_url = provider.build_url('files', q=query, alt='json', maxResults=1000)
+        list_file_url = provider.build_url('files', q=query, alt='json', maxResults=1000,
+                                           fields=provider.LISTING_FIELDS)
         aiohttpretty.register_json_uri('GET', list_file_url,
                                        body=root_provider_fixtures['list_file'])
 
@@ -1059,7 +1037,8 @@ class TestMetadata:
         item = body['items'][0]
 
         query = provider._build_query(path.identifier)
-        url = provider.build_url('files', q=query, alt='json', maxResults=1000)
+        url = provider.build_url('files', q=query, alt='json', maxResults=1000,
+                                 fields=provider.LISTING_FIELDS)
         url_children = provider.build_url('files', q=f"'{path.identifier}' in parents")
 
         aiohttpretty.register_json_uri('GET', url, body=body)
@@ -1084,7 +1063,8 @@ class TestMetadata:
         item = body['items'][0]
 
         query = provider._build_query(path.identifier)
-        url = provider.build_url('files', q=query, alt='json', maxResults=1000)
+        url = provider.build_url('files', q=query, alt='json', maxResults=1000,
+                                 fields=provider.LISTING_FIELDS)
 
         aiohttpretty.register_json_uri('GET', url, body=body)
 
@@ -1095,6 +1075,32 @@ class TestMetadata:
         assert result == [expected]
         assert aiohttpretty.has_call(method='GET', uri=url)
 
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_list_folder(self, provider, root_provider_fixtures):
+        path = GoogleDrivePath(
+            '/hugo/kim/pins/',
+            _ids=[str(x) for x in range(4)]
+        )
+
+        body = generate_list(3, root_provider_fixtures, **root_provider_fixtures['folder_metadata'])
+        body['nextPageToken'] = 'page-3'
+        item = body['items'][0]
+
+        query = provider._build_query(path.identifier)
+        url = provider.build_url('files', q=query, alt='json', fields=provider.LISTING_PAGE_FIELDS,
+                                 maxResults=50, pageToken='page-2')
+
+        aiohttpretty.register_json_uri('GET', url, body=body)
+
+        result, cursor = await provider.list_folder(path, cursor='page-2', page_size=50)
+
+        expected = GoogleDriveFolderMetadata(item, path.child(item['title'], folder=True))
+
+        assert result == [expected]
+        assert cursor == 'page-3'
+        assert aiohttpretty.has_call(method='GET', uri=url)
+
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
     async def test_metadata_editable_gdoc_no_revision(self, provider, sharing_fixtures):
@@ -1104,11 +1110,12 @@ class TestMetadata:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         revisions_body = sharing_fixtures['editable_gdoc']['revisions']
-        revisions_url = provider.build_url('files', metadata_body['id'], 'revisions')
+        revisions_url = provider.build_url('files', metadata_body['id'], 'revisions',
+                                          fields=provider.DOCS_REVISION_FIELDS)
         aiohttpretty.register_json_uri('GET', revisions_url, body=revisions_body)
 
         result = await provider.metadata(path)
@@ -1168,11 +1175,12 @@ class TestMetadata:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         revisions_body = sharing_fixtures['editable_gdoc']['revisions']
-        revisions_url = provider.build_url('files', metadata_body['id'], 'revisions')
+        revisions_url = provider.build_url('files', metadata_body['id'], 'revisions',
+                                          fields=provider.DOCS_REVISION_FIELDS)
         aiohttpretty.register_json_uri('GET', revisions_url, body=revisions_body)
 
         result = await provider.metadata(path, revision=self.MAGIC_REVISION)
@@ -1193,7 +1201,7 @@ class TestMetadata:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         result = await provider.metadata(path)
@@ -1232,7 +1240,7 @@ class TestMetadata:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         result = await provider.metadata(path, revision=self.MAGIC_REVISION)
@@ -1252,7 +1260,7 @@ class TestMetadata:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         result = await provider.metadata(path)
@@ -1309,7 +1317,7 @@ class TestMetadata:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         result = await provider.metadata(path, revision=self.MAGIC_REVISION)
@@ -1327,7 +1335,7 @@ class TestMetadata:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         result = await provider.metadata(path)
@@ -1364,7 +1372,7 @@ class TestMetadata:
             _ids=['1', '2', metadata_body['id']]
         )
 
-        metadata_url = provider.build_url('files', path.identifier)
+        metadata_url = provider.build_url('files', path.identifier, fields=provider.FILE_FIELDS)
         aiohttpretty.register_json_uri('GET', metadata_url, body=metadata_body)
 
         result = await provider.metadata(path, revision=self.MAGIC_REVISION)
@@ -1398,7 +1406,7 @@ class TestRevisions:
     async def test_get_revisions_no_revisions(self, provider, revision_fixtures,
                                               root_provider_fixtures):
         item = root_provider_fixtures['list_file']['items'][0]
-        metadata_url = provider.build_url('files', item['id'])
+        metadata_url = provider.build_url('files', item['id'], fields=provider.FILE_FIELDS)
         revisions_url = provider.build_url('files', item['id'], 'revisions')
         path = WaterButlerPath('/birdie.jpg', _ids=('doesntmatter', item['id']))
 
@@ -1420,7 +1428,7 @@ class TestRevisions:
     async def test_get_revisions_for_uneditable(self, provider, sharing_fixtures):
         file_fixtures = sharing_fixtures['viewable_gdoc']
         item = file_fixtures['metadata']
-        metadata_url = provider.build_url('files', item['id'])
+        metadata_url = provider.build_url('files', item['id'], fields=provider.FILE_FIELDS)
         revisions_url = provider.build_url('files', item['id'], 'revisions')
         path = WaterButlerPath('/birdie.jpg', _ids=('doesntmatter', item['id']))
 
@@ -1544,7 +1552,8 @@ class TestIntraFunctions:
         aiohttpretty.register_uri('PUT', delete_url, body=del_url_body, status=200)
 
         children_query = provider._build_query(dest_path.identifier)
-        children_url = provider.build_url('files', q=children_query, alt='json', maxResults=1000)
+        children_url = provider.build_url('files', q=children_query, alt='json', maxResults=1000,
+                                          fields=provider.LISTING_FIELDS)
         children_list = generate_list(3, root_provider_fixtures,
                                       **root_provider_fixtures['folder_metadata'])
         aiohttpretty.register_json_uri('GET', children_url, body=children_list)
@@ -1587,6 +1596,102 @@ class TestIntraFunctions:
         assert aiohttpretty.has_call(method='PUT', uri=delete_url)
 
 
+class TestBatching:
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_concurrent_metadata_is_batched(self, provider, root_provider_fixtures):
+        item = root_provider_fixtures['list_file']['items'][0]
+        paths = [
+            GoogleDrivePath('/birdie.jpg', _ids=(provider.folder['id'], item['id'])),
+            GoogleDrivePath('/kim.jpg', _ids=(provider.folder['id'], 'doesnotexist')),
+        ]
+        aiohttpretty.register_uri(
+            'POST', ds.BATCH_URL,
+            body=multipart_response('batch_foo',
+                                    (0, 200, json.dumps(item)),
+                                    (1, 404, '{"error": {"code": 404}}')),
+            headers={'Content-Type': 'multipart/mixed; boundary=batch_foo'},
+        )
+
+        results = await asyncio.gather(*[provider.metadata(path) for path in paths],
+                                       return_exceptions=True)
+
+        assert results[0] == GoogleDriveFileMetadata(item, paths[0])
+        assert isinstance(results[1], exceptions.NotFoundError)
+        assert len(aiohttpretty.calls) == 1
+
+        body = aiohttpretty.calls[0]['data'].decode('utf-8')
+        metadata_url = provider.build_url('files', item['id'], fields=provider.FILE_FIELDS)
+        assert f'GET {metadata_url[len("https://www.googleapis.com"):]} HTTP/1.1' in body
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_concurrent_deletes_are_batched(self, provider):
+        paths = [
+            GoogleDrivePath(f'/file{i}', _ids=(provider.folder['id'], f'id{i}'))
+            for i in range(3)
+        ]
+        aiohttpretty.register_uri(
+            'POST', ds.BATCH_URL,
+            body=multipart_response('batch_foo', *[(i, 200, '{}') for i in range(3)]),
+            headers={'Content-Type': 'multipart/mixed; boundary=batch_foo'},
+        )
+
+        await asyncio.gather(*[provider.delete(path) for path in paths])
+
+        assert len(aiohttpretty.calls) == 1
+        assert aiohttpretty.calls[0]['data'].decode('utf-8').count('"trashed": "true"') == 3
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_throttled_sub_requests_are_retried(self, provider, monkeypatch):
+        monkeypatch.setattr(ds, 'BATCH_MAX_RETRY_AFTER', 0)
+        paths = [
+            GoogleDrivePath(f'/file{i}', _ids=(provider.folder['id'], f'id{i}'))
+            for i in range(2)
+        ]
+        aiohttpretty.register_uri('POST', ds.BATCH_URL, responses=[
+            {
+                'body': multipart_response('batch_foo', (0, 200, '{}'), (1, 429, '{}')),
+                'headers': {'Content-Type': 'multipart/mixed; boundary=batch_foo'},
+            },
+            {
+                'body': multipart_response('batch_foo', (0, 200, '{}')),
+                'headers': {'Content-Type': 'multipart/mixed; boundary=batch_foo'},
+            },
+        ])
+
+        await asyncio.gather(*[provider.delete(path) for path in paths])
+
+        assert len(aiohttpretty.calls) == 2
+        assert 'PUT /drive/v2/files/id1 ' in aiohttpretty.calls[1]['data'].decode('utf-8')
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_failed_sub_requests_are_retried(self, provider, monkeypatch):
+        monkeypatch.setattr(ds, 'BATCH_DEFAULT_RETRY_AFTER', 0)
+        paths = [
+            GoogleDrivePath(f'/file{i}', _ids=(provider.folder['id'], f'id{i}'))
+            for i in range(2)
+        ]
+        aiohttpretty.register_uri('POST', ds.BATCH_URL, responses=[
+            {
+                'body': multipart_response('batch_foo', (0, 200, '{}'), (1, 503, '{}')),
+                'headers': {'Content-Type': 'multipart/mixed; boundary=batch_foo'},
+            },
+            {
+                'body': multipart_response('batch_foo', (0, 200, '{}')),
+                'headers': {'Content-Type': 'multipart/mixed; boundary=batch_foo'},
+            },
+        ])
+
+        await asyncio.gather(*[provider.delete(path) for path in paths])
+
+        assert len(aiohttpretty.calls) == 2
+        assert 'PUT /drive/v2/files/id1 ' in aiohttpretty.calls[1]['data'].decode('utf-8')
+
+
 class TestOperationsOrMisc:
 
     @pytest.mark.asyncio
@@ -1646,8 +1751,7 @@ class TestOperationsOrMisc:
         part_name, part_is_folder = current_part[0], current_part[1]
         query = _build_title_search_query(provider, part_name, True)
 
-        url = provider.build_url('files', provider.folder['id'], 'children',
-                                 q=query, fields='items(id)')
+        url = _build_part_search_url(provider, provider.folder['id'], query)
         aiohttpretty.register_json_uri('GET', url,
                                        body=error_fixtures['parts_file_missing_metadata'])
 
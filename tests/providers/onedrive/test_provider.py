@@ -1,5 +1,6 @@
 import io
 import json
+import asyncio
 import pytest
 
 import aiohttpretty
@@ -7,6 +8,7 @@ import aiohttpretty
 from waterbutler.core import streams
 from waterbutler.core import exceptions
 
+from waterbutler.providers.onedrive import settings
 from waterbutler.providers.onedrive import OneDriveProvider
 from waterbutler.providers.onedrive.provider import OneDrivePath
 from waterbutler.providers.onedrive.metadata import OneDriveFileMetadata
@@ -71,6 +73,19 @@ def other_provider(auth, other_credentials, root_settings):
     return OneDriveProvider(auth, other_credentials, root_settings)
 
 
+def batch_response(responses, status=200):
+    """Build an aiohttpretty response for a Graph $batch call from (status, body) pairs, given in
+    the order the sub-requests were made."""
+    return {
+        'status': status,
+        'body': json.dumps({'responses': [
+            {'id': str(i), 'status': sub_status, 'headers': {}, 'body': body}
+            for i, (sub_status, body) in enumerate(responses)
+        ]}).encode('utf-8'),
+        'headers': {'Content-Type': 'application/json'},
+    }
+
+
 @pytest.fixture
 def file_content():
     return b'SLEEP IS FOR OSX GO SERVE STREAMS'
@@ -845,22 +860,21 @@ class TestDelete:
         root_delete_url = provider._build_graph_item_url('root')
         aiohttpretty.register_json_uri('DELETE', root_delete_url, status=204)
 
-        child1_url = provider._build_graph_item_url('F4D50E400DFE7D4E!134')
-        aiohttpretty.register_json_uri('GET', child1_url, status=200,
-                                       body=readwrite_fixtures['root_delete_folder_metadata'])
-        aiohttpretty.register_json_uri('DELETE', child1_url, status=204)
-
-        child2_url = provider._build_graph_item_url('F4D50E400DFE7D4E!104')
-        aiohttpretty.register_json_uri('GET', child2_url, status=200,
-                                       body=readwrite_fixtures['root_delete_file_metadata'])
-        aiohttpretty.register_json_uri('DELETE', child2_url, status=204)
+        # the children are validated and deleted concurrently, so both steps are batched
+        batch_url = f'{settings.BASE_GRAPH_URL}/$batch'
+        aiohttpretty.register_uri('POST', batch_url, responses=[
+            batch_response([
+                (200, readwrite_fixtures['root_delete_folder_metadata']),
+                (200, readwrite_fixtures['root_delete_file_metadata']),
+            ]),
+            batch_response([(204, None), (204, None)]),
+        ])
 
         await provider.delete(path, confirm_delete=1)
 
         assert aiohttpretty.has_call(method='GET', uri=root_metadata_url)
         assert not aiohttpretty.has_call(method='DELETE', uri=root_delete_url)
-        assert aiohttpretty.has_call(method='DELETE', uri=child1_url)
-        assert aiohttpretty.has_call(method='DELETE', uri=child2_url)
+        assert len([call for call in aiohttpretty.calls if call['method'] == 'POST']) == 2
 
     @pytest.mark.asyncio
     async def test_delete_root_not_confirmed(self, provider):
@@ -894,6 +908,113 @@ class TestDelete:
         assert aiohttpretty.has_call(method='DELETE', uri=delete_url)
 
 
+class TestBatching:
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_concurrent_requests_are_batched(self, provider, readwrite_fixtures):
+        batch_url = f'{settings.BASE_GRAPH_URL}/$batch'
+        aiohttpretty.register_uri('POST', batch_url, responses=[
+            batch_response([
+                (200, readwrite_fixtures['root_delete_folder_metadata']),
+                (200, readwrite_fixtures['root_delete_file_metadata']),
+            ]),
+        ])
+
+        folder, file = await asyncio.gather(
+            provider.validate_path('/F4D50E400DFE7D4E!134'),
+            provider.validate_path('/F4D50E400DFE7D4E!104'),
+        )
+
+        assert folder.identifier == 'F4D50E400DFE7D4E!134'
+        assert file.identifier == 'F4D50E400DFE7D4E!104'
+        assert len(aiohttpretty.calls) == 1
+
+        sub_requests = json.loads(aiohttpretty.calls[0]['data'])['requests']
+        assert sub_requests == [
+            {'id': '0', 'method': 'GET', 'url': '/drives/deadbeef/items/F4D50E400DFE7D4E!134'},
+            {'id': '1', 'method': 'GET', 'url': '/drives/deadbeef/items/F4D50E400DFE7D4E!104'},
+        ]
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_lone_request_is_not_batched(self, provider):
+        path = OneDrivePath('/delete-this-file', _ids=['root', '123!456'])
+        delete_url = provider._build_graph_item_url('123!456')
+        aiohttpretty.register_json_uri('DELETE', delete_url, status=204)
+
+        await provider.delete(path)
+
+        assert aiohttpretty.has_call(method='DELETE', uri=delete_url)
+        assert len(aiohttpretty.calls) == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_sub_request_errors(self, provider, readwrite_fixtures):
+        batch_url = f'{settings.BASE_GRAPH_URL}/$batch'
+        aiohttpretty.register_uri('POST', batch_url, responses=[
+            batch_response([
+                (404, readwrite_fixtures['not_found_error_response']),
+                (204, None),
+            ]),
+        ])
+
+        results = await asyncio.gather(
+            provider.delete(OneDrivePath('/missing', _ids=['root', '123!456'])),
+            provider.delete(OneDrivePath('/present', _ids=['root', '123!789'])),
+            return_exceptions=True,
+        )
+
+        assert isinstance(results[0], exceptions.DeleteError)
+        assert results[0].code == 404
+        assert results[1] is None
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_throttled_sub_requests_are_retried(self, provider, monkeypatch):
+        monkeypatch.setattr(settings, 'ONEDRIVE_BATCH_MAX_RETRY_AFTER', 0)
+        batch_url = f'{settings.BASE_GRAPH_URL}/$batch'
+        throttled = {
+            'status': 200,
+            'body': json.dumps({'responses': [
+                {'id': '0', 'status': 204},
+                {'id': '1', 'status': 429, 'headers': {'Retry-After': '5'}},
+            ]}).encode('utf-8'),
+            'headers': {'Content-Type': 'application/json'},
+        }
+        aiohttpretty.register_uri('POST', batch_url, responses=[
+            throttled,
+            batch_response([(204, None)]),
+        ])
+
+        await asyncio.gather(
+            provider.delete(OneDrivePath('/one', _ids=['root', '123!456'])),
+            provider.delete(OneDrivePath('/two', _ids=['root', '123!789'])),
+        )
+
+        assert len(aiohttpretty.calls) == 2
+        retried = json.loads(aiohttpretty.calls[1]['data'])['requests']
+        assert retried == [{'id': '0', 'method': 'DELETE', 'url': '/drives/deadbeef/items/123!789'}]
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_throttled_sub_requests_give_up(self, provider, monkeypatch):
+        monkeypatch.setattr(settings, 'ONEDRIVE_BATCH_MAX_RETRY_AFTER', 0)
+        monkeypatch.setattr(settings, 'ONEDRIVE_BATCH_MAX_RETRIES', 0)
+        batch_url = f'{settings.BASE_GRAPH_URL}/$batch'
+        aiohttpretty.register_uri('POST', batch_url, **batch_response([(429, None), (204, None)]))
+
+        results = await asyncio.gather(
+            provider.delete(OneDrivePath('/one', _ids=['root', '123!456'])),
+            provider.delete(OneDrivePath('/two', _ids=['root', '123!789'])),
+            return_exceptions=True,
+        )
+
+        assert isinstance(results[0], exceptions.DeleteError)
+        assert results[0].code == 429
+        assert results[1] is None
+
+
 class TestOperations:
 
     def test_can_duplicate_names(self, provider):
@@ -0,0 +1,223 @@
+import os
+import errno
+import asyncio
+import hashlib
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import streams
+from waterbutler.providers.osfstorage import cache
+from waterbutler.providers.osfstorage import settings as osf_settings
+
+
+def blob(content):
+    return hashlib.sha256(content).hexdigest(), content
+
+
+class Fetcher:
+
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return streams.StringStream(self.content)
+
+
+async def read(stream):
+    return await stream.read(stream.size)
+
+
+class TestBlobCache:
+
+    @pytest.mark.asyncio
+    async def test_fill_and_open(self, tmpdir):
+        blob_cache = cache.BlobCache(str(tmpdir), 100)
+        sha256, content = blob(b'hello world')
+
+        assert await blob_cache.open(sha256) is None
+        assert await blob_cache.fill(sha256, Fetcher(content)) is True
+
+        assert await read(await blob_cache.open(sha256)) == content
+        assert blob_cache.size == len(content)
+        assert os.listdir(str(tmpdir)) == [sha256]
+
+    @pytest.mark.asyncio
+    async def test_ranges(self, tmpdir):
+        blob_cache = cache.BlobCache(str(tmpdir), 100)
+        sha256, content = blob(b'0123456789')
+        await blob_cache.fill(sha256, Fetcher(content))
+
+        stream = await blob_cache.open(sha256, (2, 5))
+        assert stream.partial
+        assert stream.content_range == 'bytes 2-5/10'
+        assert await read(stream) == b'2345'
+
+        assert await read(await blob_cache.open(sha256, (7, None))) == b'789'
+        assert not getattr(await blob_cache.open(sha256, (0, 20)), 'partial', False)
+
+    @pytest.mark.asyncio
+    async def test_fetch_caches_as_it_is_read(self, tmpdir):
+        blob_cache = cache.BlobCache(str(tmpdir), 100)
+        sha256, content = blob(b'streamed while cached')
+
+        caching, stream = await blob_cache.fetch(sha256, Fetcher(content))
+        assert caching is True
+        assert await stream.read(8) == content[:8]
+        assert await blob_cache.open(sha256) is None
+
+        assert await stream.read() == content[8:]
+        assert stream.cached
+        assert await read(await blob_cache.open(sha256)) == content
+        assert os.listdir(str(tmpdir)) == [sha256]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_cache_once(self, tmpdir):
+        blob_cache = cache.BlobCache(str(tmpdir), 100)
+        sha256, content = blob(b'popular')
+        fetch = Fetcher(content)
+
+        results = await asyncio.gather(*[blob_cache.fetch(sha256, fetch) for _ in range(3)])
+
+        assert [caching for caching, _ in results] == [True, False, False]
+        for _, stream in results:
+            assert await read(stream) == content
+        assert os.listdir(str(tmpdir)) == [sha256]
+
+    @pytest.mark.asyncio
+    async def test_dropped_stream_is_not_cached(self, tmpdir):
+        blob_cache = cache.BlobCache(str(tmpdir), 100)
+        sha256, content = blob(b'client went away')
+
+        _, stream = await blob_cache.fetch(sha256, Fetcher(content))
+        await stream.read(4)
+        stream.close()
+        await asyncio.sleep(0.01)
+
+        assert os.listdir(str(tmpdir)) == []
+        assert await blob_cache.fill(sha256, Fetcher(content)) is True
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used(self, tmpdir):
+        blob_cache = cache.BlobCache(str(tmpdir), 20)
+        first, second, third = blob(b'a' * 8), blob(b'b' * 8), blob(b'c' * 8)
+        await blob_cache.fill(first[0], Fetcher(first[1]))
+        await blob_cache.fill(second[0], Fetcher(second[1]))
+        (await blob_cache.open(first[0])).close()
+
+        await blob_cache.fill(third[0], Fetcher(third[1]))
+
+        assert await blob_cache.open(second[0]) is None
+        assert sorted(os.listdir(str(tmpdir))) == sorted([first[0], third[0]])
+        assert blob_cache.size == 16
+
+    @pytest.mark.asyncio
+    async def test_too_large_is_handed_back(self, tmpdir):
+        blob_cache = cache.BlobCache(str(tmpdir), 4)
+        sha256, content = blob(b'too large')
+
+        caching, stream = await blob_cache.fetch(sha256, Fetcher(content))
+
+        assert caching is False
+        assert await read(stream) == content
+        assert os.listdir(str(tmpdir)) == []
+
+    @pytest.mark.asyncio
+    async def test_too_large_is_not_fetched_again_to_fill(self, tmpdir):
+        blob_cache = cache.BlobCache(str(tmpdir), 4)
+        sha256, content = blob(b'too large')
+        fetch = Fetcher(content)
+        await blob_cache.fetch(sha256, fetch)
+
+        assert await blob_cache.fill(sha256, fetch) is False
+        assert fetch.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_fill_doesnt_fetch_while_caching(self, tmpdir):
+        blob_cache = cache.BlobCache(str(tmpdir), 100)
+        sha256, content = blob(b'being cached')
+        fetch = Fetcher(content)
+        _, stream = await blob_cache.fetch(sha256, fetch)
+
+        assert await blob_cache.fill(sha256, fetch) is False
+        assert fetch.calls == 1
+        assert await read(stream) == content
+
+    @pytest.mark.asyncio
+    async def test_unwritable_directory_serves_uncached(self, tmpdir):
+        not_a_directory = tmpdir.join('not-a-directory')
+        not_a_directory.write('')
+        blob_cache = cache.BlobCache(str(not_a_directory), 100)
+        sha256, content = blob(b'served anyway')
+
+        assert await blob_cache.open(sha256) is None
+        caching, stream = await blob_cache.fetch(sha256, Fetcher(content))
+
+        assert caching is False
+        assert await read(stream) == content
+        assert await blob_cache.fill(sha256, Fetcher(content)) is False
+        assert not blob_cache._filling
+
+    @pytest.mark.asyncio
+    async def test_write_failure_serves_uncached(self, tmpdir):
+        blob_cache = cache.BlobCache(str(tmpdir), 100)
+        sha256, content = blob(b'the disk filled up')
+
+        _, stream = await blob_cache.fetch(sha256, Fetcher(content))
+        assert await stream.read(4) == content[:4]
+        with mock.patch.object(stream, 'file_pointer') as file_pointer:
+            file_pointer.write.side_effect = OSError(errno.ENOSPC, 'No space left on device')
+            assert await stream.read() == content[4:]
+        await asyncio.sleep(0.01)
+
+        assert not stream.cached
+        assert os.listdir(str(tmpdir)) == []
+        assert await blob_cache.open(sha256) is None
+        assert await blob_cache.fill(sha256, Fetcher(content)) is True
+
+    @pytest.mark.asyncio
+    async def test_wrong_content_is_not_cached(self, tmpdir):
+        blob_cache = cache.BlobCache(str(tmpdir), 100)
+        sha256, _ = blob(b'expected')
+
+        _, stream = await blob_cache.fetch(sha256, Fetcher(b'corrupted'))
+
+        assert await read(stream) == b'corrupted'
+        assert not stream.cached
+        assert os.listdir(str(tmpdir)) == []
+        assert await blob_cache.open(sha256) is None
+
+    @pytest.mark.asyncio
+    async def test_loads_existing_blobs(self, tmpdir):
+        sha256, content = blob(b'left over')
+        tmpdir.join(sha256).write_binary(content)
+
+        blob_cache = cache.BlobCache(str(tmpdir), 100)
+
+        assert await read(await blob_cache.open(sha256)) == content
+        assert blob_cache.size == len(content)
+        assert await blob_cache.fill(sha256, Fetcher(b'')) is True
+
+    @pytest.mark.asyncio
+    async def test_disk_io_runs_in_executor(self, tmpdir):
+        blob_cache = cache.BlobCache(str(tmpdir), 100)
+        sha256, content = blob(b'off the loop')
+        loop = asyncio.get_event_loop()
+
+        with mock.patch.object(loop, 'run_in_executor', wraps=loop.run_in_executor) as run:
+            await blob_cache.fill(sha256, Fetcher(content))
+            (await blob_cache.open(sha256)).close()
+
+        functions = [call.args[1] for call in run.call_args_list]
+        assert blob_cache._scan in functions
+        assert open in functions
+        assert blob_cache._replace in functions
+        assert blob_cache._open in functions
+
+    def test_disabled_by_default(self, monkeypatch):
+        monkeypatch.setattr(osf_settings, 'DOWNLOAD_CACHE_DIR', None)
+
+        assert cache.get_cache() is None
@@ -1,14 +1,19 @@
 import os
 import json
+import asyncio
+import hashlib
 from http import client
 from unittest import mock
 
 import pytest
 import aiohttpretty
 
+from waterbutler.core import utils as core_utils
+from waterbutler.core import streams
 from waterbutler.core import metadata
 from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
+from waterbutler.providers.osfstorage import settings as osf_settings
 from waterbutler.providers.osfstorage.provider import OSFStorageProvider
 from waterbutler.providers.osfstorage.metadata import (OsfStorageFileMetadata,
                                                        OsfStorageFolderMetadata,
@@ -158,6 +163,98 @@ class TestDownload:
                                                         display_name=expected_name)
 
 
+class TestDownloadCache:
+
+    CONTENT = b'a popular dataset'
+
+    @pytest.fixture
+    def cached_download(self, tmpdir, monkeypatch, provider_and_mock_one, download_response,
+                        download_path, mock_time):
+        monkeypatch.setattr(osf_settings, 'DOWNLOAD_CACHE_DIR', str(tmpdir))
+        provider, inner_provider = provider_and_mock_one
+        download_response['data']['path'] = hashlib.sha256(self.CONTENT).hexdigest()
+        inner_provider.download.side_effect = lambda **kwargs: streams.StringStream(self.CONTENT)
+
+        uri, params = build_signed_url_with_auth(provider, 'GET', download_path.identifier,
+                                                 'download', version=None, mode=None)
+        aiohttpretty.register_json_uri('GET', uri, body=download_response, params=params)
+        return provider, inner_provider
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_miss_then_hit(self, cached_download, download_path):
+        provider, inner_provider = cached_download
+
+        stream = await provider.download(download_path, accept_url=False)
+        assert await stream.read(stream.size) == self.CONTENT
+        assert stream.name == 'doc.rst'
+        assert provider.metrics.serialize()['download']['cache'] == 'miss'
+
+        stream = await provider.download(download_path, accept_url=False, range=(2, 8))
+        assert await stream.read(stream.size) == self.CONTENT[2:9]
+        assert stream.partial
+        assert provider.metrics.serialize()['download']['cache'] == 'hit'
+        assert provider.metrics.serialize()['download']['cache_bytes_saved'] == 7
+
+        assert inner_provider.download.call_count == 1
+        assert inner_provider.download.call_args[1]['range'] is None
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_redirects_are_not_cached(self, cached_download, download_path, tmpdir):
+        provider, inner_provider = cached_download
+
+        await provider.download(download_path, accept_url=True)
+
+        assert inner_provider.download.call_args[1]['accept_url'] is True
+        assert tmpdir.listdir() == []
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_corrupt_blob_is_served_uncached(self, cached_download, download_path,
+                                                   tmpdir):
+        provider, inner_provider = cached_download
+        inner_provider.download.side_effect = lambda **kwargs: streams.StringStream(b'corrupt')
+
+        stream = await provider.download(download_path, accept_url=False)
+
+        assert await stream.read(stream.size) == b'corrupt'
+        assert inner_provider.download.call_count == 1
+        assert tmpdir.listdir() == []
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_unwritable_cache_is_bypassed(self, cached_download, download_path, tmpdir,
+                                                monkeypatch):
+        provider, inner_provider = cached_download
+        not_a_directory = tmpdir.join('not-a-directory')
+        not_a_directory.write('')
+        monkeypatch.setattr(osf_settings, 'DOWNLOAD_CACHE_DIR', str(not_a_directory))
+
+        stream = await provider.download(download_path, accept_url=False)
+
+        assert await stream.read(stream.size) == self.CONTENT
+        assert provider.metrics.serialize()['download']['cache'] == 'bypass'
+        assert inner_provider.download.call_count == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_range_miss_is_served_directly(self, cached_download, download_path):
+        provider, inner_provider = cached_download
+
+        await provider.download(download_path, accept_url=False, range=(2, 8))
+        while core_utils.background_tasks():
+            await asyncio.sleep(0.01)
+
+        assert provider.metrics.serialize()['download']['cache'] == 'miss'
+        ranges = [call[1]['range'] for call in inner_provider.download.call_args_list]
+        assert sorted(ranges, key=str) == [(2, 8), None]
+
+        stream = await provider.download(download_path, accept_url=False)
+        assert await stream.read(stream.size) == self.CONTENT
+        assert provider.metrics.serialize()['download']['cache'] == 'hit'
+
+
 class TestDelete:
 
     @pytest.mark.asyncio
@@ -917,6 +1014,131 @@ class TestUploads:
         provider._send_to_metadata_provider.assert_not_called()
 
 
+    @pytest.mark.asyncio
+    async def test_upload_rejects_wrong_declared_hash(self, monkeypatch, provider_and_mock_one,
+                                                      file_stream, upload_path):
+        self.patch_uuid(monkeypatch)
+        provider, inner_provider = provider_and_mock_one
+        provider._check_resource_quota = utils.MockCoroutine(return_value={'over_quota': False})
+        provider._send_to_metadata_provider = utils.MockCoroutine()
+
+        with pytest.raises(exceptions.UploadChecksumMismatchError) as exc:
+            await provider.upload(file_stream, upload_path, sha256='ab' * 32)
+
+        assert exc.value.code == client.BAD_REQUEST
+        inner_provider.upload.assert_called_once_with(file_stream,
+                                                      WaterButlerPath('/patched_path'),
+                                                      check_created=False,
+                                                      fetch_metadata=False)
+        inner_provider.delete.assert_called_once_with(WaterButlerPath('/patched_path'))
+        provider._send_to_metadata_provider.assert_not_called()
+
+
+class TestUploadByHash:
+
+    @pytest.fixture
+    def stored(self, provider_and_mock_one, upload_response):
+        provider, inner_provider = provider_and_mock_one
+        provider._check_resource_quota = utils.MockCoroutine(return_value={'over_quota': False})
+        provider._send_to_metadata_provider = utils.MockCoroutine(
+            return_value=(upload_response, True))
+        inner_provider.metadata = utils.MockCoroutine(return_value=utils.MockFileMetadata())
+        provider._references_content = utils.MockCoroutine(return_value=True)
+        return provider, inner_provider
+
+    def test_disabled_by_default(self, provider_one):
+        assert provider_one.can_upload_by_hash() is False
+
+    def test_enabled(self, monkeypatch, provider_one):
+        monkeypatch.setattr(osf_settings, 'INSTANT_UPLOADS', True)
+        assert provider_one.can_upload_by_hash() is True
+
+    @pytest.mark.asyncio
+    async def test_unreferenced_content(self, stored, upload_path):
+        provider, inner_provider = stored
+        provider._references_content.return_value = False
+
+        assert await provider.upload_by_hash(upload_path, 'ab' * 32, 1337) is None
+
+        provider._references_content.assert_called_once_with(upload_path, 'ab' * 32)
+        inner_provider.metadata.assert_not_called()
+        provider._send_to_metadata_provider.assert_not_called()
+        assert provider.provider_metrics.serialize()['upload_by_hash'] == 'unreferenced'
+
+    @pytest.mark.asyncio
+    async def test_references_earlier_version(self, provider_one, upload_path):
+        revision = mock.Mock(extra={'hashes': {'sha256': 'ab' * 32}})
+        provider_one.revisions = utils.MockCoroutine(return_value=[revision])
+        provider_one._children_metadata = utils.MockCoroutine(return_value=[])
+
+        assert await provider_one._references_content(upload_path, 'ab' * 32) is True
+        provider_one._children_metadata.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_references_file_in_folder(self, provider_one, upload_path):
+        sibling = mock.Mock(kind='file', extra={'hashes': {'sha256': 'ab' * 32}})
+        provider_one.revisions = utils.MockCoroutine(return_value=[])
+        provider_one._children_metadata = utils.MockCoroutine(return_value=[sibling])
+
+        assert await provider_one._references_content(upload_path, 'ab' * 32) is True
+        assert await provider_one._references_content(upload_path, 'cd' * 32) is False
+        provider_one._children_metadata.assert_called_with(upload_path.parent)
+
+    @pytest.mark.asyncio
+    async def test_new_file_references_nothing(self, provider_one):
+        path = WaterButlerPath('/new', _ids=('rootId', None))
+        provider_one.revisions = utils.MockCoroutine()
+        provider_one._children_metadata = utils.MockCoroutine(return_value=[])
+
+        assert await provider_one._references_content(path, 'ab' * 32) is False
+        provider_one.revisions.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_registers_stored_content(self, stored, upload_path):
+        provider, inner_provider = stored
+        sha256 = 'ab' * 32
+
+        res, created = await provider.upload_by_hash(upload_path, sha256, 1337)
+
+        assert created is True
+        assert res.name == '[TEST]'
+        assert res.extra['version'] == 8
+        assert upload_path.identifier_path == res.path
+        inner_provider.metadata.assert_called_once_with(WaterButlerPath('/' + sha256))
+        inner_provider.upload.assert_not_called()
+        args, kwargs = provider._send_to_metadata_provider.call_args
+        assert args[:2] == (None, upload_path)
+        assert kwargs == {'hashes': {'sha256': sha256}}
+        assert provider.provider_metrics.serialize()['upload_by_hash'] == 'hit'
+
+    @pytest.mark.asyncio
+    async def test_missing_content(self, stored, upload_path):
+        provider, inner_provider = stored
+        inner_provider.metadata.side_effect = exceptions.MetadataError('Boom!', code=404)
+
+        assert await provider.upload_by_hash(upload_path, 'ab' * 32, 1337) is None
+
+        provider._send_to_metadata_provider.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_size_mismatch(self, stored, upload_path):
+        provider, inner_provider = stored
+
+        assert await provider.upload_by_hash(upload_path, 'ab' * 32, 1) is None
+
+        provider._send_to_metadata_provider.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_over_quota(self, stored, upload_path):
+        provider, inner_provider = stored
+        provider._check_resource_quota.return_value = {'over_quota': True}
+
+        with pytest.raises(OsfStorageQuotaExceededError):
+            await provider.upload_by_hash(upload_path, 'ab' * 32, 1337)
+
+        provider._send_to_metadata_provider.assert_not_called()
+
+
 class TestCrossRegionMove:
 
     @pytest.mark.asyncio
@@ -145,3 +145,31 @@ def file_metadata_unparsable_response():
                            'fixtures/file_metadata_unparsable_response.xml')) as fp:
         return fp.read()
 
+
+
+@pytest.fixture
+def folder_tree_metadata():
+    with open(os.path.join(os.path.dirname(__file__),
+                           'fixtures/folder_tree_metadata.xml')) as fp:
+        return fp.read()
+
+
+@pytest.fixture
+def folder_tree_shallow_metadata():
+    with open(os.path.join(os.path.dirname(__file__),
+                           'fixtures/folder_tree_shallow_metadata.xml')) as fp:
+        return fp.read()
+
+
+@pytest.fixture
+def folder_tree_sub_metadata():
+    with open(os.path.join(os.path.dirname(__file__),
+                           'fixtures/folder_tree_sub_metadata.xml')) as fp:
+        return fp.read()
+
+
+@pytest.fixture
+def folder_tree_empty_metadata():
+    with open(os.path.join(os.path.dirname(__file__),
+                           'fixtures/folder_tree_empty_metadata.xml')) as fp:
+        return fp.read()
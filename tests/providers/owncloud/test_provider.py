@@ -8,6 +8,7 @@ from waterbutler.core import streams
 from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.providers.owncloud import OwnCloudProvider
+from waterbutler.providers.owncloud import utils as owncloud_utils
 from waterbutler.providers.owncloud.metadata import (OwnCloudFileMetadata,
                                                      OwnCloudFileRevisionMetadata)
 
@@ -28,7 +29,11 @@ from tests.providers.owncloud.fixtures import (
     folder_metadata,
     file_metadata_unparsable_response,
     moved_folder_metadata,
-    moved_parent_folder_metadata
+    moved_parent_folder_metadata,
+    folder_tree_metadata,
+    folder_tree_shallow_metadata,
+    folder_tree_sub_metadata,
+    folder_tree_empty_metadata,
 )
 
 
@@ -356,6 +361,111 @@ class TestMetadata:
         assert result[0].name == 'Documents'
 
 
+class TestStreamingParser:
+
+    def test_parse_in_small_chunks(self, folder_tree_metadata):
+        body = folder_tree_metadata.encode('utf-8')
+        parser = owncloud_utils.DAVResponseParser('/my_folder/', skip_first=True)
+
+        items = []
+        for i in range(0, len(body), 13):
+            items.extend(parser.feed(body[i:i + 13]))
+        items.extend(parser.close())
+
+        assert [item.path for item in items] == ['/alpha.txt', '/sub/', '/sub/beta.txt',
+                                                 '/sub/empty/']
+
+    def test_items_yielded_before_body_complete(self, folder_tree_metadata):
+        body = folder_tree_metadata.encode('utf-8')
+        parser = owncloud_utils.DAVResponseParser('/my_folder/')
+
+        first_half = parser.feed(body[:len(body) // 2])
+        assert len(first_half) > 0
+        assert first_half[0].path == '/'
+
+    @pytest.mark.asyncio
+    async def test_parse_dav_response_matches_parser(self, folder_tree_metadata):
+        items = await owncloud_utils.parse_dav_response(folder_tree_metadata, '/my_folder/',
+                                                        skip_first=True)
+        assert len(items) == 4
+        assert items[1].kind == 'folder'
+
+
+class TestMetadataTree:
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_depth_infinity(self, provider, folder_tree_metadata):
+        path = WaterButlerPath('/', prepend=provider.folder)
+        url = provider._webdav_url_ + path.full_path
+        aiohttpretty.register_uri('PROPFIND', url, body=folder_tree_metadata, status=207)
+
+        tree = await provider._metadata_tree(path)
+
+        assert aiohttpretty.has_call(method='PROPFIND', uri=url, headers={'Depth': 'infinity'})
+        assert [item.name for item in tree['/my_folder/']] == ['alpha.txt', 'sub']
+        assert [item.name for item in tree['/my_folder/sub/']] == ['beta.txt', 'empty']
+        assert tree['/my_folder/sub/empty/'] == []
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_depth_infinity_refused(self, provider, folder_tree_shallow_metadata,
+                                          folder_tree_sub_metadata, folder_tree_empty_metadata):
+        path = WaterButlerPath('/', prepend=provider.folder)
+        url = provider._webdav_url_ + path.full_path
+        aiohttpretty.register_uri('PROPFIND', url, responses=[
+            {'status': 403},
+            {'status': 207, 'body': folder_tree_shallow_metadata},
+        ])
+        aiohttpretty.register_uri('PROPFIND', url + 'sub/', body=folder_tree_sub_metadata,
+                                  status=207)
+        aiohttpretty.register_uri('PROPFIND', url + 'sub/empty/', body=folder_tree_empty_metadata,
+                                  status=207)
+
+        tree = await provider._metadata_tree(path)
+
+        assert [item.name for item in tree['/my_folder/']] == ['alpha.txt', 'sub']
+        assert [item.name for item in tree['/my_folder/sub/']] == ['beta.txt', 'empty']
+        assert tree['/my_folder/sub/empty/'] == []
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_depth_infinity_downgraded(self, provider, folder_tree_shallow_metadata,
+                                             folder_tree_sub_metadata, folder_tree_empty_metadata):
+        path = WaterButlerPath('/', prepend=provider.folder)
+        url = provider._webdav_url_ + path.full_path
+        aiohttpretty.register_uri('PROPFIND', url, body=folder_tree_shallow_metadata, status=207)
+        aiohttpretty.register_uri('PROPFIND', url + 'sub/', body=folder_tree_sub_metadata,
+                                  status=207)
+        aiohttpretty.register_uri('PROPFIND', url + 'sub/empty/', body=folder_tree_empty_metadata,
+                                  status=207)
+
+        tree = await provider._metadata_tree(path)
+
+        assert [item.name for item in tree['/my_folder/sub/']] == ['beta.txt', 'empty']
+        assert tree['/my_folder/sub/empty/'] == []
+        assert aiohttpretty.has_call(method='PROPFIND', uri=url + 'sub/empty/')
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_primed_listing_is_consumed(self, provider, folder_tree_metadata):
+        path = WaterButlerPath('/', prepend=provider.folder)
+        url = provider._webdav_url_ + path.full_path
+        aiohttpretty.register_uri('PROPFIND', url, body=folder_tree_metadata, status=207)
+
+        assert await provider._prime_tree(path)
+        assert not await provider._prime_tree(path)
+
+        sub = WaterButlerPath('/sub/', prepend=provider.folder)
+        result = await provider.metadata(sub)
+
+        assert [item.name for item in result] == ['beta.txt', 'empty']
+        assert '/my_folder/sub/' not in provider._dav_tree
+
+        provider._forget_tree(path)
+        assert provider._dav_tree == {}
+
+
 class TestRevisions:
 
     @pytest.mark.asyncio
@@ -1310,6 +1310,31 @@ class TestMetadata:
         assert aiohttpretty.has_call(method='HEAD', uri=metadata_url)
 
 
+    @pytest.mark.asyncio
+    async def test_list_folder(self, provider):
+        path = WaterButlerPath('/darp/')
+        contents = [{'Key': 'darp/'}, {'Key': 'darp/my-image.jpg'}]
+        prefixes = [{'Prefix': 'darp/photos/'}]
+        provider._list_folder_page = MockCoroutine(return_value=(contents, prefixes, 'next'))
+
+        result, cursor = await provider.list_folder(path, cursor='this', page_size=3)
+
+        assert [item.name for item in result] == ['photos', 'my-image.jpg']
+        assert cursor == 'next'
+        provider._list_folder_page.assert_called_once_with(
+            {'Prefix': 'darp/', 'Delimiter': '/', 'Bucket': provider.bucket_name}, 'this', 3
+        )
+
+    @pytest.mark.asyncio
+    async def test_list_folder_missing(self, provider):
+        path = WaterButlerPath('/darp/')
+        provider._list_folder_page = MockCoroutine(return_value=([], [], None))
+        provider.check_key_existence = MockCoroutine(side_effect=exceptions.NotFoundError('/darp/'))
+
+        with pytest.raises(exceptions.NotFoundError):
+            await provider.list_folder(path)
+
+
 class TestCreateFolder:
 
     @pytest.mark.skip('TODO fix broken s3 provider tests')
@@ -1,9 +1,14 @@
+import os
 import json
 from http import HTTPStatus
+from unittest import mock
 
 from tornado import testing
 
 from tests import utils
+from waterbutler import settings
+from waterbutler.core import metrics
+from waterbutler.server import workers
 from waterbutler.version import __version__
 
 
@@ -14,9 +19,58 @@ class TestStatusHandler(utils.HandlerTestCase):
         expected = {
             'status': 'up',
             'version': __version__,
+            'pid': os.getpid(),
+            'worker': None,
+            'requests_in_flight': 0,
+            'draining': False,
         }
         resp = yield self.http_client.fetch(
             self.get_url('/status'),
         )
         assert resp.code == HTTPStatus.OK
         assert expected == json.loads(resp.body.decode())
+
+    @testing.gen_test
+    def test_draining(self):
+        with mock.patch.object(workers, '_draining', True):
+            resp = yield self.http_client.fetch(self.get_url('/status'), raise_error=False)
+
+        assert resp.code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert json.loads(resp.body.decode())['status'] == 'draining'
+
+
+class TestMetricsHandler(utils.HandlerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(settings, 'METRICS_TOKEN', 's3cret')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @testing.gen_test
+    def test_get(self):
+        metrics.UPSTREAM_REQUESTS.inc('osfstorage', 'api.osf.io', 'GET', '2xx')
+
+        resp = yield self.http_client.fetch(self.get_url('/metrics'),
+                                            headers={'Authorization': 'Bearer s3cret'})
+
+        assert resp.code == HTTPStatus.OK
+        assert resp.headers['Content-Type'] == metrics.REGISTRY.CONTENT_TYPE
+        body = resp.body.decode()
+        assert ('waterbutler_upstream_requests_total{provider="osfstorage",host="api.osf.io",'
+                'method="GET",status_class="2xx"}') in body
+        assert body.endswith('# EOF\n')
+
+    @testing.gen_test
+    def test_wrong_token(self):
+        resp = yield self.http_client.fetch(self.get_url('/metrics'), raise_error=False,
+                                            headers={'Authorization': 'Bearer guess'})
+
+        assert resp.code == HTTPStatus.NOT_FOUND
+
+    @testing.gen_test
+    def test_not_served_without_a_token(self):
+        with mock.patch.object(settings, 'METRICS_TOKEN', None):
+            resp = yield self.http_client.fetch(self.get_url('/metrics'), raise_error=False)
+
+        assert resp.code == HTTPStatus.NOT_FOUND
@@ -96,12 +96,11 @@ def mock_intra(monkeypatch, request):
     src_provider.can_intra_copy = mock.Mock(return_value=True)
     src_provider.can_intra_move = mock.Mock(return_value=True)
 
-    mock_backgrounded = MockCoroutine(return_value=(MockFileMetadata(), request.param))
-    monkeypatch.setattr(waterbutler.server.api.v1.provider.movecopy.tasks,
-                        'backgrounded',
-                        mock_backgrounded)
+    mock_intra_action = MockCoroutine(return_value=(MockFileMetadata(), request.param))
+    src_provider.copy = mock_intra_action
+    src_provider.move = mock_intra_action
 
-    return mock_make_provider, mock_backgrounded
+    return mock_make_provider, mock_intra_action
 
 
 @pytest.fixture(params=[True, False])
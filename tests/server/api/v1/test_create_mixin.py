@@ -172,6 +172,29 @@ class TestValidatePut:
         assert exc.value.message == 'Invalid Content-Length'
         handler.get_query_argument.assert_called_once_with('kind', default='file')
 
+    def test_content_sha256(self, http_request):
+
+        handler = mock_handler(http_request)
+        handler.request.headers = {'Content-Length': 5000, 'X-Content-SHA256': 'AB' * 32}
+        handler.get_query_argument = mock.Mock(return_value='file')
+
+        handler.prevalidate_put()
+
+        assert handler.content_sha256 == 'ab' * 32
+
+    @pytest.mark.parametrize('kind,sha256', [('file', 'ab' * 31), ('file', 'zz' * 32),
+                                             ('folder', 'ab' * 32)])
+    def test_invalid_content_sha256(self, http_request, kind, sha256):
+
+        handler = mock_handler(http_request)
+        handler.request.headers = {'Content-Length': 0, 'X-Content-SHA256': sha256}
+        handler.get_query_argument = mock.Mock(return_value=kind)
+
+        with pytest.raises(exceptions.InvalidParameters) as exc:
+            handler.prevalidate_put()
+
+        assert exc.value.code == client.BAD_REQUEST
+
     @pytest.mark.asyncio
     async def test_name_required_for_dir(self, http_request):
 
@@ -283,3 +306,58 @@ class TestUploadFile:
         not_created_upload_handler.write.assert_called_once_with({
             'data': mock_file_metadata.json_api_serialized('3rqws')
         })
+
+
+class TestUploadByHash:
+
+    def handler(self, http_request, result, supported=True):
+        handler = mock_handler(http_request)
+        handler.resource = '3rqws'
+        handler.target_path = WaterButlerPath('/file')
+        handler.content_sha256 = 'ab' * 32
+        handler.request.headers['Content-Length'] = '1337'
+        handler.provider.can_upload_by_hash = mock.Mock(return_value=supported)
+        handler.provider.upload_by_hash = MockCoroutine(return_value=result)
+        handler.set_status = mock.Mock()
+        handler.finish = mock.Mock()
+        return handler
+
+    @pytest.mark.asyncio
+    async def test_content_is_stored(self, http_request, mock_file_metadata):
+        handler = self.handler(http_request, (mock_file_metadata, True))
+
+        assert await handler.upload_by_hash() is True
+
+        handler.provider.upload_by_hash.assert_called_once_with(WaterButlerPath('/file'),
+                                                                'ab' * 32, 1337)
+        handler.set_status.assert_called_once_with(201)
+        handler.finish.assert_called_once_with({
+            'data': mock_file_metadata.json_api_serialized('3rqws')
+        })
+        assert handler._discard_body is True
+
+    @pytest.mark.asyncio
+    async def test_content_is_missing(self, http_request):
+        handler = self.handler(http_request, None)
+
+        assert await handler.upload_by_hash() is False
+
+        assert handler.provider.upload_by_hash.called
+        assert not handler.finish.called
+
+    @pytest.mark.asyncio
+    async def test_provider_doesnt_support_it(self, http_request, mock_file_metadata):
+        handler = self.handler(http_request, (mock_file_metadata, True), supported=False)
+
+        assert await handler.upload_by_hash() is False
+
+        assert not handler.provider.upload_by_hash.called
+
+    @pytest.mark.asyncio
+    async def test_no_declared_hash(self, http_request, mock_file_metadata):
+        handler = self.handler(http_request, (mock_file_metadata, True))
+        handler.content_sha256 = None
+
+        assert await handler.upload_by_hash() is False
+
+        assert not handler.provider.upload_by_hash.called
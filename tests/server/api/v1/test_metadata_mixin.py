@@ -1,8 +1,10 @@
 import json
+from unittest import mock
 
 import pytest
 
 from tests.utils import MockCoroutine
+from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
 
 from tests.server.api.v1.utils import mock_handler
@@ -41,6 +43,60 @@ class TestMetadataMixin:
 
         handler.write.assert_called_once_with({'data': serialized_data})
 
+    @pytest.mark.asyncio
+    async def test_get_folder_page(self, http_request, mock_folder_children):
+        http_request.uri = '/v1/resources/test/providers/test/folder/?page[size]=2'
+        handler = mock_handler(http_request)
+        handler.request.query_arguments['page[size]'] = [b'2']
+        handler.provider.metadata = MockCoroutine(return_value=mock_folder_children)
+
+        await handler.get_folder()
+
+        data = handler.write.call_args[0][0]
+        assert data['data'] == [x.json_api_serialized(handler.resource)
+                                for x in mock_folder_children[:2]]
+        assert data['links']['next'] == ('http://localhost:7777/v1/resources/test/providers/test/'
+                                         'folder/?page%5Bsize%5D=2&page%5Bcursor%5D=2')
+
+    @pytest.mark.asyncio
+    async def test_get_folder_last_page(self, http_request, mock_folder_children):
+        handler = mock_handler(http_request)
+        handler.request.query_arguments['page[cursor]'] = [b'2']
+        handler.provider.metadata = MockCoroutine(return_value=mock_folder_children)
+
+        await handler.get_folder()
+
+        handler.write.assert_called_once_with({
+            'data': [mock_folder_children[2].json_api_serialized(handler.resource)],
+            'links': {'next': None},
+        })
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('size', [b'0', b'1001', b'many'])
+    async def test_get_folder_invalid_page_size(self, http_request, size):
+        handler = mock_handler(http_request)
+        handler.request.query_arguments['page[size]'] = [size]
+
+        with pytest.raises(exceptions.InvalidParameters):
+            await handler.get_folder()
+
+    @pytest.mark.asyncio
+    async def test_get_folder_streams_pages(self, http_request, mock_folder_children):
+        handler = mock_handler(http_request)
+        handler.flush = mock.AsyncMock()
+        pages = [mock_folder_children[:1], mock_folder_children[1:2], mock_folder_children[2:]]
+        cursors = ['1', '2', None]
+        handler.provider.list_folder = MockCoroutine(side_effect=list(zip(pages, cursors)))
+
+        await handler.get_folder()
+
+        body = ''.join(call[0][0] for call in handler.write.call_args_list)
+        assert json.loads(body) == {
+            'data': [x.json_api_serialized(handler.resource) for x in mock_folder_children]
+        }
+        assert handler.flush.await_count == 2
+        assert handler._headers['Content-Type'] == 'application/json; charset=UTF-8'
+
     @pytest.mark.asyncio
     async def test_get_folder_download_as_zip(self, http_request,):
         # Including 'zip' in the query params should trigger the download_as_zip method
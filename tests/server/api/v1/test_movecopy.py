@@ -1,6 +1,12 @@
+import asyncio
+from unittest import mock
+
 import pytest
 
+from waterbutler.core import progress
 from waterbutler.core import exceptions
+from waterbutler import settings as wb_settings
+from waterbutler.server.api.v1.provider import movecopy
 
 from tests.server.api.v1.utils import mock_handler
 from tests.server.api.v1.fixtures import (http_request, move_copy_args, handler_auth,
@@ -87,7 +93,7 @@ class TestMoveOrCopy:
                                    mock_file_metadata):
         handler = mock_handler(http_request)
         handler._json = {'action': action, 'path': '/test_path/'}
-        mock_make_provider, mock_celery = mock_intra
+        mock_make_provider, mock_intra_action = mock_intra
 
         await handler.move_or_copy()
 
@@ -95,12 +101,11 @@ class TestMoveOrCopy:
                                               handler.auth['auth'],
                                               handler.auth['credentials'],
                                               handler.auth['settings'])
-        mock_celery.assert_called_with(getattr(handler.provider, action),
-                                       handler.provider,
-                                       handler.path,
-                                       handler.dest_path,
-                                       conflict='warn',
-                                       rename=None)
+        mock_intra_action.assert_called_with(handler.provider,
+                                             handler.path,
+                                             handler.dest_path,
+                                             conflict='warn',
+                                             rename=None)
         handler.write.assert_called_with(serialized_metadata)
         assert handler.dest_meta == mock_file_metadata
 
@@ -151,3 +156,71 @@ class TestMoveOrCopy:
                                        conflict='warn',
                                        rename='renamed path',
                                        request=serialized_request)
+
+    @pytest.mark.asyncio
+    async def test_intra_move_copy_hand_off(self, http_request, patch_make_provider_move_copy,
+                                            mock_file_metadata, tmpdir, monkeypatch):
+        monkeypatch.setattr(wb_settings, 'PROGRESS_STORE', f'file://{tmpdir}')
+        monkeypatch.setattr(wb_settings, 'PROGRESS_PUBLISH_INTERVAL', 0.01)
+        monkeypatch.setattr(movecopy.settings, 'INTRA_MOVE_COPY_TIMEOUT', 0.01)
+        release = asyncio.Event()
+
+        async def slow_copy(*args, **kwargs):
+            await release.wait()
+            return mock_file_metadata, True
+
+        provider = patch_make_provider_move_copy.return_value
+        provider.can_intra_copy = mock.Mock(return_value=True)
+        provider.copy = slow_copy
+        handler = mock_handler(http_request)
+        handler._json = {'action': 'copy', 'path': '/test_path/'}
+        handler._send_hook = mock.Mock()
+
+        await handler.move_or_copy()
+
+        assert handler.get_status() == 202
+        data = handler.write.call_args[0][0]['data']
+        assert data['attributes']['status'] == 'pending'
+        assert handler._headers['Location'] == data['links']['self']
+        assert not handler._send_hook.called
+
+        assert (await progress.get_store().load(data['id']))['owner'] == {
+            'resource': 'test_source_resource', 'provider': 'MockProvider', 'requester': None,
+        }
+
+        release.set()
+        record = await progress.get_store().load(data['id'])
+        while record['status'] not in progress.FINAL_STATES:
+            await asyncio.sleep(0.01)
+            record = await progress.get_store().load(data['id'])
+
+        assert record['status'] == 'succeeded'
+        assert record['created'] is True
+        assert handler.dest_meta == mock_file_metadata
+        handler._send_hook.assert_called_once_with('copy')
+
+    @pytest.mark.asyncio
+    async def test_inter_move_copy_hand_off(self, http_request, mock_inter, tmpdir, monkeypatch):
+        monkeypatch.setattr(wb_settings, 'PROGRESS_STORE', f'file://{tmpdir}')
+        task_id = '4ef2d1dd-c5da-41a7-ae4a-9d0ba7a68927'
+        mock_adelay = mock_inter[1]
+        mock_adelay.return_value = mock.Mock(id=task_id)
+        movecopy.tasks.wait_on_celery.side_effect = movecopy.tasks.WaitTimeOutError
+
+        handler = mock_handler(http_request)
+        handler._json = {'action': 'move', 'path': '/test_path/'}
+
+        await handler.move_or_copy()
+
+        assert handler.get_status() == 202
+        data = handler.write.call_args[0][0]['data']
+        assert data['id'] == task_id
+        assert data['attributes'] == {'action': 'move', 'status': 'pending'}
+        assert handler._headers['Location'] == data['links']['self']
+        assert await progress.get_store().load(task_id) == {
+            'action': 'move',
+            'status': 'pending',
+            'owner': {
+                'resource': 'test_source_resource', 'provider': 'MockProvider', 'requester': None,
+            },
+        }
@@ -0,0 +1,175 @@
+import json
+import asyncio
+from http import client
+from unittest import mock
+
+import pytest
+
+from tornado import testing
+from tornado import httpclient
+
+from waterbutler.core import progress
+from waterbutler.core import exceptions
+from waterbutler import settings as wb_settings
+from waterbutler.server.api.v1 import operations
+
+from tests.utils import MockCoroutine, MockFileMetadata
+from tests.server.api.v1.utils import ServerTestCase
+
+OPERATION_ID = 'c5a4e1f0-2b6e-4d3c-9a8f-0e1d2c3b4a59'
+OWNER = {'resource': 'guid1', 'provider': 'osfstorage', 'requester': 'user1'}
+
+
+@pytest.fixture(autouse=True)
+def progress_store(tmpdir, monkeypatch):
+    monkeypatch.setattr(wb_settings, 'PROGRESS_STORE', f'file://{tmpdir}')
+    monkeypatch.setattr(wb_settings, 'PROGRESS_PUBLISH_INTERVAL', 0.01)
+    return progress.get_store()
+
+
+async def finish(result=None, exception=None):
+    if exception is not None:
+        raise exception
+    return result
+
+
+async def run(coro):
+    task = asyncio.ensure_future(coro)
+    await operations.run(OPERATION_ID, 'copy', task, OWNER)
+    return await progress.get_store().load(OPERATION_ID)
+
+
+class TestRun:
+
+    @pytest.mark.asyncio
+    async def test_succeeded(self):
+        metadata = MockFileMetadata()
+
+        record = await run(finish((metadata, True)))
+
+        assert record['status'] == 'succeeded'
+        assert record['created'] is True
+        assert record['metadata'] == metadata.json_api_serialized('guid1')
+        assert record['owner'] == OWNER
+
+    @pytest.mark.asyncio
+    async def test_failed(self):
+        record = await run(finish(exception=exceptions.IntraCopyError('nope', code=409)))
+
+        assert record['status'] == 'failed'
+        assert record['error'] == {'code': 409, 'message': 'nope'}
+
+    @pytest.mark.asyncio
+    async def test_unexpected_error_is_hidden(self):
+        record = await run(finish(exception=ValueError('secret')))
+
+        assert record['status'] == 'failed'
+        assert record['error'] == {'code': 500, 'message': 'Copy failed'}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_while_running(self, progress_store):
+        task = asyncio.ensure_future(asyncio.sleep(10))
+        running = asyncio.ensure_future(operations.run(OPERATION_ID, 'move', task, OWNER))
+        await asyncio.sleep(0.01)
+
+        await progress_store.cancel(OPERATION_ID)
+        await running
+
+        assert task.cancelled()
+        assert (await progress_store.load(OPERATION_ID))['status'] == 'cancelled'
+
+    @pytest.mark.asyncio
+    async def test_cancelled_before_running(self, progress_store):
+        task = asyncio.ensure_future(asyncio.sleep(10))
+        await progress_store.cancel(OPERATION_ID)
+
+        await operations.run(OPERATION_ID, 'move', task, OWNER)
+        await asyncio.sleep(0)
+
+        assert task.cancelled()
+        assert (await progress_store.load(OPERATION_ID))['status'] == 'cancelled'
+
+
+class TestOperationHandler(ServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.auth = {'auth': {'id': 'user1'}, 'credentials': {}, 'settings': {}}
+        self.patcher = mock.patch.object(operations.auth_handler, 'get',
+                                         MockCoroutine(side_effect=lambda *a, **kw: self.auth))
+        self.auth_get = self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        super().tearDown()
+
+    @testing.gen_test
+    def test_get(self):
+        record = {'action': 'copy', 'status': 'running', 'progress': {'files_done': 3}}
+        yield progress.get_store().save(OPERATION_ID, dict(record, owner=OWNER))
+
+        resp = yield self.http_client.fetch(self.get_url(f'/operations/{OPERATION_ID}'))
+
+        data = json.loads(resp.body.decode())['data']
+        assert data['id'] == OPERATION_ID
+        assert data['attributes'] == record
+        assert data['links']['self'].endswith(f'/v1/operations/{OPERATION_ID}')
+        (resource, provider, request), kwargs = self.auth_get.call_args
+        assert (resource, provider, request.method) == ('guid1', 'osfstorage', 'GET')
+
+    @testing.gen_test
+    def test_get_unknown(self):
+        with pytest.raises(httpclient.HTTPError) as exc:
+            yield self.http_client.fetch(self.get_url('/operations/d3adb33f'))
+
+        assert exc.value.code == client.NOT_FOUND
+
+    @testing.gen_test
+    def test_get_started_by_someone_else(self):
+        self.auth = {'auth': {'id': 'user2'}, 'credentials': {}, 'settings': {}}
+        yield progress.get_store().save(OPERATION_ID, {'status': 'running', 'owner': OWNER})
+
+        with pytest.raises(httpclient.HTTPError) as exc:
+            yield self.http_client.fetch(self.get_url(f'/operations/{OPERATION_ID}'))
+
+        assert exc.value.code == client.NOT_FOUND
+
+    @testing.gen_test
+    def test_get_without_owner(self):
+        yield progress.get_store().save(OPERATION_ID, {'status': 'running'})
+
+        with pytest.raises(httpclient.HTTPError) as exc:
+            yield self.http_client.fetch(self.get_url(f'/operations/{OPERATION_ID}'))
+
+        assert exc.value.code == client.NOT_FOUND
+
+    @testing.gen_test
+    def test_delete(self):
+        yield progress.get_store().save(OPERATION_ID, {'status': 'running', 'owner': OWNER})
+
+        resp = yield self.http_client.fetch(self.get_url(f'/operations/{OPERATION_ID}'),
+                                            method='DELETE')
+
+        assert resp.code == client.ACCEPTED
+        assert (yield progress.get_store().is_cancelled(OPERATION_ID))
+        assert self.auth_get.call_args[0][2].method == 'DELETE'
+
+    @testing.gen_test
+    def test_delete_started_by_someone_else(self):
+        self.auth = {'auth': {'id': 'user2'}, 'credentials': {}, 'settings': {}}
+        yield progress.get_store().save(OPERATION_ID, {'status': 'running', 'owner': OWNER})
+
+        with pytest.raises(httpclient.HTTPError) as exc:
+            yield self.http_client.fetch(self.get_url(f'/operations/{OPERATION_ID}'),
+                                         method='DELETE')
+
+        assert exc.value.code == client.NOT_FOUND
+        assert not (yield progress.get_store().is_cancelled(OPERATION_ID))
+
+    @testing.gen_test
+    def test_delete_unknown(self):
+        with pytest.raises(httpclient.HTTPError) as exc:
+            yield self.http_client.fetch(self.get_url('/operations/d3adb33f'), method='DELETE')
+
+        assert exc.value.code == client.NOT_FOUND
+        assert not (yield progress.get_store().is_cancelled('d3adb33f'))
@@ -3,6 +3,7 @@ from unittest import mock
 
 import pytest
 
+from waterbutler.core import metrics
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.server.api.v1.provider import list_or_value
 
@@ -55,6 +56,20 @@ class TestProviderHandler:
         handler.target_path = WaterButlerPath('/file')
         await handler.prepare_stream()
 
+    @pytest.mark.asyncio
+    async def test_prepare_stream_with_declared_hash(self, http_request):
+
+        handler = mock_handler(http_request)
+        handler.target_path = WaterButlerPath('/file')
+        handler.content_sha256 = 'ab' * 32
+        handler.provider.can_upload_by_hash = mock.Mock(return_value=True)
+        handler.provider.upload = MockCoroutine()
+        await handler.prepare_stream()
+        await handler.uploader
+
+        handler.provider.upload.assert_called_once_with(handler.stream, handler.target_path,
+                                                        sha256='ab' * 32)
+
     @pytest.mark.asyncio
     async def test_head(self, http_request):
 
@@ -337,3 +352,48 @@ class TestProviderHandlerFinish:
 
         assert handler.on_finish() is None
         handler._send_hook.assert_called_once_with('download_file')
+
+
+class TestProviderHandlerMetrics:
+
+    @pytest.fixture(autouse=True)
+    def clear(self):
+        metrics.REGISTRY.clear()
+        yield
+        metrics.REGISTRY.clear()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('method,query,path,action', [
+        ('GET', {}, '/file', 'download_file'),
+        ('GET', {'meta': [b'']}, '/file', 'metadata'),
+        ('GET', {'revisions': [b'']}, '/file', 'revisions'),
+        ('GET', {}, '/folder/', 'metadata'),
+        ('GET', {'zip': [b'']}, '/folder/', 'download_zip'),
+        ('PUT', {'kind': [b'folder']}, '/folder/', 'create_folder'),
+        ('PUT', {}, '/file', 'upload'),
+        ('HEAD', {}, '/file', 'metadata'),
+        ('DELETE', {}, '/file', 'delete'),
+    ])
+    async def test_records_request(self, http_request, method, query, path, action):
+        handler = mock_handler(http_request)
+        handler.request.method = method
+        handler.request.query_arguments.update(query)
+        handler.path = WaterButlerPath(path)
+        handler._send_hook = mock.Mock()
+
+        handler.on_finish()
+
+        labels = ('MockProvider', action, method)
+        assert metrics.HANDLER_REQUESTS.value(*labels, '2xx') == 1
+        assert metrics.HANDLER_LATENCY.count(*labels) == 1
+
+    @pytest.mark.asyncio
+    async def test_records_failed_request(self, http_request):
+        handler = mock_handler(http_request)
+        handler.request.method = 'POST'
+        handler._status_code = 400
+        del handler.provider
+
+        handler.on_finish()
+
+        assert metrics.HANDLER_REQUESTS.value('unknown', 'other', 'POST', '4xx') == 1
@@ -0,0 +1,85 @@
+import logging
+from unittest import mock
+
+import pytest
+from tornado import testing
+
+from waterbutler.core import timing
+from waterbutler.core import metrics
+from waterbutler.core import streams
+from waterbutler.server import settings as server_settings
+
+from tests import utils
+from tests.server.api.v1.utils import ServerTestCase
+
+
+class SlowProvider(utils.MockProvider1):
+
+    async def download(self, path, **kwargs):
+        # as if `make_request` had asked the upstream for the file
+        timing.record_upstream(0.25)
+        stream = streams.StringStream(b'file content')
+        stream.content_type = 'text/plain'
+        return stream
+
+
+class TestServerTiming(ServerTestCase):
+
+    URL = '/resources/guid1/providers/osfstorage/file'
+
+    def setUp(self):
+        super().setUp()
+        metrics.REGISTRY.clear()
+        self.patchers = [
+            mock.patch('waterbutler.server.api.v1.provider.auth_handler.get', utils.MockCoroutine(
+                return_value={'auth': {}, 'settings': {}, 'credentials': {}})),
+            mock.patch('waterbutler.server.api.v1.provider.utils.make_provider',
+                       mock.Mock(return_value=SlowProvider({}, {}, {}))),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        super().tearDown()
+        for patcher in self.patchers:
+            patcher.stop()
+        metrics.REGISTRY.clear()
+
+    @testing.gen_test
+    def test_not_sent_by_default(self):
+        resp = yield self.http_client.fetch(self.get_url(self.URL))
+
+        assert resp.body == b'file content'
+        assert 'Server-Timing' not in resp.headers
+
+    @testing.gen_test
+    def test_sent_to_trusted_callers(self):
+        with mock.patch.object(server_settings, 'SERVER_TIMING_TOKEN', 's3cr3t'):
+            untrusted = yield self.http_client.fetch(self.get_url(self.URL),
+                                                     headers={'X-WaterButler-Timing': 'guess'})
+            resp = yield self.http_client.fetch(self.get_url(self.URL),
+                                                headers={'X-WaterButler-Timing': 's3cr3t'})
+
+        assert 'Server-Timing' not in untrusted.headers
+        phases = [entry.split(';')[0] for entry in resp.headers['Server-Timing'].split(', ')]
+        assert phases == ['auth', 'validate', 'operation', 'ttfb', 'upstream', 'total']
+        assert 'upstream;dur=250.0;desc="1 calls"' in resp.headers['Server-Timing']
+
+    @testing.gen_test
+    def test_phases_are_recorded(self):
+        with mock.patch.object(server_settings, 'SERVER_TIMING', True):
+            yield self.http_client.fetch(self.get_url(self.URL))
+
+        for phase in ('auth', 'validate', 'operation', 'ttfb', 'stream', 'upstream'):
+            assert metrics.HANDLER_PHASE_LATENCY.count('MockProvider1', 'download_file',
+                                                       phase) == 1
+
+    @testing.gen_test
+    def test_slow_requests_are_logged(self):
+        with mock.patch.object(server_settings, 'SLOW_REQUEST_THRESHOLD', 0), \
+                self.assertLogs('waterbutler.server.api.v1.provider', logging.WARNING) as logs:
+            yield self.http_client.fetch(self.get_url(self.URL))
+
+        message, = [line for line in logs.output if 'Slow request' in line]
+        assert '"action": "download_file"' in message
+        assert '"upstream_calls": 1' in message
@@ -0,0 +1,126 @@
+import os
+import signal
+import asyncio
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import utils
+from waterbutler.core import metrics
+from waterbutler.server import workers
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    metrics.REQUESTS_IN_FLIGHT.clear()
+    yield
+    metrics.REQUESTS_IN_FLIGHT.clear()
+    workers._draining = False
+
+
+@pytest.fixture
+def server():
+    return mock.Mock(close_all_connections=mock.AsyncMock())
+
+
+class TestDrain:
+
+    @pytest.mark.asyncio
+    async def test_idle(self, server):
+        assert await workers.drain(server, 5) == 0
+
+        assert workers.draining()
+        server.stop.assert_called_once_with()
+        server.close_all_connections.assert_awaited_once_with()
+
+    @pytest.mark.asyncio
+    async def test_waits_for_requests(self, server):
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        asyncio.get_running_loop().call_later(0.2, metrics.REQUESTS_IN_FLIGHT.dec)
+
+        assert await workers.drain(server, 5) == 0
+        assert metrics.REQUESTS_IN_FLIGHT.value() == 0
+
+    @pytest.mark.asyncio
+    async def test_waits_for_background_tasks(self, server):
+        task = utils.background(asyncio.ensure_future(asyncio.sleep(0.2)))
+
+        assert await workers.drain(server, 5) == 0
+        assert task.done()
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_timeout(self, server):
+        metrics.REQUESTS_IN_FLIGHT.inc(amount=2)
+
+        assert await workers.drain(server, 0.2) == 2
+        server.close_all_connections.assert_awaited_once_with()
+
+    @pytest.mark.asyncio
+    async def test_closes_log_shipper(self, server):
+        with mock.patch.object(workers.log_shipper, 'close', mock.AsyncMock()) as close:
+            await workers.drain(server, 5)
+
+        (timeout, ), _ = close.await_args
+        assert 0 < timeout <= 5
+
+
+def test_health():
+    metrics.REQUESTS_IN_FLIGHT.inc()
+
+    assert workers.health() == {
+        'pid': os.getpid(),
+        'worker': None,
+        'requests_in_flight': 1,
+        'draining': False,
+    }
+
+
+class TestCheckStores:
+
+    @pytest.fixture(autouse=True)
+    def default_store(self, monkeypatch):
+        monkeypatch.setattr(workers.progress.wb_settings, 'PROGRESS_STORE', None)
+        monkeypatch.setattr(workers.progress.task_settings, 'result_backend', 'rpc://')
+
+    def test_one_worker_with_default_store(self):
+        workers.check_stores(1)
+
+    def test_several_workers_with_default_store(self):
+        with pytest.raises(ValueError):
+            workers.check_stores(4)
+
+    def test_several_workers_with_shared_store(self, monkeypatch):
+        monkeypatch.setattr(workers.progress.wb_settings, 'PROGRESS_STORE', 'redis://redis:6379/2')
+
+        workers.check_stores(4)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+class TestSupervisor:
+
+    @pytest.fixture(autouse=True)
+    def restore_signals(self):
+        handlers = {signum: signal.getsignal(signum) for signum in workers._STOP_SIGNALS}
+        yield
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+
+    def test_restarts_workers_until_stopped(self, tmpdir):
+        started = tmpdir.join('started')
+        supervisor_pid = os.getpid()
+
+        def target(worker_id):
+            with open(str(started), 'a') as fp:
+                fp.write(f'{worker_id}\n')
+            with open(str(started)) as fp:
+                if len(fp.readlines()) < 3:
+                    return  # exits, and is started again
+            os.kill(supervisor_pid, signal.SIGTERM)
+            signal.pause()
+
+        supervisor = workers.Supervisor(target, 1, restart_delay=0)
+        supervisor.run()
+
+        assert supervisor.stopping
+        assert supervisor.workers == {}
+        assert started.read().split() == ['0', '0', '0']
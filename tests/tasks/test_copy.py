@@ -8,6 +8,7 @@ import celery
 import pytest
 
 from waterbutler import tasks  # noqa
+from waterbutler.core import metrics
 
 import tests.utils as test_utils
 
@@ -54,6 +55,22 @@ def test_copy_calls_copy(providers, bundles, callback):
     assert src.copy.called
     src.copy.assert_called_once_with(dest, src_bundle['path'], dest_bundle['path'])
 
+@pytest.mark.celery(result_backend=None)
+def test_copy_records_metrics(providers, bundles, callback):
+    src, dest = providers
+    src_bundle, dest_bundle = bundles
+    metrics.REGISTRY.clear()
+
+    copy.copy(cp.deepcopy(src_bundle), cp.deepcopy(dest_bundle))
+    src.copy.side_effect = Exception('This is a string')
+    with pytest.raises(Exception):
+        copy.copy(cp.deepcopy(src_bundle), cp.deepcopy(dest_bundle))
+
+    labels = ('copy', 'MockProvider', 'MockProvider')
+    assert metrics.TASKS.value(*labels, 'succeeded') == 1
+    assert metrics.TASKS.value(*labels, 'failed') == 1
+    assert metrics.TASK_LATENCY.count(*labels) == 2
+
 @pytest.mark.celery(result_backend=None)
 def test_is_task():
     assert callable(copy.copy)
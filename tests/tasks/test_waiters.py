@@ -0,0 +1,146 @@
+import os
+import pickle
+import asyncio
+import collections
+from unittest import mock
+
+import pytest
+from celery import states
+from celery.result import EagerResult
+from celery.backends.base import DisabledBackend
+
+from waterbutler.tasks import app
+from waterbutler.tasks import core
+from waterbutler.tasks import waiters
+from waterbutler.tasks import exceptions
+
+
+def write_result(basepath, task_id, result):
+    # write then rename, like a worker finishing while we're reading
+    tmp_path = os.path.join(basepath, f'.{task_id}')
+    with open(tmp_path, 'wb') as result_file:
+        pickle.dump(result, result_file)
+    os.rename(tmp_path, os.path.join(basepath, task_id))
+
+
+@pytest.fixture
+def no_inotify(monkeypatch):
+    monkeypatch.setattr(waiters, '_inotify_watch', lambda path: None)
+
+
+@pytest.fixture
+def adhoc_backend(monkeypatch):
+    monkeypatch.setattr(waiters, '_WAITERS', type(waiters._WAITERS)())
+    with mock.patch.object(type(app), 'backend', new=DisabledBackend(app)):
+        yield
+
+
+class TestAdhocFileResultWaiter:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('inotify', [True, False])
+    async def test_wakes_on_result(self, tmpdir, monkeypatch, inotify):
+        if not inotify:
+            monkeypatch.setattr(waiters, '_inotify_watch', lambda path: None)
+        waiter = waiters.AdhocFileResultWaiter(str(tmpdir), interval=0.01)
+
+        pending = asyncio.ensure_future(waiter.wait('abc'))
+        await asyncio.sleep(0.02)
+        assert not pending.done()
+
+        asyncio.get_event_loop().call_soon(write_result, str(tmpdir), 'abc', ('meta', True))
+        assert await asyncio.wait_for(pending, 1) == ('meta', True)
+        assert waiter._futures == {}
+
+    @pytest.mark.asyncio
+    async def test_result_already_written(self, tmpdir):
+        write_result(str(tmpdir), 'abc', 42)
+        waiter = waiters.AdhocFileResultWaiter(str(tmpdir))
+
+        assert await asyncio.wait_for(waiter.wait('abc'), 1) == 42
+
+    @pytest.mark.asyncio
+    async def test_raises_task_exception(self, tmpdir):
+        waiter = waiters.AdhocFileResultWaiter(str(tmpdir))
+        pending = asyncio.ensure_future(waiter.wait('abc'))
+        await asyncio.sleep(0)
+
+        write_result(str(tmpdir), 'abc', ValueError('nope'))
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(pending, 1)
+
+    @pytest.mark.asyncio
+    async def test_ignores_other_tasks(self, tmpdir):
+        waiter = waiters.AdhocFileResultWaiter(str(tmpdir))
+        pending = asyncio.ensure_future(waiter.wait('abc'))
+        await asyncio.sleep(0)
+
+        write_result(str(tmpdir), 'xyz', 1)
+        await asyncio.sleep(0.02)
+        assert not pending.done()
+        pending.cancel()
+
+
+class TestResolveMeta:
+
+    @pytest.mark.asyncio
+    async def test_ignores_unfinished_states(self):
+        waiter = waiters.BaseResultWaiter()
+        future = asyncio.get_event_loop().create_future()
+        waiter._futures['abc'].append(future)
+
+        waiter._resolve_meta('abc', {'status': states.STARTED, 'result': None}, app.backend)
+        assert not future.done()
+
+        waiter._resolve_meta('abc', {'status': states.SUCCESS, 'result': 1}, app.backend)
+        assert future.result() == 1
+
+    @pytest.mark.asyncio
+    async def test_failure(self):
+        waiter = waiters.BaseResultWaiter()
+        future = asyncio.get_event_loop().create_future()
+        waiter._futures['abc'].append(future)
+        backend = mock.Mock(exception_to_python=lambda result: KeyError(result))
+
+        waiter._resolve_meta('abc', {'status': states.FAILURE, 'result': 'x'}, backend)
+        assert isinstance(future.exception(), KeyError)
+
+
+class TestRPCResultWaiter:
+
+    def test_buffers_early_results(self):
+        waiter = object.__new__(waiters.RPCResultWaiter)
+        waiters.BaseResultWaiter.__init__(waiter)
+        waiter.backend = app.backend
+        waiter._buffered = collections.OrderedDict()
+        waiter.max_buffered = 2
+
+        for task_id in ('a', 'b', 'c'):
+            message = mock.Mock(properties={'correlation_id': task_id})
+            waiter._on_message({'status': states.SUCCESS, 'result': task_id}, message)
+
+        assert list(waiter._buffered) == ['b', 'c']
+
+
+class TestWaitOnCelery:
+
+    @pytest.mark.asyncio
+    async def test_eager_result(self):
+        result = EagerResult('abc', ('meta', False), states.SUCCESS)
+        assert await core.wait_on_celery(result) == ('meta', False)
+
+    @pytest.mark.asyncio
+    async def test_adhoc_backend(self, tmpdir, adhoc_backend):
+        result = mock.Mock(id='abc')
+        asyncio.get_event_loop().call_later(0.01, write_result, str(tmpdir), 'abc', 'done')
+
+        assert await core.wait_on_celery(result, basepath=str(tmpdir)) == 'done'
+
+    @pytest.mark.asyncio
+    async def test_timeout(self, tmpdir, adhoc_backend):
+        with pytest.raises(exceptions.WaitTimeOutError):
+            await core.wait_on_celery(mock.Mock(id='abc'), timeout=0.01, basepath=str(tmpdir))
+
+    @pytest.mark.asyncio
+    async def test_waiter_is_shared(self, tmpdir, adhoc_backend):
+        assert waiters.get_waiter(str(tmpdir)) is waiters.get_waiter(str(tmpdir))
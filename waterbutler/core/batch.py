@@ -0,0 +1,241 @@
+import json
+import asyncio
+import logging
+from http import HTTPStatus
+
+from waterbutler.core import exceptions
+
+logger = logging.getLogger(__name__)
+
+# sub-response statuses retried in a later batch rather than raised
+RETRY_STATUSES = (
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.INTERNAL_SERVER_ERROR,
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+)
+
+
+class BatchResponse:
+    """A sub-response from a batch call, exposing the parts of the ``aiohttp.ClientResponse``
+    interface that providers use.  ``body`` is the decoded JSON body if there was one, otherwise
+    the body as a string (or `None` if empty).
+    """
+
+    def __init__(self, status, headers=None, body=None):
+        self.status = status
+        self.headers = {key.upper(): value for key, value in (headers or {}).items()}
+        self.body = body
+
+    async def json(self):
+        return self.body
+
+    async def read(self):
+        if self.body is None:
+            return b''
+        if isinstance(self.body, str):
+            return self.body.encode('utf-8')
+        return json.dumps(self.body).encode('utf-8')
+
+    async def release(self):
+        pass
+
+    def __repr__(self):
+        return f'<BatchResponse({self.status})>'
+
+
+class BatchRequest:
+
+    def __init__(self, method, url, expects, throws, body=None, headers=None):
+        self.method = method
+        self.url = url
+        self.expects = expects
+        self.throws = throws
+        self.body = body
+        self.headers = headers or {}
+        self.attempts = 0
+        self.status = None  # type: int
+        self.future = asyncio.get_event_loop().create_future()
+
+
+class BaseBatcher:
+    """Coalesce the requests one provider makes concurrently into batch calls.
+
+    While nothing is in flight, requests are sent on the next turn of the event loop, together
+    with any others submitted in the same turn, so serial code paths don't wait for the window.
+    Requests submitted while others are in flight are collected for up to `window` seconds and
+    sent together.  A call carries up to `max_requests` requests, and a request that turns out to
+    be alone is sent as a plain request.  Sub-requests answered with a 429 or a 500, 502, 503 or
+    504 are retried in a later batch once the longest ``Retry-After`` among them has passed.
+
+    Subclasses describe the upstream's batch format by implementing `_build_batch` and
+    `_parse_batch`, and provide the settings below.
+    """
+
+    base_url = ''  # type: str
+    window = 0.01  # type: float
+    max_requests = 20  # type: int
+    max_retries = 3  # type: int
+    default_retry_after = 1.0  # type: float
+    max_retry_after = 30.0  # type: float
+
+    def __init__(self, provider):
+        self.provider = provider
+        self._pending = []  # type: list
+        self._timer = None
+        self._in_flight = 0
+
+    async def request(self, method, url, expects, throws, body=None, headers=None):
+        """Queue a request for the next batch and wait for its response.  Behaves like
+        `make_request`: a response whose status is not in ``expects`` is raised as ``throws``.
+
+        :param str method: the HTTP method
+        :param str url: the absolute URL of the request, which must start with `base_url`
+        :param tuple expects: the acceptable response status codes
+        :param Exception throws: the exception to raise for any other status
+        :param dict body: optional JSON body
+        :param dict headers: optional extra headers
+        :rtype: `BatchResponse` or ``aiohttp.ClientResponse``
+        """
+        request = BatchRequest(method, self._relative_url(url), expects, throws,
+                               body=body, headers=headers)
+        self._enqueue(request)
+        return await request.future
+
+    def _build_batch(self, requests):
+        """Return the ``(url, kwargs)`` to pass to `make_request` for a batch of ``requests``."""
+        raise NotImplementedError
+
+    async def _parse_batch(self, resp, requests):
+        """Return a list of ``(request, BatchResponse)`` pairs from a batch response."""
+        raise NotImplementedError
+
+    def _enqueue(self, request):
+        self._pending.append(request)
+        if len(self._pending) >= self.max_requests:
+            self._flush()
+        elif self._timer is None:
+            delay = self.window if self._in_flight else 0
+            self._timer = asyncio.get_event_loop().call_later(delay, self._flush)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        requests, self._pending = self._pending, []
+        while requests:
+            chunk, requests = requests[:self.max_requests], requests[self.max_requests:]
+            self._in_flight += 1
+            asyncio.ensure_future(self._send(chunk))
+
+    async def _send(self, requests):
+        try:
+            if len(requests) == 1 and requests[0].attempts == 0:
+                await self._send_one(requests[0])
+            else:
+                await self._send_batch(requests)
+        except Exception as exc:
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(exc)
+        finally:
+            self._in_flight -= 1
+
+    async def _send_one(self, request):
+        kwargs = {'headers': request.headers}
+        if request.body is not None:
+            kwargs['data'] = json.dumps(request.body)
+            kwargs['headers'] = {'content-type': 'application/json', **request.headers}
+        resp = await self.provider.make_request(
+            request.method,
+            self.base_url + request.url,
+            expects=request.expects,
+            throws=request.throws,
+            **kwargs
+        )
+        if request.future.cancelled():
+            await resp.release()
+        else:
+            request.future.set_result(resp)
+
+    async def _send_batch(self, requests):
+        self.provider.metrics.incr('batch.calls')
+
+        url, kwargs = self._build_batch(requests)
+        resp = await self.provider.make_request(
+            'POST',
+            url,
+            expects=(HTTPStatus.OK, HTTPStatus.TOO_MANY_REQUESTS),
+            throws=exceptions.ProviderError,
+            **kwargs
+        )
+        if resp.status == HTTPStatus.TOO_MANY_REQUESTS:
+            await resp.release()
+            self._retry(requests, self._retry_after(resp.headers))
+            return
+
+        throttled, retry_after = [], 0.0
+        for request, sub in await self._parse_batch(resp, requests):
+            if request.future.cancelled():
+                continue
+            if sub.status in RETRY_STATUSES and sub.status not in request.expects:
+                request.status = sub.status
+                throttled.append(request)
+                retry_after = max(retry_after, self._retry_after(sub.headers))
+            elif sub.status not in request.expects:
+                request.future.set_exception(request.throws(
+                    sub.body or f'An error occurred while making a {request.method} '
+                                f'request to {request.url}',
+                    code=sub.status,
+                ))
+            else:
+                request.future.set_result(sub)
+
+        if throttled:
+            if any(r.status == HTTPStatus.TOO_MANY_REQUESTS for r in throttled):
+                self.provider.metrics.incr('batch.throttled')
+            if any(r.status != HTTPStatus.TOO_MANY_REQUESTS for r in throttled):
+                self.provider.metrics.incr('batch.server_errors')
+            self._retry(throttled, retry_after)
+
+        for request in requests:
+            if not request.future.done() and request not in throttled:
+                request.future.set_exception(exceptions.ProviderError(
+                    'Batch response is missing a sub-response',
+                    code=HTTPStatus.BAD_GATEWAY,
+                ))
+
+    def _retry(self, requests, delay):
+        """Requeue throttled or failed requests after ``delay`` seconds, or fail them with their
+        last status once they have used up their retries."""
+        logger.debug(f'{len(requests)} batched requests throttled or failed, '
+                     f'retrying in {delay}s')
+        loop = asyncio.get_event_loop()
+        for request in requests:
+            if request.future.cancelled():
+                continue
+            request.attempts += 1
+            if request.attempts > self.max_retries:
+                status = request.status or HTTPStatus.TOO_MANY_REQUESTS
+                if status == HTTPStatus.TOO_MANY_REQUESTS:
+                    message = 'The upstream service is throttling requests, please try again later'
+                else:
+                    message = 'The upstream service is unavailable, please try again later'
+                request.future.set_exception(request.throws(message, code=status))
+            else:
+                loop.call_later(delay, self._enqueue, request)
+
+    def _retry_after(self, headers):
+        for key, value in headers.items():
+            if key.lower() == 'retry-after':
+                try:
+                    return min(float(value), self.max_retry_after)
+                except ValueError:
+                    break
+        return self.default_retry_after
+
+    def _relative_url(self, url):
+        if not url.startswith(self.base_url):
+            raise ValueError(f'Only URLs under {self.base_url} can be batched, got {url}')
+        return url[len(self.base_url):]
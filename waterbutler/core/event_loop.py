@@ -0,0 +1,71 @@
+"""The event loops the server and celery workers run on.
+
+``EVENT_LOOP`` picks the implementation: ``asyncio``, ``uvloop``, or ``auto`` for uvloop if it is
+installed.  Most of WaterButler's time goes to moving bytes between sockets, which uvloop does
+with less overhead per read and write.  The ``uvloop`` package is not installed with
+WaterButler; without it every loop is a stdlib one.
+
+``EVENT_LOOP_EXECUTOR_THREADS`` sizes the default executor of every loop made here, which hashes
+upload parts and waits on blocking celery calls.  See ``benchmarks/event_loop_throughput.py`` for
+the loopback throughput of each implementation.
+"""
+import socket
+import asyncio
+import logging
+import concurrent.futures
+
+from waterbutler import settings
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+IMPLEMENTATIONS = ('auto', 'asyncio', 'uvloop')
+
+
+def implementation(name=None):
+    """The loop implementation ``name``, or ``EVENT_LOOP``, resolves to: ``asyncio`` or
+    ``uvloop``."""
+    name = name or settings.EVENT_LOOP
+    if name not in IMPLEMENTATIONS:
+        raise ValueError(f'EVENT_LOOP must be one of {IMPLEMENTATIONS}, not {name!r}')
+    if name == 'asyncio':
+        return 'asyncio'
+    if uvloop is None:
+        if name == 'uvloop':
+            logger.warning('EVENT_LOOP is uvloop but uvloop is not installed, using asyncio')
+        return 'asyncio'
+    return 'uvloop'
+
+
+def new_event_loop(name=None):
+    """A new loop of the configured implementation, or of ``name``."""
+    if implementation(name) == 'uvloop':
+        loop = uvloop.new_event_loop()
+    else:
+        loop = asyncio.new_event_loop()
+    if settings.EVENT_LOOP_EXECUTOR_THREADS:
+        loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(
+            max_workers=settings.EVENT_LOOP_EXECUTOR_THREADS,
+            thread_name_prefix='waterbutler',
+        ))
+    return loop
+
+
+def run(main, debug=False, name=None):
+    """Like `asyncio.run`, on a loop from `new_event_loop`."""
+    with asyncio.Runner(debug=debug, loop_factory=lambda: new_event_loop(name)) as runner:
+        return runner.run(main)
+
+
+def set_buffer_sizes(sock, send=0, receive=0):
+    """Set the kernel buffers of ``sock``, leaving those given as ``0`` to the kernel's defaults
+    and autotuning.  Sockets accepted from a listening socket inherit its sizes."""
+    if send:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, send)
+    if receive:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive)
+    return sock
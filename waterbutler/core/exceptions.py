@@ -258,11 +258,25 @@ class NotFoundError(ProviderError):
         )
 
 
+class ServiceUnavailableError(ProviderError):
+    """Raised instead of sending a request to an upstream service whose circuit breaker is open,
+    see :mod:`waterbutler.core.retry`."""
+    def __init__(self, host, code=HTTPStatus.SERVICE_UNAVAILABLE):
+        super().__init__(f'{host} is currently unavailable, please try again later', code=code)
+
+
 class InvalidPathError(ProviderError):
     def __init__(self, message, code=HTTPStatus.BAD_REQUEST, is_user_error=True):
         super().__init__(message, code=code, is_user_error=is_user_error)
 
 
+class TransferCancelledError(WaterButlerError):
+    """Raised by a copy or move that stopped because its cancellation was requested."""
+    def __init__(self, message='The transfer was cancelled', code=HTTPStatus.CONFLICT,
+                 is_user_error=True):
+        super().__init__(message, code=code, is_user_error=is_user_error)
+
+
 class OverwriteSelfError(InvalidParameters):
     def __init__(self, path):
         super().__init__('Unable to move or copy \'{}\'. Moving or copying a file or '
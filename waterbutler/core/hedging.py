@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import collections
+from urllib import parse
+
+from waterbutler import settings as wb_settings
+
+logger = logging.getLogger(__name__)
+
+HEDGEABLE_METHODS = ('GET', 'HEAD')
+
+# (provider name, upstream host) -> LatencyTracker, shared by every provider instance
+_TRACKERS = {}  # type: dict
+_BUDGET = None
+_STATS = {'eligible': 0, 'sent': 0, 'wins': 0}
+
+
+class LatencyTracker:
+    """Keep the latencies of the last ``size`` GET and HEAD requests to one upstream."""
+
+    def __init__(self, size):
+        self.samples = collections.deque(maxlen=size)  # type: collections.deque
+        self._sorted = None
+
+    def add(self, latency):
+        self.samples.append(latency)
+        self._sorted = None
+
+    def percentile(self, pct):
+        if not self.samples:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self.samples)
+        return self._sorted[min(int(len(self._sorted) * pct / 100), len(self._sorted) - 1)]
+
+    def hedge_delay(self):
+        """How long to wait for the first attempt before hedging, or `None` if we haven't seen
+        enough requests to this upstream to tell what slow means."""
+        if len(self.samples) < wb_settings.HEDGING_MIN_SAMPLES:
+            return None
+        return max(self.percentile(wb_settings.HEDGING_PERCENTILE), wb_settings.HEDGING_MIN_DELAY)
+
+
+class HedgeBudget:
+    """A process-wide token bucket that keeps hedges to ``ratio`` of eligible requests, so that
+    hedging can't multiply the load on an upstream that is slow because it is overloaded."""
+
+    def __init__(self, ratio, burst):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = float(burst)
+
+    def deposit(self):
+        self.tokens = min(self.tokens + self.ratio, self.burst)
+
+    def withdraw(self):
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def tracker(provider_name, url):
+    key = (provider_name, parse.urlsplit(url).netloc)
+    try:
+        return _TRACKERS[key]
+    except KeyError:
+        latencies = _TRACKERS[key] = LatencyTracker(wb_settings.HEDGING_WINDOW)
+        return latencies
+
+
+def budget():
+    global _BUDGET
+    if _BUDGET is None:
+        _BUDGET = HedgeBudget(wb_settings.HEDGING_MAX_RATIO, wb_settings.HEDGING_BURST)
+    return _BUDGET
+
+
+def _discard(task):
+    """Cancel a losing attempt, or close its response if it already has one."""
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled() and task.exception() is None:
+        task.result().close()
+
+
+async def race(send, delay):
+    """Call ``send`` and, if it hasn't returned after ``delay`` seconds, call it a second time.
+    Return the first successful result and cancel the other attempt.  If both attempts fail the
+    first failure is raised.
+
+    :param send: a coroutine function that sends the request and returns the response
+    :param float delay: seconds to wait before hedging, or `None` to never hedge
+    :return: a tuple of the response, whether a hedge was sent, and whether the hedge won
+    """
+    _STATS['eligible'] += 1
+    budget().deposit()
+
+    first = asyncio.ensure_future(send())
+    if delay is None:
+        return await first, False, False
+
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+    except asyncio.CancelledError:
+        first.cancel()
+        raise
+    if done or not budget().withdraw():
+        return await first, False, False
+
+    _STATS['sent'] += 1
+    logger.debug(f'No response after {delay:.3f}s, hedging')
+    second = asyncio.ensure_future(send())
+    pending, error = [first, second], None
+    try:
+        while pending:
+            await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # check in submission order so that the original wins a tie
+            for task in [task for task in pending if task.done()]:
+                pending.remove(task)
+                if task.exception() is None:
+                    won = task is second
+                    _STATS['wins'] += won
+                    return task.result(), True, won
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in (first, second):
+            if task in pending:
+                _discard(task)
+
+
+def stats():
+    """Process-wide hedging counters: requests eligible for hedging, hedges sent and hedges that
+    answered before the original request."""
+    return dict(_STATS)
@@ -0,0 +1,261 @@
+import time
+import asyncio
+import logging
+import weakref
+import collections
+from http import HTTPStatus
+from urllib import parse
+from email.utils import parsedate_to_datetime
+
+from waterbutler import settings as wb_settings
+
+logger = logging.getLogger(__name__)
+
+# event loop -> {(provider name, upstream host): AdaptiveLimiter}
+_LIMITERS = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
+
+THROTTLE_STATUSES = (HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.SERVICE_UNAVAILABLE)
+
+
+def parse_retry_after(value, now=None):
+    """Return the number of seconds a ``Retry-After`` header value asks us to wait, or `None` if
+    it can't be parsed.  Both the delta-seconds and the HTTP-date forms are accepted.
+    """
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(date.timestamp() - (now or time.time()), 0.0)
+
+
+class AdaptiveLimiter:
+    """Limit the number of requests in flight to one upstream, adapting the limit to how the
+    upstream behaves (additive increase, multiplicative decrease).
+
+    * Every successful response received while the limiter was saturated raises the limit by
+      ``1 / limit``, i.e. by about one per round of requests, up to ``ceiling``.
+    * A 429 or 503 response, a failed request, or a sustained rise in latency lowers the limit
+      by ``backoff``, down to ``floor``.  The limit is lowered at most once per round trip, so one
+      burst of failures doesn't collapse it to the floor.
+    * Latency is compared against its own long-run average rather than the best latency seen,
+      since requests to one upstream range from cheap lookups to expensive listings.  It has
+      risen once the recent average has stayed above ``latency_tolerance`` times the long-run
+      average for ``LATENCY_SUSTAINED`` responses in a row.  Nothing is judged until
+      ``LATENCY_WARMUP`` responses have been seen.
+    * A ``Retry-After`` header on a throttled response holds every queued request until it has
+      passed.
+
+    Latency is measured until the response headers arrive, so the time spent streaming a
+    response body doesn't count against the upstream.  Requests that upload a large body only
+    wait for a slot with `admit` and report their outcome with `record`: they neither hold a slot
+    while the body is sent nor feed the upload's duration in as latency, see `is_large_body`.
+    """
+
+    LATENCY_WARMUP = 20
+    LATENCY_SUSTAINED = 10
+
+    def __init__(self, key, initial, floor, ceiling, backoff=0.5, latency_tolerance=2.0,
+                 max_retry_after=60.0):
+        self.key = key
+        self.floor = floor
+        self.ceiling = ceiling
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.max_retry_after = max_retry_after
+        self.limit = float(min(max(initial, floor), ceiling))
+
+        self.in_flight = 0
+        self.throttled = 0
+        self.baseline_latency = None  # type: float
+        self.smoothed_latency = None  # type: float
+        self._samples = 0
+        self._slow = 0
+        self._waiters = collections.deque()  # type: collections.deque
+        self._resume_at = 0.0
+        self._hold_until = 0.0
+        self._wake_handle = None
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    @property
+    def paused(self):
+        return self._resume_at > self._now()
+
+    def stats(self):
+        return {
+            'provider': self.key[0],
+            'host': self.key[1],
+            'limit': round(self.limit, 2),
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'throttled': self.throttled,
+            'paused': self.paused,
+        }
+
+    async def acquire(self):
+        """Wait for a free slot.  Every successful `acquire` must be paired with a `release`."""
+        if not self.paused and not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters.append(waiter)
+        self._schedule_wake()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over just as we were cancelled, give it back
+                self.release(None, None)
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    async def admit(self):
+        """Wait for a free slot like `acquire`, but give it back straight away.  For requests
+        that shouldn't hold a slot, yet should still queue behind a saturated or paused upstream.
+        Report their outcome with `record`."""
+        await self.acquire()
+        self.in_flight -= 1
+        self._wake()
+
+    def release(self, status, latency, headers=None):
+        """Give back a slot and adapt the limit to the outcome of the request, see `record`."""
+        self.in_flight -= 1
+        self.record(status, latency, headers)
+
+    def record(self, status, latency, headers=None):
+        """Adapt the limit to the outcome of a request.
+
+        :param int status: the response status, or `None` if the request failed or wasn't sent
+        :param float latency: seconds until the response headers arrived, or `None` if the
+            request shouldn't count towards the upstream's latency or its failure wasn't the
+            upstream's doing
+        :param headers: the response headers, consulted for ``Retry-After``
+        """
+        if status in THROTTLE_STATUSES:
+            self.throttled += 1
+            retry_after = parse_retry_after((headers or {}).get('Retry-After'))
+            if retry_after:
+                self._pause(min(retry_after, self.max_retry_after))
+            self._decrease()
+        elif status is None:
+            if latency is not None:
+                self._decrease()
+        else:
+            self._observe_latency(latency)
+
+        self._wake()
+
+    def _observe_latency(self, latency):
+        if latency is None:
+            return
+        self._samples += 1
+        if self.smoothed_latency is None:
+            self.baseline_latency = self.smoothed_latency = latency
+        else:
+            self.smoothed_latency += (latency - self.smoothed_latency) * 0.1
+            self.baseline_latency += (latency - self.baseline_latency) * 0.01
+
+        if self.smoothed_latency > self.baseline_latency * self.latency_tolerance:
+            self._slow += 1
+        else:
+            self._slow = 0
+
+        if self._samples >= self.LATENCY_WARMUP and self._slow >= self.LATENCY_SUSTAINED:
+            self._decrease()
+        elif not self._slow and self.in_flight + 1 >= int(self.limit):
+            self.limit = min(self.limit + 1 / self.limit, self.ceiling)
+
+    def _decrease(self):
+        now = self._now()
+        if now < self._hold_until:
+            return
+        self.limit = max(self.limit * self.backoff, self.floor)
+        self._hold_until = now + (self.smoothed_latency or 0.0)
+        logger.debug(f'Concurrency limit for {self.key} lowered to {self.limit:.2f}')
+
+    def _pause(self, delay):
+        self._resume_at = max(self._resume_at, self._now() + delay)
+        logger.debug(f'{self.key} asked us to back off, holding requests for {delay:.1f}s')
+
+    def _wake(self):
+        if self.paused:
+            self._schedule_wake()
+            return
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def _schedule_wake(self):
+        if self._wake_handle is not None or not self.paused:
+            return
+
+        def wake():
+            self._wake_handle = None
+            self._wake()
+
+        self._wake_handle = asyncio.get_event_loop().call_at(self._resume_at, wake)
+
+    def _now(self):
+        return asyncio.get_event_loop().time()
+
+
+def is_large_body(data):
+    """Whether sending ``data`` as a request body may take a while: it is streamed, or larger
+    than ``LIMITER_LARGE_BODY`` bytes."""
+    if data is None or isinstance(data, (dict, list, tuple)):
+        return False
+    if isinstance(data, (bytes, bytearray, str)):
+        return len(data) > wb_settings.LIMITER_LARGE_BODY
+    return True
+
+
+def _provider_config(provider_name):
+    config = {
+        'INITIAL_CONCURRENCY': wb_settings.LIMITER_INITIAL_CONCURRENCY,
+        'MIN_CONCURRENCY': wb_settings.LIMITER_MIN_CONCURRENCY,
+        'MAX_CONCURRENCY': wb_settings.LIMITER_MAX_CONCURRENCY,
+        'BACKOFF': wb_settings.LIMITER_BACKOFF,
+        'LATENCY_TOLERANCE': wb_settings.LIMITER_LATENCY_TOLERANCE,
+        'MAX_RETRY_AFTER': wb_settings.LIMITER_MAX_RETRY_AFTER,
+    }
+    config.update(wb_settings.LIMITER_PROVIDERS.get(provider_name, {}))
+    return {
+        'initial': int(config['INITIAL_CONCURRENCY']),
+        'floor': int(config['MIN_CONCURRENCY']),
+        'ceiling': int(config['MAX_CONCURRENCY']),
+        'backoff': float(config['BACKOFF']),
+        'latency_tolerance': float(config['LATENCY_TOLERANCE']),
+        'max_retry_after': float(config['MAX_RETRY_AFTER']),
+    }
+
+
+def get_limiter(provider_name, url):
+    """Return the limiter for requests from ``provider_name`` to the host of ``url`` on the
+    current event loop, creating it on first use.  Floors and ceilings can be overridden per
+    provider with the ``LIMITER.PROVIDERS`` setting.
+    """
+    limiters = _LIMITERS.setdefault(asyncio.get_event_loop(), {})
+    key = (provider_name, parse.urlsplit(url).netloc)
+    try:
+        return limiters[key]
+    except KeyError:
+        limiter = limiters[key] = AdaptiveLimiter(key, **_provider_config(provider_name))
+        return limiter
+
+
+def stats():
+    """Current limits and queue depths of every limiter on the current event loop."""
+    return [limiter.stats() for limiter in _LIMITERS.get(asyncio.get_event_loop(), {}).values()]
@@ -0,0 +1,413 @@
+"""Delivering OSF callbacks and Keen events in the background.
+
+Every file action is logged to the OSF with a signed callback and to Keen.  Rather than every
+action opening connections of its own, `waterbutler.core.remote_logging` builds the events and
+queues them with the `LogShipper` of the running loop, which sends them over one keep-alive
+session:
+
+* callbacks go out as soon as they are queued, the OSF has no endpoint taking several at once.
+* Keen events are gathered for up to ``FLUSH_INTERVAL`` seconds and sent to Keen's bulk events
+  endpoint, up to ``BATCH_SIZE`` at a time.
+
+Deliveries that fail with a connection error, a 5xx, 408 or 429 are retried ``RETRIES`` times.
+Events that still can't be delivered, or that don't fit in their queue, are written to the spool
+directory ``SPOOL_PATH`` and queued again every ``REPLAY_INTERVAL`` seconds by any process sharing
+the directory, including after a restart.  An event spooled more than ``MAX_SPOOLS`` times, or first
+spooled more than ``MAX_AGE`` seconds ago, is moved to the ``dead`` directory of the spool instead,
+where it stays until someone looks at it.  The spool is read and written on the default executor.
+A stopping server spools whatever it couldn't deliver in time, see `waterbutler.server.workers`.
+Delivery is at least once: events whose delivery was interrupted are sent again.
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import collections
+
+import aiohttp
+import sentry_sdk
+
+from waterbutler import settings
+from waterbutler.core import utils
+from waterbutler.core import metrics
+
+logger = logging.getLogger(__name__)
+
+CALLBACK = 'callback'
+KEEN = 'keen'
+
+# Besides 5xx, the statuses worth sending the same events again for
+RETRY_STATUSES = (408, 429)
+
+# The directory of the spool events that are given up on are moved to
+DEAD_LETTERS = 'dead'
+
+_SHIPPERS = {}  # type: dict
+
+
+class DeliveryError(Exception):
+
+    def __init__(self, status, body=b''):
+        super().__init__(f'Got {status}: {body[:500]!r}')
+        self.status = status
+
+    @property
+    def retryable(self):
+        return self.status >= 500 or self.status in RETRY_STATUSES
+
+
+def callback_event(url, payload, action):
+    """An event PUTting ``payload`` to the OSF callback ``url``.  It is signed when it is sent."""
+    return {'kind': CALLBACK, 'url': url, 'payload': payload, 'action': action}
+
+
+def keen_event(domain, collection, payload, action):
+    """An event adding ``payload`` to ``collection`` in the ``private`` or ``public`` Keen project.
+    The project's keys are looked up when it is sent, so that they aren't written to the spool.
+    """
+    return {'kind': KEEN, 'domain': domain, 'collection': collection, 'payload': payload,
+            'action': action}
+
+
+def _keen_project(domain):
+    if domain == 'public':
+        return settings.KEEN_PUBLIC_PROJECT_ID, settings.KEEN_PUBLIC_WRITE_KEY
+    return settings.KEEN_PRIVATE_PROJECT_ID, settings.KEEN_PRIVATE_WRITE_KEY
+
+
+def get_shipper():
+    """The shipper of the running loop."""
+    loop = asyncio.get_event_loop()
+    shipper = _SHIPPERS.get(loop)
+    if shipper is None:
+        shipper = _SHIPPERS[loop] = LogShipper()
+    return shipper
+
+
+async def close(timeout=0):
+    """Close the shipper of the running loop, if it has one, see `LogShipper.close`."""
+    shipper = _SHIPPERS.pop(asyncio.get_event_loop(), None)
+    if shipper is not None:
+        await shipper.close(timeout)
+
+
+class LogShipper:
+
+    def __init__(self, spool_path=settings.LOG_SHIPPER_SPOOL_PATH,
+                 max_queue=settings.LOG_SHIPPER_MAX_QUEUE,
+                 batch_size=settings.LOG_SHIPPER_BATCH_SIZE,
+                 flush_interval=settings.LOG_SHIPPER_FLUSH_INTERVAL,
+                 retries=settings.LOG_SHIPPER_RETRIES,
+                 backoff=settings.LOG_SHIPPER_BACKOFF,
+                 replay_interval=settings.LOG_SHIPPER_REPLAY_INTERVAL,
+                 max_spools=settings.LOG_SHIPPER_MAX_SPOOLS,
+                 max_age=settings.LOG_SHIPPER_MAX_AGE):
+        self.spool_path = spool_path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.backoff = backoff
+        self.replay_interval = replay_interval
+        self.max_spools = max_spools
+        self.max_age = max_age
+
+        self._queues = {CALLBACK: collections.deque(), KEEN: collections.deque()}
+        self._wakeups = {kind: asyncio.Event() for kind in self._queues}
+        self._in_flight = {kind: None for kind in self._queues}  # type: dict
+        # events queued or being delivered
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._flushing = 0
+        self._session = None  # type: aiohttp.ClientSession
+        self._tasks = []  # type: list
+        # events being written to the spool
+        self._spooling = set()  # type: set
+        self._closed = False
+
+    def start(self):
+        """Start delivering, and queueing spooled events again.  Done by `submit` too."""
+        if self._tasks or self._closed:
+            return
+        self._tasks = [asyncio.ensure_future(self._run(kind)) for kind in self._queues]
+        if self.spool_path:
+            self._tasks.append(asyncio.ensure_future(self._replay()))
+
+    def submit(self, event):
+        """Queue ``event`` for delivery.  If its queue is full, or the shipper is closed, the event
+        is spooled instead."""
+        queue = self._queues[event['kind']]
+        if self._closed or len(queue) >= self.max_queue:
+            spooling = asyncio.ensure_future(self._spool([event]))
+            self._spooling.add(spooling)
+            spooling.add_done_callback(self._spooling.discard)
+            return
+        queue.append(event)
+        self._pending += 1
+        self._idle.clear()
+        self._wakeups[event['kind']].set()
+        self.start()
+
+    async def flush(self):
+        """Wait until the events queued so far are delivered, given up on or spooled."""
+        self._flushing += 1
+        for wakeup in self._wakeups.values():
+            wakeup.set()
+        try:
+            await self._idle.wait()
+        finally:
+            self._flushing -= 1
+
+    async def close(self, timeout=0):
+        """Stop taking events, deliver those queued within ``timeout`` seconds and spool the
+        rest."""
+        self._closed = True
+        if timeout > 0:
+            try:
+                await asyncio.wait_for(self.flush(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        leftover = []
+        for kind, queue in self._queues.items():
+            leftover.extend(self._in_flight[kind] or [])
+            leftover.extend(queue)
+            queue.clear()
+            self._in_flight[kind] = None
+        if leftover:
+            logger.warning(f'Spooling {len(leftover)} log events that were not delivered in time')
+            await self._spool(leftover)
+        await self.spooled()
+        self._pending = 0
+        self._idle.set()
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def spooled(self):
+        """Wait until the events spooled by `submit` so far are written."""
+        await asyncio.gather(*self._spooling)
+
+    async def replay(self):
+        """Queue spooled events again, oldest first, while the queues are less than half full.
+        Returns how many were queued."""
+        loop = asyncio.get_event_loop()
+        count = 0
+        for name in await loop.run_in_executor(None, self._spool_files):
+            if any(len(queue) >= self.max_queue // 2 for queue in self._queues.values()):
+                break
+            events = await loop.run_in_executor(None, self._claim, name)
+            for event in events:
+                self.submit(event)
+            count += len(events)
+
+        if count:
+            logger.info(f'Queued {count} spooled log events again')
+        return count
+
+    def _spool_files(self):
+        try:
+            return sorted(name for name in os.listdir(self.spool_path) if name.endswith('.jsonl'))
+        except FileNotFoundError:
+            return []
+
+    def _claim(self, name):
+        """Read and remove the spool file ``name``, unless another process got to it first."""
+        path = os.path.join(self.spool_path, name)
+        claimed = f'{path}.{os.getpid()}'
+        try:
+            # only one of the processes sharing the spool replays each file
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return []
+        try:
+            with open(claimed) as fp:
+                events = [json.loads(line) for line in fp if line.strip()]
+        except (OSError, ValueError):
+            logger.exception(f'Could not read the spooled log events in {claimed}')
+            return []
+        os.remove(claimed)
+        return events
+
+    async def _replay(self):
+        while True:
+            await self.replay()
+            await asyncio.sleep(self.replay_interval)
+
+    async def _run(self, kind):
+        queue, wakeup = self._queues[kind], self._wakeups[kind]
+        deliver = self._deliver_keen if kind == KEEN else self._deliver_callbacks
+        while True:
+            await wakeup.wait()
+            if kind == KEEN and queue:
+                await self._gather(queue, wakeup)
+            wakeup.clear()
+
+            while queue:
+                batch = [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+                self._in_flight[kind] = batch
+                try:
+                    await deliver(batch)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception(f'Delivering {len(batch)} {kind} events failed')
+                self._in_flight[kind] = None
+                self._pending -= len(batch)
+                if self._pending <= 0:
+                    self._pending = 0
+                    self._idle.set()
+
+    async def _gather(self, queue, wakeup):
+        """Wait up to `flush_interval` for a full batch, unless something is waiting on `flush`."""
+        deadline = time.monotonic() + self.flush_interval
+        while len(queue) < self.batch_size and not self._flushing:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    async def _deliver_callbacks(self, events):
+        await asyncio.gather(*[self._attempt([event], self._send_callback) for event in events])
+
+    async def _deliver_keen(self, events):
+        by_domain = collections.defaultdict(list)  # type: dict
+        for event in events:
+            by_domain[event['domain']].append(event)
+        await asyncio.gather(*[self._attempt(group, self._send_keen)
+                               for group in by_domain.values()])
+
+    async def _attempt(self, events, send):
+        """Deliver ``events`` with ``send``, retrying failures that may go away and spooling the
+        events if they don't."""
+        kind = events[0]['kind']
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff * attempt)
+            try:
+                await send(events)
+            except DeliveryError as exc:
+                if not exc.retryable:
+                    return self._reject(events, exc)
+                error = exc
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as exc:
+                error = exc
+            except Exception as exc:
+                return self._reject(events, exc)
+            else:
+                metrics.LOG_EVENTS.inc(kind, 'delivered', amount=len(events))
+                return
+            logger.warning(f'Delivering {len(events)} {kind} events failed with {error!r}, '
+                           f'{attempt} / {self.retries} retries')
+
+        logger.error(f'Could not deliver {len(events)} {kind} events, spooling them')
+        await self._spool(events)
+
+    def _reject(self, events, exc):
+        logger.error(f'Dropping {len(events)} {events[0]["kind"]} events rejected with {exc!r}')
+        sentry_sdk.capture_exception(exc)
+        metrics.LOG_EVENTS.inc(events[0]['kind'], 'rejected', amount=len(events))
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def _send_callback(self, events):
+        event, = events
+        # the OSF refuses payloads signed too long ago, so this is the time of the attempt
+        payload = dict(event['payload'], time=time.time() + 60)
+        status, body = await utils.send_signed_request('PUT', event['url'], payload,
+                                                       session=self._get_session())
+        if status // 100 != 2:
+            raise DeliveryError(status, body)
+        logger.info(f'Callback for {event["action"]} request succeeded with {body.decode("utf-8")}')
+
+    async def _send_keen(self, events):
+        domain = events[0]['domain']
+        project_id, write_key = _keen_project(domain)
+        if not project_id or not write_key:
+            raise ValueError(f'The {domain} Keen project is not configured')
+
+        body = collections.defaultdict(list)  # type: dict
+        for event in events:
+            body[event['collection']].append(event['payload'])
+        url = '{}/{}/projects/{}/events'.format(settings.KEEN_API_BASE_URL,
+                                                settings.KEEN_API_VERSION, project_id)
+        headers = {'Content-Type': 'application/json', 'Authorization': write_key}
+
+        async with self._get_session().post(url, data=json.dumps(body).encode('UTF-8'),
+                                            headers=headers) as resp:
+            if resp.status // 100 != 2:
+                raise DeliveryError(resp.status, await resp.read())
+            results = await resp.json()
+
+        # Keen answers for each event; one it refuses won't be taken on a second try either
+        refused = [result for collection in results.values() for result in collection
+                   if not result.get('success')]
+        if refused:
+            logger.error(f'Keen refused {len(refused)} of {len(events)} {domain} events, '
+                         f'e.g. {refused[0]!r}')
+        logger.info(f'Logged {len(events) - len(refused)} events to {domain} Keen')
+
+    async def _spool(self, events):
+        """Write ``events`` to the spool to be queued again later, or to its dead letters if they
+        have been spooled too often or too long ago.  Drop them if there is no spool."""
+        if not self.spool_path:
+            logger.error(f'Dropping {len(events)} log events, there is no spool')
+            self._count(events, 'dropped')
+            return
+
+        now = time.time()
+        spooled, dead = [], []
+        for event in events:
+            event = dict(event, spooled=event.get('spooled', 0) + 1,
+                         first_spooled=event.get('first_spooled', now))
+            if event['spooled'] > self.max_spools or now - event['first_spooled'] > self.max_age:
+                dead.append(event)
+            else:
+                spooled.append(event)
+        if dead:
+            logger.error(f'Giving up on {len(dead)} log events, moving them to the dead letters')
+
+        loop = asyncio.get_event_loop()
+        for directory, batch, outcome in ((self.spool_path, spooled, 'spooled'),
+                                          (os.path.join(self.spool_path, DEAD_LETTERS), dead,
+                                           'dead')):
+            if not batch:
+                continue
+            try:
+                await loop.run_in_executor(None, self._write, directory, batch)
+            except (OSError, TypeError, ValueError):
+                logger.exception(f'Dropping {len(batch)} log events that could not be spooled')
+                outcome = 'dropped'
+            self._count(batch, outcome)
+
+    @staticmethod
+    def _write(directory, events):
+        name = f'{time.time():.6f}-{uuid.uuid4().hex}'
+        temporary = os.path.join(directory, f'.{name}.tmp')
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        with open(temporary, 'w') as fp:
+            for event in events:
+                fp.write(json.dumps(event) + '\n')
+        os.rename(temporary, os.path.join(directory, f'{name}.jsonl'))
+
+    @staticmethod
+    def _count(events, outcome):
+        kinds = collections.Counter(event['kind'] for event in events)
+        for kind, count in kinds.items():
+            metrics.LOG_EVENTS.inc(kind, outcome, amount=count)
@@ -1,4 +1,10 @@
 import copy
+import hmac
+import bisect
+import threading
+import http.server
+
+from waterbutler import settings as wb_settings
 
 
 def _merge_dicts(a, b, path=None):
@@ -191,3 +197,285 @@ class MetricsSubRecord(MetricsRecord):
         subrecord = MetricsSubRecord(self.name, name)
         self.subrecords.append(subrecord)
         return subrecord
+
+
+# Process-wide metrics
+#
+# `MetricsRecord` describes one request and is sent off with its log entry.  The metrics below
+# are aggregated over every request the process has handled and are exported in the OpenMetrics
+# text format on ``/metrics``, by the server and, see `serve`, by celery workers.  Recording a
+# sample is a dict lookup and a few additions, so it is cheap enough to do for every upstream
+# request.  Each metric keeps at most ``METRICS_MAX_SERIES`` label combinations; samples with any
+# other labels are counted under ``OVERFLOW`` so that a label fed from user input can't grow the
+# registry without bound.  The upstream series name the hosts of user-configured storage, so
+# ``/metrics`` is only served to callers holding ``METRICS_TOKEN``, see `authorized`.
+
+OVERFLOW = '__overflow__'
+
+# seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+                   300.0)
+
+
+def status_class(status):
+    """``'2xx'`` for a 204, ``'error'`` if there was no response at all."""
+    if not status:
+        return 'error'
+    return f'{status // 100}xx'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A metric and its samples, one for every combination of label values seen so far."""
+
+    TYPE = None  # type: str
+
+    def __init__(self, name, documentation, labels=(), max_series=None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.max_series = max_series
+        self._series = {}  # type: dict
+
+    def _get(self, label_values):
+        try:
+            return self._series[label_values]
+        except KeyError:
+            pass
+        if len(label_values) != len(self.labels):
+            raise ValueError(f'{self.name} takes the labels {self.labels}')
+        max_series = self.max_series or wb_settings.METRICS_MAX_SERIES
+        if len(self._series) >= max_series:
+            label_values = (OVERFLOW, ) * len(self.labels)
+            if label_values in self._series:
+                return self._series[label_values]
+        series = self._series[label_values] = self._new_series()
+        return series
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def _label_string(self, label_values, extra=()):
+        pairs = list(zip(self.labels, label_values)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+    def _sample_lines(self, label_values, series):
+        raise NotImplementedError
+
+    def expose(self):
+        lines = [
+            f'# TYPE {self.name} {self.TYPE}',
+            f'# HELP {self.name} {_escape(self.documentation)}',
+        ]
+        for label_values, series in sorted(self._series.items()):
+            lines.extend(self._sample_lines(label_values, series))
+        return lines
+
+    def clear(self):
+        self._series.clear()
+
+
+class Counter(Metric):
+
+    TYPE = 'counter'
+
+    def _new_series(self):
+        return [0]
+
+    def inc(self, *label_values, amount=1):
+        self._get(label_values)[0] += amount
+
+    def value(self, *label_values):
+        series = self._series.get(label_values)
+        return 0 if series is None else series[0]
+
+    def _sample_lines(self, label_values, series):
+        return [f'{self.name}_total{self._label_string(label_values)} {_format_value(series[0])}']
+
+
+class Gauge(Metric):
+
+    TYPE = 'gauge'
+
+    def _new_series(self):
+        return [0]
+
+    def set(self, value, *label_values):
+        self._get(label_values)[0] = value
+
+    def inc(self, *label_values, amount=1):
+        self._get(label_values)[0] += amount
+
+    def dec(self, *label_values, amount=1):
+        self._get(label_values)[0] -= amount
+
+    def value(self, *label_values):
+        series = self._series.get(label_values)
+        return 0 if series is None else series[0]
+
+    def _sample_lines(self, label_values, series):
+        return [f'{self.name}{self._label_string(label_values)} {_format_value(series[0])}']
+
+
+class Histogram(Metric):
+    """Counts observations into ``buckets``, each an upper bound.  A series is a list holding the
+    count of each bucket (not cumulative), the count above the last bucket, and the sum."""
+
+    TYPE = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS, max_series=None):
+        super().__init__(name, documentation, labels=labels, max_series=max_series)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return [0] * (len(self.buckets) + 2)
+
+    def observe(self, value, *label_values):
+        series = self._get(label_values)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return 0 if series is None else sum(series[:-1])
+
+    def _sample_lines(self, label_values, series):
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float('inf'), ), series[:-1]):
+            cumulative += count
+            le = self._label_string(label_values, [('le', _format_value(float(bound)))])
+            lines.append(f'{self.name}_bucket{le} {cumulative}')
+        labels = self._label_string(label_values)
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        lines.append(f'{self.name}_sum{labels} {_format_value(float(series[-1]))}')
+        return lines
+
+
+class Registry:
+
+    CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+    def __init__(self):
+        self._metrics = {}  # type: dict
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'{metric.name} is already registered')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def expose(self):
+        """The samples of every metric, in the OpenMetrics text format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.expose())
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+def authorized(authorization):
+    """Whether the value of an ``Authorization`` header grants access to ``/metrics``, see
+    ``METRICS_TOKEN``."""
+    token = wb_settings.METRICS_TOKEN
+    scheme, _, credentials = (authorization or '').partition(' ')
+    if not token or scheme.lower() != 'bearer':
+        return False
+    return hmac.compare_digest(credentials.strip().encode(), token.encode())
+
+
+class _ExporterHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.partition('?')[0] != '/metrics' or \
+                not authorized(self.headers.get('Authorization')):
+            self.send_error(404)
+            return
+        body = REGISTRY.expose().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', REGISTRY.CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(address, port):
+    """Export the metrics of this process on ``http://<address>:<port>/metrics`` from a daemon
+    thread, for processes that don't run the server.  Returns the HTTP server."""
+    server = http.server.ThreadingHTTPServer((address, port), _ExporterHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-exporter', daemon=True).start()
+    return server
+
+
+REGISTRY = Registry()
+
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    'waterbutler_upstream_requests', 'Requests sent by providers to their upstream services',
+    labels=('provider', 'host', 'method', 'status_class'),
+)
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    'waterbutler_upstream_request_seconds',
+    'Seconds until the response headers of a request to an upstream service arrived',
+    labels=('provider', 'host', 'method'),
+)
+UPSTREAM_IN_FLIGHT = REGISTRY.gauge(
+    'waterbutler_upstream_requests_in_flight',
+    'Requests to upstream services waiting for their response headers',
+    labels=('provider', 'host'),
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    'waterbutler_requests_in_flight', 'Requests to the v0 and v1 APIs not answered yet',
+)
+HANDLER_REQUESTS = REGISTRY.counter(
+    'waterbutler_requests', 'Requests answered by the v1 API',
+    labels=('provider', 'action', 'method', 'status_class'),
+)
+HANDLER_LATENCY = REGISTRY.histogram(
+    'waterbutler_request_seconds', 'Seconds taken to answer a request to the v1 API',
+    labels=('provider', 'action', 'method'),
+)
+HANDLER_PHASE_LATENCY = REGISTRY.histogram(
+    'waterbutler_request_phase_seconds',
+    'Seconds spent in each phase of answering a request to the v1 API, see waterbutler.core.timing',
+    labels=('provider', 'action', 'phase'),
+)
+LOG_EVENTS = REGISTRY.counter(
+    'waterbutler_log_events', 'OSF callbacks and Keen events by what became of them',
+    labels=('kind', 'outcome'),
+)
+TASKS = REGISTRY.counter(
+    'waterbutler_tasks', 'Celery moves and copies run by this worker process',
+    labels=('action', 'src_provider', 'dest_provider', 'outcome'),
+)
+TASK_LATENCY = REGISTRY.histogram(
+    'waterbutler_task_seconds',
+    'Seconds taken by celery moves and copies run by this worker process',
+    labels=('action', 'src_provider', 'dest_provider'),
+    buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 4 * 3600.0),
+)
@@ -1,4 +1,5 @@
 import os
+import copy
 import typing  # noqa
 import itertools
 
@@ -15,8 +16,14 @@ class WaterButlerPathPart:
     do not.  The `count` property is used for Mac-style renaming, where `(1)` is appended to a path
     name when a copy operation encounters a naming conflict.  `ext` is inferred from the initial
     path.
+
+    Listings and tree walks create a great many parts, so they use `__slots__` and compute `value`
+    and `raw` once, until `increment_name` changes them.  Subclasses should declare `__slots__`
+    too.
     """
 
+    __slots__ = ('_id', '_count', '_orig_id', '_orig_part', '_value', '_raw')
+
     DECODE = lambda x: x  # type: typing.Callable[[str], str]
     ENCODE = lambda x: x  # type: typing.Callable[[str], str]
 
@@ -25,7 +32,8 @@ class WaterButlerPathPart:
         self._count = 0  # type: int
         self._orig_id = _id
         self._orig_part = part
-        self._name, self._ext = os.path.splitext(self.original_value)
+        self._value = self.original_value
+        self._raw = None  # type: typing.Optional[str]
 
     @property
     def identifier(self) -> str:
@@ -33,14 +41,17 @@ class WaterButlerPathPart:
 
     @property
     def value(self) -> str:
-        if self._count:
-            return f'{self._name} ({self._count}){self._ext}'
-        return f'{self._name}{self._ext}'
+        if self._value is None:
+            name, ext = os.path.splitext(self.original_value)
+            self._value = f'{name} ({self._count}){ext}'
+        return self._value
 
     @property
     def raw(self) -> str:
         """ The `value` as passed through the `ENCODE` function"""
-        return self.__class__.ENCODE(self.value)  # type: ignore
+        if self._raw is None:
+            self._raw = self.__class__.ENCODE(self.value)  # type: ignore
+        return self._raw
 
     @property
     def original_value(self) -> str:
@@ -52,11 +63,12 @@ class WaterButlerPathPart:
 
     @property
     def ext(self) -> str:
-        return self._ext
+        return os.path.splitext(self.original_value)[1]
 
     def increment_name(self, _id=None) -> 'WaterButlerPathPart':
         self._id = _id
         self._count += 1
+        self._value = self._raw = None
         return self
 
     def renamed(self, name: str) -> 'WaterButlerPathPart':
@@ -99,8 +111,17 @@ class WaterButlerPath:
         path.full_path()
         path.materialized_path()
 
+    These strings are built once and kept until the path changes through `increment_name`,
+    `rename` or by adding or removing parts.  Children and parents made by `child` and `parent`
+    share the parts they have in common with this path rather than copying them, which is why
+    `increment_name` replaces the last part instead of changing it in place.
     """
 
+    # ``__dict__`` keeps attributes some providers add to paths, e.g. dataverse's ``revision``
+    __slots__ = ('_orig_path', '_prepend', '_prepend_parts', '_parts', '_is_folder', '_cache_key',
+                 '_cached_path', '_cached_raw_path', '_cached_full_path', '_cached_materialized',
+                 '__dict__')
+
     PART_CLASS = WaterButlerPathPart
 
     @classmethod
@@ -183,6 +204,45 @@ class WaterButlerPath:
         if self.is_dir and not self._orig_path.endswith('/'):
             self._orig_path += '/'
 
+        self._cache_key = None  # type: typing.Optional[tuple]
+
+    def _cache(self) -> None:
+        """Drop the cached strings if the parts or kind of the path changed since they were
+        built."""
+        key = (len(self._parts), self._is_folder)
+        if self._cache_key != key:
+            self._cache_key = key
+            self._cached_path = self._cached_raw_path = None
+            self._cached_full_path = self._cached_materialized = None
+
+    def _derive(self, parts: list, folder: bool) -> typing.Optional['WaterButlerPath']:
+        """A new path made of ``parts``, as `from_parts` would make it, but sharing the parts
+        instead of joining them into a string and parsing that again.  Returns `None` where the
+        result could differ: for subclasses that set up more state in ``__init__``, and for parts
+        whose raw form isn't a single valid path segment.
+        """
+        if type(self).__init__ is not WaterButlerPath.__init__:
+            return None
+
+        shared = []
+        for part in parts:
+            raw = part.raw
+            if '/' in raw or (shared and raw in ('', '.', '..')):
+                return None
+            if part._count or part.original_raw != raw:
+                # `from_parts` would parse the part again from its raw form
+                part = self.PART_CLASS(raw, _id=part.identifier)
+            shared.append(part)
+
+        path = object.__new__(type(self))
+        path._orig_path = None
+        path._prepend = self._prepend
+        path._prepend_parts = self._prepend_parts
+        path._parts = shared
+        path._is_folder = bool(folder)
+        path._cache_key = None
+        return path
+
     @property
     def is_root(self) -> bool:
         """ Returns `True` if the path is the root directory. """
@@ -242,27 +302,47 @@ class WaterButlerPath:
         Does NOT include a leading slash.  Calling `.path()` on the storage root returns the
         empty string.
         """
-        if len(self.parts) == 1:
-            return ''
-        return '/'.join([x.value for x in self.parts[1:]]) + ('/' if self.is_dir else '')
+        self._cache()
+        if self._cached_path is None:
+            if len(self.parts) == 1:
+                self._cached_path = ''
+            else:
+                self._cached_path = ('/'.join([x.value for x in self.parts[1:]]) +
+                                     ('/' if self.is_dir else ''))
+        return self._cached_path
 
     @property
     def raw_path(self) -> str:
         """ Like `.path()`, but passes each path segment through the PathPart's ENCODE function.
         """
-        if len(self.parts) == 1:
-            return ''
-        return '/'.join([x.raw for x in self.parts[1:]]) + ('/' if self.is_dir else '')
+        self._cache()
+        if self._cached_raw_path is None:
+            if len(self.parts) == 1:
+                self._cached_raw_path = ''
+            else:
+                self._cached_raw_path = ('/'.join([x.raw for x in self.parts[1:]]) +
+                                         ('/' if self.is_dir else ''))
+        return self._cached_raw_path
 
     @property
     def full_path(self):
         """ Same as `.path()`, but with the provider storage root prepended. """
-        return '/'.join([x.value for x in self._prepend_parts + self.parts[1:]]) + ('/' if self.is_dir else '')
+        self._cache()
+        if self._cached_full_path is None:
+            self._cached_full_path = (
+                '/'.join([x.value for x in self._prepend_parts + self.parts[1:]]) +
+                ('/' if self.is_dir else '')
+            )
+        return self._cached_full_path
 
     @property
     def materialized_path(self) -> str:
         """ Returns the user-readable unix-style path without the storage root prepended. """
-        return '/'.join([x.value for x in self.parts]) + ('/' if self.is_dir else '')
+        self._cache()
+        if self._cached_materialized is None:
+            self._cached_materialized = ('/'.join([x.value for x in self.parts]) +
+                                         ('/' if self.is_dir else ''))
+        return self._cached_materialized
 
     @property
     def parent(self):
@@ -272,7 +352,8 @@ class WaterButlerPath:
         """
         if len(self.parts) == 1:
             return None
-        return self.__class__.from_parts(self.parts[:-1], folder=True, prepend=self._prepend)
+        return (self._derive(self.parts[:-1], True) or
+                self.__class__.from_parts(self.parts[:-1], folder=True, prepend=self._prepend))
 
     @property
     def extra(self) -> dict:
@@ -286,17 +367,19 @@ class WaterButlerPath:
         :param _id: the id of the child entity (defaults to None)
         :param bool folder: whether or not the child is a folder (defaults to False)
         """
-        return self.__class__.from_parts(  # type: ignore
-            self.parts + [self.PART_CLASS(name, _id=_id)],
-            folder=folder, prepend=self._prepend
-        )
+        parts = self.parts + [self.PART_CLASS(name, _id=_id)]
+        return (self._derive(parts, folder) or
+                self.__class__.from_parts(parts, folder=folder, prepend=self._prepend))  # type: ignore
 
     def increment_name(self) -> 'WaterButlerPath':
-        self._parts[-1].increment_name()
+        # the last part may be shared with paths made from this one, which keep their name
+        self._parts[-1] = copy.copy(self._parts[-1]).increment_name()
+        self._cache_key = None
         return self
 
     def rename(self, name) -> 'WaterButlerPath':
         self._parts[-1] = self._parts[-1].renamed(name)
+        self._cache_key = None
         return self
 
     def __eq__(self, other):
@@ -306,4 +389,10 @@ class WaterButlerPath:
         return self.materialized_path
 
     def __repr__(self):
-        return f'{self.__class__.__name__}({self._orig_path!r}, prepend={self._prepend!r})'
+        orig_path = self._orig_path
+        if orig_path is None:
+            # made by `_derive`, see `from_parts`
+            orig_path = '/'.join(x.raw for x in self.parts) or '/'
+            if self.is_dir and not orig_path.endswith('/'):
+                orig_path += '/'
+        return f'{self.__class__.__name__}({orig_path!r}, prepend={self._prepend!r})'
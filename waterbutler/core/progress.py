@@ -0,0 +1,358 @@
+"""Progress reporting and cooperative cancellation for long-running copies and moves.
+
+A celery copy or move runs inside a `TransferProgress`, which counts the files and bytes that
+`BaseProvider._folder_file_op` discovers and that `BaseProvider.copy` streams, and publishes a
+snapshot to a store (`FileStore` or `RedisStore`) at most every ``PROGRESS_PUBLISH_INTERVAL``
+seconds.  The servers read the snapshots back from the same store for
+``/v1/operations/<task id>``, so the store has to be shared by every server and celery worker, see
+`store_url`.
+
+Cancellation goes the other way: the server sets a flag in the store, the reporter notices it the
+next time it publishes, and the transfer stops at the next file or chunk it handles by raising
+`TransferCancelledError`.
+
+Each record carries the `owner` of the transfer, so that the servers only show or cancel it for the
+user who started it.
+"""
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import weakref
+import contextlib
+import contextvars
+from urllib import parse
+
+from waterbutler.core import exceptions
+from waterbutler import settings as wb_settings
+from waterbutler.tasks import settings as task_settings
+
+logger = logging.getLogger(__name__)
+
+# the transfer running in the current task, and the file it is transferring
+_CURRENT = contextvars.ContextVar('transfer_progress', default=None)  # type: ignore
+_FILE = contextvars.ContextVar('transfer_progress_file', default=None)  # type: ignore
+
+# event loop -> RedisStore
+_REDIS_STORES = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
+
+# where progress is kept if neither ``PROGRESS_STORE`` nor a Redis result backend is configured
+DEFAULT_FILE_STORE = 'file:///tmp/waterbutler-progress'
+
+TASK_ID_RE = re.compile(r'^[0-9a-f-]+$')
+
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+def current():
+    """The `TransferProgress` of the transfer running in this task, or `None`."""
+    return _CURRENT.get()
+
+
+def owner(resource, provider):
+    """Who a transfer into ``provider`` of ``resource`` belongs to: the resource and provider the
+    requester has to be authorized for, and the id of the user the provider acts for."""
+    return {
+        'resource': resource,
+        'provider': provider.NAME,
+        'requester': (provider.auth or {}).get('id'),
+    }
+
+
+class FileStore:
+    """Keep progress in JSON files in ``basepath``, next to a marker file for cancellations.  The
+    files are read and written on the default executor.  Every server and celery worker has to
+    see the same ``basepath``, so this only works on one host or on a shared filesystem."""
+
+    def __init__(self, basepath, ttl):
+        self.basepath = basepath
+        self.ttl = ttl
+
+    def _path(self, task_id, suffix='json'):
+        if not TASK_ID_RE.match(task_id):
+            raise ValueError(f'Invalid task id {task_id!r}')
+        return os.path.join(self.basepath, f'{task_id}.{suffix}')
+
+    async def _run(self, func, *args):
+        return await asyncio.get_event_loop().run_in_executor(None, func, *args)
+
+    async def create(self, task_id, record):
+        await self._run(self._create, self._path(task_id), record)
+
+    async def save(self, task_id, record):
+        await self._run(self._save, self._path(task_id), record)
+
+    async def load(self, task_id):
+        return await self._run(self._load, self._path(task_id))
+
+    async def cancel(self, task_id):
+        await self._run(self._touch, self._path(task_id, 'cancel'))
+
+    async def is_cancelled(self, task_id):
+        return await self._run(os.path.exists, self._path(task_id, 'cancel'))
+
+    def _create(self, path, record):
+        os.makedirs(self.basepath, exist_ok=True)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return
+        with os.fdopen(fd, 'w') as fp:
+            json.dump(record, fp)
+
+    def _save(self, path, record):
+        os.makedirs(self.basepath, exist_ok=True)
+        with open(f'{path}.tmp', 'w') as fp:
+            json.dump(record, fp)
+        os.replace(f'{path}.tmp', path)
+
+    def _load(self, path):
+        try:
+            if os.path.getmtime(path) < time.time() - self.ttl:
+                return None
+            with open(path) as fp:
+                return json.load(fp)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _touch(self, path):
+        os.makedirs(self.basepath, exist_ok=True)
+        with open(path, 'w'):
+            pass
+
+
+class RedisStore:
+    """Keep progress in Redis keys that expire ``ttl`` seconds after the last update."""
+
+    def __init__(self, url, ttl):
+        import redis.asyncio as aioredis
+        self.client = aioredis.from_url(url)
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(task_id, suffix='progress'):
+        return f'waterbutler-{suffix}-{task_id}'
+
+    async def create(self, task_id, record):
+        await self.client.set(self._key(task_id), json.dumps(record), ex=self.ttl, nx=True)
+
+    async def save(self, task_id, record):
+        await self.client.set(self._key(task_id), json.dumps(record), ex=self.ttl)
+
+    async def load(self, task_id):
+        payload = await self.client.get(self._key(task_id))
+        return None if payload is None else json.loads(payload)
+
+    async def cancel(self, task_id):
+        await self.client.set(self._key(task_id, 'cancel'), 1, ex=self.ttl)
+
+    async def is_cancelled(self, task_id):
+        return bool(await self.client.exists(self._key(task_id, 'cancel')))
+
+
+def store_url():
+    """The store progress is kept in: ``PROGRESS_STORE`` if set, otherwise the celery result
+    backend if it is Redis, which the servers and workers share already, otherwise
+    `DEFAULT_FILE_STORE`."""
+    if wb_settings.PROGRESS_STORE:
+        return wb_settings.PROGRESS_STORE
+    backend = task_settings.result_backend or ''
+    if parse.urlsplit(backend).scheme in ('redis', 'rediss'):
+        return backend
+    return DEFAULT_FILE_STORE
+
+
+def get_store():
+    """Return the store at `store_url`."""
+    store = store_url()
+    url = parse.urlsplit(store)
+    if url.scheme in ('redis', 'rediss'):
+        loop = asyncio.get_event_loop()
+        try:
+            return _REDIS_STORES[loop]
+        except KeyError:
+            redis_store = _REDIS_STORES[loop] = RedisStore(store, wb_settings.PROGRESS_TTL)
+            return redis_store
+    if url.scheme == 'file':
+        return FileStore(url.path, wb_settings.PROGRESS_TTL)
+    raise ValueError(f'Unsupported progress store {store!r}')
+
+
+class FileProgress:
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.streamed = 0
+
+
+class _ProgressWriter:
+    """Count the bytes read from a download stream, see `TransferProgress.track`."""
+
+    def __init__(self, progress, file):
+        self.progress = progress
+        self.file = file
+
+    def write(self, data):
+        self.progress.raise_if_cancelled()
+        self.file.streamed += len(data)
+        self.progress.bytes_done += len(data)
+
+
+class TransferProgress:
+    """Track a copy or move and publish its progress to ``store`` under ``task_id``.
+
+    Use it as an async context manager around the transfer.  The totals grow as folders are
+    listed, so they are only final once every folder has been visited.
+    """
+
+    def __init__(self, task_id, action, owner=None, store=None, publish_interval=None):
+        self.task_id = task_id
+        self.action = action
+        self.owner = owner
+        self.store = store or get_store()
+        self.publish_interval = publish_interval or wb_settings.PROGRESS_PUBLISH_INTERVAL
+
+        self.status = PENDING
+        self.started = time.time()
+        self.finished = None
+        self.files_total = 0
+        self.files_done = 0
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.metadata = None
+        self.created = None
+        self.error = None
+        self.cancelled = False
+        self._in_flight = []  # type: list
+        self._token = None
+        self._pump = None
+
+    async def __aenter__(self):
+        if await self.store.is_cancelled(self.task_id):
+            # cancelled before it started
+            self.status, self.finished = CANCELLED, time.time()
+            await self.publish()
+            raise exceptions.TransferCancelledError()
+
+        self._token = _CURRENT.set(self)
+        self.status = RUNNING
+        await self.publish()
+        self._pump = asyncio.ensure_future(self._run_pump())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        _CURRENT.reset(self._token)
+        self._pump.cancel()
+        self.finished = time.time()
+        if exc is None:
+            self.status = SUCCEEDED
+        elif isinstance(exc, (exceptions.TransferCancelledError, asyncio.CancelledError)):
+            self.status = CANCELLED
+        else:
+            self.status = FAILED
+            if isinstance(exc, exceptions.WaterButlerError):
+                self.error = {'code': int(exc.code), 'message': exc.message}
+            else:
+                self.error = {'code': 500, 'message': f'{self.action.capitalize()} failed'}
+        try:
+            await self.publish()
+        except Exception:
+            logger.exception(f'Could not publish the final progress of {self.task_id}')
+        return False
+
+    async def _run_pump(self):
+        while True:
+            await asyncio.sleep(self.publish_interval)
+            try:
+                await self.publish()
+                self.cancelled = self.cancelled or await self.store.is_cancelled(self.task_id)
+            except Exception:
+                logger.warning(f'Could not publish the progress of {self.task_id}', exc_info=True)
+
+    async def publish(self):
+        await self.store.save(self.task_id, self.snapshot())
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise exceptions.TransferCancelledError()
+
+    def announce(self, files):
+        """Count ``files``, a list of file sizes (`None` if unknown), towards the totals."""
+        self.files_total += len(files)
+        self.bytes_total += sum(size or 0 for size in files)
+
+    @contextlib.contextmanager
+    def transferring(self, path, size=None, announced=False):
+        """Mark the file at ``path`` as in flight for the duration of the block.  Bytes streamed
+        through `track` inside the block are counted towards it; whatever wasn't streamed (e.g.
+        because the provider copied the file itself) is counted when the block exits.
+        """
+        if path.is_dir:
+            yield None
+            return
+
+        self.raise_if_cancelled()
+        if not announced:
+            self.announce([size])
+        file = FileProgress(path, size)
+        token = _FILE.set(file)
+        self._in_flight.append(file)
+        try:
+            yield file
+        finally:
+            _FILE.reset(token)
+            self._in_flight.remove(file)
+        self.files_done += 1
+        if file.size is not None and file.size > file.streamed:
+            self.bytes_done += file.size - file.streamed
+
+    def track(self, stream):
+        """Count the bytes read from ``stream`` towards the file in flight in this task."""
+        file = _FILE.get()
+        if file is None:
+            return
+        if file.size is None and getattr(stream, 'size', None):
+            file.size = stream.size
+            self.bytes_total += stream.size
+        if hasattr(stream, 'add_writer'):
+            stream.add_writer('progress', _ProgressWriter(self, file))
+
+    def snapshot(self):
+        elapsed = (self.finished or time.time()) - self.started
+        throughput = self.bytes_done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.status == RUNNING and throughput and self.bytes_total >= self.bytes_done:
+            eta = round((self.bytes_total - self.bytes_done) / throughput, 1)
+        attributes = {
+            'action': self.action,
+            'status': self.status,
+            'started': self.started,
+            'finished': self.finished,
+            'progress': {
+                'files_total': self.files_total,
+                'files_done': self.files_done,
+                'bytes_total': self.bytes_total,
+                'bytes_done': self.bytes_done,
+                'current_file': self._in_flight[-1].path.materialized_path
+                if self._in_flight else None,
+                'throughput': round(throughput, 1),
+                'eta': eta,
+            },
+        }
+        if self.metadata is not None:
+            attributes['metadata'] = self.metadata
+        if self.created is not None:
+            attributes['created'] = self.created
+        if self.error is not None:
+            attributes['error'] = self.error
+        if self.owner is not None:
+            attributes['owner'] = self.owner
+        return attributes
@@ -4,7 +4,6 @@ import typing
 import asyncio
 import logging
 import weakref
-import functools
 import itertools
 from urllib import parse
 
@@ -13,9 +12,18 @@ import aiohttp
 from aiohttp.client import _RequestContextManager
 
 from waterbutler.core import streams
+from waterbutler.core import limiter
+from waterbutler.core import ranged
+from waterbutler.core import hedging
+from waterbutler.core import progress as wb_progress
+from waterbutler.core import transfer as wb_transfer
+from waterbutler.core import retry as wb_retry
+from waterbutler.core import timing as wb_timing
+from waterbutler.core import tracing as wb_tracing
 from waterbutler.core import exceptions
 from waterbutler.core import path as wb_path
 from waterbutler import settings as wb_settings
+from waterbutler.core import metrics as wb_metrics
 from waterbutler.core.metrics import MetricsRecord
 from waterbutler.core import metadata as wb_metadata
 from waterbutler.core.utils import ZipStreamGenerator
@@ -23,34 +31,6 @@ from waterbutler.core.utils import RequestHandlerContext
 
 
 logger = logging.getLogger(__name__)
-_THROTTLES = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
-
-
-def throttle(concurrency=10, interval=1):
-    def _throttle(func):
-        @functools.wraps(func)
-        async def wrapped(*args, **kwargs):
-            if asyncio.get_event_loop() not in _THROTTLES:
-                count, last_call, event = 0, time.time(), asyncio.Event()
-                _THROTTLES[asyncio.get_event_loop()] = (count, last_call, event)
-                event.set()
-            else:
-                count, last_call, event = _THROTTLES[asyncio.get_event_loop()]
-
-            await event.wait()
-            count += 1
-            if count > concurrency:
-                count = 0
-                if (time.time() - last_call) < interval:
-                    event.clear()
-                    await asyncio.sleep(interval - (time.time() - last_call))
-                    event.set()
-
-            last_call = time.time()
-            _THROTTLES[asyncio.get_event_loop()] = (count, last_call, event)
-            return await func(*args, **kwargs)
-        return wrapped
-    return _throttle
 
 
 def build_url(base, *segments, **query):
@@ -62,6 +42,14 @@ def build_url(base, *segments, **query):
     return url.url
 
 
+def _item_size(item):
+    """The size of a file's metadata as an int, 0 if the provider doesn't report one."""
+    try:
+        return int(item.size or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
 class BaseProvider(metaclass=abc.ABCMeta):
     """The base class for all providers. Every provider must, at the least, implement all abstract
     methods in this class.
@@ -91,6 +79,7 @@ class BaseProvider(metaclass=abc.ABCMeta):
         """
         retry_on = retry_on or {408, 502, 503, 504}
         self._retry_on = retry_on
+        self.retry_policy = wb_retry.RetryPolicy.from_settings(self.NAME, retry_on=retry_on)
         self.auth = auth
         self.credentials = credentials
         self.settings = settings
@@ -211,7 +200,6 @@ class BaseProvider(metaclass=abc.ABCMeta):
 
         return session
 
-    @throttle()
     async def make_request(self, method, url, *args, **kwargs):
         r"""
         A wrapper around seven HTTP request methods in :class:`aiohttp.ClientSession`.  It replaces
@@ -253,8 +241,11 @@ class BaseProvider(metaclass=abc.ABCMeta):
         :keyword expects: ( :class:`tuple` ) An optional tuple of HTTP status codes as integers
             raises an exception if the returned status code is not in it
         :keyword retry: ( :class:`int` ) An optional integer with default value 2 that determines
-            how further to retry failed requests with the exponential back-off algorithm
+            how many times to retry failed requests.  When and whether to retry is decided by
+            ``self.retry_policy``, see :class:`waterbutler.core.retry.RetryPolicy`
         :keyword throws: ( :class:`Exception` ) The exception to be raised from expects
+        :keyword hedge: ( :class:`bool` ) Opt an idempotent GET or HEAD request into hedging, see
+            :func:`_send_hedged`
         :return: The HTTP response
         :rtype: :class:`aiohttp.ClientResponse`
         :raises: :class:`.UnhandledProviderError` Raised if expects is defined
@@ -265,7 +256,7 @@ class BaseProvider(metaclass=abc.ABCMeta):
         no_auth_header = kwargs.pop('no_auth_header', False)
         if no_auth_header:
             kwargs['headers'].pop('Authorization')
-        retry = _retry = kwargs.pop('retry', 2)
+        retry = kwargs.pop('retry', 2)
         expects = kwargs.pop('expects', None)
         throws = kwargs.pop('throws', exceptions.UnhandledProviderError)
         byte_range = kwargs.pop('range', None)
@@ -275,54 +266,158 @@ class BaseProvider(metaclass=abc.ABCMeta):
         session = self.get_or_create_session(connector=connector)
 
         method = method.upper()
+        hedge = (kwargs.pop('hedge', False) and wb_settings.HEDGING_ENABLED and
+                 method in hedging.HEDGEABLE_METHODS)
+        delay = None
         while retry >= 0:
             # Don't overwrite the callable ``url`` so that signed URLs are refreshed for every retry
             non_callable_url = url() if callable(url) else url
+            upstream = self.retry_policy.upstream(self.NAME, non_callable_url)
+            self.provider_metrics.add('retry.upstream', upstream.stats())
+            if not upstream.breaker.allow():
+                self.provider_metrics.incr('retry.short_circuited')
+                raise exceptions.ServiceUnavailableError(upstream.host)
+
+            retry_after = None
             try:
                 self.provider_metrics.incr('requests.count')
-                # TODO: use a `dict` to select methods with either `lambda` or `functools.partial`
-                if method == 'GET':
-                    response = await session.get(non_callable_url,
-                                                 timeout=wb_settings.AIOHTTP_TIMEOUT,
-                                                 *args, **kwargs)
-                elif method == 'PUT':
-                    response = await session.put(non_callable_url,
-                                                 timeout=wb_settings.AIOHTTP_TIMEOUT,
-                                                 *args, **kwargs)
-                elif method == 'POST':
-                    response = await session.post(non_callable_url,
-                                                  timeout=wb_settings.AIOHTTP_TIMEOUT,
-                                                  *args, **kwargs)
-                elif method == 'HEAD':
-                    response = await session.head(non_callable_url, *args, **kwargs)
-                elif method == 'DELETE':
-                    response = await session.delete(non_callable_url, **kwargs)
-                elif method == 'PATCH':
-                    response = await session.patch(non_callable_url, *args, **kwargs)
-                elif method == 'OPTIONS':
-                    response = await session.options(non_callable_url, *args, **kwargs)
-                elif method in wb_settings.WEBDAV_METHODS:
-                    # `aiohttp.ClientSession` only has functions available for native HTTP methods.
-                    # For WebDAV (a protocol that extends HTTP) ones, WB lets the `ClientSession`
-                    # instance call `_request()` directly and then wraps the return object with
-                    # `aiohttp.client._RequestContextManager`.
-                    response = await _RequestContextManager(
-                        session._request(method, url, *args, **kwargs)
-                    )
+                if hedge:
+                    response = await self._send_hedged(session, method, url, non_callable_url,
+                                                       *args, **kwargs)
                 else:
-                    raise exceptions.WaterButlerError('Unsupported HTTP method ...')
+                    response = await self._send_request(session, method, url, non_callable_url,
+                                                        *args, **kwargs)
+                self.retry_policy.record(upstream, response.status)
                 self.provider_metrics.incr('requests.tally.ok')
                 if expects and response.status not in expects:
+                    retry_after = response.headers.get('Retry-After')
                     unexpected = await exceptions.exception_from_response(response,
                                                                           error=throws, **kwargs)
+                    # for callers that retry on their own, see `RetryPolicy.delay`
+                    unexpected.retry_after = retry_after
                     raise unexpected
                 return response
             except throws as e:
                 self.provider_metrics.incr('requests.tally.nok')
-                if retry <= 0 or e.code not in self._retry_on:
+                if retry <= 0 or e.code not in self.retry_policy.retry_on:
                     raise
-                await asyncio.sleep((1 + _retry - retry) * 2)
+                if not self.retry_policy.should_retry(upstream, e.code):
+                    self.provider_metrics.incr('retry.budget_exhausted')
+                    raise
+                delay = self.retry_policy.delay(delay, retry_after)
+                if delay is None:
+                    raise
+                self.provider_metrics.incr('retry.count')
+                wb_tracing.add_event('waterbutler.retry', **{
+                    'http.status_code': e.code,
+                    'waterbutler.retries_left': retry,
+                    'waterbutler.delay': delay,
+                })
+                await asyncio.sleep(delay)
                 retry -= 1
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self.retry_policy.record(upstream, None)
+                raise
+
+    async def _send_request(self, session, method, url, non_callable_url, *args, **kwargs):
+        """Send one request through the adaptive limiter for its upstream, see
+        :mod:`waterbutler.core.limiter`.  The limiter's slot is held until the response headers
+        have arrived.  Uploads of a large body only wait for a slot, and their latency isn't
+        sampled, so that a few long uploads don't throttle every other request to the upstream.
+        """
+        upstream = limiter.get_limiter(self.NAME, non_callable_url)
+        if upstream.queued or upstream.in_flight >= int(upstream.limit):
+            self.provider_metrics.incr('limiter.queued')
+        # a large upload takes as long as its body does, which says nothing about the upstream
+        large_body = limiter.is_large_body(kwargs.get('data'))
+        if large_body:
+            await upstream.admit()
+            settle = upstream.record
+        else:
+            await upstream.acquire()
+            settle = upstream.release
+
+        provider_name, host = upstream.key
+        in_flight = wb_metrics.UPSTREAM_IN_FLIGHT
+        in_flight.inc(provider_name, host)
+        span = wb_tracing.start_span(f'{method} {host}', **{
+            'http.method': method,
+            'net.peer.name': host,
+            'waterbutler.provider': provider_name,
+        })
+        start = time.monotonic()
+        try:
+            # TODO: use a `dict` to select methods with either `lambda` or `functools.partial`
+            if method == 'GET':
+                response = await session.get(non_callable_url,
+                                             timeout=wb_settings.AIOHTTP_TIMEOUT,
+                                             *args, **kwargs)
+            elif method == 'PUT':
+                response = await session.put(non_callable_url,
+                                             timeout=wb_settings.AIOHTTP_TIMEOUT,
+                                             *args, **kwargs)
+            elif method == 'POST':
+                response = await session.post(non_callable_url,
+                                              timeout=wb_settings.AIOHTTP_TIMEOUT,
+                                              *args, **kwargs)
+            elif method == 'HEAD':
+                response = await session.head(non_callable_url, *args, **kwargs)
+            elif method == 'DELETE':
+                response = await session.delete(non_callable_url, **kwargs)
+            elif method == 'PATCH':
+                response = await session.patch(non_callable_url, *args, **kwargs)
+            elif method == 'OPTIONS':
+                response = await session.options(non_callable_url, *args, **kwargs)
+            elif method in wb_settings.WEBDAV_METHODS:
+                # `aiohttp.ClientSession` only has functions available for native HTTP methods.
+                # For WebDAV (a protocol that extends HTTP) ones, WB lets the `ClientSession`
+                # instance call `_request()` directly and then wraps the return object with
+                # `aiohttp.client._RequestContextManager`.
+                response = await _RequestContextManager(
+                    session._request(method, url, *args, **kwargs)
+                )
+            else:
+                raise exceptions.WaterButlerError('Unsupported HTTP method ...')
+        except asyncio.CancelledError:
+            settle(None, None)
+            wb_tracing.end_span(span, **{'waterbutler.cancelled': True})
+            raise
+        except Exception as exc:
+            settle(None, None if large_body else time.monotonic() - start)
+            wb_metrics.UPSTREAM_REQUESTS.inc(provider_name, host, method, 'error')
+            wb_timing.record_upstream(time.monotonic() - start)
+            wb_tracing.end_span(span, **{'error.type': type(exc).__name__})
+            raise
+        finally:
+            in_flight.dec(provider_name, host)
+
+        latency = time.monotonic() - start
+        settle(response.status, None if large_body else latency, response.headers)
+        wb_metrics.UPSTREAM_REQUESTS.inc(provider_name, host, method,
+                                         wb_metrics.status_class(response.status))
+        wb_metrics.UPSTREAM_LATENCY.observe(latency, provider_name, host, method)
+        wb_timing.record_upstream(latency)
+        wb_tracing.end_span(span, **{'http.status_code': response.status})
+        self.provider_metrics.add('limiter.upstream', upstream.stats())
+        if method in hedging.HEDGEABLE_METHODS:
+            hedging.tracker(self.NAME, non_callable_url).add(latency)
+        return response
+
+    async def _send_hedged(self, session, method, url, non_callable_url, *args, **kwargs):
+        """Send a request and, if it hasn't been answered within the ``HEDGING.PERCENTILE``
+        latency of its upstream, send an identical one and use whichever answers first.  Hedges
+        are limited process-wide to ``HEDGING.MAX_RATIO`` of the requests that opted in.  Only
+        use this for idempotent requests whose responses are small or cheap to abandon.
+        """
+        response, hedged, won = await hedging.race(
+            lambda: self._send_request(session, method, url, non_callable_url, *args, **kwargs),
+            hedging.tracker(self.NAME, non_callable_url).hedge_delay(),
+        )
+        if hedged:
+            self.provider_metrics.incr('hedge.sent')
+            if won:
+                self.provider_metrics.incr('hedge.wins')
+        return response
 
     def request(self, *args, **kwargs):
         return RequestHandlerContext(self.make_request(*args, **kwargs))
@@ -425,12 +520,28 @@ class BaseProvider(metaclass=abc.ABCMeta):
         if src_path.is_dir:
             return await self._folder_file_op(self.copy, *args, **kwargs)  # type: ignore
 
-        download_stream = await self.download(src_path)
+        with wb_tracing.span('waterbutler.copy.download', **{'waterbutler.provider': self.NAME}):
+            download_stream = await self.download(src_path)
+
+        progress = wb_progress.current()
+        if progress is not None:
+            progress.track(download_stream)
 
         if getattr(download_stream, 'name', None):
             dest_path.rename(download_stream.name)
 
-        return await dest_provider.upload(download_stream, dest_path)
+        size = getattr(download_stream, 'size', None)
+        if ranged.can_transfer(self, dest_provider, size):
+            ranged.discard(download_stream)
+            self.provider_metrics.add('copy.ranged', True)
+            return await ranged.transfer(self, dest_provider, src_path, dest_path, size)
+
+        # the upload reads the download as it goes, so this is where the bytes are moved
+        with wb_tracing.span('waterbutler.copy.upload', **{
+            'waterbutler.provider': dest_provider.NAME,
+            'waterbutler.size': size,
+        }):
+            return await dest_provider.upload(download_stream, dest_path)
 
     async def _folder_file_op(self,
                               func: typing.Callable,
@@ -447,6 +558,11 @@ class BaseProvider(metaclass=abc.ABCMeta):
                func: dest_provider.revalidate_path
                func: self.metadata
 
+        The whole tree is scheduled by a single :class:`.TreeTransfer`: the outermost call starts
+        it, and the calls for subfolders (made by ``func``) add their children to it instead of
+        starting their own.  ``OP_CONCURRENCY`` limits the number of operations in flight across
+        the tree and ``OP_MAX_BYTES_IN_FLIGHT`` the total size of the files being transferred.
+
         :param coroutine func: to be applied to src/dest path
         :param *Provider dest_provider: Destination provider
         :param *ProviderPath src_path: Source path
@@ -455,6 +571,17 @@ class BaseProvider(metaclass=abc.ABCMeta):
         assert src_path.is_dir, 'src_path must be a directory'
         assert asyncio.iscoroutinefunction(func), 'func must be a coroutine'
 
+        transfer = wb_transfer.TreeTransfer.current()
+        if transfer is None:
+            transfer = wb_transfer.TreeTransfer(wb_settings.OP_CONCURRENCY,
+                                                wb_settings.OP_MAX_BYTES_IN_FLIGHT)
+            try:
+                return await transfer.run(
+                    self._folder_file_op(func, dest_provider, src_path, dest_path, **kwargs)
+                )
+            finally:
+                self.provider_metrics.add('_folder_file_ops.transfer', transfer.stats())
+
         try:
             await dest_provider.delete(dest_path)
             created = False
@@ -473,29 +600,33 @@ class BaseProvider(metaclass=abc.ABCMeta):
         # Metadata returns a union, which confuses mypy
         self.provider_metrics.append('_folder_file_ops.item_counts', len(items))  # type: ignore
 
-        for i in range(0, len(items), wb_settings.OP_CONCURRENCY):  # type: ignore
-            futures = []
-            for item in items[i:i + wb_settings.OP_CONCURRENCY]:  # type: ignore
-                futures.append(asyncio.ensure_future(
-                    func(
-                        dest_provider,
-                        # TODO figure out a way to cut down on all the requests made here
-                        (await self.revalidate_path(src_path, item.name, folder=item.is_folder)),
-                        (await dest_provider.revalidate_path(dest_path, item.name, folder=item.is_folder)),
-                        handle_naming=False,
-                    )
-                ))
-
-                if item.is_folder:
-                    await futures[-1]
-
-            if not futures:
-                continue
-
-            done, _ = await asyncio.wait(futures, return_when=asyncio.FIRST_EXCEPTION)
-
-            for fut in done:
-                folder.children.append(fut.result()[0])
+        progress = wb_progress.current()
+        if progress is not None:
+            progress.raise_if_cancelled()
+            progress.announce([_item_size(item)
+                               for item in items if not item.is_folder])  # type: ignore
+
+        # the folder exists, so its slot can go to its children while we wait on them
+        transfer.detach()
+
+        async def apply(item):
+            # TODO figure out a way to cut down on all the requests made here
+            item_src_path = await self.revalidate_path(src_path, item.name, folder=item.is_folder)
+            item_dest_path = await dest_provider.revalidate_path(dest_path, item.name,
+                                                                 folder=item.is_folder)
+            if progress is None:
+                return await func(dest_provider, item_src_path, item_dest_path,
+                                  handle_naming=False)
+            with progress.transferring(item_src_path, _item_size(item), announced=True):
+                return await func(dest_provider, item_src_path, item_dest_path,
+                                  handle_naming=False)
+
+        futures = [
+            transfer.submit(apply, item, size=None if item.is_folder else _item_size(item))
+            for item in items  # type: ignore
+        ]
+        for meta, _ in await asyncio.gather(*futures):
+            folder.children.append(meta)
 
         return folder, created
 
@@ -541,6 +672,66 @@ class BaseProvider(metaclass=abc.ABCMeta):
 
         return dest_path
 
+    def can_upload_by_hash(self) -> bool:
+        """Indicates if `upload_by_hash` can create files from content the provider already has.
+
+        .. note::
+            Defaults to False
+
+        :rtype: :class:`bool`
+        """
+        return False
+
+    async def upload_by_hash(self, path: wb_path.WaterButlerPath, sha256: str,
+                             size: int) -> typing.Optional[tuple]:
+        """Create the file at ``path`` from content with the given ``sha256`` and ``size``, if
+        the provider already stores it, without transferring it.  Returns what `upload` would, or
+        `None` if the content has to be uploaded after all.  In that case `upload` is called with
+        a ``sha256`` keyword argument, and must reject content that doesn't match it.  Only called
+        if `can_upload_by_hash` returned True.
+
+        :param path: ( :class:`.WaterButlerPath` ) Where to create the file
+        :param sha256: ( :class:`str` ) The hex sha256 the client declared for the file
+        :param size: ( :class:`int` ) The size of the file in bytes
+        :rtype: (:class:`.BaseFileMetadata`, :class:`bool`) or `None`
+        """
+        return None
+
+    def can_download_ranges(self) -> bool:
+        """Indicates if ``download`` honors its ``range`` argument, returning a stream of just the
+        requested bytes.  Used to copy large files in parallel parts, see :mod:`.ranged`.
+
+        .. note::
+            Defaults to False
+
+        :rtype: :class:`bool`
+        """
+        return False
+
+    def can_upload_parts(self, size: int) -> bool:
+        """Indicates if a file of ``size`` bytes can be uploaded in parts with
+        `start_part_upload`.
+
+        .. note::
+            Defaults to False
+
+        :param size: ( :class:`int` ) The size of the file in bytes
+        :rtype: :class:`bool`
+        """
+        return False
+
+    async def start_part_upload(self, path: wb_path.WaterButlerPath,
+                                size: int) -> 'ranged.PartUpload':
+        """Start a multipart upload of ``size`` bytes to ``path``, replacing any existing file.
+        Only called if `can_upload_parts` returned True.
+
+        :param path: ( :class:`.WaterButlerPath` ) Where to upload the file to
+        :param size: ( :class:`int` ) The size of the file in bytes
+        :rtype: :class:`.ranged.PartUpload`
+        :raises: :class:`.UploadError`
+        """
+        raise NotImplementedError
+
     def can_intra_copy(self,
                        other: 'BaseProvider',
                        path: wb_path.WaterButlerPath = None) -> bool:
@@ -763,6 +954,52 @@ class BaseProvider(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError
 
+    async def list_folder(self, path: wb_path.WaterButlerPath, cursor: str | None = None,
+                          page_size: int | None = None, **kwargs) \
+            -> tuple[list[wb_metadata.BaseMetadata], str | None]:
+        r"""Get one page of the children of the folder at ``path``.  Returns the metadata of up to
+        ``page_size`` children and the cursor of the next page, or `None` after the last page.
+
+        ``cursor`` is a cursor returned by an earlier call, or `None` for the first page.  Cursors
+        are opaque to callers.  This implementation lists the whole folder with `metadata` and
+        counts its way through it; providers whose API pages through folders override it to pass
+        their own cursors on.  With ``page_size`` `None`, a provider may return pages of whatever
+        size its API prefers.
+
+        :param path: ( :class:`.WaterButlerPath` ) The path to a folder
+        :param cursor: ( :class:`str` ) Where to start listing
+        :param page_size: ( :class:`int` ) The most children to return
+        :param kwargs: ( :class:`dict` ) Arguments passed on to `metadata`
+        :rtype: (:class:`list` of :class:`.BaseMetadata`, :class:`str`)
+        :raises: :class:`.MetadataError`, :class:`.InvalidParameters`
+        """
+        start = 0
+        if cursor is not None:
+            try:
+                start = int(cursor)
+            except ValueError:
+                start = -1
+            if start < 0:
+                raise exceptions.InvalidParameters(f'Invalid page cursor: {cursor}')
+
+        children = await self.metadata(path, **kwargs)  # type: ignore
+        if page_size is None:
+            return children[start:], None  # type: ignore
+
+        end = start + page_size
+        return children[start:end], (str(end) if end < len(children) else None)  # type: ignore
+
+    async def iter_folder(self, path: wb_path.WaterButlerPath, page_size: int | None = None,
+                          **kwargs) -> typing.AsyncIterator[list[wb_metadata.BaseMetadata]]:
+        """Yield the children of the folder at ``path`` a page at a time, see `list_folder`."""
+        cursor = None
+        while True:
+            children, cursor = await self.list_folder(path, cursor=cursor, page_size=page_size,
+                                                      **kwargs)
+            yield children
+            if cursor is None:
+                return
+
     @abc.abstractmethod
     async def validate_v1_path(self, path: str, **kwargs) -> wb_path.WaterButlerPath:
         """API v1 requires that requests against folder endpoints always end with a slash, and
@@ -0,0 +1,186 @@
+"""Copy one large file between providers over several connections.
+
+`BaseProvider.copy` normally pipes a single ``download()`` stream into a single ``upload()``.
+When the source can serve byte ranges (`BaseProvider.can_download_ranges`) and the destination
+can take the file in parts (`BaseProvider.can_upload_parts`), `transfer` instead splits the file
+into the destination's part size and moves up to ``RANGED_TRANSFER_CONCURRENCY`` parts at once,
+each downloaded as a byte range and then uploaded into the destination's `PartUpload`.
+
+Parts are started in order and handed to `PartUpload.hash_in_order` in order, so destinations
+that want a hash of the whole file can compute it as the parts go by.  A part's slot is only
+freed once it has been uploaded, so at most ``RANGED_TRANSFER_MAX_BUFFER`` bytes of parts are held
+in memory, but always at least one part.
+"""
+import abc
+import asyncio
+import hashlib
+import logging
+
+from waterbutler.core import tracing
+from waterbutler.core import exceptions
+from waterbutler import settings as wb_settings
+from waterbutler.core import progress as wb_progress
+
+logger = logging.getLogger(__name__)
+
+
+class Part:
+    """The bytes ``offset`` to ``offset + len(data) - 1`` of the file, the ``number``-th part of
+    the upload (numbered from 1)."""
+
+    __slots__ = ('number', 'offset', 'data', '_digests')
+
+    def __init__(self, number, offset, data):
+        self.number = number
+        self.offset = offset
+        self.data = data
+        self._digests = {}  # type: dict
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    async def digest(self, name):
+        """The ``name`` (e.g. ``'md5'``) hash of the part.  Hashing a whole part blocks for a
+        while, so it happens on the default executor, and only once per hash."""
+        if name not in self._digests:
+            loop = asyncio.get_event_loop()
+            self._digests[name] = await loop.run_in_executor(
+                None, lambda: hashlib.new(name, self.data).digest())
+        return self._digests[name]
+
+
+class PartUpload(metaclass=abc.ABCMeta):
+    """A destination's multipart upload session, as returned by `BaseProvider.start_part_upload`.
+    `upload_part` is called for several parts at once, in no particular order.
+    """
+
+    #: The size of every part but the last one, as required by the destination
+    part_size = None  # type: int
+
+    async def hash_in_order(self, part: Part) -> None:
+        """Called with every part, in order, before it is uploaded."""
+        pass
+
+    @abc.abstractmethod
+    async def upload_part(self, part: Part) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def complete(self) -> tuple:
+        """Commit the parts and return the ``(metadata, created)`` pair ``upload()`` would."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def abort(self) -> bool:
+        """Discard the parts uploaded so far.  Returns `False` if they couldn't be removed."""
+        raise NotImplementedError
+
+
+def can_transfer(src_provider, dest_provider, size) -> bool:
+    """Whether a file of ``size`` bytes should be copied with `transfer`."""
+    return (
+        size is not None and
+        size >= wb_settings.RANGED_TRANSFER_THRESHOLD and
+        src_provider.can_download_ranges() and
+        dest_provider.can_upload_parts(size)
+    )
+
+
+def discard(stream):
+    """Drop the response or file behind ``stream`` without reading the rest of it."""
+    response = getattr(stream, 'response', None)
+    if response is not None:
+        response.close()
+    elif hasattr(stream, 'close'):
+        stream.close()
+
+
+async def _fetch(src_provider, src_path, number, offset, size):
+    stream = await src_provider.download(src_path, range=(offset, offset + size - 1))
+    progress = wb_progress.current()
+    if progress is not None:
+        progress.track(stream)
+
+    chunks, received = [], 0
+    while received < size:
+        chunk = await stream.read(min(size - received, wb_settings.RANGED_TRANSFER_READ_SIZE))
+        if not chunk:
+            break
+        chunks.append(chunk)
+        received += len(chunk)
+
+    # a source that ignores the range sends the whole file
+    if received != size or not getattr(stream, 'partial', True):
+        discard(stream)
+        raise exceptions.DownloadError(
+            f'Could not download bytes {offset}-{offset + size - 1} of {src_path}', code=502)
+    return Part(number, offset, b''.join(chunks))
+
+
+async def _transfer_part(src_provider, src_path, session, number, offset, size, turn, done):
+    with tracing.span('waterbutler.ranged.fetch', **{'waterbutler.part': number,
+                                                     'waterbutler.size': size}):
+        part = await _fetch(src_provider, src_path, number, offset, size)
+    await turn.wait()
+    await session.hash_in_order(part)
+    done.set()
+    with tracing.span('waterbutler.ranged.upload', **{'waterbutler.part': number,
+                                                      'waterbutler.size': size}):
+        await session.upload_part(part)
+
+
+async def transfer(src_provider, dest_provider, src_path, dest_path, size,
+                   concurrency=None, max_buffer=None):
+    """Copy the ``size`` bytes at ``src_path`` to ``dest_path``, see the module docstring.
+
+    Returns what ``dest_provider.upload`` would.  If anything fails the destination's upload
+    session is aborted and the error is raised.
+    """
+    concurrency = concurrency or wb_settings.RANGED_TRANSFER_CONCURRENCY
+    max_buffer = max_buffer or wb_settings.RANGED_TRANSFER_MAX_BUFFER
+
+    session = await dest_provider.start_part_upload(dest_path, size)
+    part_size = session.part_size
+    window = max(1, min(concurrency, max_buffer // part_size))
+    logger.debug(f'Copying {size} bytes from {src_path} to {dest_path} in parts of {part_size} '
+                 f'bytes, {window} at a time')
+
+    slots = asyncio.Semaphore(window)
+    tasks = []  # type: list
+
+    def release(task):
+        slots.release()
+
+    try:
+        # each part waits for the one before it to be hashed, the first one doesn't wait
+        turn = asyncio.Event()
+        turn.set()
+        for number, offset in enumerate(range(0, size, part_size), start=1):
+            await slots.acquire()
+            # a failed part frees its slot, so this is where the failure is noticed
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+            done = asyncio.Event()
+            tasks.append(asyncio.ensure_future(_transfer_part(
+                src_provider, src_path, session, number, offset, min(part_size, size - offset),
+                turn, done,
+            )))
+            tasks[-1].add_done_callback(release)
+            turn = done
+        await asyncio.gather(*tasks)
+        return await session.complete()
+    except BaseException as exc:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.error(f'Ranged copy of {src_path} failed, aborting the upload: {exc!r}')
+        try:
+            aborted = await session.abort()
+        except Exception:
+            logger.exception(f'Could not abort the upload of {dest_path}')
+            aborted = False
+        if not aborted:
+            logger.error(f'The parts uploaded to {dest_path} could not be removed')
+        raise
@@ -1,13 +1,12 @@
-import json
 import time
 import asyncio
 import logging
 
 import furl
-import aiohttp
 
 from waterbutler import settings
 from waterbutler.core import utils
+from waterbutler.core import log_shipper
 from waterbutler.sizes import KBs, MBs, GBs
 from waterbutler.version import __version__
 from waterbutler.tasks import settings as task_settings
@@ -16,10 +15,11 @@ from waterbutler.tasks import settings as task_settings
 logger = logging.getLogger(__name__)
 
 
-@utils.async_retry(retries=5, backoff=5)
 async def log_to_callback(action, source=None, destination=None, start_time=None, errors=None,
                           request=None):
-    """PUT a logging payload back to the callback given by the auth provider."""
+    """Queue a logging payload to be PUT back to the callback given by the auth provider.  The
+    payload is signed, and its ``time`` set, when it is sent, see `waterbutler.core.log_shipper`.
+    """
     errors = errors or []
     request = request or {}
     auth = getattr(destination, 'auth', source.auth)
@@ -28,7 +28,6 @@ async def log_to_callback(action, source=None, destination=None, start_time=None
         'action': action,
         'action_meta': {},
         'auth': auth,
-        'time': time.time() + 60,
         'errors': errors,
     }
 
@@ -60,22 +59,15 @@ async def log_to_callback(action, source=None, destination=None, start_time=None
                          settings.MFR_IDENTIFYING_HEADER in request["request"]["headers"])
         log_payload['action_meta']['is_mfr_render'] = is_mfr_render
 
-    resp_status, resp_data = await utils.send_signed_request('PUT', auth['callback_url'], log_payload)
-
-    if resp_status // 100 != 2:
-        raise Exception(
-            'Callback for {} request failed with {!r}, got {}'.format(
-                action, resp_status, resp_data.decode('utf-8')
-            )
-        )
-
-    logger.info('Callback for {} request succeeded with {}'.format(action, resp_data.decode('utf-8')))
+    log_shipper.get_shipper().submit(
+        log_shipper.callback_event(auth['callback_url'], log_payload, action)
+    )
 
 
 async def log_to_keen(action, api_version, request, source, destination=None, errors=None,
                       bytes_downloaded=0, bytes_uploaded=0):
-    """Send events to Keen describing the action that occurred.  A scrubbed version of the payload
-    suitable for public display is also sent."""
+    """Queue events for Keen describing the action that occurred.  A scrubbed version of the
+    payload suitable for public display is also queued."""
     if not settings.KEEN_ENABLE_LOGGING or not settings.KEEN_PRIVATE_PROJECT_ID or not settings.KEEN_PRIVATE_WRITE_KEY:
         return
 
@@ -171,10 +163,11 @@ async def log_to_keen(action, api_version, request, source, destination=None, er
     if destination is not None and hasattr(destination, 'provider'):
         keen_payload['providers']['destination'] = destination.provider.provider_metrics.serialize()
 
+    shipper = log_shipper.get_shipper()
+
     # send the private payload
     if settings.KEEN_PRIVATE_LOG_ACTIONS:
-        await _send_to_keen(keen_payload, 'file_access', settings.KEEN_PRIVATE_PROJECT_ID,
-                            settings.KEEN_PRIVATE_WRITE_KEY, action, domain='private')
+        shipper.submit(log_shipper.keen_event('private', 'file_access', keen_payload, action))
 
     if (
         errors is not None or
@@ -187,57 +180,36 @@ async def log_to_keen(action, api_version, request, source, destination=None, er
     # build and ship the public file stats payload
     file_metadata = keen_payload['files']['source']
     public_payload = _build_public_file_payload(action, request, file_metadata)
-    await _send_to_keen(public_payload, 'file_stats', settings.KEEN_PUBLIC_PROJECT_ID,
-                        settings.KEEN_PUBLIC_WRITE_KEY, action, domain='public')
-
-
-@utils.async_retry(retries=5, backoff=5)
-async def _send_to_keen(payload, collection, project_id, write_key, action, domain='private'):
-    """Serialize and send an event to Keen.  If an error occurs, try up to five more times.
-    Will raise an excpetion if the event cannot be sent."""
-
-    serialized = json.dumps(payload).encode('UTF-8')
-    logger.debug(f"Serialized payload: {serialized}")
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': write_key,
-    }
-    url = '{}/{}/projects/{}/events/{}'.format(settings.KEEN_API_BASE_URL,
-                                                   settings.KEEN_API_VERSION,
-                                                   project_id, collection)
-
-    async with aiohttp.request('POST', url, headers=headers, data=serialized) as resp:
-        if resp.status == 201:
-            logger.info(f'Successfully logged {action} to {collection} collection in {domain} Keen')
-        else:
-            raise Exception('Failed to log {} to {} collection in {} Keen. Status: {} Error: {}'.format(
-                action, collection, domain, str(int(resp.status)), await resp.read()
-            ))
-        return
+    shipper.submit(log_shipper.keen_event('public', 'file_stats', public_payload, action))
 
 
 def log_file_action(action, source, api_version, destination=None, request=None,
                     start_time=None, errors=None, bytes_downloaded=None, bytes_uploaded=None):
-    """Kick off logging actions in the background. Returns array of asyncio.Tasks."""
+    """Kick off logging actions in the background. Returns array of asyncio.Tasks.  The tasks
+    finish once the events are queued, not delivered, see `waterbutler.core.log_shipper`."""
     request = request or {}
     return [
-        log_to_callback(action, source=source, destination=destination,
-                        start_time=start_time, errors=errors, request=request,),
-        asyncio.ensure_future(
+        utils.background(asyncio.ensure_future(
+            log_to_callback(action, source=source, destination=destination,
+                            start_time=start_time, errors=errors, request=request,),
+        )),
+        utils.background(asyncio.ensure_future(
             log_to_keen(action, source=source, destination=destination,
                         errors=errors, request=request, api_version=api_version,
                         bytes_downloaded=bytes_downloaded, bytes_uploaded=bytes_uploaded,),
-        ),
+        )),
     ]
 
 
 async def wait_for_log_futures(*args, **kwargs):
     """Background actions that are still running when a celery task returns may not complete.
     This method allows the celery task to wait for logging to finish before returning."""
-    return await asyncio.wait(
+    result = await asyncio.wait(
         log_file_action(*args, **kwargs),
         return_when=asyncio.ALL_COMPLETED
     )
+    await log_shipper.get_shipper().flush()
+    return result
 
 
 def _munge_file_metadata(metadata):
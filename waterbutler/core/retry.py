@@ -0,0 +1,204 @@
+import time
+import random
+import logging
+from urllib import parse
+
+from waterbutler import settings as wb_settings
+from waterbutler.core.limiter import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# (provider name, upstream host) -> Upstream, shared by every provider instance in the process
+_UPSTREAMS = {}  # type: dict
+
+
+class RetryBudget:
+    """A token bucket that caps retries to a fraction of live traffic.  Every request deposits
+    ``ratio`` tokens and every retry withdraws one, so that during a brownout at most about
+    ``ratio`` extra requests are sent per original one.  The bucket starts full, with
+    ``max_tokens`` tokens, so that quiet upstreams can still retry.
+    """
+
+    def __init__(self, ratio, max_tokens):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = float(max_tokens)
+
+    def deposit(self):
+        self.tokens = min(self.tokens + self.ratio, self.max_tokens)
+
+    def withdraw(self):
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    """Fail fast once an upstream is clearly down.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and requests are refused
+    without being sent: `make_request` raises a `ServiceUnavailableError`.  Once ``reset_timeout``
+    seconds have passed a single probe request is let through (half-open): if it succeeds the
+    breaker closes again, otherwise it stays open for another ``reset_timeout``.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_sent_at = 0.0
+
+    def allow(self):
+        now = time.monotonic()
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_sent_at = now
+            return True
+        # half-open: only one probe at a time, unless the last one never came back
+        if now - self.probe_sent_at < self.reset_timeout:
+            return False
+        self.probe_sent_at = now
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f'Opening circuit breaker after {self.failures} failures')
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class Upstream:
+    """Retry budget and circuit breaker state for one upstream host."""
+
+    def __init__(self, key, budget, breaker):
+        self.key = key
+        self.budget = budget
+        self.breaker = breaker
+
+    @property
+    def host(self):
+        return self.key[1]
+
+    def stats(self):
+        return {
+            'host': self.host,
+            'breaker': self.breaker.state,
+            'failures': self.breaker.failures,
+            'budget': round(self.budget.tokens, 2),
+        }
+
+
+class RetryPolicy:
+    """Decide whether and when `BaseProvider.make_request` retries a failed request.
+
+    * Only responses whose status is in ``retry_on`` are retried.
+    * The delay grows exponentially with decorrelated jitter (each delay is drawn between
+      ``base_delay`` and three times the previous one, capped at ``max_delay``), so that requests
+      that failed together don't retry together.
+    * A ``Retry-After`` header takes precedence over the computed delay.  If it asks for more than
+      ``max_retry_after`` seconds the request is not retried at all.
+    * Each upstream host has a `RetryBudget` and a `CircuitBreaker` shared across the process.
+
+    Providers that need different behavior can set `BaseProvider.retry_policy` to an instance of
+    this class or a subclass.
+    """
+
+    def __init__(self, retry_on=None, base_delay=1.0, max_delay=20.0, max_retry_after=60.0,
+                 budget_ratio=0.2, budget_max_tokens=10, breaker_threshold=5,
+                 breaker_reset_timeout=30.0):
+        self.retry_on = retry_on or {408, 502, 503, 504}
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.budget_ratio = budget_ratio
+        self.budget_max_tokens = budget_max_tokens
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
+
+    @classmethod
+    def from_settings(cls, provider_name, retry_on=None):
+        """Build a policy from the ``RETRY`` settings, applying any overrides configured for
+        ``provider_name`` in ``RETRY.PROVIDERS``."""
+        config = {
+            'BASE_DELAY': wb_settings.RETRY_BASE_DELAY,
+            'MAX_DELAY': wb_settings.RETRY_MAX_DELAY,
+            'MAX_RETRY_AFTER': wb_settings.RETRY_MAX_RETRY_AFTER,
+            'BUDGET_RATIO': wb_settings.RETRY_BUDGET_RATIO,
+            'BUDGET_MAX_TOKENS': wb_settings.RETRY_BUDGET_MAX_TOKENS,
+            'BREAKER_THRESHOLD': wb_settings.RETRY_BREAKER_THRESHOLD,
+            'BREAKER_RESET_TIMEOUT': wb_settings.RETRY_BREAKER_RESET_TIMEOUT,
+        }
+        config.update(wb_settings.RETRY_PROVIDERS.get(provider_name, {}))
+        return cls(
+            retry_on=retry_on,
+            base_delay=float(config['BASE_DELAY']),
+            max_delay=float(config['MAX_DELAY']),
+            max_retry_after=float(config['MAX_RETRY_AFTER']),
+            budget_ratio=float(config['BUDGET_RATIO']),
+            budget_max_tokens=int(config['BUDGET_MAX_TOKENS']),
+            breaker_threshold=int(config['BREAKER_THRESHOLD']),
+            breaker_reset_timeout=float(config['BREAKER_RESET_TIMEOUT']),
+        )
+
+    def upstream(self, provider_name, url):
+        """Return the shared `Upstream` state for requests from ``provider_name`` to the host of
+        ``url``."""
+        key = (provider_name, parse.urlsplit(url).netloc)
+        try:
+            return _UPSTREAMS[key]
+        except KeyError:
+            upstream = _UPSTREAMS[key] = Upstream(
+                key,
+                RetryBudget(self.budget_ratio, self.budget_max_tokens),
+                CircuitBreaker(self.breaker_threshold, self.breaker_reset_timeout),
+            )
+            return upstream
+
+    def record(self, upstream, status):
+        """Feed the outcome of one request to ``upstream``'s budget and breaker.  ``status`` is
+        `None` if no response was received."""
+        upstream.budget.deposit()
+        if status is None or (status in self.retry_on and status != 429):
+            upstream.breaker.record_failure()
+        else:
+            upstream.breaker.record_success()
+
+    def should_retry(self, upstream, code):
+        """Whether a request to ``upstream`` that failed with ``code``, `None` if no response was
+        received, may be sent again.  Spends from ``upstream``'s budget if so."""
+        return (code is None or code in self.retry_on) and upstream.budget.withdraw()
+
+    def delay(self, previous, retry_after=None):
+        """Return the number of seconds to wait before the next attempt, or `None` if the
+        upstream asked us to wait longer than we're willing to.
+
+        :param float previous: the previous delay, or `None` on the first retry
+        :param str retry_after: the ``Retry-After`` header of the failed response, if any
+        """
+        server_delay = parse_retry_after(retry_after)
+        if server_delay is not None:
+            return server_delay if server_delay <= self.max_retry_after else None
+        return min(self.max_delay,
+                   random.uniform(self.base_delay, (previous or self.base_delay) * 3))
+
+
+def stats():
+    """Budget and breaker state of every upstream seen by this process."""
+    return [upstream.stats() for upstream in _UPSTREAMS.values()]
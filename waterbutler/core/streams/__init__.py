@@ -8,6 +8,9 @@ from waterbutler.core.streams.base import EmptyStream  # noqa
 from waterbutler.core.streams.file import FileStreamReader  # noqa
 from waterbutler.core.streams.file import PartialFileStreamReader  # noqa
 
+from waterbutler.core.streams.spooled import SpooledPart  # noqa
+from waterbutler.core.streams.spooled import SpooledPartStream  # noqa
+
 from waterbutler.core.streams.http import FormDataStream  # noqa
 from waterbutler.core.streams.http import RequestStreamReader  # noqa
 from waterbutler.core.streams.http import ResponseStreamReader  # noqa
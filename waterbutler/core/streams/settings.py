@@ -13,3 +13,9 @@ ZIP_EXTENSIONS = config.get('ZIP_EXTENSIONS', '.zip .gz .bzip .bzip2 .rar .xz .b
 # (approximately equivalent to a 6).  See the zlib docs for more:
 # https://docs.python.org/3/library/zlib.html#zlib.compressobj
 ZIP_COMPRESSION_LEVEL = int(config.get('ZIP_COMPRESSION_LEVEL', zlib.Z_DEFAULT_COMPRESSION))
+
+# Parts of uploads spooled for their digests or length, see `SpooledPart`, are held in memory up
+# to ``SPOOLED_PART_MAX_MEMORY`` bytes and written to a temporary file beyond that.  What is read
+# from the upload is written to the part ``SPOOLED_PART_WRITE_SIZE`` bytes at a time.
+SPOOLED_PART_MAX_MEMORY = int(config.get('SPOOLED_PART_MAX_MEMORY', 8 * 1024 * 1024))
+SPOOLED_PART_WRITE_SIZE = int(config.get('SPOOLED_PART_WRITE_SIZE', 1024 * 1024))
@@ -0,0 +1,112 @@
+import asyncio
+import hashlib
+import tempfile
+import threading
+
+from waterbutler.core.streams import settings
+from waterbutler.core.streams.base import BaseStream
+
+
+class SpooledPart:
+    """Up to ``size`` bytes of a stream, held for providers that need a part's digests or length
+    before they can send it.  ``size`` of `None` takes the rest of the stream.
+
+    The part is kept in memory up to ``max_memory`` bytes and spills to a temporary file beyond
+    that.  The bytes are written, hashed with each of ``digests`` and read back on the default
+    executor, so neither the disk nor hashing blocks the event loop.  Every call to `stream`
+    reads the part from its start, so a request that failed can be sent again.
+    """
+
+    def __init__(self, size=None, digests=('sha1', ), max_memory=None, write_size=None):
+        self.size = size
+        self.max_memory = settings.SPOOLED_PART_MAX_MEMORY if max_memory is None else max_memory
+        self.write_size = write_size or settings.SPOOLED_PART_WRITE_SIZE
+        self.written = 0
+        self._hashes = {name: hashlib.new(name) for name in digests}
+        self._file = tempfile.SpooledTemporaryFile(max_size=self.max_memory)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def on_disk(self):
+        return self._file._rolled
+
+    async def fill(self, stream):
+        """Read the part from ``stream``.  Returns the number of bytes read, less than ``size``
+        if the stream ended early."""
+        loop = asyncio.get_event_loop()
+        pending, pending_size = [], 0
+        while self.size is None or self.written + pending_size < self.size:
+            wanted = self.write_size - pending_size
+            if self.size is not None:
+                wanted = min(wanted, self.size - self.written - pending_size)
+            chunk = await stream.read(wanted)
+            if not chunk:
+                break
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size >= self.write_size:
+                await loop.run_in_executor(None, self._write, b''.join(pending))
+                pending, pending_size = [], 0
+        if pending:
+            await loop.run_in_executor(None, self._write, b''.join(pending))
+        return self.written
+
+    def digest(self, name):
+        return self._hashes[name].digest()
+
+    def hexdigest(self, name):
+        return self._hashes[name].hexdigest()
+
+    async def read(self, offset, size):
+        """``size`` bytes of the part from ``offset``."""
+        return await asyncio.get_event_loop().run_in_executor(None, self._read, offset, size)
+
+    def stream(self):
+        """A new stream of the whole part."""
+        return SpooledPartStream(self)
+
+    def close(self):
+        self._file.close()
+
+    def _write(self, data):
+        with self._lock:
+            self._file.seek(0, 2)
+            self._file.write(data)
+        for hasher in self._hashes.values():
+            hasher.update(data)
+        self.written += len(data)
+
+    def _read(self, offset, size):
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(size)
+
+
+class SpooledPartStream(BaseStream):
+    """Reads a `SpooledPart` from its start."""
+
+    def __init__(self, part):
+        super().__init__()
+        self.part = part
+        self.position = 0
+        self.content_type = 'application/octet-stream'
+
+    @property
+    def size(self):
+        return self.part.written
+
+    async def _read(self, size=-1):
+        remaining = self.part.written - self.position
+        if size < 0 or size > remaining:
+            size = remaining
+        data = await self.part.read(self.position, size) if size else b''
+        self.position += len(data)
+        if self.position >= self.part.written:
+            self.feed_eof()
+        return data
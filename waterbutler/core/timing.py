@@ -0,0 +1,115 @@
+"""Where the time of one API request went.
+
+`ProviderHandler` starts a `RequestTiming` for every request and times each phase of it, such as
+authorization or path validation, with `RequestTiming.phase`.  While the timing is current,
+every request a provider sends upstream through ``make_request`` is added to it as well, so a
+slow request can be blamed on WaterButler, on the upstream service, or on the client reading
+the response.
+
+The phases are reported in the ``Server-Timing`` response header, see `server_timing`, logged
+for slow requests and recorded in the ``waterbutler_request_phase_seconds`` histogram.  When
+tracing is enabled the request and each of its phases is also a span, see
+`waterbutler.core.tracing`.
+"""
+import time
+import contextlib
+import contextvars
+
+from waterbutler.core import tracing
+
+_CURRENT = contextvars.ContextVar('request_timing', default=None)  # type: ignore
+
+# How long the first chunk of a download took to arrive from the provider
+TTFB = 'ttfb'
+UPSTREAM = 'upstream'
+
+
+def current():
+    """The `RequestTiming` of the request being handled in this task, or `None`."""
+    return _CURRENT.get()
+
+
+class RequestTiming:
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.phases = {}  # type: dict
+        self.upstream_count = 0
+        self.upstream_seconds = 0.0
+        self._open = None
+        self._span = None
+
+    def activate(self, **attributes):
+        """Make this the current timing of the running task, and of the tasks it starts.  The
+        ``attributes`` describe the request to tracing."""
+        _CURRENT.set(self)
+        self._span = tracing.start_span('waterbutler.request', current=True, **attributes)
+
+    def finish(self, **attributes):
+        """End the open phase and the request's span."""
+        self.end()
+        tracing.end_span(self._span, **attributes)
+        self._span = None
+
+    def add(self, name, seconds):
+        """Add ``seconds`` to the phase ``name``; a phase entered several times adds up."""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.monotonic()
+        try:
+            with tracing.span(f'waterbutler.{name}'):
+                yield
+        finally:
+            self.add(name, time.monotonic() - start)
+
+    def begin(self, name):
+        """Start timing the phase ``name``, which lasts until `end` or the next `begin`.  For
+        phases that don't fit in one block, like the provider operation that ends whenever the
+        response starts streaming."""
+        self.end()
+        self._open = (name, time.monotonic(), tracing.start_span(f'waterbutler.{name}'))
+
+    def end(self, name=None):
+        """End the phase started by `begin`, if it is ``name`` or ``name`` isn't given."""
+        if self._open is not None and name in (None, self._open[0]):
+            name, start, span = self._open
+            self._open = None
+            self.add(name, time.monotonic() - start)
+            tracing.end_span(span)
+
+    def add_upstream(self, seconds):
+        """Count a request sent upstream, ``seconds`` being how long its response headers took."""
+        self.upstream_count += 1
+        self.upstream_seconds += seconds
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def serialize(self):
+        """The phases in milliseconds, for logging."""
+        return {
+            'total_ms': round(self.elapsed * 1000, 1),
+            'phases_ms': {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            'upstream_calls': self.upstream_count,
+            'upstream_ms': round(self.upstream_seconds * 1000, 1),
+        }
+
+    def server_timing(self):
+        """The value of a ``Server-Timing`` header for the phases timed so far, e.g.
+        ``auth;dur=12.3, upstream;dur=85.0;desc="2 calls", total;dur=110.2``."""
+        entries = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.phases.items()]
+        if self.upstream_count:
+            entries.append(f'{UPSTREAM};dur={self.upstream_seconds * 1000:.1f};'
+                           f'desc="{self.upstream_count} calls"')
+        entries.append(f'total;dur={self.elapsed * 1000:.1f}')
+        return ', '.join(entries)
+
+
+def record_upstream(seconds):
+    """Add an upstream request to the current timing, if there is one."""
+    timing = _CURRENT.get()
+    if timing is not None:
+        timing.add_upstream(seconds)
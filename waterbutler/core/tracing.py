@@ -0,0 +1,134 @@
+"""Optional OpenTelemetry tracing.
+
+With ``TRACING.ENABLED`` set, WaterButler records spans for the phases of v1 requests (see
+`waterbutler.core.timing`), for every request providers send upstream, for the download and
+upload halves of copies between providers, and for celery moves and copies.  The trace context of
+the request that queued a task travels in the celery message, so the task's spans belong to the
+same trace as the request.
+
+The ``opentelemetry-api`` and ``opentelemetry-sdk`` packages are not installed with WaterButler.
+Without them, or with tracing disabled, every function here does nothing and returns `None`.
+``TRACING.EXPORTER`` picks where spans are sent: ``otlp`` (needs
+``opentelemetry-exporter-otlp``), ``console``, or ``none`` to leave the tracer provider to
+whatever the process was set up with, e.g. ``opentelemetry-instrument``.
+"""
+import logging
+import contextlib
+
+from waterbutler import settings as wb_settings
+from waterbutler.version import __version__
+
+try:
+    from opentelemetry import trace as otel_trace
+    from opentelemetry import context as otel_context
+    from opentelemetry import propagate as otel_propagate
+except ImportError:  # pragma: no cover
+    otel_trace = otel_context = otel_propagate = None
+
+logger = logging.getLogger(__name__)
+
+_TRACER_PROVIDER = None
+
+
+def enabled():
+    return wb_settings.TRACING_ENABLED and otel_trace is not None
+
+
+def configure(tracer_provider=None):
+    """Set up the tracer provider named by ``TRACING.EXPORTER``, or use ``tracer_provider``
+    instead, e.g. one with an in-memory exporter in tests.  Called once when a server or
+    celery worker starts."""
+    global _TRACER_PROVIDER
+    if tracer_provider is not None:
+        _TRACER_PROVIDER = tracer_provider
+        return
+    if not wb_settings.TRACING_ENABLED:
+        return
+    if otel_trace is None:
+        logger.warning('Tracing is enabled but opentelemetry is not installed')
+        return
+    if wb_settings.TRACING_EXPORTER == 'none':
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    if wb_settings.TRACING_EXPORTER == 'console':
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter as Exporter
+    else:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (  # type: ignore
+            OTLPSpanExporter as Exporter
+        )
+
+    provider = TracerProvider(
+        resource=Resource.create({'service.name': wb_settings.TRACING_SERVICE_NAME}),
+    )
+    provider.add_span_processor(BatchSpanProcessor(Exporter()))
+    otel_trace.set_tracer_provider(provider)
+
+
+def _tracer():
+    return otel_trace.get_tracer('waterbutler', __version__, tracer_provider=_TRACER_PROVIDER)
+
+
+def _attributes(attributes):
+    # opentelemetry drops attributes whose value is None, with a warning
+    return {key: value for key, value in attributes.items() if value is not None}
+
+
+def _parent(carrier):
+    # without trace context in the carrier, the span stays a child of the current one
+    return otel_propagate.extract(carrier, context=otel_context.get_current()) if carrier else None
+
+
+@contextlib.contextmanager
+def span(name, carrier=None, **attributes):
+    """Run the block in a new span, a child of the current span or of the context propagated in
+    ``carrier``.  Yields the span, or `None` when tracing is disabled."""
+    if not enabled():
+        yield None
+        return
+    with _tracer().start_as_current_span(name, context=_parent(carrier),
+                                         attributes=_attributes(attributes)) as current:
+        yield current
+
+
+def start_span(name, carrier=None, current=False, **attributes):
+    """Start a span that is ended with `end_span`, for spans that don't fit in one block.  With
+    ``current``, the span becomes the parent of spans started later by this task and the tasks it
+    starts."""
+    if not enabled():
+        return None
+    started = _tracer().start_span(name, context=_parent(carrier),
+                                   attributes=_attributes(attributes))
+    if current:
+        otel_context.attach(otel_trace.set_span_in_context(started))
+    return started
+
+
+def end_span(started, **attributes):
+    if started is None:
+        return
+    started.set_attributes(_attributes(attributes))
+    started.end()
+
+
+def set_attributes(**attributes):
+    """Add attributes to the current span."""
+    if enabled():
+        otel_trace.get_current_span().set_attributes(_attributes(attributes))
+
+
+def add_event(name, **attributes):
+    """Record an event, like a retry, on the current span."""
+    if enabled():
+        otel_trace.get_current_span().add_event(name, attributes=_attributes(attributes))
+
+
+def inject(carrier):
+    """Add the current trace context to the dict ``carrier``, e.g. the headers of a celery
+    message, and return it."""
+    if enabled():
+        otel_propagate.inject(carrier)
+    return carrier
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import itertools
+import contextvars
+import collections
+
+logger = logging.getLogger(__name__)
+
+# the transfer the current task is part of, and the work item it is running
+_TRANSFER = contextvars.ContextVar('tree_transfer', default=None)  # type: contextvars.ContextVar
+_ITEM = contextvars.ContextVar('tree_transfer_item', default=None)  # type: contextvars.ContextVar
+
+# how many queued files past the head of the queue are considered when the head doesn't fit in the
+# byte window
+LOOKAHEAD = 64
+
+
+class _Item:
+
+    __slots__ = ('func', 'args', 'kwargs', 'size', 'future', 'skipped', 'released')
+
+    def __init__(self, func, args, kwargs, size, future):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.size = size
+        self.future = future
+        self.skipped = 0
+        self.released = False
+
+    @property
+    def weight(self):
+        return self.size or 0
+
+
+class TreeTransfer:
+    """Schedule the operations of a recursive folder copy or move across the whole tree.
+
+    * At most ``concurrency`` operations run at once, however the tree is shaped.  Folders are
+      scheduled ahead of files, since creating a folder is what makes its children available.  A
+      folder only holds its slot while it is being created and listed, not while its children run.
+    * Files are weighted by size.  A file is only started if it fits in the ``max_bytes`` window
+      (or if nothing else is in flight), and smaller files further down the queue may overtake a
+      large one that doesn't fit.  A file that has been overtaken ``concurrency`` times is not
+      overtaken again, so that large files can't be starved.
+    * The first operation to fail cancels everything else, and its error is raised from `run`.
+
+    Code running inside a transfer can find it with `TreeTransfer.current`.
+    """
+
+    def __init__(self, concurrency, max_bytes):
+        self.concurrency = max(int(concurrency), 1)
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self.bytes_in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self._folders = collections.deque()  # type: collections.deque
+        self._files = collections.deque()  # type: collections.deque
+        self._running = {}  # type: dict
+        self._error = None  # type: Exception
+
+    @staticmethod
+    def current():
+        return _TRANSFER.get()
+
+    def stats(self):
+        return {
+            'completed': self.completed,
+            'peak_in_flight': self.peak_in_flight,
+            'concurrency': self.concurrency,
+        }
+
+    async def run(self, coro):
+        """Run ``coro`` as the root of the transfer and return its result."""
+        token = _TRANSFER.set(self)
+        try:
+            return await coro
+        except BaseException as exc:
+            self._abort()
+            if self._running:
+                await asyncio.wait(list(self._running))
+            if self._error is not None and self._error is not exc:
+                raise self._error
+            raise
+        finally:
+            _TRANSFER.reset(token)
+
+    def submit(self, func, *args, size=None, **kwargs):
+        """Queue ``func(*args, **kwargs)`` and return a future for its result.  Operations on
+        folders are submitted without a ``size``."""
+        future = asyncio.get_event_loop().create_future()
+        if self._error is not None:
+            future.cancel()
+            return future
+        item = _Item(func, args, kwargs, size, future)
+        (self._folders if size is None else self._files).append(item)
+        self._dispatch()
+        return future
+
+    def detach(self):
+        """Give up the slot held by the calling operation, e.g. once a folder has been created and
+        is only waiting on its children."""
+        item = _ITEM.get()
+        if item is not None:
+            self._release(item)
+            self._dispatch()
+
+    def _fits(self, item):
+        return self.bytes_in_flight == 0 or self.bytes_in_flight + item.weight <= self.max_bytes
+
+    def _next(self):
+        if self._folders:
+            return self._folders.popleft()
+        if not self._files:
+            return None
+
+        head = self._files[0]
+        if self._fits(head):
+            return self._files.popleft()
+        if head.skipped >= self.concurrency:
+            return None
+        for index, item in enumerate(itertools.islice(self._files, 1, LOOKAHEAD), 1):
+            if self._fits(item):
+                head.skipped += 1
+                del self._files[index]
+                return item
+        return None
+
+    def _dispatch(self):
+        while self.in_flight < self.concurrency:
+            item = self._next()
+            if item is None:
+                return
+            if item.future.done():
+                continue
+            self.in_flight += 1
+            self.bytes_in_flight += item.weight
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            task = asyncio.ensure_future(self._run_item(item))
+            self._running[task] = item
+
+    def _release(self, item):
+        if not item.released:
+            item.released = True
+            self.in_flight -= 1
+            self.bytes_in_flight -= item.weight
+
+    async def _run_item(self, item):
+        _TRANSFER.set(self)
+        _ITEM.set(item)
+        try:
+            result = await item.func(*item.args, **item.kwargs)
+        except asyncio.CancelledError:
+            item.future.cancel()
+            raise
+        except Exception as exc:
+            if self._error is None:
+                logger.debug(f'Transfer failed with {exc!r}, cancelling the remaining operations')
+                self._error = exc
+                self._abort()
+            if not item.future.done():
+                item.future.set_exception(exc)
+        else:
+            if not item.future.done():
+                item.future.set_result(result)
+        finally:
+            self._running.pop(asyncio.current_task(), None)
+            self._release(item)
+            self.completed += 1
+            self._dispatch()
+
+    def _abort(self):
+        for item in itertools.chain(self._folders, self._files):
+            item.future.cancel()
+        self._folders.clear()
+        self._files.clear()
+        current = asyncio.current_task()
+        for task in self._running:
+            if task is not current:
+                task.cancel()
@@ -4,6 +4,7 @@ import pytz
 import asyncio
 import logging
 import functools
+import datetime
 import unicodedata
 import dateutil.parser
 from urllib import parse
@@ -18,6 +19,11 @@ from waterbutler.core.signing import Signer
 from waterbutler.core.streams import EmptyStream
 from waterbutler.server import settings as server_settings
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 
 def rehydrate(payload):
     from waterbutler.core.metadata import BaseMetadata  # local import to break cycles
@@ -67,6 +73,22 @@ def as_task(func):
     return wrapped
 
 
+# Tasks that outlive the request that started them, see `background`
+_BACKGROUND = set()  # type: set
+
+
+def background(future):
+    """Keep a reference to ``future``, a callback or a move handed off by a request, until it is
+    done.  A stopping server waits for these, see `waterbutler.server.workers`."""
+    _BACKGROUND.add(future)
+    future.add_done_callback(_BACKGROUND.discard)
+    return future
+
+
+def background_tasks():
+    return set(_BACKGROUND)
+
+
 def async_retry(retries=5, backoff=1, exceptions_tuple=(Exception, )):
 
     def _async_retry(func):
@@ -103,9 +125,9 @@ def async_retry(retries=5, backoff=1, exceptions_tuple=(Exception, )):
     return _async_retry
 
 
-async def send_signed_request(method, url, payload):
+async def send_signed_request(method, url, payload, session=None):
     """Calculates a signature for a payload, then sends a request to the given url with the payload
-    and signature.
+    and signature.  Sent with ``session`` if given, otherwise with a session of its own.
 
     This method will read the response into memory before returning, so **DO NOT** use it if the
     response may be very large.  As of 2019-04-06, this function is only used by the callback logging
@@ -114,7 +136,8 @@ async def send_signed_request(method, url, payload):
 
     message, signature = signer.sign_payload(payload)
 
-    async with aiohttp.request(
+    request = aiohttp.request if session is None else session.request
+    async with request(
             method,
             url,
             data=json.dumps({
@@ -129,7 +152,15 @@ async def send_signed_request(method, url, payload):
 def normalize_datetime(date_string):
     if date_string is None:
         return None
-    parsed_datetime = dateutil.parser.parse(date_string)
+    parsed_datetime = None
+    if date_string[4:5] == '-':
+        # most providers send ISO 8601, which the stdlib parses far faster than dateutil
+        try:
+            parsed_datetime = datetime.datetime.fromisoformat(date_string)
+        except ValueError:
+            pass
+    if parsed_datetime is None:
+        parsed_datetime = dateutil.parser.parse(date_string)
     if not parsed_datetime.tzinfo:
         parsed_datetime = parsed_datetime.replace(tzinfo=pytz.UTC)
     parsed_datetime = parsed_datetime.astimezone(tz=pytz.UTC)
@@ -137,6 +168,18 @@ def normalize_datetime(date_string):
     return parsed_datetime.isoformat()
 
 
+def json_encode(value):
+    """Encode ``value`` as JSON, with ``orjson`` if it is installed.  For large responses such as
+    folder listings, where the stdlib encoder is a noticeable part of the time spent."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode('utf-8')
+        except TypeError:
+            # e.g. integers larger than 64 bits, which json handles
+            pass
+    return json.dumps(value)
+
+
 def strip_for_disposition(filename):
     """Convert given filename to a form useable by a non-extended parameter.
 
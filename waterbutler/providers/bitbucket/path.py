@@ -1,3 +1,4 @@
+import copy
 import functools
 from urllib import parse
 
@@ -6,6 +7,8 @@ from waterbutler.core import path
 
 class BitbucketPathPart(path.WaterButlerPathPart):
 
+    __slots__ = ()
+
     bitbucket_safe_chars = '~`!@$^&*()_-+={}|[];:,<.>"\' '
 
     DECODE = parse.unquote
@@ -14,9 +17,7 @@ class BitbucketPathPart(path.WaterButlerPathPart):
 
     def increment_name(self, _id=None):
         """Overridden to preserve branch from _id upon incrementing"""
-        self._id = _id or (self._id[0], self._id[1])
-        self._count += 1
-        return self
+        return super().increment_name(_id or (self._id[0], self._id[1]))
 
 
 class BitbucketPath(path.WaterButlerPath):
@@ -54,6 +55,8 @@ class BitbucketPath(path.WaterButlerPath):
         return super().child(name, _id=_id, folder=folder)
 
     def set_commit_sha(self, commit_sha):
+        # parts may be shared with the paths this one was made from or has made
+        self._parts = [copy.copy(part) for part in self._parts]
         for part in self.parts:
             part._id = (commit_sha, part._id[1])
 
@@ -2,14 +2,14 @@ import json
 import base64
 import hashlib
 import logging
-import tempfile
+import asyncio
 from asyncio import sleep
 from http import HTTPStatus
 
 import aiohttp
 
 from waterbutler.core.path import WaterButlerPath
-from waterbutler.core import exceptions, streams, provider
+from waterbutler.core import exceptions, streams, provider, ranged
 from waterbutler.core.exceptions import RetryChunkedUploadCommit
 
 from waterbutler.providers.box import settings as pd_settings
@@ -19,6 +19,47 @@ from waterbutler.providers.box.metadata import (BaseBoxMetadata, BoxRevision,
 logger = logging.getLogger(__name__)
 
 
+class BoxPartUpload(ranged.PartUpload):
+    """A chunked upload session fed by `waterbutler.core.ranged`, see
+    `BoxProvider.start_part_upload`.  Box wants the sha1 of every part as well as of the whole
+    file, which is computed as the parts go by.
+    """
+
+    def __init__(self, provider, path, size, session_data):
+        self.provider = provider
+        self.path = path
+        self.size = size
+        self.session_data = session_data
+        self.part_size = session_data['part_size']
+        self.manifest = []  # type: list
+        self.sha1 = hashlib.sha1()
+
+    async def hash_in_order(self, part):
+        await asyncio.get_event_loop().run_in_executor(None, self.sha1.update, part.data)
+
+    async def upload_part(self, part):
+        part_sha = await part.digest('sha1')
+        self.manifest.append(await self.provider._send_part(
+            streams.StringStream(part.data), part.size, part.offset, self.size,
+            base64.standard_b64encode(part_sha).decode(), self.session_data['id'],
+        ))
+
+    @property
+    def data_sha(self):
+        return base64.standard_b64encode(self.sha1.digest()).decode()
+
+    async def complete(self):
+        manifest = sorted(self.manifest, key=lambda part: part['offset'])
+        entry = await self.provider._commit_chunked_upload(self.session_data, manifest,
+                                                           self.data_sha)
+        created = self.path.identifier is None
+        self.path._parts[-1]._id = entry['id']
+        return BoxFileMetadata(entry, self.path), created
+
+    async def abort(self):
+        return await self.provider._abort_chunked_upload(self.session_data, self.data_sha)
+
+
 class BoxProvider(provider.BaseProvider):
     """Provider for the Box.com cloud storage service.
 
@@ -29,7 +70,8 @@ class BoxProvider(provider.BaseProvider):
     NAME = 'box'
     BASE_URL = pd_settings.BASE_URL
     NONCHUNKED_UPLOAD_LIMIT = pd_settings.NONCHUNKED_UPLOAD_LIMIT  # 50MB default
-    TEMP_CHUNK_SIZE = pd_settings.TEMP_CHUNK_SIZE  # 32KiB default
+    UPLOAD_PART_CONCURRENCY = pd_settings.UPLOAD_PART_CONCURRENCY
+    UPLOAD_PART_RETRIES = pd_settings.UPLOAD_PART_RETRIES
     UPLOAD_COMMIT_RETRIES = pd_settings.UPLOAD_COMMIT_RETRIES
 
     def __init__(self, auth, credentials, settings, **kwargs):
@@ -195,6 +237,17 @@ class BoxProvider(provider.BaseProvider):
     def can_intra_copy(self, other: provider.BaseProvider, path: WaterButlerPath = None) -> bool:
         return self == other
 
+    def can_download_ranges(self) -> bool:
+        return True
+
+    def can_upload_parts(self, size: int) -> bool:
+        return size > self.NONCHUNKED_UPLOAD_LIMIT
+
+    async def start_part_upload(self, path: WaterButlerPath, size: int) -> BoxPartUpload:
+        session_data = await self._open_chunked_upload_session(path, size)
+        logger.debug(f'chunked upload session data: {json.dumps(session_data)}')
+        return BoxPartUpload(self, path, size, session_data)
+
     async def intra_copy(self,  # type: ignore
                          dest_provider: provider.BaseProvider, src_path: WaterButlerPath,
                          dest_path: WaterButlerPath) -> tuple[BaseBoxMetadata, bool]:
@@ -558,15 +611,7 @@ class BoxProvider(provider.BaseProvider):
             logger.debug(f'chunked upload parts manifest: {json.dumps(parts_manifest)}')
             data_sha = base64.standard_b64encode(stream.writers['sha1'].digest).decode()
             # Step 4. Complete the session and return the uploaded file's metadata.
-            retry = self.UPLOAD_COMMIT_RETRIES
-            while retry > 0:
-                retry -= 1
-                try:
-                    metadata = await self._complete_chunked_upload_session(session_data,
-                                                                           parts_manifest, data_sha)
-                    break
-                except RetryChunkedUploadCommit:
-                    continue
+            metadata = await self._commit_chunked_upload(session_data, parts_manifest, data_sha)
         except Exception as err:
             msg = 'An unexpected error has occurred during the multi-part upload.'
             logger.error(f'{msg} upload_id={session_data} error={err!r}')
@@ -577,9 +622,32 @@ class BoxProvider(provider.BaseProvider):
             raise exceptions.UploadError(msg)
         return metadata
 
+    async def _commit_chunked_upload(self, session_data: dict, parts_manifest: list,
+                                     data_sha: str) -> dict:
+        """Complete the session, retrying up to ``UPLOAD_COMMIT_RETRIES`` times while Box is
+        still processing the parts.  Returns the uploaded file's metadata, and raises an
+        `UploadError` if Box never finished.
+        """
+        retry = self.UPLOAD_COMMIT_RETRIES
+        while retry > 0:
+            retry -= 1
+            try:
+                return await self._complete_chunked_upload_session(session_data,
+                                                                   parts_manifest, data_sha)
+            except RetryChunkedUploadCommit:
+                continue
+        raise exceptions.UploadError(
+            'Box did not finish processing the uploaded parts, please try again later',
+            code=HTTPStatus.SERVICE_UNAVAILABLE,
+        )
+
     async def _create_chunked_upload_session(self, path: WaterButlerPath,
                                              stream: streams.BaseStream) -> dict:
-        """Create an upload session to use with a chunked upload.
+        """Create an upload session for ``stream``, see `_open_chunked_upload_session`."""
+        return await self._open_chunked_upload_session(path, stream.size)
+
+    async def _open_chunked_upload_session(self, path: WaterButlerPath, size: int) -> dict:
+        """Create an upload session to use with a chunked upload of ``size`` bytes.
 
         The upload session metadata contains a session identifier, the partitioning scheme, and
         urls to the chunked upload endpoints. When the upload has completed the session will need
@@ -601,7 +669,7 @@ class BoxProvider(provider.BaseProvider):
             segments = ['files', 'upload_sessions']
             data['folder_id'] = path.parent.identifier
         data.update({
-            'file_size': stream.size,
+            'file_size': size,
             'file_name': path.name,
         })
 
@@ -619,6 +687,9 @@ class BoxProvider(provider.BaseProvider):
         """Calculate the partitioning scheme and upload the parts of the stream.  Returns a list
         of metadata objects for each part, as reported by Box.  This list will be used to finialize
         the upload.
+
+        The stream is read in order, one part at a time, while up to ``UPLOAD_PART_CONCURRENCY``
+        parts already read are being sent.
         """
 
         part_max_size = session_data['part_size']
@@ -628,45 +699,97 @@ class BoxProvider(provider.BaseProvider):
         logger.debug('Stream will be partitioned into {} with the following '
                      'sizes: {}'.format(len(parts), parts))
 
-        start_offset, manifest = 0, []
-        for part_id, part_size in enumerate(parts):
-            logging.debug('Uploading part {}, with size {} bytes, starting '
-                          'at offset {}'.format(part_id, part_size, start_offset))
-            part_metadata = await self._upload_part(stream, str(part_id), part_size, start_offset,
-                                                    session_data['id'])
-            manifest.append(part_metadata)
-            start_offset += part_size
-
-        return manifest
+        slots = asyncio.Semaphore(self.UPLOAD_PART_CONCURRENCY)
+        tasks = []  # type: list
 
-    async def _upload_part(self, stream: streams.BaseStream, part_id: str, part_size: int,
-                           start_offset: int, session_id: str) -> dict:
-        """Upload one part/chunk of the given stream to Box.
+        def release(task):
+            slots.release()
 
-        Box requires that the sha of the part be sent along in the headers of the request.  To do
-        this WB must write the stream segment to disk before uploading.  The part sha is calculated
-        as the tempfile is written.
+        try:
+            start_offset = 0
+            for part_id, part_size in enumerate(parts):
+                await slots.acquire()
+                # a failed part frees its slot, so this is where the failure is noticed
+                for task in tasks:
+                    if task.done() and not task.cancelled() and task.exception() is not None:
+                        raise task.exception()
+                logging.debug('Uploading part {}, with size {} bytes, starting '
+                              'at offset {}'.format(part_id, part_size, start_offset))
+                part = streams.SpooledPart(part_size, digests=('sha1', ))
+                try:
+                    if await part.fill(stream) != part_size:
+                        raise exceptions.UploadError(
+                            f'The upload ended before part {part_id} was complete')
+                except BaseException:
+                    part.close()
+                    slots.release()
+                    raise
+                tasks.append(asyncio.ensure_future(self._upload_part(
+                    part, str(part_id), start_offset, stream.size, session_data['id'])))
+                tasks[-1].add_done_callback(release)
+                start_offset += part_size
+            manifest = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return sorted(manifest, key=lambda part: part['offset'])
+
+    async def _upload_part(self, part: streams.SpooledPart, part_id: str, start_offset: int,
+                           total_size: int, session_id: str) -> dict:
+        """Upload one part/chunk of the given stream to Box, and close it.
+
+        Box requires that the sha of the part be sent along in the headers of the request, so the
+        part is spooled and hashed before it is sent, see `streams.SpooledPart`.  A part that fails
+        to send is sent again from the spool up to ``UPLOAD_PART_RETRIES`` times, as long as the
+        upload host's retry budget allows it, its circuit breaker is closed and any
+        ``Retry-After`` it asked for isn't too long, see `waterbutler.core.retry`.
 
         API Docs: https://developer.box.com/reference#upload-part
         """
-
-        cutoff_stream = streams.CutoffStream(stream, cutoff=part_size)
-        part_hasher_name = f'part-{part_id}-sha1'
-        stream.add_writer(part_hasher_name, streams.HashStreamWriter(hashlib.sha1))
-
-        f = tempfile.TemporaryFile()
-        chunk = await cutoff_stream.read(self.TEMP_CHUNK_SIZE)
-        while chunk:
-            f.write(chunk)
-            chunk = await cutoff_stream.read(self.TEMP_CHUNK_SIZE)
-        file_stream = streams.FileStreamReader(f)
-
-        part_sha = stream.writers[part_hasher_name].digest
-        part_sha_b64 = base64.standard_b64encode(part_sha).decode()
-        stream.remove_writer(part_hasher_name)
+        part_sha_b64 = base64.standard_b64encode(part.digest('sha1')).decode()
+        upstream = self.retry_policy.upstream(
+            self.NAME, self._build_upload_url('files', 'upload_sessions', session_id))
+        delay = None
+        try:
+            for attempt in range(self.UPLOAD_PART_RETRIES + 1):
+                try:
+                    # the stream of a failed attempt is spent, so this retries instead
+                    return await self._send_part(part.stream(), part.written, start_offset,
+                                                 total_size, part_sha_b64, session_id, retry=0)
+                except exceptions.UploadError as exc:
+                    if exc.code not in self.retry_policy.retry_on:
+                        raise
+                    error, code, retry_after = exc, exc.code, getattr(exc, 'retry_after', None)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                    error, code, retry_after = exc, None, None
+                if attempt == self.UPLOAD_PART_RETRIES:
+                    raise error
+                if upstream.breaker.state != upstream.breaker.CLOSED:
+                    self.provider_metrics.incr('retry.short_circuited')
+                    raise error
+                if not self.retry_policy.should_retry(upstream, code):
+                    self.provider_metrics.incr('retry.budget_exhausted')
+                    raise error
+                delay = self.retry_policy.delay(delay, retry_after)
+                if delay is None:
+                    raise error
+                self.provider_metrics.incr('retry.count')
+                logger.info(f'Sending part {part_id} failed with {error!r}, retrying')
+                await asyncio.sleep(delay)
+        finally:
+            part.close()
+
+    async def _send_part(self, part_stream: streams.BaseStream, part_size: int,
+                         start_offset: int, total_size: int, part_sha_b64: str,
+                         session_id: str, retry: int = 2) -> dict:
+        """Send one part, whose sha1 is already known, of a file of ``total_size`` bytes.
+        ``retry`` is passed on to `make_request`."""
 
         byte_range = self._build_range_header((start_offset, start_offset + part_size - 1))
-        content_range = str(byte_range).replace('=', ' ') + f'/{stream.size}'
+        content_range = str(byte_range).replace('=', ' ') + f'/{total_size}'
 
         response = await self.make_request(
             'PUT',
@@ -678,13 +801,12 @@ class BoxProvider(provider.BaseProvider):
                 'Content-Type:': 'application/octet-stream',
                 'Digest': f'sha={part_sha_b64}'
             },
-            data=file_stream,
+            data=part_stream,
             expects=(201, 200),
             throws=exceptions.UploadError,
+            retry=retry,
         )
         data = await response.json()
-
-        f.close()
         return data['part']
 
     async def _complete_chunked_upload_session(self, session_data: dict, parts_manifest: list,
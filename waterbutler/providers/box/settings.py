@@ -7,8 +7,12 @@ BASE_URL = config.get('BASE_URL', 'https://api.box.com/2.0')
 BASE_UPLOAD_URL = config.get('BASE_CONTENT_URL', 'https://upload.box.com/api/2.0')
 NONCHUNKED_UPLOAD_LIMIT = int(config.get('NONCHUNKED_UPLOAD_LIMIT', 50 * 1000 * 1000))  # 50 MB
 
-# The size of the chunks read when writing the upload stream to disk
-TEMP_CHUNK_SIZE = int(config.get('TEMP_CHUNK_SIZE', 32 * 1024))  # 32KiB
+# How many parts of a chunked upload are sent at once.  Each is spooled first, see
+# `waterbutler.core.streams.SpooledPart`, so this many parts are held at a time.
+UPLOAD_PART_CONCURRENCY = int(config.get('UPLOAD_PART_CONCURRENCY', 4))
+
+# Number of times to send a part again after a connection error or retryable status
+UPLOAD_PART_RETRIES = int(config.get('UPLOAD_PART_RETRIES', 2))
 
 # Number of times to retry upload commits before giving up
 UPLOAD_COMMIT_RETRIES = int(config.get('UPLOAD_COMMIT_RETRIES', 10))
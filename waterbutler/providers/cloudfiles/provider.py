@@ -4,9 +4,12 @@ import json
 import time
 import asyncio
 import hashlib
+import logging
+import weakref
 import functools
 
 import furl
+import dateutil.parser
 
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.core import streams, provider, exceptions
@@ -16,6 +19,16 @@ from waterbutler.providers.cloudfiles.metadata import (CloudFilesFileMetadata,
                                                        CloudFilesFolderMetadata,
                                                        CloudFilesHeaderMetadata, )
 
+logger = logging.getLogger(__name__)
+
+# Identity tokens, storage endpoints and temp url keys shared by every provider instance in the
+# process, keyed by `CloudFilesProvider._connection_key`.  osfstorage builds a new cloudfiles
+# provider for every request, so without this each upload or download would pay for a token
+# request and a temp url key lookup.
+_CONNECTIONS = {}  # type: dict
+# In-flight connection refreshes per event loop, so concurrent requests share a single refresh.
+_REFRESHES = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
+
 
 def ensure_connection(func):
     """Runs ``_ensure_connection`` before continuing to the method
@@ -27,19 +40,52 @@ def ensure_connection(func):
     return wrapped
 
 
+class CloudFilesConnection:
+    """The result of authenticating against the identity endpoint: the token and its expiry time
+    (as a unix timestamp, or `None` if unknown), the storage endpoints for the provider's region
+    and the account's temp url key, if it had to be looked up.
+    """
+
+    def __init__(self, token, expires, public_endpoint, internal_endpoint, temp_url_key=None):
+        self.token = token
+        self.expires = expires
+        self.public_endpoint = public_endpoint
+        self.internal_endpoint = internal_endpoint
+        self.temp_url_key = temp_url_key
+
+    def expires_within(self, seconds):
+        return self.expires is not None and self.expires - time.time() <= seconds
+
+    @property
+    def expired(self):
+        return self.expires_within(settings.TOKEN_EXPIRY_MARGIN)
+
+    @property
+    def stale(self):
+        return self.expires_within(settings.TOKEN_REFRESH_WINDOW)
+
+
 class CloudFilesProvider(provider.BaseProvider):
     """Provider for Rackspace CloudFiles.
 
     API Docs: https://developer.rackspace.com/docs/cloud-files/v1/developer-guide/#document-developer-guide
+
+    Quirks:
+
+    * Tokens, endpoints and temp url keys are cached process-wide (see `_CONNECTIONS`) and shared
+      between instances with the same identity credentials.  A cached token is refreshed in the
+      background shortly before it expires, and dropped if the storage API rejects it with a 401.
     """
     NAME = 'cloudfiles'
 
     def __init__(self, auth, credentials, settings_data, **kwargs):
         super().__init__(auth, credentials, settings_data, **kwargs)
         self.token = None
+        self.token_expires = None
         self.endpoint = None
         self.public_endpoint = None
         self.temp_url_key = credentials.get('temp_key', '').encode()
+        self.has_own_temp_url_key = bool(self.temp_url_key)
         self.region = self.credentials['region']
         self.og_token = self.credentials['token']
         self.username = self.credentials['username']
@@ -234,7 +280,23 @@ class CloudFilesProvider(provider.BaseProvider):
         })
         return url.url
 
-    async def make_request(self, *args, **kwargs):
+    async def make_request(self, *args, reauthenticate=True, **kwargs):
+        """Retries once on a 408.  If the request is rejected with a 401 the cached token is
+        discarded and, unless ``reauthenticate`` is `False` or the request body is a stream that
+        has already been consumed, the request is retried once with a fresh token.
+        """
+        try:
+            return await self._make_request(*args, **kwargs)
+        except exceptions.ProviderError as e:
+            if e.code != 401 or not reauthenticate or not self.token:
+                raise
+            self._invalidate_connection()
+            if isinstance(kwargs.get('data'), streams.BaseStream):
+                raise
+            await self._ensure_connection()
+            return await self._make_request(*args, **kwargs)
+
+    async def _make_request(self, *args, **kwargs):
         try:
             return await super().make_request(*args, **kwargs)
         except exceptions.ProviderError as e:
@@ -243,32 +305,129 @@ class CloudFilesProvider(provider.BaseProvider):
             await asyncio.sleep(1)
             return await super().make_request(*args, **kwargs)
 
+    @property
+    def _connection_key(self):
+        """Key for this provider's entry in the process-wide connection cache.  The api key is
+        hashed so that it doesn't show up in debugging output.
+        """
+        return (
+            settings.AUTH_URL,
+            self.username,
+            hashlib.sha256(self.og_token.encode()).hexdigest(),
+            self.region.lower(),
+            bool(self.use_public),
+        )
+
     async def _ensure_connection(self):
-        """Defines token, endpoint and temp_url_key if they are not already defined
+        """Defines token, endpoint and temp_url_key if they are not already defined, reusing the
+        process-wide cached connection when possible.
         :raises ProviderError: If no temp url key is available
         """
         # Must have a temp url key for download and upload
         # Currently You must have one for everything however
         self.metrics.add('ensure_connection.has_token_and_endpoint', True)
         self.metrics.add('ensure_connection.has_temp_url_key', True)
+        if self.token and self.endpoint and self.temp_url_key and not (
+            self.token_expires is not None and
+            self.token_expires - time.time() <= settings.TOKEN_REFRESH_WINDOW
+        ):
+            return
+
         if not self.token or not self.endpoint:
             self.metrics.add('ensure_connection.has_token_and_endpoint', False)
-            data = await self._get_token()
-            self.token = data['access']['token']['id']
-            self.metrics.add('ensure_connection.use_public', True if self.use_public else False)
-            if self.use_public:
-                self.public_endpoint, _ = self._extract_endpoints(data)
-                self.endpoint = self.public_endpoint
-            else:
-                self.public_endpoint, self.endpoint = self._extract_endpoints(data)
         if not self.temp_url_key:
             self.metrics.add('ensure_connection.has_temp_url_key', False)
-            resp = await self.make_request('HEAD', self.endpoint, expects=(204, ))
+
+        connection = _CONNECTIONS.get(self._connection_key)
+        self.metrics.add('ensure_connection.cached', connection is not None and not connection.expired)
+        if connection is None or connection.expired:
+            connection = await asyncio.shield(self._refresh_connection())
+        elif connection.stale:
+            self._refresh_connection()
+
+        self._use_connection(connection)
+
+    def _use_connection(self, connection):
+        self.token = connection.token
+        self.token_expires = connection.expires
+        self.metrics.add('ensure_connection.use_public', True if self.use_public else False)
+        self.public_endpoint = connection.public_endpoint
+        if self.use_public:
+            self.endpoint = connection.public_endpoint
+        else:
+            self.endpoint = connection.internal_endpoint
+        if not self.has_own_temp_url_key:
+            self.temp_url_key = connection.temp_url_key
+
+    def _refresh_connection(self):
+        """Start fetching a new connection, or join the fetch already in progress on this event
+        loop for the same credentials.
+
+        :rtype: `asyncio.Future` resolving to a `CloudFilesConnection`
+        """
+        key = self._connection_key
+        refreshes = _REFRESHES.setdefault(asyncio.get_event_loop(), {})
+        future = refreshes.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch_connection())
+            refreshes[key] = future
+
+            def _done(fut):
+                refreshes.pop(key, None)
+                if not fut.cancelled() and fut.exception() is not None:
+                    logger.warning(f'Refreshing cloudfiles token failed: {fut.exception()!r}')
+
+            future.add_done_callback(_done)
+        return future
+
+    async def _fetch_connection(self):
+        """Authenticate against the identity endpoint, look up the temp url key if the credentials
+        didn't include one, and store the result in the process-wide cache.
+
+        :rtype: `CloudFilesConnection`
+        :raises ProviderError: If no temp url key is available
+        """
+        data = await self._get_token()
+        token = data['access']['token']
+        expires = token.get('expires')
+        public_endpoint, internal_endpoint = self._extract_endpoints(data)
+
+        temp_url_key = None
+        if not self.has_own_temp_url_key:
+            endpoint = public_endpoint if self.use_public else internal_endpoint
+            resp = await self.make_request(
+                'HEAD', endpoint,
+                headers={'X-Auth-Token': token['id']},
+                expects=(204, ),
+                reauthenticate=False,
+            )
+            await resp.release()
             try:
-                self.temp_url_key = resp.headers['X-Account-Meta-Temp-URL-Key'].encode()
+                temp_url_key = resp.headers['X-Account-Meta-Temp-URL-Key'].encode()
             except KeyError:
                 raise exceptions.ProviderError('No temp url key is available', code=503)
 
+        connection = CloudFilesConnection(
+            token['id'],
+            dateutil.parser.parse(expires).timestamp() if expires else None,
+            public_endpoint,
+            internal_endpoint,
+            temp_url_key=temp_url_key,
+        )
+        _CONNECTIONS[self._connection_key] = connection
+        return connection
+
+    def _invalidate_connection(self):
+        """Forget this instance's token and, if it is still the cached one, the cached connection.
+        """
+        connection = _CONNECTIONS.get(self._connection_key)
+        if connection is not None and connection.token == self.token:
+            del _CONNECTIONS[self._connection_key]
+        self.token = None
+        self.token_expires = None
+        if not self.has_own_temp_url_key:
+            self.temp_url_key = b''
+
     def _extract_endpoints(self, data):
         """Pulls both the public and internal cloudfiles urls,
         returned respectively, from the return of tokens
@@ -303,6 +462,7 @@ class CloudFilesProvider(provider.BaseProvider):
                 'Content-Type': 'application/json',
             },
             expects=(200, ),
+            reauthenticate=False,
         )
         data = await resp.json()
         return data
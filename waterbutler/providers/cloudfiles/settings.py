@@ -5,3 +5,9 @@ config = settings.child('CLOUDFILES_PROVIDER_CONFIG')
 
 TEMP_URL_SECS = int(config.get('TEMP_URL_SECS', 100))
 AUTH_URL = config.get('AUTH_URL', 'https://identity.api.rackspacecloud.com/v2.0/tokens')
+
+# Identity tokens are shared by all provider instances in the process until they expire.  Tokens
+# within TOKEN_EXPIRY_MARGIN seconds of expiring are treated as expired, and tokens within
+# TOKEN_REFRESH_WINDOW seconds of expiring are refreshed in the background while still in use.
+TOKEN_EXPIRY_MARGIN = int(config.get('TOKEN_EXPIRY_MARGIN', 60))
+TOKEN_REFRESH_WINDOW = int(config.get('TOKEN_REFRESH_WINDOW', 600))
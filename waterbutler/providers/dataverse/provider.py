@@ -1,6 +1,6 @@
+import time
 import hashlib
 import logging
-import tempfile
 from http import HTTPStatus
 
 from aiohttp.helpers import BasicAuth
@@ -15,6 +15,33 @@ from waterbutler.providers.dataverse.metadata import (DataverseRevision,
 
 logger = logging.getLogger(__name__)
 
+# Dataset version listings shared by every provider instance in the process.  Maps
+# (host, dataset id, version, token hash) to an (expiry timestamp, DatasetListing) tuple.
+_LISTINGS = {}  # type: dict
+
+
+class DatasetListing:
+    """The files in one dataset version, plus lookup tables by file id and by name.  A name or id
+    may appear more than once when listings for several versions are combined, so each table maps
+    to the list of matching items in listing order.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.by_id = {}  # type: dict
+        self.by_name = {}  # type: dict
+        for item in items:
+            self.by_id.setdefault(item.extra['fileId'], []).append(item)
+            self.by_name.setdefault(item.name, []).append(item)
+
+
+def _listing_ttl(version):
+    if version == 'latest':
+        return pd_settings.DRAFT_CACHE_TTL
+    if version == 'latest-published':
+        return pd_settings.LATEST_PUBLISHED_CACHE_TTL
+    return pd_settings.PUBLISHED_CACHE_TTL
+
 
 class DataverseProvider(provider.BaseProvider):
     """Provider for Dataverse
@@ -78,6 +105,14 @@ class DataverseProvider(provider.BaseProvider):
 
     * For more info about ``aiohttp.helpersBasicAuth`` as of version 3.5, see:
       https://github.com/aio-libs/aiohttp/blob/3.5/aiohttp/helpers.py#L116-L176
+
+    About Caching
+
+    * Dataset version listings are cached process-wide in ``_LISTINGS``, keyed by host, dataset
+      id, version and a hash of the API token, with a short TTL for drafts and a long one for
+      numbered published versions.  Each provider instance also keeps the listings it has seen in
+      ``_metadata_cache`` so that one request sees a consistent view.  Uploads and deletes drop
+      the cached draft listing.
     """
 
     NAME = 'dataverse'
@@ -107,6 +142,7 @@ class DataverseProvider(provider.BaseProvider):
         })
 
         self._metadata_cache = {}
+        self._combined_listing = None
 
     def build_url(self, path, *segments, **query):
         # Need to split up the dataverse subpaths and push them into segments
@@ -136,9 +172,10 @@ class DataverseProvider(provider.BaseProvider):
         path = path.strip('/')
 
         wbpath = None
-        for item in (await self._maybe_fetch_metadata(version=revision)):
-            if path == item.extra['fileId']:
-                wbpath = WaterButlerPath('/' + item.name, _ids=(None, item.extra['fileId']))
+        matches = (await self._maybe_fetch_listing(version=revision)).by_id.get(path)
+        if matches:
+            item = matches[-1]
+            wbpath = WaterButlerPath('/' + item.name, _ids=(None, item.extra['fileId']))
         wbpath = wbpath or WaterButlerPath('/' + path)
 
         wbpath.revision = revision
@@ -148,23 +185,73 @@ class DataverseProvider(provider.BaseProvider):
         path = path.strip('/')
 
         wbpath = None
-        for item in (await self._maybe_fetch_metadata(version=revision)):
-            if path == item.name:
-                # Dataverse cant have folders
-                wbpath = base.child(item.name, _id=item.extra['fileId'], folder=False)
+        matches = (await self._maybe_fetch_listing(version=revision)).by_name.get(path)
+        if matches:
+            # Dataverse cant have folders
+            wbpath = base.child(matches[-1].name, _id=matches[-1].extra['fileId'], folder=False)
         wbpath = wbpath or base.child(path, _id=None, folder=False)
 
         wbpath.revision = revision or base.revision
         return wbpath
 
     async def _maybe_fetch_metadata(self, version=None, refresh=False):
+        return list((await self._maybe_fetch_listing(version=version, refresh=refresh)).items)
+
+    async def _maybe_fetch_listing(self, version=None, refresh=False):
+        """Return the `DatasetListing` for ``version``, or the combined listing of the draft and
+        published versions if ``version`` is `None`.  Listings are looked up in this instance's
+        cache, then the process-wide cache, and only then fetched from Dataverse.
+
+        :param str version: 'latest', 'latest-published', a version number, or `None`
+        :param bool refresh: bypass both caches
+        :rtype: `DatasetListing`
+        """
         if refresh or self._metadata_cache.get(version) is None:
             versions = (version,) if version else ('latest', 'latest-published')
             for v in versions:
-                self._metadata_cache[v] = await self._get_data(v)
+                self._metadata_cache[v] = await self._get_listing(v, refresh=refresh)
+            self._combined_listing = None
         if version:
             return self._metadata_cache[version]
-        return sum(self._metadata_cache.values(), [])
+        if self._combined_listing is None:
+            self._combined_listing = DatasetListing(
+                sum([listing.items for listing in self._metadata_cache.values()], [])
+            )
+        return self._combined_listing
+
+    def _listing_key(self, version):
+        return (
+            self.settings['host'],
+            self._id,
+            version,
+            hashlib.sha256(self.token.encode()).hexdigest(),
+        )
+
+    async def _get_listing(self, version, refresh=False):
+        """Fetch the listing for a single dataset version through the process-wide cache."""
+        key = self._listing_key(version)
+        cached = _LISTINGS.get(key)
+        if not refresh and cached is not None and cached[0] > time.time():
+            self.metrics.add(f'listing_cache.{version}', 'hit')
+            return cached[1]
+
+        self.metrics.add(f'listing_cache.{version}', 'miss')
+        return self._store_listing(version, await self._get_data(version))
+
+    def _store_listing(self, version, items):
+        listing = DatasetListing(items)
+        key = self._listing_key(version)
+        _LISTINGS.pop(key, None)
+        _LISTINGS[key] = (time.time() + _listing_ttl(version), listing)
+        while len(_LISTINGS) > pd_settings.CACHE_MAX_ENTRIES:
+            del _LISTINGS[next(iter(_LISTINGS))]
+        return listing
+
+    def _invalidate_draft(self):
+        """Forget the draft listing after the dataset has been modified."""
+        _LISTINGS.pop(self._listing_key('latest'), None)
+        self._metadata_cache.pop('latest', None)
+        self._combined_listing = None
 
     async def download(self, path: WaterButlerPath, revision: str = None,  # type: ignore
                        range: tuple[int, int] = None, **kwargs) -> streams.ResponseStreamReader:
@@ -209,37 +296,36 @@ class DataverseProvider(provider.BaseProvider):
 
         zip_stream = streams.ZipStreamReader(AsyncIterator([(path.name, stream)]))
 
-        # Write stream to disk (Necessary to find zip file size)
-        f = tempfile.TemporaryFile()
-        chunk = await zip_stream.read()
-        while chunk:
-            f.write(chunk)
-            chunk = await zip_stream.read()
-        file_stream = streams.FileStreamReader(f)
-
-        dv_headers = {
-            "Content-Disposition": "filename=temp.zip",
-            "Content-Type": "application/zip",
-            "Packaging": "http://purl.org/net/sword/package/SimpleZip",
-            "Content-Length": str(file_stream.size),
-        }
-
-        # Delete old file if it exists
-        if path.identifier:
-            await self.delete(path)
-
-        resp = await self.make_request(
-            'POST',
-            self.build_url(pd_settings.EDIT_MEDIA_BASE_URL, 'study', self.doi),
-            headers=dv_headers,
-            data=file_stream,
-            expects=(201, ),
-            throws=exceptions.UploadError
-        )
+        # Spool the zip (Necessary to find zip file size)
+        with streams.SpooledPart(digests=()) as zip_part:
+            await zip_part.fill(zip_stream)
+            file_stream = zip_part.stream()
+
+            dv_headers = {
+                "Content-Disposition": "filename=temp.zip",
+                "Content-Type": "application/zip",
+                "Packaging": "http://purl.org/net/sword/package/SimpleZip",
+                "Content-Length": str(file_stream.size),
+            }
+
+            # Delete old file if it exists
+            if path.identifier:
+                await self.delete(path)
+
+            self._invalidate_draft()
+            resp = await self.make_request(
+                'POST',
+                self.build_url(pd_settings.EDIT_MEDIA_BASE_URL, 'study', self.doi),
+                headers=dv_headers,
+                data=file_stream,
+                expects=(201, ),
+                throws=exceptions.UploadError
+            )
         await resp.release()
 
         # Find appropriate version of file
         metadata = await self._get_data('latest')
+        self._store_listing('latest', metadata)
         files = metadata if isinstance(metadata, list) else []
         file_metadata = next(file for file in files if file.name == path.name)
 
@@ -263,6 +349,7 @@ class DataverseProvider(provider.BaseProvider):
             throws=exceptions.DeleteError,
         )
         await resp.release()
+        self._invalidate_draft()
 
     async def metadata(self, path, version=None, **kwargs):
         """
@@ -283,14 +370,10 @@ class DataverseProvider(provider.BaseProvider):
             # return await self._get_all_data()
             return await self._maybe_fetch_metadata(version=version)
 
-        try:
-            return next(
-                item
-                for item in
-                (await self._maybe_fetch_metadata(version=version))
-                if item.extra['fileId'] == path.identifier
-            )
-        except StopIteration:
+        matches = (await self._maybe_fetch_listing(version=version)).by_id.get(path.identifier)
+        if matches:
+            return matches[0]
+        else:
             raise exceptions.MetadataError(
                 f"Could not retrieve file '{path}'",
                 code=HTTPStatus.NOT_FOUND,
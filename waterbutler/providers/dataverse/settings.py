@@ -8,3 +8,12 @@ DOWN_BASE_URL = config.get('DOWN_BASE_URL', "/api/access/datafile/")
 # TODO: double check and remove this unused API URL / endpoint
 METADATA_BASE_URL = config.get('METADATA_BASE_URL', "/dvn/api/data-deposit/v1.1/swordv2/statement/study/")
 JSON_BASE_URL = config.get('JSON_BASE_URL', "/api/v1/datasets/{0}/versions/:{1}")
+
+# Dataset version listings are cached process-wide.  Draft listings ('latest') change whenever
+# someone edits the dataset, the 'latest-published' alias moves when a new version is published,
+# and numbered versions never change.  Time-to-live for each, in seconds:
+DRAFT_CACHE_TTL = int(config.get('DRAFT_CACHE_TTL', 15))
+LATEST_PUBLISHED_CACHE_TTL = int(config.get('LATEST_PUBLISHED_CACHE_TTL', 120))
+PUBLISHED_CACHE_TTL = int(config.get('PUBLISHED_CACHE_TTL', 24 * 60 * 60))
+# Maximum number of dataset versions held in the cache.  The oldest entries are evicted first.
+CACHE_MAX_ENTRIES = int(config.get('CACHE_MAX_ENTRIES', 256))
@@ -552,6 +552,30 @@ class DropboxProvider(provider.BaseProvider):
 
         return DropboxFileMetadata(data, self.folder)
 
+    async def list_folder(self,  # type: ignore
+                          path: WaterButlerPath,
+                          cursor: str = None,
+                          page_size: int = None,
+                          **kwargs) -> tuple[list[BaseDropboxMetadata], str | None]:
+        """List one page of the folder at ``path``, using Dropbox's own cursors.  Dropbox treats
+        ``page_size`` as a hint and may return a few more or fewer entries."""
+        if cursor is None:
+            url = self.build_url('files', 'list_folder')
+            body = {'path': path.full_path.rstrip('/')}  # type: dict
+            if page_size is not None:
+                body['limit'] = page_size
+        else:
+            url = self.build_url('files', 'list_folder', 'continue')
+            body = {'cursor': cursor}
+
+        data = await self.dropbox_request(url, body, throws=core_exceptions.MetadataError)
+        items = [
+            DropboxFolderMetadata(entry, self.folder) if entry['.tag'] == 'folder'
+            else DropboxFileMetadata(entry, self.folder)
+            for entry in data['entries']
+        ]  # type: list[BaseDropboxMetadata]
+        return items, (data['cursor'] if data['has_more'] else None)
+
     async def revisions(self, path: WaterButlerPath, **kwargs) -> list[DropboxRevision]:
         # Dropbox v2 API limits the number of revisions returned to a maximum
         # of 100, default 10. Previously we had set the limit to 250.
@@ -2,11 +2,11 @@ from waterbutler.core import path
 
 
 class GitHubPathPart(path.WaterButlerPathPart):
+    __slots__ = ()
+
     def increment_name(self, _id=None):
         """Overridden to preserve branch from _id upon incrementing"""
-        self._id = _id or (self._id[0], None)
-        self._count += 1
-        return self
+        return super().increment_name(_id or (self._id[0], None))
 
 
 class GitHubPath(path.WaterButlerPath):
@@ -1,3 +1,4 @@
+import copy
 import logging
 import functools
 from urllib import parse
@@ -10,6 +11,7 @@ logger = logging.getLogger(__name__)
 
 
 class GitLabPathPart(WaterButlerPathPart):
+    __slots__ = ()
     DECODE = parse.unquote
     # TODO: mypy lacks a syntax to define kwargs for callables
     ENCODE = functools.partial(parse.quote, safe='')  # type: ignore
@@ -51,5 +53,7 @@ class GitLabPath(WaterButlerPath):
         return super().child(name, _id=_id, folder=folder)
 
     def set_commit_sha(self, commit_sha):
+        # parts may be shared with the paths this one was made from or has made
+        self._parts = [copy.copy(part) for part in self._parts]
         for part in self.parts:
             part._id = (commit_sha, part._id[1])
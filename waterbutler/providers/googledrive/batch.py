@@ -0,0 +1,127 @@
+import json
+import uuid
+from email.message import Message
+from urllib import parse
+
+from waterbutler.core.batch import BaseBatcher, BatchResponse
+
+from waterbutler.providers.googledrive import settings as pd_settings
+
+
+def _content_type_param(content_type, param):
+    message = Message()
+    message['Content-Type'] = content_type
+    return message.get_param(param)
+
+
+def _parse_headers(lines):
+    headers = {}
+    for line in lines:
+        key, sep, value = line.partition(':')
+        if sep:
+            headers[key.strip()] = value.strip()
+    return headers
+
+
+def build_multipart(requests, boundary):
+    """Encode ``requests`` as the ``multipart/mixed`` body of a Drive batch call.  Each part is an
+    ``application/http`` request whose ``Content-ID`` is its position in ``requests``.
+    """
+    parts = []
+    for i, request in enumerate(requests):
+        lines = [f'{request.method} {request.url} HTTP/1.1']
+        lines.extend(f'{key}: {value}' for key, value in request.headers.items())
+        body = ''
+        if request.body is not None:
+            lines.append('Content-Type: application/json')
+            body = json.dumps(request.body)
+        parts.append('\r\n'.join([
+            f'--{boundary}',
+            'Content-Type: application/http',
+            f'Content-ID: <item{i}>',
+            '',
+            *lines,
+            '',
+            body,
+        ]))
+    parts.append(f'--{boundary}--')
+    return '\r\n'.join(parts).encode('utf-8')
+
+
+def parse_multipart(content_type, payload):
+    """Decode the ``multipart/mixed`` body of a Drive batch response into a dict mapping each
+    sub-request's position to a `BatchResponse`.
+    """
+    boundary = _content_type_param(content_type, 'boundary')
+    if not boundary:
+        raise ValueError(f'Batch response has no multipart boundary: {content_type}')
+
+    responses = {}
+    text = payload.decode('utf-8').replace('\r\n', '\n')
+    for part in text.split(f'--{boundary}')[1:]:
+        if part.startswith('--'):
+            break
+        part_headers, _, http = part.strip('\n').partition('\n\n')
+        content_id = _parse_headers(part_headers.split('\n')).get('Content-ID', '')
+        index = int(content_id.strip('<>').rpartition('item')[2])
+
+        head, _, body = http.partition('\n\n')
+        status_line, *header_lines = head.split('\n')
+        headers = _parse_headers(header_lines)
+        body = body.rstrip('\n')
+        if not body:
+            decoded = None
+        elif 'json' in headers.get('Content-Type', ''):
+            decoded = json.loads(body)
+        else:
+            decoded = body
+        responses[index] = BatchResponse(int(status_line.split()[1]), headers, decoded)
+    return responses
+
+
+class DriveBatcher(BaseBatcher):
+    """Coalesce Drive API requests issued concurrently by one provider into multipart batch calls
+    of up to ``BATCH_MAX_REQUESTS`` (Drive's limit is 100) sub-requests.
+
+    API docs: https://developers.google.com/drive/api/v2/batch
+    """
+
+    @property
+    def base_url(self):
+        url = parse.urlsplit(pd_settings.BASE_URL)
+        return f'{url.scheme}://{url.netloc}'
+
+    @property
+    def window(self):
+        return pd_settings.BATCH_WINDOW
+
+    @property
+    def max_requests(self):
+        return pd_settings.BATCH_MAX_REQUESTS
+
+    @property
+    def max_retries(self):
+        return pd_settings.BATCH_MAX_RETRIES
+
+    @property
+    def default_retry_after(self):
+        return pd_settings.BATCH_DEFAULT_RETRY_AFTER
+
+    @property
+    def max_retry_after(self):
+        return pd_settings.BATCH_MAX_RETRY_AFTER
+
+    def _build_batch(self, requests):
+        boundary = f'batch_{uuid.uuid4().hex}'
+        return pd_settings.BATCH_URL, {
+            'data': build_multipart(requests, boundary),
+            'headers': {'Content-Type': f'multipart/mixed; boundary={boundary}'},
+        }
+
+    async def _parse_batch(self, resp, requests):
+        responses = parse_multipart(resp.headers.get('Content-Type', ''), await resp.read())
+        return [
+            (requests[index], response)
+            for index, response in responses.items()
+            if index < len(requests)
+        ]
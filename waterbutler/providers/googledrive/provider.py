@@ -1,5 +1,6 @@
 import os
 import json
+import asyncio
 import hashlib
 import functools
 from urllib import parse
@@ -12,6 +13,7 @@ from waterbutler.core import exceptions, provider, streams
 from waterbutler.core.path import WaterButlerPath, WaterButlerPathPart
 
 from waterbutler.providers.googledrive import utils
+from waterbutler.providers.googledrive.batch import DriveBatcher
 from waterbutler.providers.googledrive import settings as pd_settings
 from waterbutler.providers.googledrive.metadata import (GoogleDriveRevision,
                                                         BaseGoogleDriveMetadata,
@@ -27,6 +29,7 @@ def clean_query(query: str):
 
 
 class GoogleDrivePathPart(WaterButlerPathPart):
+    __slots__ = ()
     DECODE = parse.unquote
     # TODO: mypy lacks a syntax to define kwargs for callables
     ENCODE = functools.partial(parse.quote, safe='')  # type: ignore
@@ -69,6 +72,13 @@ class GoogleDriveProvider(provider.BaseProvider):
     return the latest version instead.  The file metadata endpoint will behave the same.  A metadata
     or download request for a readonly file with a revision value that doesn't end with the sentinel
     value will always return a 404 Not Found.
+
+    Requests:
+
+    File and listing requests ask for a partial response (the ``fields`` query parameter) limited
+    to what the metadata classes and this provider read.  Path lookups, file metadata and deletes
+    made concurrently by one provider instance are coalesced into multipart batch calls by
+    `DriveBatcher`; a request that is alone in its batching window is sent as-is.
     """
     NAME = 'googledrive'
     BASE_URL = pd_settings.BASE_URL
@@ -78,10 +88,20 @@ class GoogleDriveProvider(provider.BaseProvider):
     # 'reader' and 'commenter' are not authorized to access the revisions list
     ROLES_ALLOWING_REVISIONS = ['owner', 'organizer', 'writer']
 
+    # Partial response masks.  Anything added to the metadata classes must be added here too.
+    # https://developers.google.com/drive/api/v2/performance#partial-response
+    FILE_FIELDS = ('id,title,mimeType,version,etag,fileSize,md5Checksum,createdDate,modifiedDate,'
+                   'alternateLink,downloadUrl,exportLinks,userPermission(role)')
+    LISTING_FIELDS = f'nextLink,items({FILE_FIELDS})'
+    LISTING_PAGE_FIELDS = f'nextPageToken,items({FILE_FIELDS})'
+    PATH_PART_FIELDS = 'items(id,title,mimeType)'
+    DOCS_REVISION_FIELDS = 'items(id)'
+
     def __init__(self, auth: dict, credentials: dict, settings: dict, **kwargs) -> None:
         super().__init__(auth, credentials, settings, **kwargs)
         self.token = self.credentials['token']
         self.folder = self.settings['folder']
+        self._batcher = DriveBatcher(self)
 
     async def validate_v1_path(self, path: str, **kwargs) -> GoogleDrivePath:
         if path == '/':
@@ -232,6 +252,8 @@ class GoogleDriveProvider(provider.BaseProvider):
             range=range,
             expects=(200, 206),
             throws=exceptions.DownloadError,
+            hedge=(metadata.size is not None and  # type: ignore
+                   metadata.size_as_int <= pd_settings.HEDGE_MAX_DOWNLOAD_SIZE),  # type: ignore
         )
 
         if metadata.size is not None and not metadata.is_google_doc:  # type: ignore
@@ -302,15 +324,18 @@ class GoogleDriveProvider(provider.BaseProvider):
                     code=400
                 )
 
-        await self.make_request(
+        await self._trash(path.identifier)
+        return
+
+    async def _trash(self, item_id: str) -> None:
+        resp = await self._batcher.request(
             'PUT',
-            self.build_url('files', path.identifier),
-            data=json.dumps({'labels': {'trashed': 'true'}}),
-            headers={'Content-Type': 'application/json'},
+            self.build_url('files', item_id),
+            body={'labels': {'trashed': 'true'}},
             expects=(200, ),
             throws=exceptions.DeleteError,
         )
-        return
+        await resp.release()
 
     @staticmethod
     def _build_query(folder_id: str, title: str = None) -> str:
@@ -470,7 +495,8 @@ class GoogleDriveProvider(provider.BaseProvider):
     async def _resolve_path_to_ids(self, path, start_at=None):
         """Takes a path and traverses the file tree (ha!) beginning at ``start_at``, looking for
         something that matches ``path``.  Returns a list of dicts for each part of the path, with
-        ``title``, ``mimeType``, and ``id`` keys.
+        ``title``, ``mimeType``, and ``id`` keys.  Each part costs one files.list request that
+        returns the matching child's id, title and mimeType.
         """
         self.metrics.incr('called_resolve_path_to_ids')
         ret = start_at or [{
@@ -507,16 +533,18 @@ class GoogleDriveProvider(provider.BaseProvider):
                             '=' if part_is_folder else '!=',
                             self.FOLDER_MIME_TYPE
                         )
-            resp = await self.make_request(
+            resp = await self._batcher.request(
                 'GET',
-                self.build_url('files', item_id, 'children', q=query, fields='items(id)'),
+                self.build_url('files', q=f"'{item_id}' in parents and {query}",
+                               fields=self.PATH_PART_FIELDS),
                 expects=(200, ),
                 throws=exceptions.MetadataError,
             )
             data = await resp.json()
 
             try:
-                item_id = data['items'][0]['id']
+                item = data['items'][0]
+                item_id = item['id']
             except (KeyError, IndexError):
                 if parts:
                     # if we can't find an intermediate path part, that's an error
@@ -528,13 +556,7 @@ class GoogleDriveProvider(provider.BaseProvider):
                     'mimeType': 'folder' if part_is_folder else '',
                 }]
 
-            resp = await self.make_request(
-                'GET',
-                self.build_url('files', item_id, fields='id,title,mimeType'),
-                expects=(200, ),
-                throws=exceptions.MetadataError,
-            )
-            ret.append(await resp.json())
+            ret.append(item)
         return ret
 
     async def _handle_docs_versioning(self, path: GoogleDrivePath, item: dict, raw: bool = True):
@@ -557,9 +579,9 @@ class GoogleDriveProvider(provider.BaseProvider):
         :rtype: dict
         :return: a metadata for the googledoc or the raw response object from the GDrive API
         """
-        resp = await self.make_request(
+        resp = await self._batcher.request(
             'GET',
-            self.build_url('files', item['id'], 'revisions'),
+            self.build_url('files', item['id'], 'revisions', fields=self.DOCS_REVISION_FIELDS),
             expects=(200, ),
             throws=exceptions.RevisionsError,
         )
@@ -581,7 +603,8 @@ class GoogleDriveProvider(provider.BaseProvider):
                                path: WaterButlerPath,
                                raw: bool = False) -> list[BaseGoogleDriveMetadata | dict]:
         query = self._build_query(path.identifier)
-        built_url = self.build_url('files', q=query, alt='json', maxResults=1000)
+        built_url = self.build_url('files', q=query, alt='json', maxResults=1000,
+                                   fields=self.LISTING_FIELDS)
         full_resp = []
         while built_url:
             resp = await self.make_request(
@@ -589,6 +612,7 @@ class GoogleDriveProvider(provider.BaseProvider):
                 built_url,
                 expects=(200, ),
                 throws=exceptions.MetadataError,
+                hedge=True,
             )
             resp_json = await resp.json()
             full_resp.extend([
@@ -598,6 +622,34 @@ class GoogleDriveProvider(provider.BaseProvider):
             built_url = resp_json.get('nextLink', None)
         return full_resp
 
+    async def list_folder(self,  # type: ignore
+                          path: GoogleDrivePath,
+                          cursor: str = None,
+                          page_size: int = None,
+                          **kwargs) -> tuple[list[BaseGoogleDriveMetadata], str | None]:
+        """List one page of the folder at ``path``, using Drive's page tokens as cursors."""
+        if path.identifier is None:
+            raise exceptions.MetadataError(f'{str(path)} not found', code=404)
+
+        query = {'maxResults': page_size or 1000}
+        if cursor is not None:
+            query['pageToken'] = cursor
+        built_url = self.build_url('files', q=self._build_query(path.identifier), alt='json',
+                                   fields=self.LISTING_PAGE_FIELDS, **query)
+        resp = await self.make_request(
+            'GET',
+            built_url,
+            expects=(200, ),
+            throws=exceptions.MetadataError,
+            hedge=True,
+        )
+        resp_json = await resp.json()
+        items = [
+            self._serialize_item(path.child(item['title']), item)
+            for item in resp_json['items']
+        ]
+        return items, resp_json.get('nextPageToken')  # type: ignore
+
     async def _file_metadata(self,
                              path: GoogleDrivePath,
                              revision: str = None,
@@ -641,9 +693,9 @@ class GoogleDriveProvider(provider.BaseProvider):
         if revision and valid_revision:
             url = self.build_url('files', path.identifier, 'revisions', revision)
         else:
-            url = self.build_url('files', path.identifier)
+            url = self.build_url('files', path.identifier, fields=self.FILE_FIELDS)
 
-        resp = await self.make_request(
+        resp = await self._batcher.request(
             'GET', url,
             expects=(200, 403, 404, ),
             throws=exceptions.MetadataError,
@@ -698,11 +750,9 @@ class GoogleDriveProvider(provider.BaseProvider):
             raise exceptions.MetadataError(f'{str(path)} not found',
                                            code=HTTPStatus.NOT_FOUND)
 
-        for child in child_ids:
-            await self.make_request(
-                'PUT',
-                self.build_url('files', child['id']),
-                data=json.dumps({'labels': {'trashed': 'true'}}),
-                headers={'Content-Type': 'application/json'},
-                expects=(200, ),
-                throws=exceptions.DeleteError)
+        # trashed concurrently so that the requests are sent as batch calls
+        for i in range(0, len(child_ids), pd_settings.BATCH_MAX_REQUESTS):
+            await asyncio.gather(*[
+                self._trash(child['id'])
+                for child in child_ids[i:i + pd_settings.BATCH_MAX_REQUESTS]
+            ])
@@ -6,3 +6,17 @@ config = settings.child('GOOGLEDRIVE_PROVIDER_CONFIG')
 BASE_URL = config.get('BASE_URL', 'https://www.googleapis.com/drive/v2')
 BASE_UPLOAD_URL = config.get('BASE_UPLOAD_URL', 'https://www.googleapis.com/upload/drive/v2')
 DRIVE_IGNORE_VERSION = config.get('DRIVE_IGNORE_VERSION', '0000000000000000000000000000000000000')
+BATCH_URL = config.get('BATCH_URL', 'https://www.googleapis.com/batch/drive/v2')
+# Drive requests made while others are in flight are collected for this many seconds into one
+# batch.  Requests made while none are in flight are sent straight away
+BATCH_WINDOW = float(config.get('BATCH_WINDOW', 0.01))
+# Drive accepts at most 100 sub-requests per batch call
+BATCH_MAX_REQUESTS = int(config.get('BATCH_MAX_REQUESTS', 100))
+# How often a throttled (429) or failed (500, 502, 503, 504) sub-request is retried before giving up
+BATCH_MAX_RETRIES = int(config.get('BATCH_MAX_RETRIES', 3))
+# Wait used when a retried sub-response has no Retry-After header, and the cap on any Retry-After
+BATCH_DEFAULT_RETRY_AFTER = float(config.get('BATCH_DEFAULT_RETRY_AFTER', 1))
+BATCH_MAX_RETRY_AFTER = float(config.get('BATCH_MAX_RETRY_AFTER', 30))
+
+# Downloads of files up to this size may be hedged, see `BaseProvider._send_hedged`
+HEDGE_MAX_DOWNLOAD_SIZE = int(config.get('HEDGE_MAX_DOWNLOAD_SIZE', 1024 * 1024))
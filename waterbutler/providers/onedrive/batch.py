@@ -0,0 +1,61 @@
+import json
+
+from waterbutler.core.batch import BaseBatcher, BatchResponse
+
+from waterbutler.providers.onedrive import settings
+
+
+class GraphBatcher(BaseBatcher):
+    """Coalesce Graph API requests issued concurrently by one provider into JSON ``$batch``
+    calls of up to ``ONEDRIVE_BATCH_MAX_REQUESTS`` (Graph's limit is 20) sub-requests.
+
+    API docs: https://docs.microsoft.com/en-us/graph/json-batching
+    """
+
+    @property
+    def base_url(self):
+        return settings.BASE_GRAPH_URL
+
+    @property
+    def window(self):
+        return settings.ONEDRIVE_BATCH_WINDOW
+
+    @property
+    def max_requests(self):
+        return settings.ONEDRIVE_BATCH_MAX_REQUESTS
+
+    @property
+    def max_retries(self):
+        return settings.ONEDRIVE_BATCH_MAX_RETRIES
+
+    @property
+    def default_retry_after(self):
+        return settings.ONEDRIVE_BATCH_DEFAULT_RETRY_AFTER
+
+    @property
+    def max_retry_after(self):
+        return settings.ONEDRIVE_BATCH_MAX_RETRY_AFTER
+
+    def _build_batch(self, requests):
+        serialized = []
+        for i, request in enumerate(requests):
+            sub = {'id': str(i), 'method': request.method, 'url': request.url}
+            if request.body is not None:
+                sub['body'] = request.body
+                sub['headers'] = {'Content-Type': 'application/json', **request.headers}
+            elif request.headers:
+                sub['headers'] = request.headers
+            serialized.append(sub)
+
+        return settings.BASE_GRAPH_URL + '/$batch', {
+            'data': json.dumps({'requests': serialized}),
+            'headers': {'content-type': 'application/json'},
+        }
+
+    async def _parse_batch(self, resp, requests):
+        data = await resp.json()
+        return [
+            (requests[int(sub['id'])],
+             BatchResponse(sub['status'], sub.get('headers'), sub.get('body')))
+            for sub in data['responses']
+        ]
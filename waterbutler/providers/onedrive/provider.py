@@ -9,6 +9,7 @@ from waterbutler.core import provider
 from waterbutler.core import exceptions
 
 from waterbutler.providers.onedrive import settings
+from waterbutler.providers.onedrive.batch import GraphBatcher
 from waterbutler.providers.onedrive.path import OneDrivePath
 from waterbutler.providers.onedrive.metadata import (OneDriveFileMetadata,
                                                      OneDriveFolderMetadata,
@@ -46,6 +47,10 @@ class OneDriveProvider(provider.BaseProvider):
 
     * File and folder names may not end with a period.
 
+    * Metadata, delete and copy requests made concurrently by one provider instance, e.g. by
+      `_folder_file_op` or `_delete_folder_contents`, are coalesced into Graph ``$batch`` calls by
+      `GraphBatcher`.  A request that is alone in its batching window is sent as-is.
+
     """
     NAME = 'onedrive'
 
@@ -61,6 +66,7 @@ class OneDriveProvider(provider.BaseProvider):
         self.token = self.credentials['token']
         self.folder = self.settings['folder']
         self.drive_id = self.settings['drive_id']
+        self._batcher = GraphBatcher(self)
 
     # ========== properties ==========
 
@@ -106,7 +112,7 @@ class OneDriveProvider(provider.BaseProvider):
 
         item_url = self._build_graph_item_url(path)
         logger.debug(f'item_url::{item_url}')
-        resp = await self.make_request(
+        resp = await self._batcher.request(
             'GET',
             item_url,
             expects=(HTTPStatus.OK, ),
@@ -136,7 +142,7 @@ class OneDriveProvider(provider.BaseProvider):
 
         item_url = self._build_graph_item_url(path)
         logger.debug(f'item_url::{item_url}')
-        resp = await self.make_request(
+        resp = await self._batcher.request(
             'GET',
             item_url,
             expects=(HTTPStatus.OK, ),
@@ -169,7 +175,7 @@ class OneDriveProvider(provider.BaseProvider):
 
         assert isinstance(base, OneDrivePath), 'Base path should be validated'
         assert base.identifier, 'Base path should be validated'
-        resp = await self.make_request(
+        resp = await self._batcher.request(
             'GET',
             self._build_graph_item_url(base.identifier, 'children'),
             expects=(HTTPStatus.OK, HTTPStatus.NOT_FOUND),
@@ -211,7 +217,7 @@ class OneDriveProvider(provider.BaseProvider):
 
         url = self._build_graph_item_url(path.identifier, expand='children')
         logger.debug(f'url::{repr(url)}')
-        resp = await self.make_request(
+        resp = await self._batcher.request(
             'GET',
             url,
             expects=(HTTPStatus.OK, ),
@@ -280,7 +286,7 @@ class OneDriveProvider(provider.BaseProvider):
             # TODO: we should be able to get the download url from validate_v1_path
             metadata_url = self._build_graph_item_url(path.identifier)
             logger.debug(f'metadata_url to get download path: url::{metadata_url}')
-            metadata_resp = await self.make_request(
+            metadata_resp = await self._batcher.request(
                 'GET',
                 metadata_url,
                 expects=(HTTPStatus.OK, ),
@@ -403,10 +409,9 @@ class OneDriveProvider(provider.BaseProvider):
                 code=HTTPStatus.BAD_REQUEST,
             )
 
-        resp = await self.make_request(
+        resp = await self._batcher.request(
             'DELETE',
             self._build_graph_item_url(path.identifier),
-            data={},
             expects=(HTTPStatus.NO_CONTENT,),
             throws=exceptions.DeleteError,
         )
@@ -440,11 +445,11 @@ class OneDriveProvider(provider.BaseProvider):
         logger.debug('intra_copy dest_provider::{} src_path::{} '
                      'dest_path::{} url::{} payload::{}'.format(repr(dest_provider), repr(src_path),
                                                                 repr(dest_path), repr(url), payload))
-        resp = await self.make_request(
+        resp = await self._batcher.request(
             'POST',
             url,
-            data=json.dumps(payload),
-            headers={'content-type': 'application/json', 'Prefer': 'respond-async'},
+            body=payload,
+            headers={'Prefer': 'respond-async'},
             expects=(HTTPStatus.ACCEPTED,),
             throws=exceptions.IntraCopyError,
         )
@@ -569,7 +574,7 @@ class OneDriveProvider(provider.BaseProvider):
         # try to get access to a file outside of the configured root.
         base_folder = None
         if not self.has_real_root() and self.folder != path_data['parentReference']['id']:
-            base_folder_resp = await self.make_request(
+            base_folder_resp = await self._batcher.request(
                 'GET', self._build_graph_item_url(self.folder),
                 expects=(HTTPStatus.OK, ),
                 throws=exceptions.MetadataError
@@ -838,6 +843,13 @@ class OneDriveProvider(provider.BaseProvider):
         :param OneDrivePath path: OneDrivePath object for folder
         """
         children = await self.metadata(path)
-        for child in children:  # type: ignore
-            onedrive_path = await self.validate_path(child.path)
-            await self.delete(onedrive_path)
+
+        async def delete_child(child):
+            await self.delete(await self.validate_path(child.path))
+
+        # deleted concurrently so that the validations and deletes are sent as $batch calls
+        for i in range(0, len(children), settings.ONEDRIVE_BATCH_MAX_REQUESTS):  # type: ignore
+            await asyncio.gather(*[
+                delete_child(child)
+                for child in children[i:i + settings.ONEDRIVE_BATCH_MAX_REQUESTS]  # type: ignore
+            ])
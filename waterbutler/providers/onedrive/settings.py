@@ -12,3 +12,13 @@ ONEDRIVE_CHUNKED_UPLOAD_CHUNK_SIZE = int(config.get('ONEDRIVE_CHUNKED_UPLOAD_CHU
 # 4mb
 ONEDRIVE_CHUNKED_UPLOAD_FILE_SIZE = int(config.get('ONEDRIVE_CHUNKED_UPLOAD_FILE_SIZE',
                                                    1024 * 1024 * 4))
+
+# Concurrent Graph requests made within this many seconds of each other are sent as one $batch
+ONEDRIVE_BATCH_WINDOW = float(config.get('ONEDRIVE_BATCH_WINDOW', 0.01))
+# Graph accepts at most 20 sub-requests per $batch call
+ONEDRIVE_BATCH_MAX_REQUESTS = int(config.get('ONEDRIVE_BATCH_MAX_REQUESTS', 20))
+# How often a throttled (429) sub-request is retried before giving up
+ONEDRIVE_BATCH_MAX_RETRIES = int(config.get('ONEDRIVE_BATCH_MAX_RETRIES', 3))
+# Wait used when a 429 has no Retry-After header, and the cap on any Retry-After we honor
+ONEDRIVE_BATCH_DEFAULT_RETRY_AFTER = float(config.get('ONEDRIVE_BATCH_DEFAULT_RETRY_AFTER', 1))
+ONEDRIVE_BATCH_MAX_RETRY_AFTER = float(config.get('ONEDRIVE_BATCH_MAX_RETRY_AFTER', 30))
@@ -0,0 +1,319 @@
+"""A local disk cache for the blobs osfstorage keeps on its storage provider.
+
+osfstorage stores every version of every file on the storage provider under the sha256 of its
+content, so a blob never changes once it is written and can be cached for as long as there is room
+for it.  `BlobCache` keeps whole blobs in ``DOWNLOAD_CACHE_DIR``, one file per sha256, evicting the
+least recently used ones once they take up more than ``DOWNLOAD_CACHE_MAX_BYTES``.
+
+A missing blob is cached while it is served: `BlobCache.fetch` hands back the download from the
+storage provider wrapped in a `CachingStream`, which writes each chunk to a temporary file as the
+client reads it, so the first byte isn't held back until the whole blob is on disk.  Requests for
+a blob that is already being cached are sent to the storage provider.  The temporary file is
+renamed into place once the whole blob has been read and its sha256 checked, so a reader never sees
+a partly written blob.  All of the disk IO runs on the default executor.  Several processes may
+share the directory, but each one only counts the blobs it has seen towards the size limit.
+
+The cache never fails a download: if the directory can't be read or written, the blob is served
+from the storage provider and the error is logged.
+"""
+import os
+import uuid
+import asyncio
+import hashlib
+import logging
+import weakref
+import collections
+
+from waterbutler.core import ranged
+from waterbutler.core import streams
+
+from waterbutler.providers.osfstorage import settings
+
+logger = logging.getLogger(__name__)
+
+_CACHES = {}  # type: dict
+
+# how many blobs too large to cache are remembered, so they aren't downloaded again just to be
+# found too large
+OVERSIZED_ENTRIES = 1024
+
+
+async def _run(func, *args):
+    return await asyncio.get_event_loop().run_in_executor(None, func, *args)
+
+
+def _discard_part(file_pointer, partial):
+    file_pointer.close()
+    try:
+        os.remove(partial)
+    except FileNotFoundError:
+        pass
+    except OSError as exc:
+        logger.warning(f'Could not remove {partial}: {exc}')
+
+
+class BlobCache:
+
+    def __init__(self, directory, max_bytes, read_size=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.read_size = read_size or settings.DOWNLOAD_CACHE_READ_SIZE
+        self.size = 0
+        self._blobs = collections.OrderedDict()  # type: collections.OrderedDict
+        self._filling = set()  # type: set
+        self._oversized = collections.OrderedDict()  # type: collections.OrderedDict
+        self._loading = None
+
+    async def _load(self):
+        """Index the blobs already in the directory the first time the cache is used."""
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self._index())
+        await asyncio.shield(self._loading)
+
+    async def _index(self):
+        try:
+            found = await _run(self._scan)
+        except OSError as exc:
+            logger.error(f'Could not load the download cache in {self.directory}: {exc}')
+            return
+        for _, name, size in found:
+            self._add(name, size)
+        await self._evict()
+
+    def _scan(self):
+        """The blobs in the directory, least recently used first.  Temporary files may belong to a
+        fill in another process and are left alone."""
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith('.part'):
+                    continue
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name, stat.st_size))
+        return sorted(found)
+
+    def _path(self, sha256):
+        return os.path.join(self.directory, sha256)
+
+    def _add(self, sha256, size):
+        self.size += size - self._blobs.get(sha256, 0)
+        self._blobs[sha256] = size
+        self._blobs.move_to_end(sha256)
+
+    def _forget(self, sha256):
+        self.size -= self._blobs.pop(sha256, 0)
+
+    async def _evict(self):
+        evicted = []
+        while self.size > self.max_bytes and self._blobs:
+            sha256, size = self._blobs.popitem(last=False)
+            self.size -= size
+            evicted.append(self._path(sha256))
+        if evicted:
+            await _run(self._remove, evicted)
+
+    @staticmethod
+    def _remove(paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as exc:
+                logger.warning(f'Could not evict {path}: {exc}')
+                continue
+            logger.debug(f'Evicted {os.path.basename(path)} from the download cache')
+
+    def fits(self, size):
+        return size is not None and size <= self.max_bytes
+
+    def _remember_oversized(self, sha256):
+        self._oversized[sha256] = True
+        self._oversized.move_to_end(sha256)
+        while len(self._oversized) > OVERSIZED_ENTRIES:
+            self._oversized.popitem(last=False)
+
+    async def open(self, sha256, range=None):
+        """Return a stream of the cached blob, or of the inclusive byte ``range`` of it, or
+        `None` if the blob isn't cached."""
+        await self._load()
+        try:
+            file_pointer, size = await _run(self._open, sha256)
+        except FileNotFoundError:
+            # evicted by another process
+            self._forget(sha256)
+            return None
+        except OSError as exc:
+            logger.error(f'Could not open {sha256} in the download cache: {exc}')
+            self._forget(sha256)
+            return None
+        self._add(sha256, size)
+
+        if range is None or (range[0] == 0 and (range[1] is None or range[1] >= size - 1)):
+            stream = streams.FileStreamReader(file_pointer)
+        else:
+            start, end = range
+            end = size - 1 if end is None else min(end, size - 1)
+            stream = streams.PartialFileStreamReader(file_pointer, (start, end))
+        return stream
+
+    def _open(self, sha256):
+        file_pointer = open(self._path(sha256), 'rb')
+        # the mtime orders the blobs when the cache is next loaded
+        os.utime(file_pointer.fileno())
+        return file_pointer, os.fstat(file_pointer.fileno()).st_size
+
+    async def fetch(self, sha256, fetch):
+        """Download the blob named ``sha256`` with ``fetch``, a coroutine function returning a
+        stream of the whole blob, and cache it as it is read.
+
+        Returns a ``(caching, stream)`` pair.  ``stream`` is a `CachingStream` unless the blob
+        can't be cached, because it is too large, another request is caching it already or the
+        temporary file can't be created, in which case it is the stream ``fetch`` returned and
+        ``caching`` is `False`.
+        """
+        await self._load()
+        if not self._fillable(sha256):
+            return False, await fetch()
+
+        self._filling.add(sha256)
+        try:
+            stream = await fetch()
+        except BaseException:
+            self._filling.discard(sha256)
+            raise
+        if not self.fits(stream.size):
+            self._filling.discard(sha256)
+            self._remember_oversized(sha256)
+            return False, stream
+
+        partial = os.path.join(self.directory, f'{sha256}.{uuid.uuid4().hex}.part')
+        try:
+            file_pointer = await _run(open, partial, 'wb')
+        except BaseException as exc:
+            self._filling.discard(sha256)
+            if not isinstance(exc, OSError):
+                ranged.discard(stream)
+                raise
+            logger.error(f'Could not cache {sha256}: {exc}')
+            return False, stream
+        return True, CachingStream(self, sha256, stream, file_pointer, partial)
+
+    def _fillable(self, sha256):
+        """Whether a download of ``sha256`` should be cached: it isn't being cached already and
+        isn't known to be too large."""
+        return sha256 not in self._filling and sha256 not in self._oversized
+
+    async def fill(self, sha256, fetch):
+        """Cache the blob named ``sha256`` without serving it, downloading it with ``fetch``.
+        Returns whether the blob was cached.  Nothing is downloaded if the blob is cached or being
+        cached already, or is known to be too large."""
+        await self._load()
+        if sha256 in self._blobs:
+            return True
+        if not self._fillable(sha256):
+            return False
+        caching, stream = await self.fetch(sha256, fetch)
+        if not caching:
+            ranged.discard(stream)
+            return False
+        while await stream.read(self.read_size):
+            pass
+        return stream.cached
+
+    async def _commit(self, sha256, file_pointer, partial, size, hexdigest):
+        """Rename the temporary file of a completely read blob into place."""
+        self._filling.discard(sha256)
+        if hexdigest != sha256:
+            await _run(_discard_part, file_pointer, partial)
+            raise ValueError(f'Downloaded content does not match {sha256}')
+        await _run(self._replace, file_pointer, partial, self._path(sha256))
+        self._add(sha256, size)
+        await self._evict()
+
+    @staticmethod
+    def _replace(file_pointer, partial, path):
+        try:
+            file_pointer.close()
+            os.replace(partial, path)
+        except BaseException:
+            _discard_part(file_pointer, partial)
+            raise
+
+    def _abandon(self, sha256, file_pointer, partial):
+        """Drop the temporary file of a blob that wasn't read to its end."""
+        self._filling.discard(sha256)
+        try:
+            asyncio.get_running_loop().run_in_executor(None, _discard_part, file_pointer, partial)
+        except RuntimeError:
+            _discard_part(file_pointer, partial)
+
+
+class CachingStream(streams.BaseStream):
+    """Serve a blob from the storage provider and write it to the cache as it is read, see
+    `BlobCache.fetch`.  If the stream is dropped before its end, nothing is cached."""
+
+    def __init__(self, cache, sha256, stream, file_pointer, partial):
+        super().__init__()
+        self.cache = cache
+        self.sha256 = sha256
+        self.stream = stream
+        self.content_type = getattr(stream, 'content_type', 'application/octet-stream')
+        self.file_pointer = file_pointer
+        self.partial = partial
+        self.cached = False
+        self._digest = hashlib.sha256()
+        self._written = 0
+        self._finalizer = weakref.finalize(self, cache._abandon, sha256, file_pointer, partial)
+
+    @property
+    def size(self):
+        return self.stream.size
+
+    def close(self):
+        if self._finalizer.alive:
+            self._finalizer()
+        ranged.discard(self.stream)
+        self.feed_eof()
+
+    async def _read(self, size=-1):
+        chunk = await self.stream.read(size)
+        if chunk and self._finalizer.alive:
+            self._digest.update(chunk)
+            try:
+                await _run(self.file_pointer.write, chunk)
+            except OSError as exc:
+                # keep serving the blob, just stop caching it
+                logger.error(f'Could not cache {self.sha256}: {exc}')
+                self._finalizer()
+            self._written += len(chunk)
+        if self._finalizer.alive and (not chunk or self._written >= self.stream.size):
+            await self._finish()
+        if not chunk:
+            self.feed_eof()
+        return chunk
+
+    async def _finish(self):
+        self._finalizer.detach()
+        try:
+            await self.cache._commit(self.sha256, self.file_pointer, self.partial, self._written,
+                                     self._digest.hexdigest())
+        except (ValueError, OSError) as exc:
+            logger.error(f'Could not cache {self.sha256}: {exc}')
+            return
+        self.cached = True
+
+
+def get_cache():
+    """Return the cache configured by ``DOWNLOAD_CACHE_DIR``, or `None` if it is disabled."""
+    directory = settings.DOWNLOAD_CACHE_DIR
+    if not directory:
+        return None
+    try:
+        return _CACHES[directory]
+    except KeyError:
+        cache = _CACHES[directory] = BlobCache(directory, settings.DOWNLOAD_CACHE_MAX_BYTES)
+        return cache
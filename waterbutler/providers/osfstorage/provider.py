@@ -14,6 +14,7 @@ from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.core.metadata import BaseMetadata
 
+from waterbutler.providers.osfstorage import cache
 from waterbutler.providers.osfstorage import settings
 from waterbutler.providers.osfstorage.metadata import OsfStorageFileMetadata
 from waterbutler.providers.osfstorage.metadata import OsfStorageFolderMetadata
@@ -71,7 +72,8 @@ class OSFStorageProvider(provider.BaseProvider):
         resp = await self.make_signed_request(
             'GET',
             self.build_url(obj_id, 'lineage'),
-            expects=(200,)
+            expects=(200,),
+            hedge=True,
         )
 
         data = await resp.json()
@@ -97,7 +99,8 @@ class OSFStorageProvider(provider.BaseProvider):
         resp = await self.make_signed_request(
             'GET',
             self.build_url(path, 'lineage'),
-            expects=(200, 404)
+            expects=(200, 404),
+            hedge=True,
         )
         if resp.status == 404:
             await resp.release()
@@ -159,6 +162,9 @@ class OSFStorageProvider(provider.BaseProvider):
         # For 1-to-1 bucket-region mapping, bucket is the same if and only if region is the same
         return self.settings['storage']['bucket'] == other.settings['storage']['bucket']
 
+    def can_upload_by_hash(self):
+        return settings.INSTANT_UPLOADS
+
     def can_intra_copy(self, other, path=None):
         return isinstance(other, self.__class__) and self.is_same_region(other)
 
@@ -220,18 +226,60 @@ class OSFStorageProvider(provider.BaseProvider):
             expects=(200, ),
             params=user_param,
             throws=exceptions.DownloadError,
+            hedge=True,
         )
         data = await resp.json()
 
         provider_object = self.make_provider(data['settings'])
         name = data['data'].pop('name')
+        sha256 = data['data']['path']
         data['data']['path'] = await provider_object.validate_path('/' + data['data']['path'])
         download_kwargs = {}
         download_kwargs.update(kwargs)
         download_kwargs.update(data['data'])
         download_kwargs['display_name'] = kwargs.get('display_name') or name
+
+        blob_cache = cache.get_cache()
+        if blob_cache is not None and not download_kwargs.get('accept_url'):
+            stream = await self._download_cached(blob_cache, sha256, provider_object,
+                                                 download_kwargs)
+            if stream is not None:
+                stream.name = download_kwargs['display_name']
+                return stream
+
         return await provider_object.download(**download_kwargs)
 
+    async def _download_cached(self, blob_cache, sha256, provider_object, download_kwargs):
+        """Serve the blob named ``sha256`` from the local download cache, caching it from
+        ``provider_object`` on a miss.  Returns `None` if the download should go to the storage
+        provider instead."""
+        request_range = download_kwargs.get('range')
+        stream = await blob_cache.open(sha256, request_range)
+        if stream is not None:
+            self.metrics.add('download.cache', 'hit')
+            self.metrics.add('download.cache_bytes_saved', stream.size)
+            return stream
+
+        async def fetch():
+            return await provider_object.download(**dict(download_kwargs, range=None))
+
+        if request_range is not None:
+            # serve the range from the storage provider and cache the whole blob meanwhile
+            self.metrics.add('download.cache', 'miss')
+            utils.background(asyncio.ensure_future(self._fill_cache(blob_cache, sha256, fetch)))
+            return None
+
+        caching, stream = await blob_cache.fetch(sha256, fetch)
+        self.metrics.add('download.cache', 'miss' if caching else 'bypass')
+        return stream
+
+    @staticmethod
+    async def _fill_cache(blob_cache, sha256, fetch):
+        try:
+            await blob_cache.fill(sha256, fetch)
+        except Exception:
+            logger.warning(f'Could not cache {sha256}', exc_info=True)
+
     async def upload(self, stream, path, **kwargs):
         """Upload a new file to osfstorage
 
@@ -247,6 +295,9 @@ class OSFStorageProvider(provider.BaseProvider):
         Once this is done the file metadata is sent back to the metadata provider to be recorded.
         Finally, WB constructs its metadata response and sends that back to the original request
         issuer.
+
+        If a ``sha256`` keyword is given (see `upload_by_hash`), the file is rejected with an
+        `UploadChecksumMismatchError` unless its content has that hash.
         """
 
         # This path is called when uploading to osfstorage directly or when moving/copying from
@@ -270,10 +321,72 @@ class OSFStorageProvider(provider.BaseProvider):
 
         data, created = await self._send_to_metadata_provider(stream, path, metadata, **kwargs)
 
-        name = path.name
+        return self._uploaded_metadata(path, metadata, data), created
+
+    async def upload_by_hash(self, path, sha256, size):
+        """Create ``path`` from content already in the storage region, without transferring it.
+
+        Content is stored under its sha256, so if an object of ``size`` bytes exists at that name
+        the new version is registered with the metadata provider straight away.  Only the sha256
+        is sent along with it, since it is the one hash WB can vouch for without the bytes.
+        Returns `None` if the content isn't there; the caller then uploads it with ``sha256`` so
+        that the declared hash gets checked.
+
+        Knowing a hash is not having the content, so only content the resource already references
+        near ``path`` is reused, see `_references_content`.
+        """
+        if not await self._references_content(path, sha256):
+            self.provider_metrics.add('upload_by_hash', 'unreferenced')
+            return None
+
+        storage_provider = self.make_provider(self.settings)
+        remote_complete_path = await storage_provider.validate_path('/' + sha256)
+        try:
+            metadata = await storage_provider.metadata(remote_complete_path)
+        except exceptions.MetadataError as e:
+            if e.code != 404:
+                raise
+            self.provider_metrics.add('upload_by_hash', 'miss')
+            return None
+
+        if metadata.size is None or int(metadata.size) != size:
+            logger.warning(f'Declared size {size} does not match the {metadata.size} bytes stored '
+                           f'for {sha256}, uploading the content')
+            self.provider_metrics.add('upload_by_hash', 'size_mismatch')
+            return None
 
+        quota = await self._check_resource_quota()
+        if quota['over_quota']:
+            raise OsfStorageQuotaExceededError('')
+
+        self.provider_metrics.add('upload_by_hash', 'hit')
+        metadata = metadata.serialized()
+        data, created = await self._send_to_metadata_provider(None, path, metadata,
+                                                              hashes={'sha256': sha256})
+        return self._uploaded_metadata(path, metadata, data), created
+
+    async def _references_content(self, path, sha256):
+        """Whether an earlier version of the file at ``path``, or a file in the same folder, has
+        the content ``sha256``.  Those are already readable by whoever can write to ``path``, so
+        linking their content again discloses nothing."""
+        if path.identifier is not None:
+            revisions = await self.revisions(path)
+            if any(revision.extra['hashes']['sha256'] == sha256 for revision in revisions):
+                return True
+
+        if path.parent.identifier is None:
+            return False
+        siblings = await self._children_metadata(path.parent)
+        return any(
+            item.kind == 'file' and item.extra['hashes']['sha256'] == sha256
+            for item in siblings
+        )
+
+    def _uploaded_metadata(self, path, metadata, data):
+        """Combine the storage provider's ``metadata`` of an upload with the ``data`` the metadata
+        provider recorded for it."""
         metadata.update({
-            'name': name,
+            'name': path.name,
             'md5': data['data']['md5'],
             'path': data['data']['path'],
             'sha256': data['data']['sha256'],
@@ -285,7 +398,7 @@ class OSFStorageProvider(provider.BaseProvider):
         })
 
         path._parts[-1]._id = metadata['path'].strip('/')
-        return OsfStorageFileMetadata(metadata, str(path)), created
+        return OsfStorageFileMetadata(metadata, str(path))
 
     async def delete(self, path, confirm_delete=0, **kwargs):
         """Delete file, folder, or provider root contents
@@ -520,7 +633,8 @@ class OSFStorageProvider(provider.BaseProvider):
         resp = await self.make_signed_request(
             'GET',
             self.build_url(path.identifier, revision=revision),
-            expects=(200, )
+            expects=(200, ),
+            hedge=True,
         )
         return OsfStorageFileMetadata((await resp.json()), str(path))
 
@@ -528,7 +642,8 @@ class OSFStorageProvider(provider.BaseProvider):
         resp = await self.make_signed_request(
             'GET',
             self.build_url(path.identifier, 'children', user_id=self.auth.get('id')),
-            expects=(200, )
+            expects=(200, ),
+            hedge=True,
         )
         resp_json = await resp.json()
 
@@ -628,9 +743,10 @@ class OSFStorageProvider(provider.BaseProvider):
 
         return folder_meta, created
 
-    async def _send_to_storage_provider(self, stream, path, **kwargs):
+    async def _send_to_storage_provider(self, stream, path, sha256=None, **kwargs):
         """Send uploaded file data to the storage provider, where it will be stored w/o metadata
-        in a content-addressable format.
+        in a content-addressable format.  If ``sha256`` is given and the data doesn't match it, the
+        data is discarded and `UploadChecksumMismatchError` raised.
 
         :return: metadata of the file as it exists on the storage provider
         """
@@ -648,6 +764,12 @@ class OSFStorageProvider(provider.BaseProvider):
                                       fetch_metadata=False, **kwargs)
 
         complete_name = stream.writers['sha256'].hexdigest
+        if sha256 is not None and sha256 != complete_name:
+            await storage_provider.delete(remote_pending_path)
+            raise exceptions.UploadChecksumMismatchError(
+                f'The uploaded file does not match its declared sha256 {sha256}',
+                code=HTTPStatus.BAD_REQUEST)
+
         remote_complete_path = await storage_provider.validate_path('/' + complete_name)
 
         try:
@@ -661,12 +783,18 @@ class OSFStorageProvider(provider.BaseProvider):
 
         return metadata
 
-    async def _send_to_metadata_provider(self, stream, path, metadata, **kwargs):
+    async def _send_to_metadata_provider(self, stream, path, metadata, hashes=None, **kwargs):
         """Send metadata about the uploaded file (including its location on the storage provider) to
-        the OSF.
+        the OSF.  The file's hashes are read from ``stream`` unless given in ``hashes``.
 
         :return: metadata of the file and a bool indicating if the file was newly created
         """
+        if hashes is None:
+            hashes = {
+                'md5': stream.writers['md5'].hexdigest,
+                'sha1': stream.writers['sha1'].hexdigest,
+                'sha256': stream.writers['sha256'].hexdigest,
+            }
 
         resp = await self.make_signed_request(
             'POST',
@@ -677,11 +805,7 @@ class OSFStorageProvider(provider.BaseProvider):
                 'user': self.auth['id'],
                 'settings': self.settings['storage'],
                 'metadata': metadata,
-                'hashes': {
-                    'md5': stream.writers['md5'].hexdigest,
-                    'sha1': stream.writers['sha1'].hexdigest,
-                    'sha256': stream.writers['sha256'].hexdigest,
-                },
+                'hashes': hashes,
                 'worker': {
                     'host': os.uname()[1],
                     # TODO: Include additional information
@@ -19,3 +19,20 @@ QUOTA_RETRIES = int(config.get('QUOTA_RETRIES', 2))
 # base time in seconds to wait between each quota request.  This is multiplied by the current
 # number of retries attempted.
 QUOTA_RETRIES_DELAY = int(config.get('QUOTA_RETRIES_DELAY', 1))
+
+# Let uploads that declare their sha256 in ``X-Content-SHA256`` skip the transfer when the storage
+# region already holds that content.  A hash doesn't prove the uploader has the content, so only
+# content the project already references next to the upload, in an earlier version of the file or
+# in a file in the same folder, is reused.  Off unless set.
+INSTANT_UPLOADS = config.get_bool('INSTANT_UPLOADS', False)
+
+# Keep the blobs downloaded from the storage provider in this directory, see
+# `waterbutler.providers.osfstorage.cache`.  Only downloads streamed through WaterButler are
+# cached, redirects to the storage provider are not.  Disabled unless set.
+DOWNLOAD_CACHE_DIR = config.get_nullable('DOWNLOAD_CACHE_DIR', None)
+
+# Evict the least recently used blobs once the cache holds more than this many bytes.  Larger
+# blobs are never cached.
+DOWNLOAD_CACHE_MAX_BYTES = int(config.get('DOWNLOAD_CACHE_MAX_BYTES', 10 * 1024 ** 3))  # 10GB
+
+DOWNLOAD_CACHE_READ_SIZE = int(config.get('DOWNLOAD_CACHE_READ_SIZE', 1024 * 1024))  # 1MB
@@ -1,11 +1,15 @@
+import asyncio
+
 import aiohttp
 
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
+from waterbutler import settings as wb_settings
 
 from waterbutler.providers.owncloud import utils
+from waterbutler.providers.owncloud import settings as pd_settings
 from waterbutler.providers.owncloud.metadata import OwnCloudFileRevisionMetadata
 
 
@@ -34,6 +38,11 @@ class OwnCloudProvider(provider.BaseProvider):
 
     * User credentials are stored in a aiohttp.BasicAuth object. At the moment, there isn't a
       better way to do this.
+
+    * Recursive operations (zip, cross-provider folder copy/move) list the whole tree up front with
+      a single ``Depth: infinity`` PROPFIND when the server allows it, falling back to one request
+      per folder.  The listings are held in ``_dav_tree`` and each one is consumed by the first
+      folder metadata request for it.
     """
     NAME = 'owncloud'
 
@@ -49,6 +58,9 @@ class OwnCloudProvider(provider.BaseProvider):
         self._auth = aiohttp.BasicAuth(credentials['username'], credentials['password'])
         self.metrics.add('host', self.url)
 
+        # Prefetched folder listings, keyed by the folder's full path.  See `_prime_tree`.
+        self._dav_tree = {}
+
     def connector(self):
         return aiohttp.TCPConnector(ssl=self.verify_ssl)
 
@@ -223,6 +235,23 @@ class OwnCloudProvider(provider.BaseProvider):
 
             * 204: Empty response
             * 207: Multipart response
+
+        If the listing for ``path`` was prefetched by `_prime_tree`, it is returned (and dropped
+        from the prefetch cache) without contacting the server.
+        """
+        if skip_first and path.full_path in self._dav_tree:
+            return self._dav_tree.pop(path.full_path)
+
+        return [item async for item in self._iter_propfind(path, skip_first=skip_first)]
+
+    async def _iter_propfind(self, path, skip_first=True, depth=None):
+        """Issue a PROPFIND against ``path`` and yield metadata objects as the 207 Multi-Status
+        body streams in, rather than buffering and parsing the whole body at once.
+
+        :param waterbutler.core.path.WaterButlerPath path: the file or folder to query
+        :param bool skip_first: don't yield the entry for ``path`` itself
+        :param str depth: value for the ``Depth`` header. The server default is used if omitted.
+        :raises: `waterbutler.core.exceptions.MetadataError`
         """
         response = await self.make_request('PROPFIND',
             self._webdav_url_ + path.full_path,
@@ -230,14 +259,108 @@ class OwnCloudProvider(provider.BaseProvider):
             throws=exceptions.MetadataError,
             auth=self._auth,
             connector=self.connector(),
+            headers={'Depth': depth},
         )
 
-        items = []
-        if response.status == 207:
-            content = await response.content.read()
-            items = await utils.parse_dav_response(content, self.folder, skip_first)
-        await response.release()
-        return items
+        try:
+            if response.status != 207:
+                return
+
+            parser = utils.DAVResponseParser(self.folder, skip_first=skip_first)
+            async for chunk in response.content.iter_chunked(pd_settings.PROPFIND_CHUNK_SIZE):
+                for item in parser.feed(chunk):
+                    yield item
+            for item in parser.close():
+                yield item
+        finally:
+            await response.release()
+
+    async def _metadata_tree(self, path):
+        """List every folder under ``path``.  Tries a single ``Depth: infinity`` PROPFIND first.
+        If the server refuses it, or silently answers with a ``Depth: 1`` listing, the folders not
+        covered by the response are listed one level at a time, ``OP_CONCURRENCY`` at a time.
+
+        :param waterbutler.core.path.WaterButlerPath path: the folder to walk
+        :return: dict mapping the full path of each folder to the list of its children
+        :rtype: `dict`
+        """
+        root = path.full_path
+        tree = {root: []}
+        pending = []
+
+        if pd_settings.ENABLE_DEPTH_INFINITY:
+            try:
+                async for item in self._iter_propfind(path, depth='infinity'):
+                    tree.setdefault(utils.parent_href(item._href), []).append(item)
+            except exceptions.MetadataError as exc:
+                if exc.code not in (400, 403, 501):
+                    raise
+                self.metrics.add('tree.depth_infinity', False)
+                tree = {root: await self._metadata_folder(path)}
+            else:
+                honored = len(tree) > 1
+                self.metrics.add('tree.depth_infinity', honored)
+                for children in list(tree.values()):
+                    for item in children:
+                        if not item.is_folder:
+                            continue
+                        if honored:
+                            # An empty folder has no entry of its own in an infinite listing.
+                            tree.setdefault(item._href, [])
+                        else:
+                            pending.append(item)
+        else:
+            tree[root] = await self._metadata_folder(path)
+
+        if not pending:
+            pending = [item for item in tree[root] if item.is_folder and item._href not in tree]
+
+        while pending:
+            batch = pending[:wb_settings.OP_CONCURRENCY]
+            pending = pending[wb_settings.OP_CONCURRENCY:]
+            listings = await asyncio.gather(*[
+                self._metadata_folder(WaterButlerPath(item.path, prepend=self.folder))
+                for item in batch
+            ])
+            for item, children in zip(batch, listings):
+                tree[item._href] = children
+                pending.extend(child for child in children if child.is_folder)
+
+        return tree
+
+    async def _prime_tree(self, path):
+        """Prefetch the listing of every folder under ``path`` into ``_dav_tree``.  Returns
+        `False` if the listing for ``path`` was already cached.
+        """
+        if path.full_path in self._dav_tree:
+            return False
+        self._dav_tree.update(await self._metadata_tree(path))
+        return True
+
+    def _forget_tree(self, path):
+        """Drop any unconsumed prefetched listings under ``path``."""
+        for key in [key for key in self._dav_tree if key.startswith(path.full_path)]:
+            del self._dav_tree[key]
+
+    async def zip(self, path, **kwargs):
+        """Prefetches the folder tree so that the zip generator's per-folder metadata calls are
+        served without a PROPFIND each.
+        """
+        if path.is_dir:
+            await self._prime_tree(path)
+        return await super().zip(path, **kwargs)
+
+    async def _folder_file_op(self, func, dest_provider, src_path, dest_path, **kwargs):
+        """Prefetches the source tree for cross-provider folder copies and moves so that the
+        recursive walk doesn't issue a PROPFIND per subfolder.
+        """
+        primed = await self._prime_tree(src_path)
+        try:
+            return await super()._folder_file_op(func, dest_provider, src_path, dest_path,
+                                                 **kwargs)
+        finally:
+            if primed:
+                self._forget_tree(src_path)
 
     async def create_folder(self, path, **kwargs):
         """Create a folder in the current provider at ``path``. Returns an
@@ -1,6 +1,12 @@
-try:
-    from waterbutler import settings
-except ImportError:
-    settings = {}  # type: ignore
+from waterbutler import settings
 
-config = settings.get('OWNCLOUD_PROVIDER_CONFIG', {})  # type: ignore
+config = settings.child('OWNCLOUD_PROVIDER_CONFIG')
+
+
+# Size of the chunks read from a PROPFIND response body and fed to the incremental XML parser
+PROPFIND_CHUNK_SIZE = int(config.get('PROPFIND_CHUNK_SIZE', 64 * 1024))  # 64KiB
+
+# Try a single `Depth: infinity` PROPFIND when walking a folder tree (zip, cross-provider copy and
+# move) before falling back to one `Depth: 1` PROPFIND per folder.  Many servers refuse or silently
+# downgrade infinite-depth requests; both cases are detected and handled.
+ENABLE_DEPTH_INFINITY = config.get_bool('ENABLE_DEPTH_INFINITY', True)
@@ -17,6 +17,95 @@ def strip_dav_path(path):
     return path
 
 
+def parent_href(href):
+    """Returns the href of the collection containing ``href``, with a trailing slash.
+
+    :param str href: the href of a file or folder, as returned by `strip_dav_path`
+    :rtype: str
+    """
+    return href.rstrip('/').rsplit('/', 1)[0] + '/'
+
+
+def _metadata_from_element(element, folder):
+    """Build a metadata object from a single ``{DAV:}response`` element."""
+    try:
+        href = parse.unquote(strip_dav_path(element.find('{DAV:}href').text))
+    except AttributeError:
+        raise exceptions.NotFoundError(folder)
+
+    file_attrs = {}
+    attrs = element.find('{DAV:}propstat').find('{DAV:}prop')
+    for attr in attrs:
+        file_attrs[attr.tag] = attr.text
+
+    if href[-1] == '/':
+        return OwnCloudFolderMetadata(href, folder, file_attrs)
+    return OwnCloudFileMetadata(href, folder, file_attrs)
+
+
+class DAVResponseParser:
+    """Incremental parser for WebDAV 207 Multi-Status bodies.  Feed it the body as it arrives and
+    it returns the metadata for each ``{DAV:}response`` element as soon as that element has been
+    closed, discarding the parsed element afterwards.  Memory use is bounded by the size of a single
+    response entry rather than the size of the whole listing.
+
+    ::
+
+        parser = DAVResponseParser(folder, skip_first=True)
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            for item in parser.feed(chunk):
+                ...
+        for item in parser.close():
+            ...
+
+    :param str folder: Parent folder for content
+    :param bool skip_first: discard the first entry (the queried item itself)
+    """
+
+    def __init__(self, folder, skip_first=False):
+        self.folder = folder
+        self.skip_first = skip_first
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._root = None
+        self._seen = 0
+
+    def feed(self, data):
+        """Feed a chunk of the response body to the parser.
+
+        :param bytes data: the next chunk of the body
+        :return: list of metadata objects completed by this chunk
+        """
+        self._parser.feed(data)
+        return self._drain()
+
+    def close(self):
+        """Signal the end of the body.  Raises :class:`xml.etree.ElementTree.ParseError` if the
+        document was incomplete.
+
+        :return: list of any metadata objects not yet returned
+        """
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self):
+        items = []
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                if self._root is None:
+                    self._root = element
+                continue
+            if element.tag != '{DAV:}response':
+                continue
+
+            self._seen += 1
+            if not (self.skip_first and self._seen == 1):
+                items.append(_metadata_from_element(element, self.folder))
+
+            # Drop the finished entry so the tree never grows beyond one response.
+            self._root.remove(element)
+        return items
+
+
 async def parse_dav_response(content, folder, skip_first=False):
     """Parses the xml content returned from WebDAV and returns the metadata equivalent. By default,
     WebDAV returns the metadata of the queried item first. If the root directory is selected, then
@@ -28,30 +117,7 @@ async def parse_dav_response(content, folder, skip_first=False):
     :param bool skip_first: strip off the first result of the WebDAV response
     :return: List of metadata responses.
     """
-    items = []
-    tree = ET.fromstring(content)
-
-    if skip_first:
-        tree = tree[1:]
-
-    for child in tree:
-        href = ''
-        try:
-            href = parse.unquote(strip_dav_path(child.find('{DAV:}href').text))
-        except AttributeError:
-            raise exceptions.NotFoundError(folder)
-        file_type = 'file'
-        if href[-1] == '/':
-            file_type = 'dir'
-
-        file_attrs = {}
-        attrs = child.find('{DAV:}propstat').find('{DAV:}prop')
-
-        for attr in attrs:
-            file_attrs[attr.tag] = attr.text
-
-        if file_type == 'file':
-            items.append(OwnCloudFileMetadata(href, folder, file_attrs))
-        else:
-            items.append(OwnCloudFolderMetadata(href, folder, file_attrs))
-    return items
+    parser = DAVResponseParser(folder, skip_first=skip_first)
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return parser.feed(content) + parser.close()
@@ -10,7 +10,7 @@ from aiobotocore.session import get_session  # type: ignore
 from waterbutler.providers.s3 import settings
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.core.utils import make_disposition
-from waterbutler.core import streams, provider, exceptions
+from waterbutler.core import streams, provider, exceptions, ranged
 from waterbutler.providers.s3.metadata import (S3Revision,
                                                S3FileMetadata,
                                                S3FolderMetadata,
@@ -21,6 +21,37 @@ from waterbutler.providers.s3.metadata import (S3Revision,
 logger = logging.getLogger(__name__)
 
 
+class S3PartUpload(ranged.PartUpload):
+    """A multipart upload fed by `waterbutler.core.ranged`, see `S3Provider.start_part_upload`.
+    """
+
+    def __init__(self, provider, path, exists, upload_id):
+        self.provider = provider
+        self.path = path
+        self.exists = exists
+        self.upload_id = upload_id
+        self.part_size = provider.CHUNK_SIZE
+        # part number -> headers of the response to its upload
+        self.parts_metadata = {}  # type: dict
+
+    async def upload_part(self, part):
+        headers = await self.provider._upload_part(streams.StringStream(part.data), self.path,
+                                                   self.upload_id, part.number, part.size)
+        # the ETag of a part is its md5 as long as server side encryption is not used
+        if not self.provider.encrypt_uploads:
+            if (await part.digest('md5')).hex() != headers['ETag'].replace('"', ''):
+                raise exceptions.UploadChecksumMismatchError()
+        self.parts_metadata[part.number] = headers
+
+    async def complete(self):
+        parts_metadata = [self.parts_metadata[number] for number in sorted(self.parts_metadata)]
+        await self.provider._complete_multipart_upload(self.path, self.upload_id, parts_metadata)
+        return (await self.provider.metadata(self.path)), not self.exists
+
+    async def abort(self):
+        return await self.provider._abort_chunked_upload(self.path, self.upload_id)
+
+
 class S3Provider(provider.BaseProvider):
     """Provider for Amazon's S3 cloud storage service.
 
@@ -107,6 +138,7 @@ class S3Provider(provider.BaseProvider):
                     url,
                     expects=expects,
                     throws=exceptions.MetadataError,
+                    hedge=True,
                 )
         except Exception as e:
             raise exceptions.NotFoundError(f"{path} {e}")
@@ -161,61 +193,77 @@ class S3Provider(provider.BaseProvider):
 
     async def get_folder_metadata(self, path, params):
 
-        contents, response_contents, response_prefixes = [], [], []
+        response_contents, response_prefixes = [], []
         continuation_token = None
 
         while True:
-            if continuation_token:
-                params['ContinuationToken'] = continuation_token
-
-            # Docs: https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/get_paginator.html
-            # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/list_objects_v2.html#list-objects-v2
-            list_url = await self.generate_generic_presigned_url(
-                '', 'list_objects_v2', query_parameters=params, default_params=False
+            contents, prefixes, continuation_token = await self._list_folder_page(
+                params, continuation_token
             )
+            response_contents.extend(contents)
+            response_prefixes.extend(prefixes)
 
-            resp = await self.make_request(
-                'GET', list_url,
-                expects=(200, 206),
-                throws=exceptions.DownloadError
-            )
-            xml_body = await resp.text()
-            doc = xmltodict.parse(xml_body)
-            result = doc.get('ListBucketResult', {})
+            # handle pagination
+            if continuation_token is None:
+                break
 
-            contents = result.get('Contents') or []
-            common_prefixes = result.get('CommonPrefixes') or []
+        return response_contents, response_prefixes
 
-            if isinstance(contents, dict):
-                contents = [contents]
-            if isinstance(common_prefixes, dict):
-                common_prefixes = [common_prefixes]
+    async def _list_folder_page(self, params, continuation_token=None, max_keys=None):
+        """List one page of the keys and common prefixes matching ``params``.  Returns them and
+        the continuation token of the next page, or `None` after the last page."""
+        params = dict(params)
+        if continuation_token:
+            params['ContinuationToken'] = continuation_token
+        if max_keys:
+            params['MaxKeys'] = max_keys
+
+        # Docs: https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/get_paginator.html
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/list_objects_v2.html#list-objects-v2
+        list_url = await self.generate_generic_presigned_url(
+            '', 'list_objects_v2', query_parameters=params, default_params=False
+        )
 
-            for content in contents:
-                key = content.get('Key')
-                if key:
-                    # cast xml string encoding to display the name user downloaded (to be it compatable with make_requests),
-                    # have tried yarl and furl but not see it to be helpful
-                    # Todo: maybe there is a better approach (not confident all encoding is casted)
-                    #  or use commented 'get_folder_metadata' above where no cast is needed
-                    key = key.replace('+', ' ')
-                    content['Key'] = unquote(key)
-                    response_contents.append(content)
+        resp = await self.make_request(
+            'GET', list_url,
+            expects=(200, 206),
+            throws=exceptions.DownloadError,
+            hedge=True,
+        )
+        xml_body = await resp.text()
+        doc = xmltodict.parse(xml_body)
+        result = doc.get('ListBucketResult', {})
 
-            for common_prefix in common_prefixes:
-                prefix = common_prefix.get('Prefix')
-                if prefix:
-                    prefix = prefix.replace('+', ' ')
-                    common_prefix['Prefix'] = unquote(prefix)
-                    response_prefixes.append(common_prefix)
+        contents = result.get('Contents') or []
+        common_prefixes = result.get('CommonPrefixes') or []
 
-            # handle pagination
-            if result.get('IsTruncated') == 'true':
-                continuation_token = result.get('NextContinuationToken')
-            else:
-                break
+        if isinstance(contents, dict):
+            contents = [contents]
+        if isinstance(common_prefixes, dict):
+            common_prefixes = [common_prefixes]
 
-        return response_contents, response_prefixes
+        response_contents, response_prefixes = [], []
+        for content in contents:
+            key = content.get('Key')
+            if key:
+                # cast xml string encoding to display the name user downloaded (to be it compatable with make_requests),
+                # have tried yarl and furl but not see it to be helpful
+                # Todo: maybe there is a better approach (not confident all encoding is casted)
+                #  or use commented 'get_folder_metadata' above where no cast is needed
+                key = key.replace('+', ' ')
+                content['Key'] = unquote(key)
+                response_contents.append(content)
+
+        for common_prefix in common_prefixes:
+            prefix = common_prefix.get('Prefix')
+            if prefix:
+                prefix = prefix.replace('+', ' ')
+                common_prefix['Prefix'] = unquote(prefix)
+                response_prefixes.append(common_prefix)
+
+        if result.get('IsTruncated') == 'true':
+            return response_contents, response_prefixes, result.get('NextContinuationToken')
+        return response_contents, response_prefixes, None
 
     async def delete_s3_bucket_folder_objects(self, path):
         continuation_token = None
@@ -420,6 +468,17 @@ class S3Provider(provider.BaseProvider):
     def can_intra_copy(self, dest_provider, path=None):
         return isinstance(self, type(dest_provider)) and not getattr(path, 'is_dir', False)
 
+    def can_download_ranges(self):
+        return True
+
+    def can_upload_parts(self, size):
+        return size > self.CHUNK_SIZE
+
+    async def start_part_upload(self, path, size):
+        await self._check_region()
+        path, exists = await self.handle_name_conflict(path, conflict='replace')
+        return S3PartUpload(self, path, exists, await self._create_upload_session(path))
+
     def can_intra_move(self, dest_provider, path=None):
         return isinstance(self, type(dest_provider)) and not getattr(path, 'is_dir', False)
 
@@ -932,6 +991,27 @@ class S3Provider(provider.BaseProvider):
             # if the path is root there is no need to test if it exists
             await self.check_key_existence(path_prefix)
 
+        return self._folder_items(path_prefix, contents, prefixes)
+
+    async def list_folder(self, path, cursor=None, page_size=None, **kwargs):
+        """List one page of the folder at ``path``, using S3's continuation tokens as cursors."""
+        await self._check_region()
+
+        path_prefix = path.path
+        params = {'Prefix': path_prefix, 'Delimiter': '/', 'Bucket': self.bucket_name}
+
+        contents, prefixes, next_cursor = await self._list_folder_page(params, cursor, page_size)
+
+        if cursor is None and not contents and not prefixes and not path.is_root:
+            # see `_metadata_folder`
+            await self.check_key_existence(path_prefix)
+
+        items = self._folder_items(path_prefix, contents, prefixes)
+        for item in items:
+            item.raw['base_folder'] = self.base_folder
+        return items, next_cursor
+
+    def _folder_items(self, path_prefix, contents, prefixes):
         if isinstance(contents, dict):
             contents = [contents]
 
@@ -944,7 +1024,7 @@ class S3Provider(provider.BaseProvider):
         ]
 
         for content in contents:
-            if content['Key'] == params['Prefix']:
+            if content['Key'] == path_prefix:
                 continue
 
             if content['Key'].endswith('/'):
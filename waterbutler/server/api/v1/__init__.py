@@ -1,6 +1,8 @@
 from waterbutler.server.api.v1 import provider
+from waterbutler.server.api.v1 import operations
 PREFIX = 'v1'
 
 HANDLERS = [
-    provider.ProviderHandler.as_entry()
+    provider.ProviderHandler.as_entry(),
+    operations.OperationHandler.as_entry(),
 ]
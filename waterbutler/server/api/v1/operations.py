@@ -0,0 +1,94 @@
+"""Status resources for moves and copies that outlive their request.
+
+A move or copy that doesn't finish in time is answered with a 202 pointing at
+``/v1/operations/<id>``:
+
+* Intra-provider operations that run past ``INTRA_MOVE_COPY_TIMEOUT`` keep running on the loop of
+  the server that started them, see `run`.
+* Celery tasks that run past ``WAIT_TIMEOUT`` report from the worker running them.
+
+Both publish their status to the progress store, see :mod:`waterbutler.core.progress`, so any
+server can answer for them, and both stop when ``DELETE`` on the operation sets the store's
+cancel flag.  A record is only shown to or cancelled by the user who started the operation, who
+has to be authorized for the resource it writes to.
+"""
+import asyncio
+import logging
+from http import HTTPStatus
+
+import furl
+
+from waterbutler.server import settings
+from waterbutler.core import progress
+from waterbutler.core import exceptions
+from waterbutler.server.auth import AuthHandler
+from waterbutler.server.api.v1 import core
+
+logger = logging.getLogger(__name__)
+
+auth_handler = AuthHandler(settings.AUTH_HANDLERS)
+
+
+def url(operation_id):
+    operation_url = furl.furl(settings.DOMAIN)
+    operation_url.path.add(['v1', 'operations', operation_id])
+    return operation_url.url
+
+
+def serialize_task(task_id, attributes):
+    """Serialize the progress record of a move or copy.  Its owner is left out."""
+    return {
+        'id': task_id,
+        'type': 'operations',
+        'attributes': {key: value for key, value in attributes.items() if key != 'owner'},
+        'links': {'self': url(task_id)},
+    }
+
+
+async def run(operation_id, action, task, owner):
+    """Publish the progress of ``task``, the running intra move or copy into ``owner``'s resource,
+    under ``operation_id`` until it is done, and cancel it if the operation is cancelled.
+    """
+    try:
+        async with progress.TransferProgress(operation_id, action, owner=owner) as reporter:
+            while not task.done():
+                await asyncio.wait([task], timeout=reporter.publish_interval)
+                if reporter.cancelled:
+                    task.cancel()
+            metadata, reporter.created = await task
+            reporter.metadata = metadata.json_api_serialized(owner['resource'])
+    except (exceptions.TransferCancelledError, asyncio.CancelledError):
+        task.cancel()
+    except exceptions.WaterButlerError:
+        pass
+    except Exception:
+        logger.exception(f'Intra {action} {operation_id} failed')
+
+
+class OperationHandler(core.BaseHandler):
+    PATTERN = r'/operations/(?P<operation_id>[0-9a-f-]+)/?'
+
+    async def get(self, operation_id):
+        """Report the status and progress of a long-running move or copy."""
+        record = await self._load(operation_id)
+        self.write({'data': serialize_task(operation_id, record)})
+
+    async def delete(self, operation_id):
+        """Ask a running move or copy to stop.  Files already transferred are left in place."""
+        await self._load(operation_id)
+        await progress.get_store().cancel(operation_id)
+        self.set_status(int(HTTPStatus.ACCEPTED))
+        self.write({'data': serialize_task(operation_id, await self._load(operation_id))})
+
+    async def _load(self, operation_id):
+        """The record of ``operation_id``, if the requester is the user who started it and may
+        still read (``GET``) or write (``DELETE``) the resource it writes to."""
+        record = await progress.get_store().load(operation_id)
+        owner = (record or {}).get('owner')
+        if owner is not None:
+            auth = await auth_handler.get(owner['resource'], owner['provider'], self.request,
+                                          path='/')
+            if (auth.get('auth') or {}).get('id') == owner['requester']:
+                return record
+        raise exceptions.WaterButlerError('Operation not found', code=HTTPStatus.NOT_FOUND,
+                                          is_user_error=True)
@@ -1,3 +1,5 @@
+import hmac
+import json
 import uuid
 import socket
 import asyncio
@@ -10,12 +12,14 @@ import tornado.gen
 import sentry_sdk
 
 from waterbutler.core import utils
+from waterbutler.core import timing
 from waterbutler.server import settings
 from waterbutler.server.api.v1 import core
 from waterbutler.core import remote_logging
 from waterbutler.server.auth import AuthHandler
 from waterbutler.core.log_payload import LogPayload
 from waterbutler.core import exceptions
+from waterbutler.core import metrics as wb_metrics
 from waterbutler.core.exceptions import TooManyRequests
 from waterbutler.core.streams import RequestStreamReader
 from waterbutler.server.settings import ENABLE_RATE_LIMITING
@@ -44,10 +48,21 @@ class ProviderHandler(core.BaseHandler, CreateMixin, MetadataMixin, MoveCopyMixi
     POST_VALIDATORS = {'put': 'postvalidate_put'}
     PATTERN = r'/resources/(?P<resource>(?:\w|\d)+)/providers/(?P<provider>(?:\w|\d)+)(?P<path>/.*/?)'
 
+    def initialize(self):
+        super().initialize()
+        self.timing = timing.RequestTiming()
+
     async def prepare(self, *args, **kwargs):
+        self.timing.activate(**{
+            'http.method': self.request.method,
+            'http.target': self.request.path,
+            'waterbutler.provider': self.path_kwargs.get('provider'),
+        })
+
         if ENABLE_RATE_LIMITING:
             logger.debug('>>> checking for rate-limiting')
-            limit_hit, data = self.rate_limit()
+            with self.timing.phase('ratelimit'):
+                limit_hit, data = self.rate_limit()
             if limit_hit:
                 raise TooManyRequests(data=data)
             logger.debug('>>> rate limiting check passed ...')
@@ -90,11 +105,13 @@ class ProviderHandler(core.BaseHandler, CreateMixin, MetadataMixin, MoveCopyMixi
         # Delay setup of the provider when method is post, as we need to evaluate the json body
         # action.
         if method != 'post':
-            self.auth = await auth_handler.get(self.resource, provider, self.request,
-                                               path=self.path, version=self.requested_version)
+            with self.timing.phase('auth'):
+                self.auth = await auth_handler.get(self.resource, provider, self.request,
+                                                   path=self.path, version=self.requested_version)
             self.provider = utils.make_provider(provider, self.auth['auth'],
                                                 self.auth['credentials'], self.auth['settings'])
-            self.path = await self.provider.validate_v1_path(self.path, **self.arguments)
+            with self.timing.phase('validate'):
+                self.path = await self.provider.validate_v1_path(self.path, **self.arguments)
 
         self.target_path = None
         self._discard_body = False  # Flag to discard body data when handling errors
@@ -104,14 +121,16 @@ class ProviderHandler(core.BaseHandler, CreateMixin, MetadataMixin, MoveCopyMixi
         if method in self.POST_VALIDATORS:
             await getattr(self, self.POST_VALIDATORS[method])()
 
+        self.body = b''
+        self.stream = None
+        self.add_header('X-WATERBUTLER-REQUEST-ID', str(uuid.uuid4()))
+
         # The one special case
-        if method == 'put' and self.target_path.is_file:
+        if method == 'put' and self.target_path.is_file and not await self.upload_by_hash():
             await self.prepare_stream()
-        else:
-            self.stream = None
-        self.body = b''
 
-        self.add_header('X-WATERBUTLER-REQUEST-ID', str(uuid.uuid4()))
+        # ends when the response starts, see `flush`
+        self.timing.begin('operation')
 
     async def head(self, **_):
         """Get metadata for a folder or file
@@ -211,10 +230,30 @@ class ProviderHandler(core.BaseHandler, CreateMixin, MetadataMixin, MoveCopyMixi
         self.writer = asyncio.StreamWriter(writer_transport, reader_protocol, self.reader, loop)
 
         self.stream = RequestStreamReader(self.request, self.reader)
-        self.uploader = asyncio.ensure_future(self.provider.upload(self.stream, self.target_path))
+        upload_kwargs = {}
+        if self.content_sha256 is not None and self.provider.can_upload_by_hash():
+            upload_kwargs['sha256'] = self.content_sha256
+        self.uploader = asyncio.ensure_future(self.provider.upload(self.stream, self.target_path,
+                                                                   **upload_kwargs))
+
+    def flush(self, *args, **kwargs):
+        if not self._headers_written:
+            self.timing.end('operation')
+            if self._send_server_timing():
+                self.set_header('Server-Timing', self.timing.server_timing())
+        return super().flush(*args, **kwargs)
+
+    def _send_server_timing(self):
+        if settings.SERVER_TIMING:
+            return True
+        token = self.request.headers.get('X-WaterButler-Timing')
+        return bool(token and settings.SERVER_TIMING_TOKEN and
+                    hmac.compare_digest(token, settings.SERVER_TIMING_TOKEN))
 
     def on_finish(self):
+        super().on_finish()
         status, method = self.get_status(), self.request.method.upper()
+        self._record_metrics(status, method)
 
         # If the response code is not within the 200-302 range, the request was a HEAD or OPTIONS,
         # the response code is 202, or the response was a 206 partial request, then no callbacks
@@ -256,6 +295,53 @@ class ProviderHandler(core.BaseHandler, CreateMixin, MetadataMixin, MoveCopyMixi
 
         self._send_hook(action)
 
+    def _metrics_action(self, method):
+        """A name for what the request asked for, from a small fixed set so that it can be used as
+        a metrics label.  Works for requests that failed before the path was validated."""
+        path = getattr(self, 'path', None)
+        is_folder = getattr(path, 'is_folder', False)
+        query = self.request.query_arguments
+        if method == 'GET':
+            if 'meta' in query:
+                return 'metadata'
+            if 'revisions' in query or 'versions' in query:
+                return 'revisions'
+            if is_folder:
+                return 'download_zip' if 'zip' in query else 'metadata'
+            return 'download_file'
+        if method == 'PUT':
+            return 'create_folder' if query.get('kind') == [b'folder'] else 'upload'
+        if method == 'POST':
+            # only look at a body that was parsed, an invalid one would raise here
+            body = getattr(self, '_json', None)
+            action = body.get('action') if isinstance(body, dict) else None
+            return action if action in ('move', 'copy', 'rename') else 'other'
+        return {'HEAD': 'metadata', 'DELETE': 'delete', 'OPTIONS': 'options'}.get(method, 'other')
+
+    def _record_metrics(self, status, method):
+        provider = getattr(getattr(self, 'provider', None), 'NAME', 'unknown')
+        action = self._metrics_action(method)
+        wb_metrics.HANDLER_REQUESTS.inc(provider, action, method, wb_metrics.status_class(status))
+        wb_metrics.HANDLER_LATENCY.observe(self.request.request_time(), provider, action, method)
+
+        request_timing = self.timing
+        request_timing.finish(**{'http.status_code': status, 'waterbutler.action': action})
+        phases = dict(request_timing.phases)
+        if request_timing.upstream_count:
+            phases[timing.UPSTREAM] = request_timing.upstream_seconds
+        for phase, seconds in phases.items():
+            wb_metrics.HANDLER_PHASE_LATENCY.observe(seconds, provider, action, phase)
+
+        if request_timing.elapsed >= settings.SLOW_REQUEST_THRESHOLD:
+            logger.warning('Slow request: %s', json.dumps({
+                'request_id': self._headers.get('X-WATERBUTLER-REQUEST-ID'),
+                'method': method,
+                'provider': provider,
+                'action': action,
+                'status': status,
+                **request_timing.serialize(),
+            }))
+
     def _send_hook(self, action):
         source = None
         destination = None
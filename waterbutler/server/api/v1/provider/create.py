@@ -1,8 +1,15 @@
+import re
+
 from waterbutler.core import exceptions
 
+SHA256_RE = re.compile(r'^[0-9a-fA-F]{64}$')
+
 
 class CreateMixin:
 
+    # the sha256 the client declared for the file it is uploading, see `upload_by_hash`
+    content_sha256 = None
+
     def prevalidate_put(self):
         """Prevalidation for creation requests. Runs BEFORE the body of a request is accepted and
         before the path given in the url has been validated.  An early rejection here will save us
@@ -12,6 +19,7 @@ class CreateMixin:
         1. Pull kind from query params. It must be file, folder, or not included (which defaults to file)
         2. Ensure that content length is present for file uploads
         3. Ensure that content length is either not present or 0 for folder creation requests
+        4. Ensure that a declared ``X-Content-SHA256`` is a hex sha256, and only used for files
         """
         self.kind = self.get_query_argument('kind', default='file')
 
@@ -31,6 +39,13 @@ class CreateMixin:
         except ValueError:
             raise exceptions.InvalidParameters('Invalid Content-Length')
 
+        self.content_sha256 = self.request.headers.get('X-Content-SHA256')
+        if self.content_sha256 is not None:
+            if self.kind != 'file' or not SHA256_RE.match(self.content_sha256):
+                raise exceptions.InvalidParameters('X-Content-SHA256 must be the hex sha256 of '
+                                                   'the uploaded file')
+            self.content_sha256 = self.content_sha256.lower()
+
     async def postvalidate_put(self):
         """Postvalidation for creation requests. Runs BEFORE the body of a request is accepted, but
         after the path has been validated.  Invalid path+params combinations can be rejected here.
@@ -103,6 +118,27 @@ class CreateMixin:
         self.set_status(201)
         self.write({'data': self.metadata.json_api_serialized(self.resource)})
 
+    async def upload_by_hash(self):
+        """Try to create the file from the content its ``X-Content-SHA256`` header declares,
+        without reading the body.  Clients should send ``Expect: 100-continue`` so that the body
+        isn't sent at all when this works.  Returns False if the body has to be uploaded.
+        """
+        if self.content_sha256 is None or not self.provider.can_upload_by_hash():
+            return False
+
+        size = int(self.request.headers['Content-Length'])
+        result = await self.provider.upload_by_hash(self.target_path, self.content_sha256, size)
+        if result is None:
+            return False
+
+        # the body, if the client sends it anyway, isn't needed
+        self._discard_body = True
+        self.metadata, created = result
+        if created:
+            self.set_status(201)
+        self.finish({'data': self.metadata.json_api_serialized(self.resource)})
+        return True
+
     async def upload_file(self):
         self.writer.write_eof()
 
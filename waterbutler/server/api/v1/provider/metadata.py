@@ -3,12 +3,15 @@ import json
 import asyncio
 import logging
 
+import furl
 import pytz
 from dateutil.parser import parse as datetime_parser
 
 from waterbutler.server import utils
+from waterbutler.server import settings
+from waterbutler.core import exceptions
 from waterbutler.core import mime_types
-from waterbutler.core.utils import make_disposition
+from waterbutler.core.utils import json_encode, make_disposition
 from waterbutler.core.streams import ResponseStreamReader
 
 logger = logging.getLogger(__name__)
@@ -39,9 +42,73 @@ class MetadataMixin:
         if 'zip' in self.request.query_arguments:
             return await self.download_folder_as_zip()
 
+        page_size, cursor = self._page_arguments()
         version = self.requested_version
-        data = await self.provider.metadata(self.path, version=version, revision=version)
-        return self.write({'data': [x.json_api_serialized(self.resource) for x in data]})
+        if page_size is None:
+            return await self.stream_folder(version)
+
+        data, next_cursor = await self.provider.list_folder(self.path, cursor=cursor,
+                                                            page_size=page_size,
+                                                            version=version, revision=version)
+        return self.write({
+            'data': [x.json_api_serialized(self.resource) for x in data],
+            'links': {'next': self._page_url(next_cursor)},
+        })
+
+    async def stream_folder(self, version):
+        """Write the whole folder listing.  A folder the provider lists in several pages is sent
+        as each page arrives, so that neither the listing nor the response is held in memory."""
+        pages = self.provider.iter_folder(self.path, version=version, revision=version)
+        # errors from the first page are answered as usual, nothing has been sent yet
+        first = await pages.__anext__()
+        try:
+            second = await pages.__anext__()
+        except StopAsyncIteration:
+            return self.write({'data': [x.json_api_serialized(self.resource) for x in first]})
+
+        self.set_header('Content-Type', 'application/json; charset=UTF-8')
+        self.write('{"data": [')
+        separator = ''
+        for page in (first, second):
+            separator = self._write_folder_page(page, separator)
+        await self.flush()
+        async for page in pages:
+            separator = self._write_folder_page(page, separator)
+            await self.flush()
+        self.write(']}')
+
+    def _write_folder_page(self, page, separator):
+        for item in page:
+            serialized = item.json_api_serialized(self.resource)
+            self.write(separator + json_encode(serialized))
+            separator = ', '
+        return separator
+
+    def _page_arguments(self):
+        """The ``page[size]`` and ``page[cursor]`` query parameters of a paginated folder listing,
+        or `None` for both if the listing isn't paginated."""
+        size = self.get_query_argument('page[size]', default=None)
+        cursor = self.get_query_argument('page[cursor]', default=None) or None
+        if size is None:
+            return (None, None) if cursor is None else (settings.FOLDER_PAGE_SIZE, cursor)
+
+        try:
+            page_size = int(size)
+        except ValueError:
+            page_size = 0
+        if not 0 < page_size <= settings.FOLDER_PAGE_MAX_SIZE:
+            raise exceptions.InvalidParameters(
+                f'page[size] must be a number from 1 to {settings.FOLDER_PAGE_MAX_SIZE}'
+            )
+        return page_size, cursor
+
+    def _page_url(self, cursor):
+        """The url of the page of this folder listing starting at ``cursor``."""
+        if cursor is None:
+            return None
+        page_url = furl.furl(settings.DOMAIN).join(self.request.uri)
+        page_url.args['page[cursor]'] = cursor
+        return page_url.url
 
     async def get_file(self):
         if 'meta' in self.request.query_arguments:
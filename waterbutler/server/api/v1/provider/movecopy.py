@@ -1,14 +1,18 @@
 import json
+import uuid
+import asyncio
 from http import HTTPStatus
 
 from waterbutler import tasks
 from waterbutler.sizes import MBs
+from waterbutler.core import progress
 from waterbutler.core import exceptions
 from waterbutler.server import settings
 from waterbutler.core.auth import AuthType
 from waterbutler.core import remote_logging
 from waterbutler.server.auth import AuthHandler
-from waterbutler.core.utils import make_provider
+from waterbutler.core.utils import background, make_provider
+from waterbutler.server.api.v1 import operations
 from waterbutler.constants import DEFAULT_CONFLICT
 
 auth_handler = AuthHandler(settings.AUTH_HANDLERS)
@@ -79,22 +83,24 @@ class MoveCopyMixin:
                 raise exceptions.InvalidParameters('"rename" field is required for renaming')
             provider_action = 'move'
 
-        self.auth = await auth_handler.get(
-            self.resource,
-            provider,
-            self.request,
-            action=auth_action,
-            auth_type=AuthType.SOURCE,
-            path=self.path,
-            version=self.requested_version,
-        )
+        with self.timing.phase('auth'):
+            self.auth = await auth_handler.get(
+                self.resource,
+                provider,
+                self.request,
+                action=auth_action,
+                auth_type=AuthType.SOURCE,
+                path=self.path,
+                version=self.requested_version,
+            )
         self.provider = make_provider(
             provider,
             self.auth['auth'],
             self.auth['credentials'],
             self.auth['settings']
         )
-        self.path = await self.provider.validate_v1_path(self.path, **self.arguments)
+        with self.timing.phase('validate'):
+            self.path = await self.provider.validate_v1_path(self.path, **self.arguments)
 
         if auth_action == 'rename':  # 'rename' implies the file/folder does not change location
             self.dest_auth = self.auth
@@ -118,21 +124,23 @@ class MoveCopyMixin:
 
             # Note: attached to self so that _send_hook has access to these
             self.dest_resource = self.json.get('resource', self.resource)
-            self.dest_auth = await auth_handler.get(
-                self.dest_resource,
-                self.json.get('provider', self.provider.NAME),
-                self.request,
-                action=auth_action,
-                path=path,
-                auth_type=AuthType.DESTINATION,
-            )
+            with self.timing.phase('auth'):
+                self.dest_auth = await auth_handler.get(
+                    self.dest_resource,
+                    self.json.get('provider', self.provider.NAME),
+                    self.request,
+                    action=auth_action,
+                    path=path,
+                    auth_type=AuthType.DESTINATION,
+                )
             self.dest_provider = make_provider(
                 self.json.get('provider', self.provider.NAME),
                 self.dest_auth['auth'],
                 self.dest_auth['credentials'],
                 self.dest_auth['settings']
             )
-            self.dest_path = await self.dest_provider.validate_path(**self.json)
+            with self.timing.phase('validate'):
+                self.dest_path = await self.dest_provider.validate_path(**self.json)
 
         if not getattr(self.provider, 'can_intra_' + provider_action)(self.dest_provider, self.path):
             # this weird signature syntax courtesy of py3.4 not liking trailing commas on kwargs
@@ -143,18 +151,27 @@ class MoveCopyMixin:
                 request=remote_logging._serialize_request(self.request),
                 *self.build_args()
             )
-            metadata, created = await tasks.wait_on_celery(result)
+            try:
+                metadata, created = await tasks.wait_on_celery(result)
+            except tasks.WaitTimeOutError:
+                await self.hand_off_task(provider_action, result.id)
+                return
         else:
-            metadata, created = (
-                await tasks.backgrounded(
-                    getattr(self.provider, provider_action),
-                    self.dest_provider,
-                    self.path,
-                    self.dest_path,
-                    rename=self.json.get('rename'),
-                    conflict=self.json.get('conflict', DEFAULT_CONFLICT),
-                )
-            )
+            # Intra moves and copies are mostly waiting on the provider, so run them on this loop.
+            # Shield the task so that one running past the timeout keeps going in the background.
+            task = asyncio.ensure_future(getattr(self.provider, provider_action)(
+                self.dest_provider,
+                self.path,
+                self.dest_path,
+                rename=self.json.get('rename'),
+                conflict=self.json.get('conflict', DEFAULT_CONFLICT),
+            ))
+            try:
+                metadata, created = await asyncio.wait_for(asyncio.shield(task),
+                                                           settings.INTRA_MOVE_COPY_TIMEOUT)
+            except asyncio.TimeoutError:
+                await self.hand_off(provider_action, task)
+                return
 
         self.dest_meta = metadata
 
@@ -165,3 +182,35 @@ class MoveCopyMixin:
 
         self.write({'data': metadata.json_api_serialized(self.dest_resource)})
 
+    async def hand_off(self, action, task):
+        """Answer with a 202 pointing at the status of an intra move or copy that is still
+        running, and publish its progress from this loop, see `operations.run`.  `on_finish`
+        doesn't log 202s, so the move or copy is logged when it completes.
+        """
+        operation_id = str(uuid.uuid4())
+
+        def send_hook(task):
+            if not task.cancelled() and task.exception() is None:
+                self.dest_meta = task.result()[0]
+                self._send_hook(action)
+
+        task.add_done_callback(send_hook)
+
+        await self.hand_off_task(action, operation_id)
+        background(asyncio.ensure_future(operations.run(
+            operation_id, action, task, progress.owner(self.dest_resource, self.dest_provider),
+        )))
+
+    async def hand_off_task(self, action, task_id):
+        """Answer with a 202 pointing at the status of a celery move or copy that is still
+        running.  The task reports its own progress and sends its own callback."""
+        record = {
+            'action': action,
+            'status': progress.PENDING,
+            'owner': progress.owner(self.dest_resource, self.dest_provider),
+        }
+        await progress.get_store().create(task_id, record)
+
+        self.set_status(int(HTTPStatus.ACCEPTED))
+        self.set_header('Location', operations.url(task_id))
+        self.write({'data': operations.serialize_task(task_id, record)})
@@ -1,19 +1,18 @@
 import os
-import signal
-import asyncio
 import logging
-from functools import partial
 
 import tornado.web
-import tornado.platform.asyncio
 
 import sentry_sdk
 from sentry_sdk.integrations.tornado import TornadoIntegration
 from sentry_sdk.integrations.logging import LoggingIntegration
 
 from waterbutler import settings
+from waterbutler.core import tracing
+from waterbutler.core import event_loop
 from waterbutler.server.api import v0
 from waterbutler.server.api import v1
+from waterbutler.server import workers
 from waterbutler.server import handlers
 from waterbutler.version import __version__
 from waterbutler.server import settings as server_settings
@@ -21,18 +20,6 @@ from waterbutler.server import settings as server_settings
 logger = logging.getLogger(__name__)
 
 
-def sig_handler(sig, frame):
-    io_loop = asyncio.get_event_loop()
-
-    def stop_loop():
-        if len(asyncio.Task.all_tasks(io_loop)) == 0:
-            io_loop.stop()
-        else:
-            io_loop.call_later(1, stop_loop)
-
-    io_loop.add_callback_from_signal(stop_loop)
-
-
 def api_to_handlers(api):
     return [
         (os.path.join('/', api.PREFIX, pattern.lstrip('/')), handler)
@@ -55,33 +42,33 @@ def make_app(debug):
     app = tornado.web.Application(
         api_to_handlers(v0) +
         api_to_handlers(v1) +
-        [(r'/status', handlers.StatusHandler)],
+        [(r'/status', handlers.StatusHandler),
+         (r'/metrics', handlers.MetricsHandler)],
         debug=debug,
         autoreload=False,
     )
     return app
 
 
-def serve():
+def run_worker(sockets):
+    """Serve on ``sockets`` in this process until told to stop, see `waterbutler.server.workers`.
+    """
+    tracing.configure()
     app = make_app(server_settings.DEBUG)
-
-    ssl_options = None
-    if server_settings.SSL_CERT_FILE and server_settings.SSL_KEY_FILE:
-        ssl_options = {
-            'certfile': server_settings.SSL_CERT_FILE,
-            'keyfile': server_settings.SSL_KEY_FILE,
-        }
-
-    app.listen(
-        server_settings.PORT,
-        address=server_settings.ADDRESS,
-        xheaders=server_settings.XHEADERS,
-        max_body_size=server_settings.MAX_BODY_SIZE,
-        ssl_options=ssl_options,
-    )
-
     logger.info(f"Listening on {server_settings.ADDRESS}:{server_settings.PORT}")
+    event_loop.run(workers.run_server(app, sockets), debug=server_settings.DEBUG)
 
-    signal.signal(signal.SIGTERM, partial(sig_handler))
-    asyncio.get_event_loop().set_debug(server_settings.DEBUG)
-    asyncio.get_event_loop().run_forever()
+
+def serve():
+    count = server_settings.WORKERS or os.cpu_count()
+    workers.check_stores(count)
+    if count == 1:
+        run_worker(workers.bind_sockets(reuse_port=server_settings.REUSE_PORT))
+        return
+
+    # with SO_REUSEPORT every worker binds a socket of its own
+    sockets = None if server_settings.REUSE_PORT else workers.bind_sockets()
+    workers.Supervisor(
+        lambda worker_id: run_worker(sockets or workers.bind_sockets(reuse_port=True)),
+        count,
+    ).run()
@@ -1,13 +1,30 @@
 import tornado.web
 
+from waterbutler.core import metrics
+from waterbutler.server import workers
 from waterbutler.version import __version__
 
 
 class StatusHandler(tornado.web.RequestHandler):
 
     def get(self):
-        """List information about waterbutler status"""
+        """List information about waterbutler status, and about the worker process answering"""
+        health = workers.health()
+        if health['draining']:
+            self.set_status(503)
         self.write({
-            'status': 'up',
-            'version': __version__
+            'status': 'draining' if health['draining'] else 'up',
+            'version': __version__,
+            **health,
         })
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+
+    def get(self):
+        """Process-wide metrics in the OpenMetrics text format, for callers holding
+        ``METRICS_TOKEN``"""
+        if not metrics.authorized(self.request.headers.get('Authorization')):
+            raise tornado.web.HTTPError(404)
+        self.set_header('Content-Type', metrics.REGISTRY.CONTENT_TYPE)
+        self.write(metrics.REGISTRY.expose())
@@ -15,6 +15,22 @@ SSL_CERT_FILE = config.get_nullable('SSL_CERT_FILE', None)
 SSL_KEY_FILE = config.get_nullable('SSL_KEY_FILE', None)
 
 XHEADERS = config.get_bool('XHEADERS', False)
+
+# Processes serving requests, ``0`` for one per CPU.  With more than one, a supervisor forks them
+# and restarts any that die.  They share one listening socket, or with ``REUSE_PORT`` each bind
+# their own with SO_REUSEPORT, and need ``PROGRESS_STORE`` or a Redis result backend to share the
+# status of moves and copies.  See `waterbutler.server.workers`.
+WORKERS = int(config.get('WORKERS', 1))
+REUSE_PORT = config.get_bool('REUSE_PORT', False)
+WORKER_RESTART_DELAY = float(config.get('WORKER_RESTART_DELAY', 1))
+
+# SO_SNDBUF and SO_RCVBUF of the sockets the server listens on, which client connections inherit.
+# ``0`` leaves the kernel's defaults and autotuning.
+SOCKET_SEND_BUFFER = int(config.get('SOCKET_SEND_BUFFER', 0))
+SOCKET_RECEIVE_BUFFER = int(config.get('SOCKET_RECEIVE_BUFFER', 0))
+
+# Seconds a stopping server waits for the uploads, downloads and other requests in flight
+DRAIN_TIMEOUT = float(config.get('DRAIN_TIMEOUT', 30))
 CORS_ALLOW_ORIGIN = config.get('CORS_ALLOW_ORIGIN', '*')
 
 CHUNK_SIZE = int(config.get('CHUNK_SIZE', 65536))  # 64KB
@@ -43,3 +59,21 @@ RATE_LIMITING_FIXED_WINDOW_SIZE = int(config.get('RATE_LIMITING_FIXED_WINDOW_SIZ
 
 # number of reqests permitted while the redis key is active
 RATE_LIMITING_FIXED_WINDOW_LIMIT = int(config.get('RATE_LIMITING_FIXED_WINDOW_LIMIT', 3600))
+
+# Seconds an intra-provider move or copy may run before the request is answered with a 202 and a
+# status resource.  The status is kept in the progress store for ``PROGRESS_TTL`` seconds.
+INTRA_MOVE_COPY_TIMEOUT = float(config.get('INTRA_MOVE_COPY_TIMEOUT', 20))
+
+# Report the phases of v1 requests in a ``Server-Timing`` response header, see
+# `waterbutler.core.timing`.  Sent on every response if ``SERVER_TIMING`` is set, otherwise only
+# to callers whose ``X-WaterButler-Timing`` request header matches ``SERVER_TIMING_TOKEN``.
+SERVER_TIMING = config.get_bool('SERVER_TIMING', False)
+SERVER_TIMING_TOKEN = config.get_nullable('SERVER_TIMING_TOKEN', None)
+
+# Log the phases of v1 requests that take longer than this many seconds
+SLOW_REQUEST_THRESHOLD = float(config.get('SLOW_REQUEST_THRESHOLD', 10))
+
+# Children per page of a v1 folder listing requested with ``page[cursor]`` but no ``page[size]``,
+# and the most a ``page[size]`` may ask for
+FOLDER_PAGE_SIZE = int(config.get('FOLDER_PAGE_SIZE', 100))
+FOLDER_PAGE_MAX_SIZE = int(config.get('FOLDER_PAGE_MAX_SIZE', 1000))
@@ -1,5 +1,7 @@
 import tornado.iostream
 
+from waterbutler.core import timing
+from waterbutler.core import metrics
 from waterbutler.server import settings
 
 CORS_ACCEPT_HEADERS = [
@@ -118,14 +120,28 @@ class UtilMixin:
     bytes_downloaded = 0
     bytes_uploaded = 0
 
+    def initialize(self):
+        # a stopping server waits for these, see `waterbutler.server.workers`
+        metrics.REQUESTS_IN_FLIGHT.inc()
+
+    def on_finish(self):
+        metrics.REQUESTS_IN_FLIGHT.dec()
+
     def set_status(self, code, reason=None):
         return super().set_status(code, reason or HTTP_REASONS.get(code))
 
     async def write_stream(self, stream):
+        # the provider's part of the request is over, see `waterbutler.core.timing`
+        request_timing = getattr(self, 'timing', None)
+        if request_timing is not None:
+            request_timing.begin(timing.TTFB)
+
         try:
 
             while True:
                 chunk = await stream.read(settings.CHUNK_SIZE)
+                if request_timing is not None and request_timing.phases.get(timing.TTFB) is None:
+                    request_timing.begin('stream')
                 if not chunk:
                     break
                 # Temp fix, write does not accept bytearrays currently
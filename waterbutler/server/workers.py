@@ -0,0 +1,200 @@
+"""Serving from several processes, and stopping without cutting off transfers.
+
+With ``WORKERS`` above one, `serve` runs a `Supervisor` that forks the workers, each with its own
+event loop, and forks a new one when a worker dies.  The workers either share the listening
+socket, bound once before forking, or with ``REUSE_PORT`` each bind their own with
+``SO_REUSEPORT`` so the kernel spreads new connections evenly between them.
+
+A worker told to stop, with SIGTERM or SIGINT, drains: it stops accepting connections, gives the
+requests it is answering, and the callbacks they started, up to ``DRAIN_TIMEOUT`` seconds to
+finish, spools the log events it couldn't deliver in that time, see
+`waterbutler.core.log_shipper`, and exits.  The supervisor passes SIGTERM on to every worker and
+exits once they have.  While draining, ``/status`` answers 503 so that load balancers take the
+worker out of rotation.
+
+Any worker may be asked about a move or copy that another one handed off, so several workers need
+a progress store they all share, see `waterbutler.core.progress.store_url`.  `check_stores`
+refuses to start them with the per-host default.
+"""
+import os
+import time
+import signal
+import asyncio
+import logging
+
+import tornado.netutil
+import tornado.httpserver
+
+from waterbutler.core import utils
+from waterbutler.core import metrics
+from waterbutler.core import progress
+from waterbutler.core import event_loop
+from waterbutler.core import log_shipper
+from waterbutler.server import settings
+
+logger = logging.getLogger(__name__)
+
+# How often a draining worker checks whether its requests have finished
+DRAIN_POLL_INTERVAL = 0.1
+
+_STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+# The number of this worker, counting from 0, or `None` if the server runs in a single process
+WORKER_ID = None
+_draining = False
+
+
+def draining():
+    return _draining
+
+
+def health():
+    """What ``/status`` reports about the process that answers it."""
+    return {
+        'pid': os.getpid(),
+        'worker': WORKER_ID,
+        'requests_in_flight': metrics.REQUESTS_IN_FLIGHT.value(),
+        'draining': _draining,
+    }
+
+
+def check_stores(count):
+    """Raise `ValueError` if ``count`` workers would keep progress in the default file store,
+    which the other workers and the celery workers can't be relied on to see."""
+    if count > 1 and progress.store_url() == progress.DEFAULT_FILE_STORE:
+        raise ValueError(f'WORKERS={count} needs a progress store shared by every worker: set '
+                         'PROGRESS_STORE or use a Redis CELERY_RESULT_BACKEND')
+
+
+def bind_sockets(reuse_port=False):
+    sockets = tornado.netutil.bind_sockets(settings.PORT, address=settings.ADDRESS,
+                                           reuse_port=reuse_port)
+    for sock in sockets:
+        event_loop.set_buffer_sizes(sock, send=settings.SOCKET_SEND_BUFFER,
+                                    receive=settings.SOCKET_RECEIVE_BUFFER)
+    return sockets
+
+
+def _unfinished():
+    return metrics.REQUESTS_IN_FLIGHT.value() + len(utils.background_tasks())
+
+
+async def drain(server, timeout):
+    """Stop ``server`` accepting connections and wait up to ``timeout`` seconds for the requests
+    in flight, and the callbacks and moves they left running in the background, to finish, and
+    for the log events they queued to be delivered in what is left of ``timeout``.  Returns how
+    many requests and background tasks were still unfinished."""
+    global _draining
+    _draining = True
+    server.stop()
+
+    deadline = time.monotonic() + timeout
+    while _unfinished() and time.monotonic() < deadline:
+        await asyncio.sleep(DRAIN_POLL_INTERVAL)
+
+    remaining = _unfinished()
+    if remaining:
+        logger.warning(f'Stopping with {remaining} requests and background tasks unfinished '
+                       f'after {timeout}s')
+    await log_shipper.close(max(0, deadline - time.monotonic()))
+    await server.close_all_connections()
+    return remaining
+
+
+async def run_server(app, sockets):
+    """Serve ``app`` on ``sockets`` until SIGTERM or SIGINT, then drain."""
+    ssl_options = None
+    if settings.SSL_CERT_FILE and settings.SSL_KEY_FILE:
+        ssl_options = {
+            'certfile': settings.SSL_CERT_FILE,
+            'keyfile': settings.SSL_KEY_FILE,
+        }
+
+    server = tornado.httpserver.HTTPServer(
+        app,
+        xheaders=settings.XHEADERS,
+        max_body_size=settings.MAX_BODY_SIZE,
+        ssl_options=ssl_options,
+    )
+    server.add_sockets(sockets)
+    # delivers the log events spooled by the workers that ran before this one, too
+    log_shipper.get_shipper().start()
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in _STOP_SIGNALS:
+        loop.add_signal_handler(signum, stopping.set)
+
+    await stopping.wait()
+    logger.info(f'Draining, {metrics.REQUESTS_IN_FLIGHT.value()} requests in flight')
+    await drain(server, settings.DRAIN_TIMEOUT)
+
+
+class Supervisor:
+    """Forks ``count`` workers, each calling ``target`` with its number, and forks them again
+    when they die until the supervisor gets SIGTERM or SIGINT."""
+
+    def __init__(self, target, count, restart_delay=None):
+        self.target = target
+        self.count = count
+        self.restart_delay = (settings.WORKER_RESTART_DELAY
+                              if restart_delay is None else restart_delay)
+        self.workers = {}  # type: dict
+        self.stopping = False
+
+    def spawn(self, worker_id):
+        # held back until the new worker is known to `stop`, which passes them on
+        signal.pthread_sigmask(signal.SIG_BLOCK, _STOP_SIGNALS)
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = worker_id
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, _STOP_SIGNALS)
+            return pid
+
+        global WORKER_ID
+        WORKER_ID = worker_id
+        for signum in _STOP_SIGNALS:
+            signal.signal(signum, signal.SIG_DFL)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, _STOP_SIGNALS)
+        status = 0
+        try:
+            self.target(worker_id)
+        except BaseException:
+            logger.exception(f'Worker {worker_id} failed')
+            status = 1
+        finally:
+            logging.shutdown()
+            os._exit(status)
+
+    def stop(self, signum=None, frame=None):
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        for signum in _STOP_SIGNALS:
+            signal.signal(signum, self.stop)
+        for worker_id in range(self.count):
+            self.spawn(worker_id)
+        logger.info(f'Started {self.count} workers')
+
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            worker_id = self.workers.pop(pid, None)
+            if worker_id is None:
+                continue
+            exit_code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                logger.info(f'Worker {worker_id} (pid {pid}) exited with {exit_code}')
+                continue
+            logger.warning(f'Worker {worker_id} (pid {pid}) exited with {exit_code}, '
+                           f'restarting it in {self.restart_delay}s')
+            time.sleep(self.restart_delay)
+            if not self.stopping:
+                self.spawn(worker_id)
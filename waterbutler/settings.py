@@ -156,6 +156,16 @@ def child(key):
 
 DEBUG = config.get_bool('DEBUG', True)
 OP_CONCURRENCY = int(config.get('OP_CONCURRENCY', 5))
+# Total size of the files a folder copy or move transfers at once, so that a few large files don't
+# take every slot.  A file larger than this is still transferred, just on its own.
+OP_MAX_BYTES_IN_FLIGHT = int(config.get('OP_MAX_BYTES_IN_FLIGHT', 256 * 1024 * 1024))
+# Files at least this large are copied between providers as concurrent byte ranges fed into the
+# destination's multipart upload, when both providers support it.  See waterbutler.core.ranged.
+RANGED_TRANSFER_THRESHOLD = int(config.get('RANGED_TRANSFER_THRESHOLD', 256 * 1024 * 1024))
+RANGED_TRANSFER_CONCURRENCY = int(config.get('RANGED_TRANSFER_CONCURRENCY', 8))
+# The most part data held in memory by one ranged copy, though at least one part is always held
+RANGED_TRANSFER_MAX_BUFFER = int(config.get('RANGED_TRANSFER_MAX_BUFFER', 256 * 1024 * 1024))
+RANGED_TRANSFER_READ_SIZE = int(config.get('RANGED_TRANSFER_READ_SIZE', 1024 * 1024))
 
 logging_config = config.get('LOGGING', DEFAULT_LOGGING_CONFIG)
 logging.config.dictConfig(logging_config)
@@ -181,6 +191,92 @@ KEEN_PUBLIC_PROJECT_ID = keen_public_config.get_nullable('PROJECT_ID', None)
 KEEN_PUBLIC_WRITE_KEY = keen_public_config.get_nullable('WRITE_KEY', None)
 KEEN_PUBLIC_LOG_ACTIONS = keen_public_config.get_bool('LOG_ACTIONS', True)
 
+# Delivery of OSF callbacks and Keen events, see `waterbutler.core.log_shipper`.  Each kind of
+# event is queued up to ``MAX_QUEUE``; Keen events are sent ``BATCH_SIZE`` at a time, after
+# gathering for up to ``FLUSH_INTERVAL`` seconds.  Events that can't be queued or delivered are
+# written to ``SPOOL_PATH`` and queued again every ``REPLAY_INTERVAL`` seconds, until they have been
+# spooled ``MAX_SPOOLS`` times or were first spooled ``MAX_AGE`` seconds ago.  Then they are moved
+# to ``SPOOL_PATH/dead``.
+log_shipper_config = config.child('LOG_SHIPPER')
+LOG_SHIPPER_MAX_QUEUE = int(log_shipper_config.get('MAX_QUEUE', 10000))
+LOG_SHIPPER_BATCH_SIZE = int(log_shipper_config.get('BATCH_SIZE', 100))
+LOG_SHIPPER_FLUSH_INTERVAL = float(log_shipper_config.get('FLUSH_INTERVAL', 1.0))
+LOG_SHIPPER_RETRIES = int(log_shipper_config.get('RETRIES', 5))
+LOG_SHIPPER_BACKOFF = float(log_shipper_config.get('BACKOFF', 5))
+LOG_SHIPPER_SPOOL_PATH = log_shipper_config.get_nullable('SPOOL_PATH',
+                                                         '/tmp/waterbutler-log-spool')
+LOG_SHIPPER_REPLAY_INTERVAL = float(log_shipper_config.get('REPLAY_INTERVAL', 60))
+LOG_SHIPPER_MAX_SPOOLS = int(log_shipper_config.get('MAX_SPOOLS', 20))
+LOG_SHIPPER_MAX_AGE = float(log_shipper_config.get('MAX_AGE', 3 * 24 * 60 * 60))  # 3 days
+
 WEBDAV_METHODS = {'PROPFIND', 'MKCOL', 'MOVE', 'COPY'}
 
 AIOHTTP_TIMEOUT = int(config.get('AIOHTTP_TIMEOUT', 3600))  # time in seconds
+
+# The event loop of the server and celery workers, see `waterbutler.core.event_loop`: ``asyncio``,
+# ``uvloop`` or ``auto`` for uvloop if it is installed.  ``EXECUTOR_THREADS`` sizes the loop's
+# default executor, ``0`` leaves Python's default of min(32, CPUs + 4).
+EVENT_LOOP = config.get('EVENT_LOOP', 'auto')
+EVENT_LOOP_EXECUTOR_THREADS = int(config.get('EVENT_LOOP_EXECUTOR_THREADS', 0))
+
+# Adaptive per-upstream concurrency limits, see `waterbutler.core.limiter`.  Any of the settings
+# can be overridden for one provider with e.g. ``"PROVIDERS": {"box": {"MAX_CONCURRENCY": 20}}``
+limiter_config = config.child('LIMITER')
+LIMITER_INITIAL_CONCURRENCY = int(limiter_config.get('INITIAL_CONCURRENCY', 10))
+LIMITER_MIN_CONCURRENCY = int(limiter_config.get('MIN_CONCURRENCY', 1))
+LIMITER_MAX_CONCURRENCY = int(limiter_config.get('MAX_CONCURRENCY', 100))
+LIMITER_BACKOFF = float(limiter_config.get('BACKOFF', 0.5))
+LIMITER_LATENCY_TOLERANCE = float(limiter_config.get('LATENCY_TOLERANCE', 2.0))
+LIMITER_MAX_RETRY_AFTER = float(limiter_config.get('MAX_RETRY_AFTER', 60))
+LIMITER_PROVIDERS = limiter_config.get_object('PROVIDERS', {})
+# Requests sending a streamed body, or one larger than this many bytes, only wait for a slot and
+# don't hold it while the body is sent, nor count towards the upstream's latency
+LIMITER_LARGE_BODY = int(limiter_config.get('LARGE_BODY', 1024 * 1024))
+
+# Retry policy for `BaseProvider.make_request`, see `waterbutler.core.retry`.  Overridable per
+# provider in the same way as the limiter settings, through ``"PROVIDERS"``
+retry_config = config.child('RETRY')
+RETRY_BASE_DELAY = float(retry_config.get('BASE_DELAY', 1))
+RETRY_MAX_DELAY = float(retry_config.get('MAX_DELAY', 20))
+RETRY_MAX_RETRY_AFTER = float(retry_config.get('MAX_RETRY_AFTER', 60))
+RETRY_BUDGET_RATIO = float(retry_config.get('BUDGET_RATIO', 0.2))
+RETRY_BUDGET_MAX_TOKENS = int(retry_config.get('BUDGET_MAX_TOKENS', 10))
+RETRY_BREAKER_THRESHOLD = int(retry_config.get('BREAKER_THRESHOLD', 5))
+RETRY_BREAKER_RESET_TIMEOUT = float(retry_config.get('BREAKER_RESET_TIMEOUT', 30))
+RETRY_PROVIDERS = retry_config.get_object('PROVIDERS', {})
+
+# Hedging of GET and HEAD requests that opt in with ``make_request(..., hedge=True)``, see
+# `waterbutler.core.hedging`.  A second request is sent if the first one hasn't been answered
+# within the ``PERCENTILE`` latency of the last ``WINDOW`` requests to the same upstream
+hedging_config = config.child('HEDGING')
+HEDGING_ENABLED = hedging_config.get_bool('ENABLED', True)
+HEDGING_PERCENTILE = float(hedging_config.get('PERCENTILE', 95))
+HEDGING_WINDOW = int(hedging_config.get('WINDOW', 500))
+HEDGING_MIN_SAMPLES = int(hedging_config.get('MIN_SAMPLES', 20))
+HEDGING_MIN_DELAY = float(hedging_config.get('MIN_DELAY', 0.01))
+HEDGING_MAX_RATIO = float(hedging_config.get('MAX_RATIO', 0.05))
+HEDGING_BURST = int(hedging_config.get('BURST', 10))
+
+# Progress of celery copies and moves, see `waterbutler.core.progress`.  ``STORE`` is either a
+# ``redis://`` url or a ``file://`` directory, and must be shared by every server and celery
+# worker: a ``file://`` directory only works if they all run on one host or mount it from shared
+# storage.  Unset, the celery result backend is used if it is Redis, otherwise
+# ``file:///tmp/waterbutler-progress``.
+progress_config = config.child('PROGRESS')
+PROGRESS_STORE = progress_config.get_nullable('STORE', None)
+PROGRESS_PUBLISH_INTERVAL = float(progress_config.get('PUBLISH_INTERVAL', 1.0))
+PROGRESS_TTL = int(progress_config.get('TTL', 24 * 60 * 60))
+
+# The most label combinations kept by each of the process-wide metrics exported on ``/metrics``,
+# see `waterbutler.core.metrics`.  Further combinations are counted under one overflow series.
+METRICS_MAX_SERIES = int(config.get('METRICS_MAX_SERIES', 1000))
+# ``/metrics`` is only served to requests with an ``Authorization: Bearer <METRICS_TOKEN>`` header,
+# and not at all while this is unset: the upstream series name the hosts of user-configured storage
+METRICS_TOKEN = config.get_nullable('METRICS_TOKEN', None)
+
+# Opt-in OpenTelemetry tracing, see `waterbutler.core.tracing`.  ``EXPORTER`` is ``otlp``,
+# ``console`` or ``none`` to keep a tracer provider set up outside of WaterButler
+tracing_config = config.child('TRACING')
+TRACING_ENABLED = tracing_config.get_bool('ENABLED', False)
+TRACING_EXPORTER = tracing_config.get('EXPORTER', 'otlp')
+TRACING_SERVICE_NAME = tracing_config.get('SERVICE_NAME', 'waterbutler')
@@ -1,13 +1,18 @@
+import asyncio
 import logging
 
 from celery import Celery
-from celery.signals import task_failure
+from billiard.process import current_process
+from celery.signals import task_failure, before_task_publish, worker_process_init
 
 import sentry_sdk
 from sentry_sdk.integrations.celery import CeleryIntegration
 from sentry_sdk.integrations.logging import LoggingIntegration
 
 from waterbutler.settings import config
+from waterbutler.core import metrics
+from waterbutler.core import tracing
+from waterbutler.core import event_loop
 from waterbutler.version import __version__
 from waterbutler.tasks import settings as tasks_settings
 from waterbutler.tasks import serialization
@@ -31,6 +36,39 @@ def register_signal():
     task_failure.connect(process_failure_signal, weak=False)
 
 
+@before_task_publish.connect(weak=False)
+def inject_trace_context(headers=None, **kwargs):
+    """Carry the trace of the request queueing a task in the task's message, see
+    :mod:`waterbutler.core.tracing`."""
+    if headers is not None:
+        tracing.inject(headers)
+
+
+@worker_process_init.connect(weak=False)
+def configure_tracing(**kwargs):
+    tracing.configure()
+
+
+@worker_process_init.connect(weak=False)
+def serve_metrics(**kwargs):
+    """Export the metrics of this worker process on ``METRICS_PORT`` plus its index in the pool, so
+    that a replacement for a process that exited takes over its port."""
+    if not tasks_settings.METRICS_PORT:
+        return
+    port = tasks_settings.METRICS_PORT + (getattr(current_process(), 'index', None) or 0)
+    try:
+        metrics.serve(tasks_settings.METRICS_ADDRESS, port)
+    except OSError:
+        logger.exception(f'Could not export metrics on port {port}')
+
+
+@worker_process_init.connect(weak=False)
+def set_event_loop(**kwargs):
+    """Run the tasks of this worker process on a loop of the configured implementation, see
+    :mod:`waterbutler.core.event_loop`."""
+    asyncio.set_event_loop(event_loop.new_event_loop())
+
+
 sentry_dsn = config.get_nullable('SENTRY_DSN', None)
 if sentry_dsn:
     sentry_logging = LoggingIntegration(
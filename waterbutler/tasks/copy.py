@@ -26,7 +26,13 @@ async def copy(src_bundle, dest_bundle, request=None, start_time=None, **kwargs)
 
     metadata, errors = None, []
     try:
-        metadata, created = await src_provider.copy(dest_provider, src_path, dest_path, **kwargs)
+        with core.record_task('copy', src_provider, dest_provider):
+            async with core.transfer_progress('copy', src_path, dest_bundle['nid'],
+                                              dest_provider) as progress:
+                metadata, created = await src_provider.copy(dest_provider, src_path,
+                                                            dest_path, **kwargs)
+                if progress is not None:
+                    progress.metadata = metadata.json_api_serialized(dest_bundle['nid'])
     except Exception as e:
         logger.error(f'Copy failed with error {e!r}')
         errors = [e.__repr__()]
@@ -1,12 +1,23 @@
 import os
+import time
 import pickle
 import asyncio
 import logging
 import functools
+import contextlib
+import contextvars
 
+import celery
+from celery.result import EagerResult
 from celery.backends.base import DisabledBackend
 
+from waterbutler.core import progress
+from waterbutler.core import tracing
+from waterbutler.core import event_loop
+from waterbutler.core import exceptions as core_exceptions
+from waterbutler.core import metrics as wb_metrics
 from waterbutler.tasks import app
+from waterbutler.tasks import waiters
 from waterbutler.tasks import settings
 from waterbutler.tasks import exceptions
 
@@ -23,7 +34,7 @@ def ensure_event_loop():
     try:
         return asyncio.get_event_loop()
     except (AssertionError, RuntimeError):
-        asyncio.set_event_loop(asyncio.new_event_loop())
+        asyncio.set_event_loop(event_loop.new_event_loop())
 
     # Note: No clever tricks are used here to dry up code
     # This avoids an infinite loop if settings the event loop ever fails
@@ -46,9 +57,11 @@ async def backgrounded(func, *args, **kwargs):
     if asyncio.iscoroutinefunction(func):
         func = __coroutine_unwrapper(func)
 
+    # run in a copy of the caller's context, so that e.g. the trace the caller belongs to is
+    # carried in the messages of tasks queued from the thread
     return (await loop.run_in_executor(
         None,  # None uses the default executer, ThreadPoolExecuter
-        functools.partial(func, *args, **kwargs)
+        functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
     ))
 
 
@@ -105,31 +118,70 @@ def celery_task(func, *args, **kwargs):
     return task
 
 
-@backgroundify
+def current_task_id():
+    """The id of the celery task being run, or `None` if there isn't one, e.g. when a task is
+    called directly."""
+    return getattr(getattr(celery.current_task, 'request', None), 'id', None)
+
+
+@contextlib.asynccontextmanager
+async def transfer_progress(action, src_path, dest_resource, dest_provider):
+    """Publish the progress of the copy or move of ``src_path`` into ``dest_provider`` of
+    ``dest_resource`` run by the current task, see :mod:`waterbutler.core.progress`.  Yields the
+    `TransferProgress`, or `None` outside of a task.
+    """
+    task_id = current_task_id()
+    if task_id is None:
+        yield None
+        return
+
+    owner = progress.owner(dest_resource, dest_provider)
+    async with progress.TransferProgress(task_id, action, owner=owner) as reporter:
+        with reporter.transferring(src_path):
+            yield reporter
+
+
+@contextlib.contextmanager
+def record_task(action, src_provider, dest_provider):
+    """Count the move or copy run inside the block and how long it took, see
+    :mod:`waterbutler.core.metrics`, and trace it as part of the request that queued it, see
+    :mod:`waterbutler.core.tracing`."""
+    labels = (action, src_provider.NAME, dest_provider.NAME)
+    request = getattr(celery.current_task, 'request', None)
+    # the headers of the task's message are attributes of its request
+    carrier = vars(request) if request is not None else None
+    start, outcome = time.monotonic(), 'failed'
+    with tracing.span(f'waterbutler.task.{action}', carrier=carrier, **{
+        'waterbutler.task_id': current_task_id(),
+        'waterbutler.src_provider': src_provider.NAME,
+        'waterbutler.dest_provider': dest_provider.NAME,
+    }) as span:
+        try:
+            yield
+            outcome = 'succeeded'
+        except core_exceptions.TransferCancelledError:
+            outcome = 'cancelled'
+            raise
+        finally:
+            if span is not None:
+                span.set_attribute('waterbutler.outcome', outcome)
+            wb_metrics.TASKS.inc(*labels, outcome)
+            wb_metrics.TASK_LATENCY.observe(time.monotonic() - start, *labels)
+
+
 async def wait_on_celery(result, interval=None, timeout=None, basepath=None):
+    """Wait for a task's result without polling, see :mod:`waterbutler.tasks.waiters`.  Return
+    the result, or raise the task's exception or :class:`.WaitTimeOutError`.
+    """
     timeout = timeout or settings.WAIT_TIMEOUT
-    interval = interval or settings.WAIT_INTERVAL
-    basepath = basepath or settings.ADHOC_BACKEND_PATH
 
-    waited = 0
-
-    while True:
-        if isinstance(app.backend, DisabledBackend):
-            try:
-                with open(os.path.join(basepath, result.id), 'rb') as result_file:
-                    data = pickle.load(result_file)
-                if isinstance(data, Exception):
-                    raise data
-                return data
-            except FileNotFoundError:
-                pass
-        else:
-            if result.ready():
-                if result.failed():
-                    raise result.result
-                return result.result
-
-        if waited > timeout:
-            raise exceptions.WaitTimeOutError
-        await asyncio.sleep(interval)
-        waited += interval
+    if isinstance(result, EagerResult):
+        if result.failed():
+            raise result.result
+        return result.result
+
+    waiter = waiters.get_waiter(basepath=basepath, interval=interval)
+    try:
+        return await asyncio.wait_for(waiter.wait(result.id), timeout)
+    except asyncio.TimeoutError:
+        raise exceptions.WaitTimeOutError
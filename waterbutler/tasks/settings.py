@@ -11,6 +11,12 @@ WAIT_TIMEOUT = int(config.get('WAIT_TIMEOUT', 20))
 WAIT_INTERVAL = float(config.get('WAIT_INTERVAL', 0.5))
 ADHOC_BACKEND_PATH = config.get('ADHOC_BACKEND_PATH', '/tmp')
 
+# Export the metrics of each worker process, see `waterbutler.core.metrics.serve`.  The processes
+# of a worker's pool serve ``/metrics`` on consecutive ports from ``METRICS_PORT``, which is off if
+# it is 0.  ``METRICS_TOKEN`` is required as it is by the server.
+METRICS_ADDRESS = config.get('METRICS_ADDRESS', '127.0.0.1')
+METRICS_PORT = int(config.get('METRICS_PORT', 0))
+
 broker_url = config.get(
     'BROKER_URL',
     'amqp://{}:{}//'.format(
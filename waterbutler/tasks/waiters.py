@@ -0,0 +1,307 @@
+"""Asyncio-native waiting for Celery task results.
+
+Each result backend gets a waiter that is woken when a result arrives, without polling and
+without tying up executor threads:
+
+* Redis: subscribes to the channel the Redis backend publishes every result to.
+* RPC (AMQP): consumes the reply queue, with the broker connection's socket registered on the
+  event loop.
+* Adhoc (``DisabledBackend``): watches ``ADHOC_BACKEND_PATH`` with inotify for the pickle files
+  written by :func:`waterbutler.tasks.core.adhoc_file_backend`.  Where inotify isn't available
+  the directory is checked on a timer with ``os.stat``, and a file is only opened once it exists.
+
+Any other backend falls back to polling ``AsyncResult.ready()`` in an executor thread.  There is
+one waiter per event loop, shared by every request on that loop.
+"""
+import os
+import errno
+import socket
+import pickle
+import struct
+import asyncio
+import logging
+import weakref
+import collections
+import ctypes
+import ctypes.util
+
+import kombu
+from celery import states
+from celery.backends.rpc import RPCBackend
+from celery.backends.redis import RedisBackend
+from celery.backends.base import DisabledBackend
+
+from waterbutler.tasks import app
+from waterbutler.tasks import settings
+
+logger = logging.getLogger(__name__)
+
+# event loop -> {waiter key: waiter}
+_WAITERS = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class BaseResultWaiter:
+    """Hand out futures for task ids and resolve them as results arrive."""
+
+    def __init__(self):
+        self._futures = collections.defaultdict(list)  # type: collections.defaultdict
+
+    async def wait(self, task_id):
+        """Wait for the result of ``task_id``.  Return it, or raise the task's exception."""
+        future = asyncio.get_event_loop().create_future()
+        self._futures[task_id].append(future)
+        try:
+            await self._watch(task_id)
+            return await future
+        finally:
+            self._futures[task_id].remove(future)
+            if not self._futures[task_id]:
+                del self._futures[task_id]
+                await self._unwatch(task_id)
+
+    async def _watch(self, task_id):
+        """Start listening for ``task_id``, and resolve it right away if it's already done."""
+        raise NotImplementedError
+
+    async def _unwatch(self, task_id):
+        pass
+
+    def _resolve(self, task_id, result=None, exception=None):
+        for future in self._futures.get(task_id, ()):
+            if future.done():
+                continue
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+
+    def _resolve_meta(self, task_id, meta, backend):
+        """Resolve ``task_id`` from a Celery result meta dict, ignoring non-final states."""
+        if meta['status'] not in states.READY_STATES:
+            return
+        if meta['status'] in states.PROPAGATE_STATES:
+            self._resolve(task_id, exception=backend.exception_to_python(meta['result']))
+        else:
+            self._resolve(task_id, result=meta['result'])
+
+
+class RedisResultWaiter(BaseResultWaiter):
+    """Subscribe to the channel the Redis backend publishes each task's result to."""
+
+    def __init__(self, backend):
+        super().__init__()
+        import redis.asyncio as aioredis
+        self.backend = backend
+        self.client = aioredis.from_url(app.conf.result_backend)
+        self.pubsub = self.client.pubsub()
+        self._listener = None
+
+    async def _watch(self, task_id):
+        key = self.backend.get_key_for_task(task_id)
+        await self.pubsub.subscribe(key)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.ensure_future(self._listen())
+
+        # the task may have finished before we subscribed
+        payload = await self.client.get(key)
+        if payload is not None:
+            self._resolve_meta(task_id, self.backend.decode_result(payload), self.backend)
+
+    async def _unwatch(self, task_id):
+        await self.pubsub.unsubscribe(self.backend.get_key_for_task(task_id))
+
+    async def _listen(self):
+        prefix = self.backend.task_keyprefix
+        try:
+            async for message in self.pubsub.listen():
+                if message['type'] != 'message':
+                    continue
+                task_id = self.backend.bytes_to_str(message['channel'])[len(prefix):]
+                self._resolve_meta(task_id, self.backend.decode_result(message['data']),
+                                   self.backend)
+        except Exception as exc:
+            logger.exception('Lost the connection to the Redis result backend')
+            for task_id in list(self._futures):
+                self._resolve(task_id, exception=exc)
+
+
+class RPCResultWaiter(BaseResultWaiter):
+    """Consume the RPC backend's reply queue, reading from the broker whenever its socket is
+    readable.  Results for tasks nobody is waiting on yet are kept, up to ``max_buffered``, since
+    a fast task can finish before `wait` is called."""
+
+    max_buffered = 1000
+
+    def __init__(self, backend):
+        super().__init__()
+        self.backend = backend
+        self._buffered = collections.OrderedDict()  # type: collections.OrderedDict
+        self.connection = app.connection_for_read()
+        self.connection.ensure_connection()
+        self.consumer = kombu.Consumer(
+            self.connection.default_channel,
+            queues=[backend.binding],
+            callbacks=[self._on_message],
+            accept=backend.accept,
+            no_ack=True,
+        )
+        self.consumer.consume()
+        self._sock = self.connection.connection.sock
+        asyncio.get_event_loop().add_reader(self._sock, self._drain)
+
+    async def _watch(self, task_id):
+        meta = self._buffered.pop(task_id, None)
+        if meta is not None:
+            self._resolve_meta(task_id, meta, self.backend)
+
+    def _on_message(self, meta, message):
+        task_id = message.properties.get('correlation_id') or meta.get('task_id')
+        if meta.get('status') not in states.READY_STATES:
+            return
+        if task_id in self._futures:
+            self._resolve_meta(task_id, meta, self.backend)
+            return
+        self._buffered[task_id] = meta
+        while len(self._buffered) > self.max_buffered:
+            self._buffered.popitem(last=False)
+
+    def _drain(self):
+        try:
+            while True:
+                self.connection.drain_events(timeout=0)
+        except socket.timeout:
+            pass
+        except Exception as exc:
+            logger.exception('Lost the connection to the RPC result backend')
+            asyncio.get_event_loop().remove_reader(self._sock)
+            for task_id in list(self._futures):
+                self._resolve(task_id, exception=exc)
+
+
+class AdhocFileResultWaiter(BaseResultWaiter):
+    """Watch ``basepath`` for the pickled results written by the adhoc file backend."""
+
+    def __init__(self, basepath, interval=None):
+        super().__init__()
+        self.basepath = basepath
+        self.interval = interval or settings.WAIT_INTERVAL
+        self._poll_handle = None
+        self._fd = _inotify_watch(basepath)
+        if self._fd is not None:
+            asyncio.get_event_loop().add_reader(self._fd, self._on_inotify)
+
+    async def _watch(self, task_id):
+        self._load(task_id)
+        if self._fd is None:
+            self._schedule_poll()
+
+    def _load(self, task_id):
+        try:
+            with open(os.path.join(self.basepath, task_id), 'rb') as result_file:
+                data = pickle.load(result_file)
+        except FileNotFoundError:
+            return
+        if isinstance(data, Exception):
+            self._resolve(task_id, exception=data)
+        else:
+            self._resolve(task_id, result=data)
+
+    def _on_inotify(self):
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(buffer):
+            _, mask, _, length = _INOTIFY_EVENT.unpack_from(buffer, offset)
+            offset += _INOTIFY_EVENT.size
+            name = buffer[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                for task_id in list(self._futures):
+                    self._load(task_id)
+            elif name in self._futures:
+                self._load(name)
+
+    def _schedule_poll(self):
+        if self._poll_handle is None:
+            self._poll_handle = asyncio.get_event_loop().call_later(self.interval, self._poll)
+
+    def _poll(self):
+        self._poll_handle = None
+        for task_id in list(self._futures):
+            if os.path.exists(os.path.join(self.basepath, task_id)):
+                self._load(task_id)
+        if self._futures:
+            self._schedule_poll()
+
+
+class PollingResultWaiter(BaseResultWaiter):
+    """Fallback for other backends: poll ``AsyncResult.ready()``, which may block, in an executor
+    thread."""
+
+    def __init__(self, interval=None):
+        super().__init__()
+        self.interval = interval or settings.WAIT_INTERVAL
+
+    async def _watch(self, task_id):
+        asyncio.ensure_future(self._poll(app.AsyncResult(task_id)))
+
+    async def _poll(self, result):
+        loop = asyncio.get_event_loop()
+        while result.id in self._futures:
+            if await loop.run_in_executor(None, result.ready):
+                if result.failed():
+                    self._resolve(result.id, exception=result.result)
+                else:
+                    self._resolve(result.id, result=result.result)
+                return
+            await asyncio.sleep(self.interval)
+
+
+def _inotify_watch(path):
+    """Return a non-blocking inotify file descriptor watching ``path`` for files being written
+    or moved into it, or `None` if inotify isn't available."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(path), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+        logger.warning(f'Could not watch {path}: {errno.errorcode.get(ctypes.get_errno())}')
+        os.close(fd)
+        return None
+    return fd
+
+
+def get_waiter(basepath=None, interval=None):
+    """Return the result waiter for the configured backend on the current event loop."""
+    backend = app.backend
+    if isinstance(backend, DisabledBackend):
+        key = basepath = basepath or settings.ADHOC_BACKEND_PATH
+    else:
+        key = type(backend)
+
+    waiters = _WAITERS.setdefault(asyncio.get_event_loop(), {})
+    try:
+        return waiters[key]
+    except KeyError:
+        pass
+
+    if isinstance(backend, DisabledBackend):
+        waiter = AdhocFileResultWaiter(basepath, interval=interval)
+    elif isinstance(backend, RedisBackend):
+        waiter = RedisResultWaiter(backend)
+    elif isinstance(backend, RPCBackend):
+        waiter = RPCResultWaiter(backend)
+    else:
+        waiter = PollingResultWaiter(interval=interval)
+    waiters[key] = waiter
+    return waiter